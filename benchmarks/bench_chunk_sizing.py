@@ -0,0 +1,134 @@
+"""
+Compare static and adaptive chunk sizing.
+
+Two kinds of consumer are measured: simulated links, where the consumer
+sleeps as long as a slow or fast link would take per message, and real
+TransferFile streams through an in-process FileServer over loopback gRPC.
+The loopback runs use a stock channel (4MB receive limit) except for
+adaptive-8mb, which raises the server's cap and the client's limit.
+
+    PYTHONPATH=src python benchmarks/bench_chunk_sizing.py --size-mb 256
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import grpc
+
+from fileservice import file_service_pb2 as pb2
+from fileservice import file_service_pb2_grpc as pb2_grpc
+from fileservice.chunking import CHUNK_POLICIES, MAX_CHUNK, AdaptiveChunkPolicy
+from fileservice.client.parallel_download import MAX_MESSAGE_SIZE
+from fileservice.server.server import FileServer
+from fileservice.server.service import FileServiceServicer
+
+# Simulated links: (bytes per second, fixed cost per message in seconds)
+LINKS = {
+    'slow': (4 * 1024 * 1024, 0.002),
+    'fast': (1024 * 1024 * 1024, 0.0005),
+}
+
+# Loopback configurations: (chunk policy factory, client channel options)
+LOOPBACK = {
+    'static': (CHUNK_POLICIES['static'], []),
+    'adaptive': (CHUNK_POLICIES['adaptive'], []),
+    'adaptive-8mb': (
+        lambda: AdaptiveChunkPolicy(max_size=MAX_CHUNK),
+        [('grpc.max_receive_message_length', MAX_MESSAGE_SIZE)]
+    ),
+}
+
+BENCH_PORTS = [50285, 50286, 50287]
+
+
+def summarize(responses, start: float, pause=None) -> dict:
+    """Drain a TransferFile response stream and summarize it."""
+    first_byte = None
+    messages = 0
+    total = 0
+    max_chunk = 0
+    for response in responses:
+        if response.error:
+            raise RuntimeError(response.error)
+        size = len(response.content)
+        if size and first_byte is None:
+            first_byte = time.perf_counter() - start
+        messages += 1
+        total += size
+        max_chunk = max(max_chunk, size)
+        if pause:
+            time.sleep(pause(size))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'seconds': round(elapsed, 3),
+        'mb_per_s': round(total / elapsed / (1024 * 1024), 1),
+        'messages': messages,
+        'first_byte_ms': round((first_byte or 0) * 1000, 1),
+        'max_chunk_kb': max_chunk // 1024,
+    }
+
+
+def measure(policy_name: str, file_path: str, bandwidth: float, overhead: float) -> dict:
+    """Drain TransferFile with a consumer that sleeps as long as the link would take."""
+    servicer = FileServiceServicer(chunk_policy=CHUNK_POLICIES[policy_name]())
+    request = pb2.FileRequest(file_path=file_path)
+    try:
+        return summarize(
+            servicer.TransferFile(request, None), time.perf_counter(),
+            pause=lambda size: size / bandwidth + overhead)
+    finally:
+        servicer.close()
+
+
+def measure_loopback(name: str, file_path: str, repeat: int) -> dict:
+    """Download through a real server and channel; the best of `repeat` runs is kept."""
+    policy, options = LOOPBACK[name]
+    server = FileServer(ports=BENCH_PORTS, service=FileServiceServicer(chunk_policy=policy()))
+    if not server.start():
+        raise RuntimeError("Could not start the benchmark server")
+    try:
+        with grpc.insecure_channel(f"localhost:{server.port}", options=options) as channel:
+            stub = pb2_grpc.FileServiceStub(channel)
+            runs = []
+            for _ in range(repeat):
+                try:
+                    runs.append(summarize(
+                        stub.TransferFile(pb2.FileRequest(file_path=file_path)), time.perf_counter()))
+                except grpc.RpcError as e:
+                    return {'error': f"{e.code().name}: {e.details()}"}
+            return max(runs, key=lambda run: run['mb_per_s'])
+    finally:
+        server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, default=64, help='Test file size in MB')
+    parser.add_argument('--repeat', type=int, default=3, help='Loopback runs per configuration')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, 'bench.bin')
+        with open(file_path, 'wb') as f:
+            for _ in range(args.size_mb):
+                f.write(os.urandom(1024 * 1024))
+
+        results = {
+            link: {
+                policy: measure(policy, file_path, bandwidth, overhead)
+                for policy in sorted(CHUNK_POLICIES)
+            }
+            for link, (bandwidth, overhead) in LINKS.items()
+        }
+        results['loopback'] = {
+            name: measure_loopback(name, file_path, args.repeat) for name in LOOPBACK
+        }
+
+    print(json.dumps({'size_mb': args.size_mb, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Compare throughput and memory of the chunk readers used by the streaming RPCs."""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Iterator
+
+from fileservice import file_service_pb2 as pb2
+from fileservice.server.service import FileServiceServicer
+
+
+def legacy_reader(file_path: str, chunk_size: int) -> Iterator[pb2.FileChunkResponse]:
+    """The original file.read() loop, kept as the comparison baseline."""
+    with open(file_path, 'rb') as file:
+        offset = 0
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            yield pb2.FileChunkResponse(content=chunk, offset=offset)
+            offset += len(chunk)
+
+
+def servicer_reader(mmap_threshold) -> Callable[[str, int], Iterator[pb2.FileChunkResponse]]:
+    """Stream through TransferFile with the given mmap threshold."""
+    servicer = FileServiceServicer(mmap_threshold=mmap_threshold)
+
+    def reader(file_path: str, chunk_size: int) -> Iterator[pb2.FileChunkResponse]:
+        request = pb2.FileRequest(file_path=file_path, chunk_size=chunk_size)
+        return servicer.TransferFile(request, None)
+
+    return reader
+
+
+def measure(reader, file_path: str, chunk_size: int, repeat: int) -> dict:
+    """Drain a reader and report best throughput and peak traced memory."""
+    file_size = os.path.getsize(file_path)
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for response in reader(file_path, chunk_size):
+            if response.error:
+                raise RuntimeError(response.error)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    for _ in reader(file_path, chunk_size):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'seconds': round(best, 4),
+        'mb_per_s': round(file_size / best / (1024 * 1024), 1),
+        'peak_traced_kb': peak // 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size-mb', type=int, default=256, help='Test file size in MB')
+    parser.add_argument('--chunk-kb', type=int, default=4096, help='Chunk size in KB')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per reader')
+    args = parser.parse_args()
+
+    readers = {
+        'read': legacy_reader,
+        'pread': servicer_reader(None),
+        'mmap': servicer_reader(0),
+    }
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, 'bench.bin')
+        with open(file_path, 'wb') as f:
+            for _ in range(args.size_mb):
+                f.write(os.urandom(1024 * 1024))
+
+        results = {
+            name: measure(reader, file_path, args.chunk_kb * 1024, args.repeat)
+            for name, reader in readers.items()
+        }
+
+    print(json.dumps({
+        'size_mb': args.size_mb,
+        'chunk_kb': args.chunk_kb,
+        'results': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
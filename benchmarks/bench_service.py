@@ -0,0 +1,296 @@
+"""
+Benchmark the gRPC file service end to end.
+
+Starts a FileServer in-process on a local port and drives TransferFile,
+GetFileContents and IsFileExists across file sizes, chunk sizes and
+concurrency levels. Results are printed (or written with --output) as JSON
+and can be compared against a stored baseline with --baseline; the exit
+status is 1 when any metric regressed by more than --tolerance.
+
+    PYTHONPATH=src python benchmarks/bench_service.py --output baseline.json
+    PYTHONPATH=src python benchmarks/bench_service.py --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent import futures
+from typing import Callable
+
+import grpc
+
+from fileservice import file_service_pb2 as pb2
+from fileservice import file_service_pb2_grpc as pb2_grpc
+from fileservice.client.parallel_download import MAX_MESSAGE_SIZE
+from fileservice.server.server import FileServer
+
+DEFAULT_PORTS = list(range(50260, 50270))
+
+# Metrics compared against the baseline and whether larger values are better;
+# p95 values are reported but too noisy at these sample counts to gate on
+COMPARED_METRICS = {
+    'mb_per_s': True,
+    'calls_per_s': True,
+    'ttfb_p50_ms': False,
+    'latency_p50_ms': False,
+    'peak_kb_per_stream': False,
+}
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def parse_sizes(text: str) -> list[int]:
+    """Parse a comma separated list of sizes such as '64K,1M,32M' into bytes."""
+    units = {'K': 1024, 'M': 1024 * 1024, 'G': 1024 * 1024 * 1024}
+    sizes = []
+    for item in text.split(','):
+        item = item.strip().upper()
+        if item[-1:] in units:
+            sizes.append(int(float(item[:-1]) * units[item[-1]]))
+        else:
+            sizes.append(int(item))
+    return sizes
+
+
+def format_size(size: int) -> str:
+    for unit, factor in (('G', 1024 ** 3), ('M', 1024 ** 2), ('K', 1024)):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{unit}"
+    return str(size)
+
+
+def drain(method: Callable, request) -> tuple[float, float, int]:
+    """
+    Run one streaming call to completion.
+
+    Returns:
+        Tuple of (seconds to first content byte, total seconds, bytes received)
+    """
+    start = time.perf_counter()
+    first_byte = None
+    received = 0
+    for response in method(request):
+        if response.error:
+            raise RuntimeError(response.error)
+        if response.content and first_byte is None:
+            first_byte = time.perf_counter() - start
+        received += len(response.content)
+    elapsed = time.perf_counter() - start
+    return (first_byte if first_byte is not None else elapsed), elapsed, received
+
+
+def run_concurrently(stubs: list, call: Callable, calls_per_worker: int) -> tuple[list, float]:
+    """Run calls_per_worker calls on each stub from its own thread; returns results and wall time."""
+    with futures.ThreadPoolExecutor(max_workers=len(stubs)) as executor:
+        start = time.perf_counter()
+        jobs = [executor.submit(lambda s=stub: [call(s) for _ in range(calls_per_worker)])
+                for stub in stubs]
+        results = [result for job in jobs for result in job.result()]
+        return results, time.perf_counter() - start
+
+
+def bench_stream(
+        stubs: list,
+        rpc: str,
+        file_path: str,
+        chunk_size: int,
+        repeat: int,
+        measure_memory: bool
+) -> dict:
+    """Throughput, time to first byte and memory for concurrent streams of one file."""
+    request = pb2.FileRequest(file_path=file_path, chunk_size=chunk_size)
+
+    def call(stub):
+        return drain(getattr(stub, rpc), request)
+
+    # Warm up the page cache and the connections
+    run_concurrently(stubs, call, 1)
+    results, wall = run_concurrently(stubs, call, repeat)
+
+    ttfb = [first * 1000 for first, _, _ in results]
+    latency = [elapsed * 1000 for _, elapsed, _ in results]
+    total = sum(received for _, _, received in results)
+    metrics = {
+        'mb_per_s': round(total / wall / (1024 * 1024), 1),
+        'ttfb_p50_ms': round(percentile(ttfb, 0.5), 2),
+        'ttfb_p95_ms': round(percentile(ttfb, 0.95), 2),
+        'latency_p50_ms': round(percentile(latency, 0.5), 2),
+        'latency_p95_ms': round(percentile(latency, 0.95), 2),
+    }
+
+    if measure_memory:
+        # Client and server share the process, so this covers both ends of each stream
+        tracemalloc.start()
+        run_concurrently(stubs, call, 1)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        metrics['peak_kb_per_stream'] = peak // 1024 // len(stubs)
+
+    return metrics
+
+
+def bench_exists(stubs: list, file_path: str, repeat: int) -> dict:
+    """Calls per second and latency of concurrent IsFileExists calls."""
+    request = pb2.FileRequest(file_path=file_path, include_metadata=True)
+
+    def call(stub):
+        start = time.perf_counter()
+        response = stub.IsFileExists(request)
+        if response.error or not response.exists:
+            raise RuntimeError(response.error or "File not found")
+        return time.perf_counter() - start
+
+    run_concurrently(stubs, call, 10)
+    latencies, wall = run_concurrently(stubs, call, repeat)
+    latency = [seconds * 1000 for seconds in latencies]
+    return {
+        'calls_per_s': round(len(latencies) / wall, 1),
+        'latency_p50_ms': round(percentile(latency, 0.5), 3),
+        'latency_p95_ms': round(percentile(latency, 0.95), 3),
+    }
+
+
+def run_suite(args: argparse.Namespace, target: str, temp_dir: str) -> list[dict]:
+    """Run every scenario of the configured matrix."""
+    files = {}
+    for size in args.sizes:
+        path = os.path.join(temp_dir, f"bench_{format_size(size)}.bin")
+        with open(path, 'wb') as f:
+            remaining = size
+            while remaining:
+                block = os.urandom(min(remaining, 1024 * 1024))
+                f.write(block)
+                remaining -= len(block)
+        files[size] = path
+
+    results = []
+    for concurrency in args.concurrency:
+        channels = [
+            grpc.insecure_channel(target, options=[
+                ('grpc.max_receive_message_length', MAX_MESSAGE_SIZE),
+            ])
+            for _ in range(concurrency)
+        ]
+        stubs = [pb2_grpc.FileServiceStub(channel) for channel in channels]
+        try:
+            for size, path in files.items():
+                for rpc in ('TransferFile', 'GetFileContents'):
+                    for chunk_size in args.chunk_sizes:
+                        name = (f"{rpc}/size={format_size(size)}/chunk={format_size(chunk_size)}"
+                                f"/concurrency={concurrency}")
+                        metrics = bench_stream(
+                            stubs, rpc, path, chunk_size, args.repeat, not args.no_memory)
+                        results.append({'name': name, **metrics})
+                        print(f"{name}: {metrics}", file=sys.stderr)
+
+            name = f"IsFileExists/concurrency={concurrency}"
+            metrics = bench_exists(stubs, files[args.sizes[0]], args.repeat * 100)
+            results.append({'name': name, **metrics})
+            print(f"{name}: {metrics}", file=sys.stderr)
+        finally:
+            for channel in channels:
+                channel.close()
+    return results
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> list[dict]:
+    """
+    Compare results against a baseline run.
+
+    Args:
+        results: Scenarios from this run
+        baseline: Scenarios from the stored run
+        tolerance: Allowed relative change in the worse direction
+
+    Returns:
+        One entry per compared metric with the relative change and whether it regressed
+    """
+    previous = {entry['name']: entry for entry in baseline}
+    comparison = []
+    for entry in results:
+        old = previous.get(entry['name'])
+        if not old:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if metric not in entry or not old.get(metric):
+                continue
+            change = (entry[metric] - old[metric]) / old[metric]
+            worse = -change if higher_is_better else change
+            comparison.append({
+                'name': entry['name'],
+                'metric': metric,
+                'baseline': old[metric],
+                'current': entry[metric],
+                'change': round(change, 3),
+                'regressed': worse > tolerance,
+            })
+    return comparison
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=parse_sizes, default=parse_sizes('64K,1M,32M'),
+                        help='File sizes, e.g. 64K,1M,32M')
+    parser.add_argument('--chunk-sizes', type=parse_sizes, default=parse_sizes('64K,1M'),
+                        help='Requested chunk sizes (0 lets the server choose)')
+    parser.add_argument('--concurrency', type=lambda s: [int(n) for n in s.split(',')],
+                        default=[1, 8], help='Concurrent clients, e.g. 1,8,32')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed calls per client')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc pass')
+    parser.add_argument('--output', help='Write results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against results from an earlier run')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='Relative change counted as a regression')
+    args = parser.parse_args()
+
+    server = FileServer(max_workers=max(args.concurrency) * 2, ports=DEFAULT_PORTS)
+    if not server.start():
+        sys.exit("Failed to start server")
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            results = run_suite(args, f"localhost:{server.port}", temp_dir)
+    finally:
+        server.stop()
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'grpc': grpc.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report['comparison'] = compare(results, baseline['results'], args.tolerance)
+        regressions = [entry for entry in report['comparison'] if entry['regressed']]
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    for entry in regressions:
+        print(f"REGRESSION {entry['name']} {entry['metric']}: "
+              f"{entry['baseline']} -> {entry['current']} ({entry['change']:+.1%})", file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -42,6 +42,8 @@ setup(
         'grpcio-tools>=1.60.0',
         'grpcio-testing>=1.60.0',
         'watchdog>=3.0.0',
+        'xxhash>=3.4.1',
+        'zstandard>=0.22.0',
     ],
-    python_requires='>=3.8',
+    python_requires='>=3.9',
 )
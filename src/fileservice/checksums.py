@@ -0,0 +1,68 @@
+"""Incremental file digests shared by the server and clients."""
+import hashlib
+from typing import Iterable, Optional
+
+try:
+    import xxhash
+except ImportError:  # xxh64 support is optional
+    xxhash = None
+
+
+def available_algorithms() -> list[str]:
+    """List the digest algorithms usable in this process."""
+    algorithms = ['sha256']
+    if xxhash is not None:
+        algorithms.insert(0, 'xxh64')
+    return algorithms
+
+
+def new_hasher(algorithm: str):
+    """
+    Create a hasher with the hashlib update()/hexdigest() interface.
+
+    Raises:
+        ValueError: If the algorithm is not available
+    """
+    if algorithm == 'xxh64' and xxhash is not None:
+        return xxhash.xxh64()
+    if algorithm == 'sha256':
+        return hashlib.sha256()
+    raise ValueError(f"Unsupported checksum algorithm: {algorithm}")
+
+
+class StreamingDigest:
+    """Computes several digests over data as it is streamed."""
+
+    def __init__(self, algorithms: Iterable[str], known: Optional[dict[str, str]] = None):
+        """
+        Args:
+            algorithms: Algorithms to report
+            known: Digests already known (e.g. cached); these aren't recomputed
+
+        Raises:
+            ValueError: If an algorithm is not available
+        """
+        self.known = dict(known or {})
+        self._hashers = {
+            algorithm: new_hasher(algorithm)
+            for algorithm in dict.fromkeys(algorithms)
+            if algorithm not in self.known
+        }
+
+    @property
+    def computing(self) -> list[str]:
+        """Algorithms that still need the data."""
+        return list(self._hashers)
+
+    def update(self, data: bytes) -> None:
+        """Feed the next piece of data."""
+        for hasher in self._hashers.values():
+            hasher.update(data)
+
+    def hexdigests(self) -> dict[str, str]:
+        """Hex digests for every algorithm, known and computed."""
+        digests = dict(self.known)
+        digests.update(
+            (algorithm, hasher.hexdigest()) for algorithm, hasher in self._hashers.items()
+        )
+        return digests
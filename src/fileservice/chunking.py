@@ -0,0 +1,156 @@
+"""Chunk size selection shared by downloads and uploads."""
+from typing import Optional
+
+# Define size thresholds
+SMALL_FILE = 10 * 1024 * 1024  # 10MB
+MEDIUM_FILE = 100 * 1024 * 1024  # 100MB
+LARGE_FILE = 1024 * 1024 * 1024  # 1GB
+
+# Define chunk sizes
+SMALL_CHUNK = 512 * 1024  # 512KB
+MEDIUM_CHUNK = 2 * 1024 * 1024  # 2MB
+LARGE_CHUNK = 4 * 1024 * 1024  # 4MB
+MAX_CHUNK = 8 * 1024 * 1024  # 8MB
+
+
+def optimize_chunk_size(file_size: int, requested_size: Optional[int] = None) -> int:
+    """
+    Optimize chunk size based on file size and system constraints.
+
+    Args:
+        file_size: Size of the file in bytes
+        requested_size: Requested chunk size from client
+
+    Returns:
+        Optimized chunk size in bytes
+    """
+    if requested_size:
+        # Honor requested size but cap it at MAX_CHUNK
+        return min(requested_size, MAX_CHUNK)
+
+    # Choose chunk size based on file size
+    if file_size < SMALL_FILE:
+        return SMALL_CHUNK
+    elif file_size < MEDIUM_FILE:
+        return MEDIUM_CHUNK
+    elif file_size < LARGE_FILE:
+        return LARGE_CHUNK
+    else:
+        return MAX_CHUNK
+
+
+# Bounds and target for adaptive chunk sizing
+ADAPTIVE_MIN_CHUNK = 64 * 1024  # 64KB
+# Largest aligned size that fits gRPC's default 4MB receive limit with the
+# other response fields (metadata, checksums) on top; larger caps need
+# clients that raise grpc.max_receive_message_length
+ADAPTIVE_MAX_CHUNK = 4 * 1024 * 1024 - 64 * 1024
+ADAPTIVE_TARGET_SECONDS = 0.05  # Aim for each chunk to take ~50ms to send
+ADAPTIVE_SMOOTHING = 0.3  # Weight of the newest throughput sample
+CHUNK_ALIGNMENT = 64 * 1024  # Keep adaptive sizes page/readahead friendly
+
+
+class ChunkSizer:
+    """Chooses chunk sizes for one stream; this base class keeps a fixed size."""
+
+    def __init__(self, chunk_size: int):
+        self.chunk_size = chunk_size
+
+    def next_size(self) -> int:
+        """Size of the next chunk to send."""
+        return self.chunk_size
+
+    def record(self, nbytes: int, seconds: float) -> None:
+        """
+        Report how long a chunk took to send.
+
+        Args:
+            nbytes: Size of the chunk
+            seconds: Time from handing the chunk to gRPC until it asked for the next
+        """
+
+
+class AdaptiveChunkSizer(ChunkSizer):
+    """
+    Sizes chunks so each takes about target_seconds to send.
+
+    Fast consumers get large chunks (fewer messages, less per-message
+    overhead); slow ones get small chunks (less memory held per stream and
+    steadier progress). Each step at most doubles or halves the size.
+    """
+
+    def __init__(
+            self,
+            chunk_size: int,
+            min_size: int = ADAPTIVE_MIN_CHUNK,
+            max_size: int = ADAPTIVE_MAX_CHUNK,
+            target_seconds: float = ADAPTIVE_TARGET_SECONDS
+    ):
+        super().__init__(min(max(chunk_size, min_size), max_size))
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_seconds = target_seconds
+        self.throughput: Optional[float] = None  # Smoothed bytes per second
+
+    def record(self, nbytes: int, seconds: float) -> None:
+        if nbytes <= 0:
+            return
+        rate = nbytes / max(seconds, 1e-6)
+        if self.throughput is None:
+            self.throughput = rate
+        else:
+            self.throughput += ADAPTIVE_SMOOTHING * (rate - self.throughput)
+
+        ideal = self.throughput * self.target_seconds
+        ideal = min(max(ideal, self.chunk_size / 2), self.chunk_size * 2)
+        ideal = min(max(ideal, self.min_size), self.max_size)
+        self.chunk_size = max(self.min_size, int(ideal) // CHUNK_ALIGNMENT * CHUNK_ALIGNMENT)
+
+
+class StaticChunkPolicy:
+    """The original file-size based chunk sizes."""
+
+    name = 'static'
+
+    def new_stream(self, file_size: int, requested_size: Optional[int] = None) -> ChunkSizer:
+        """Create the chunk sizer for a new stream."""
+        return ChunkSizer(optimize_chunk_size(file_size, requested_size))
+
+
+class AdaptiveChunkPolicy:
+    """
+    Starts from the static size and adapts to each stream's measured throughput.
+
+    Chunks stay below ADAPTIVE_MAX_CHUNK unless max_size is raised, which
+    only works for clients that accept larger messages than gRPC's 4MB
+    default.
+    """
+
+    name = 'adaptive'
+
+    def __init__(
+            self,
+            min_size: int = ADAPTIVE_MIN_CHUNK,
+            max_size: int = ADAPTIVE_MAX_CHUNK,
+            target_seconds: float = ADAPTIVE_TARGET_SECONDS
+    ):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_seconds = target_seconds
+
+    def new_stream(self, file_size: int, requested_size: Optional[int] = None) -> ChunkSizer:
+        """Create the chunk sizer for a new stream; explicit client sizes are kept fixed."""
+        if requested_size:
+            return ChunkSizer(optimize_chunk_size(file_size, requested_size))
+        return AdaptiveChunkSizer(
+            optimize_chunk_size(file_size),
+            self.min_size,
+            self.max_size,
+            self.target_seconds
+        )
+
+
+CHUNK_POLICIES = {
+    StaticChunkPolicy.name: StaticChunkPolicy,
+    AdaptiveChunkPolicy.name: AdaptiveChunkPolicy,
+}
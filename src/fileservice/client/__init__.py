@@ -0,0 +1,24 @@
+from .aio_client import AsyncFileClient
+from .bundle import BundleResult
+from .client import FileClient
+from .delta_sync import DeltaSync, DeltaSyncResult
+from .parallel_download import DownloadError, DownloadResult, ParallelDownloader
+from .pool import AioChannelPool, ChannelPool, default_pool
+from .upload import Uploader, UploadError, UploadResult
+
+__all__ = [
+    'AioChannelPool',
+    'AsyncFileClient',
+    'BundleResult',
+    'ChannelPool',
+    'DeltaSync',
+    'DeltaSyncResult',
+    'DownloadError',
+    'DownloadResult',
+    'FileClient',
+    'ParallelDownloader',
+    'UploadError',
+    'UploadResult',
+    'Uploader',
+    'default_pool',
+]
@@ -0,0 +1,366 @@
+import asyncio
+import logging
+import os
+import time
+from typing import AsyncIterator, BinaryIO, Iterator, Optional, Sequence
+
+import grpc
+
+from fileservice import file_service_pb2 as pb2
+from fileservice.fileutils import preallocate
+from .bundle import BundleCollector, BundleResult, bundle_request
+from .client import DEFAULT_BACKOFF, DEFAULT_RETRIES, ResumableTransfer, is_retryable, retry_delay
+from .local import receive_fd
+from .parallel_download import DownloadError, DownloadResult
+from .pool import AioChannelPool
+from .sendfile import SendfileDownload
+from .upload import Uploader, UploadError, UploadResult
+
+logger = logging.getLogger(__name__)
+
+_default_pool: Optional[AioChannelPool] = None
+
+
+def default_aio_pool() -> AioChannelPool:
+    """The process-wide pool used by async clients that aren't given one."""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = AioChannelPool()
+    return _default_pool
+
+
+async def _in_executor(iterator: Iterator) -> AsyncIterator:
+    """Drive a blocking iterator (such as file reads) from the default executor."""
+    loop = asyncio.get_running_loop()
+    sentinel = object()
+    while True:
+        item = await loop.run_in_executor(None, next, iterator, sentinel)
+        if item is sentinel:
+            return
+        yield item
+
+
+class AsyncFileClient:
+    """
+    asyncio counterpart of FileClient on grpc.aio channels.
+
+    File reads and writes run in the loop's default executor so transfers
+    don't block the event loop.
+    """
+
+    def __init__(
+            self,
+            target: str,
+            pool: Optional[AioChannelPool] = None,
+            retries: int = DEFAULT_RETRIES,
+            backoff: float = DEFAULT_BACKOFF,
+            chunk_size: int = 0,
+            compression: str = '',
+            timeout: Optional[float] = None
+    ):
+        """
+        Args:
+            target: Server address, e.g. 'localhost:50051'
+            pool: Channel pool (None uses the process-wide default pool)
+            retries: Retries after transient failures; downloads reset the
+                count whenever a retry makes progress
+            backoff: Base delay between retries in seconds
+            chunk_size: Requested chunk size (0 lets the server choose)
+            compression: Chunk compression codec to request ('' for none)
+            timeout: Deadline for unary calls in seconds
+        """
+        self.target = target
+        self.pool = pool or default_aio_pool()
+        self.retries = retries
+        self.backoff = backoff
+        self.chunk_size = chunk_size
+        self.compression = compression
+        self.timeout = timeout
+
+    @property
+    def stub(self):
+        return self.pool.stub(self.target)
+
+    async def exists(self, remote_path: str, include_metadata: bool = False) -> pb2.FileExistsResponse:
+        """
+        Check whether a file exists, retrying transient failures.
+
+        Raises:
+            DownloadError: If the server reports an error
+        """
+        request = pb2.FileRequest(file_path=remote_path, include_metadata=include_metadata)
+        attempt = 0
+        while True:
+            try:
+                response = await self.stub.IsFileExists(request, timeout=self.timeout)
+                break
+            except grpc.RpcError as e:
+                attempt += 1
+                if not is_retryable(e) or attempt > self.retries:
+                    raise
+                await asyncio.sleep(retry_delay(attempt, self.backoff))
+        if response.error:
+            raise DownloadError(f"{remote_path}: {response.error}")
+        return response
+
+    async def _transfer(self, transfer: ResumableTransfer) -> AsyncIterator[tuple[int, bytes]]:
+        attempt = 0
+        while not transfer.done:
+            progress = transfer.position
+            call = self.stub.TransferFile(transfer.request())
+            try:
+                async for response in call:
+                    yield transfer.accept(response)
+                    if transfer.finished:
+                        break
+                else:
+                    raise DownloadError(f"{transfer.remote_path}: stream ended early")
+            except grpc.RpcError as e:
+                attempt = 1 if transfer.position > progress else attempt + 1
+                if not transfer.should_retry(e, attempt, self.retries):
+                    raise DownloadError(f"{transfer.remote_path}: {e.details()}") from e
+                await asyncio.sleep(retry_delay(attempt, self.backoff))
+            finally:
+                call.cancel()
+
+    async def iter_content(
+            self,
+            remote_path: str,
+            offset: int = 0,
+            length: int = 0
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream a file (or a byte range of it) as raw chunks.
+
+        Raises:
+            DownloadError: If the server reports an error or retries run out
+        """
+        transfer = ResumableTransfer(remote_path, offset, length, self.chunk_size, self.compression)
+        async for _, data in self._transfer(transfer):
+            if data:
+                yield data
+
+    async def read(self, remote_path: str, offset: int = 0, length: int = 0) -> bytes:
+        """Read a whole file (or a byte range of it) into memory."""
+        return b''.join([data async for data in self.iter_content(remote_path, offset, length)])
+
+    async def download_to(self, remote_path: str, file: BinaryIO) -> int:
+        """
+        Stream a file into a writable binary file object.
+
+        Returns:
+            Number of bytes written
+        """
+        loop = asyncio.get_running_loop()
+        written = 0
+        async for data in self.iter_content(remote_path):
+            await loop.run_in_executor(None, file.write, data)
+            written += len(data)
+        return written
+
+    async def download(self, remote_path: str, local_path: str) -> DownloadResult:
+        """
+        Download a file straight to disk; see FileClient.download.
+
+        Raises:
+            DownloadError: If the transfer fails or retries run out
+        """
+        loop = asyncio.get_running_loop()
+        start_time = time.monotonic()
+        transfer = ResumableTransfer(remote_path, 0, 0, self.chunk_size, self.compression)
+        partial_path = f"{local_path}.partial"
+        fd = os.open(partial_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            allocated = False
+            async for offset, data in self._transfer(transfer):
+                if not allocated and transfer.size is not None:
+                    await loop.run_in_executor(None, preallocate, fd, transfer.size)
+                    allocated = True
+                if data:
+                    await loop.run_in_executor(None, os.pwrite, fd, data, offset)
+            await loop.run_in_executor(None, os.fsync, fd)
+        except BaseException:
+            os.close(fd)
+            os.remove(partial_path)
+            raise
+        os.close(fd)
+        os.replace(partial_path, local_path)
+
+        result = DownloadResult(
+            local_path=local_path,
+            size=transfer.position,
+            elapsed=time.monotonic() - start_time,
+            streams=1,
+            resume_token=transfer.resume_token
+        )
+        logger.info(
+            f"Downloaded {remote_path} in {result.elapsed:.2f}s "
+            f"({result.throughput / (1024 * 1024):.1f} MB/s, {transfer.restarts} restarts)")
+        return result
+
+    async def download_sendfile(
+            self,
+            remote_path: str,
+            local_path: str,
+            offset: int = 0,
+            length: int = 0,
+            checksum: str = ''
+    ) -> DownloadResult:
+        """
+        Download over the server's sendfile side channel; see FileClient.download_sendfile.
+
+        The side-channel receive runs on the default executor.
+
+        Raises:
+            DownloadError: If the transfer fails or the data doesn't match the checksum
+        """
+        loop = asyncio.get_running_loop()
+        download = SendfileDownload(self.target, remote_path, local_path, offset, length, checksum)
+        call = self.stub.OpenSendfile(download.request())
+        try:
+            ticket = await call.read()
+            if ticket is grpc.aio.EOF:
+                raise DownloadError(f"{remote_path}: stream ended early")
+            await loop.run_in_executor(None, download.receive, ticket)
+            last = await call.read()
+            if last is grpc.aio.EOF:
+                raise DownloadError(f"{remote_path}: stream ended early")
+            return download.finish(last)
+        except BaseException as e:
+            download.abort()
+            if isinstance(e, grpc.RpcError):
+                raise DownloadError(f"{remote_path}: {e.details()}") from e
+            raise
+        finally:
+            call.cancel()
+
+    async def open_local(self, remote_path: str) -> BinaryIO:
+        """
+        Open a file through a server on the same host; see FileClient.open_local.
+
+        Raises:
+            DownloadError: If the server refuses or the descriptor can't be received
+        """
+        loop = asyncio.get_running_loop()
+        call = self.stub.OpenLocalFile(pb2.LocalFileRequest(file_path=remote_path))
+        fd = None
+        try:
+            ticket = await call.read()
+            if ticket is grpc.aio.EOF:
+                raise DownloadError(f"{remote_path}: stream ended early")
+            if ticket.error:
+                raise DownloadError(f"{remote_path}: {ticket.error}")
+            fd = await loop.run_in_executor(None, receive_fd, ticket.fd_socket, ticket.token)
+            last = await call.read()
+            if last is grpc.aio.EOF:
+                raise DownloadError(f"{remote_path}: stream ended early")
+            if last.error:
+                raise DownloadError(f"{remote_path}: {last.error}")
+            file = os.fdopen(fd, 'rb')
+            fd = None
+            return file
+        except grpc.RpcError as e:
+            raise DownloadError(f"{remote_path}: {e.details()}") from e
+        finally:
+            if fd is not None:
+                os.close(fd)
+            call.cancel()
+
+    async def upload(self, local_path: str, remote_path: str, overwrite: bool = False) -> UploadResult:
+        """
+        Upload a local file, reading it in the default executor.
+
+        Raises:
+            UploadError: If the server reports an error
+        """
+        start_time = time.monotonic()
+        uploader = Uploader(self.target, chunk_size=self.chunk_size)
+        chunks = _in_executor(uploader._chunks(local_path, remote_path, overwrite))
+        response = await self.stub.UploadFile(chunks)
+        if not response.success:
+            raise UploadError(response.error)
+
+        result = UploadResult(
+            remote_path=remote_path,
+            size=response.bytes_written,
+            elapsed=time.monotonic() - start_time
+        )
+        logger.info(
+            f"Uploaded {local_path} to {remote_path} "
+            f"({result.throughput / (1024 * 1024):.1f} MB/s)")
+        return result
+
+    async def download_bundle(
+            self,
+            file: BinaryIO,
+            file_paths: Sequence[str] = (),
+            directory: str = '',
+            patterns: Sequence[str] = (),
+            max_depth: int = 0,
+            compression: str = ''
+    ) -> BundleResult:
+        """
+        Write a tar archive of many files to a file object; see FileClient.download_bundle.
+
+        Raises:
+            DownloadError: If the server ends the bundle with an error
+        """
+        loop = asyncio.get_running_loop()
+        request = bundle_request(file_paths, directory, patterns, max_depth, compression, self.chunk_size)
+        collector = BundleCollector()
+        async for response in self.stub.TransferBundle(request):
+            content = collector.accept(response)
+            if content:
+                await loop.run_in_executor(None, file.write, content)
+        return collector.result
+
+    async def search(
+            self,
+            directory: str,
+            query: str = '',
+            patterns: Sequence[str] = (),
+            regex: bool = False,
+            ignore_case: bool = False,
+            max_results: int = 0,
+            **options
+    ) -> AsyncIterator[pb2.SearchMatch]:
+        """
+        Search a directory on the server; see FileClient.search.
+
+        Raises:
+            DownloadError: If the server reports an error
+        """
+        request = pb2.SearchRequest(
+            directory_path=directory, query=query, patterns=patterns, regex=regex,
+            ignore_case=ignore_case, max_results=max_results, **options)
+        async for response in self.stub.SearchFiles(request):
+            if response.error:
+                raise DownloadError(f"Search of {directory} failed: {response.error}")
+            for match in response.matches:
+                yield match
+
+    async def follow(
+            self,
+            remote_path: str,
+            offset: int = 0,
+            idle_timeout: int = 0,
+            batch_delay_ms: int = 0
+    ) -> AsyncIterator[pb2.TailChunk]:
+        """
+        Follow a growing file on the server; see FileClient.follow.
+
+        Raises:
+            DownloadError: If the server reports an error
+        """
+        request = pb2.TailRequest(
+            file_path=remote_path, offset=offset, chunk_size=self.chunk_size,
+            idle_timeout=idle_timeout, batch_delay_ms=batch_delay_ms)
+        call = self.stub.TailFile(request)
+        try:
+            async for response in call:
+                if response.error:
+                    raise DownloadError(f"{remote_path}: {response.error}")
+                yield response
+        finally:
+            call.cancel()
+
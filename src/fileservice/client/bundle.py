@@ -0,0 +1,150 @@
+import io
+import os
+import tarfile
+import time
+from dataclasses import dataclass, field
+from typing import Iterator, Sequence
+
+from fileservice import file_service_pb2 as pb2
+from .parallel_download import DownloadError
+
+
+@dataclass
+class BundleResult:
+    """Outcome of a completed bundle transfer."""
+
+    file_count: int = 0
+    total_bytes: int = 0
+    archive_bytes: int = 0
+    errors: list[tuple[str, str]] = field(default_factory=list)
+    elapsed: float = 0.0
+
+
+def bundle_request(
+        file_paths: Sequence[str] = (),
+        directory: str = '',
+        patterns: Sequence[str] = (),
+        max_depth: int = 0,
+        compression: str = '',
+        chunk_size: int = 0
+) -> pb2.BundleRequest:
+    """Build a TransferBundle request; see BundleRequest in the proto for the fields."""
+    return pb2.BundleRequest(
+        file_paths=file_paths,
+        directory_path=directory,
+        patterns=patterns,
+        max_depth=max_depth,
+        compression=compression,
+        chunk_size=chunk_size
+    )
+
+
+class BundleCollector:
+    """Unpacks TransferBundle responses into archive bytes and a BundleResult."""
+
+    def __init__(self):
+        self.result = BundleResult()
+        self._start = time.monotonic()
+
+    def accept(self, response: pb2.BundleChunk) -> bytes:
+        """
+        Process one response.
+
+        Returns:
+            The archive bytes it carried
+
+        Raises:
+            DownloadError: If the server ended the bundle with an error
+        """
+        if response.error:
+            raise DownloadError(f"Bundle failed: {response.error}")
+        self.result.errors.extend((error.path, error.error) for error in response.file_errors)
+        self.result.archive_bytes += len(response.content)
+        if response.is_last:
+            self.result.file_count = response.file_count
+            self.result.total_bytes = response.total_bytes
+            self.result.elapsed = time.monotonic() - self._start
+        return response.content
+
+
+class ChunkReader(io.RawIOBase):
+    """Read-only file object over an iterator of byte chunks, for tarfile's stream mode."""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer = b''
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer:
+            self._buffer = next(self._chunks, None)
+            if self._buffer is None:
+                self._buffer = b''
+                return 0
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def extract_archive(tar: tarfile.TarFile, destination: str) -> None:
+    """
+    Unpack a (streamed) archive, refusing members that would escape destination.
+
+    Uses tarfile's 'data' filter where the interpreter has it (3.8.17+,
+    3.9.17+, 3.10.12+, 3.11.4+) and the same checks done by hand otherwise.
+
+    Raises:
+        DownloadError: If a member is unsafe to extract
+    """
+    if not hasattr(tarfile, 'data_filter'):
+        _extract_checked(tar, destination)
+        return
+    try:
+        tar.extractall(destination, filter='data')
+    except tarfile.FilterError as e:
+        raise DownloadError(f"Refusing to extract bundle: {e}") from e
+
+
+def _extract_checked(tar: tarfile.TarFile, destination: str) -> None:
+    """Extract members one by one after checking them as the 'data' filter would."""
+    root = os.path.realpath(destination)
+    for member in tar:
+        _check_member(member, root)
+        tar.extract(member, destination)
+
+
+def _check_member(member: tarfile.TarInfo, root: str) -> None:
+    """
+    Reject members that are not plain files, directories or contained links,
+    and drop ownership and special mode bits from the rest.
+    """
+    def inside(path: str) -> bool:
+        return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+    # Like the filter, absolute names are taken as relative to destination
+    name = member.name = member.name.lstrip('/' + os.sep)
+    target = os.path.join(root, name)
+    if not inside(target):
+        raise DownloadError(f"Refusing to extract bundle: {name} is outside the destination")
+
+    if member.issym():
+        link = os.path.join(os.path.dirname(target), member.linkname)
+        if os.path.isabs(member.linkname) or not inside(link):
+            raise DownloadError(f"Refusing to extract bundle: {name} links outside the destination")
+    elif member.islnk():
+        if os.path.isabs(member.linkname) or not inside(os.path.join(root, member.linkname)):
+            raise DownloadError(f"Refusing to extract bundle: {name} links outside the destination")
+    elif member.isfile():
+        # No setuid/setgid/sticky or group/other write; the owner can always read and write
+        member.mode = (member.mode & 0o755) | 0o600
+    elif member.isdir():
+        member.mode = (member.mode & 0o755) | 0o700
+    else:
+        raise DownloadError(f"Refusing to extract bundle: {name} is not a file, directory or link")
+
+    # Files belong to whoever extracts them, even when that is root
+    member.uid, member.gid = os.getuid(), os.getgid()
+    member.uname = member.gname = ''
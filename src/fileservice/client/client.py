@@ -0,0 +1,537 @@
+import logging
+import os
+import random
+import tarfile
+import time
+from typing import BinaryIO, Iterator, Optional, Sequence
+
+import grpc
+
+from fileservice import file_service_pb2 as pb2
+from fileservice.compression import StreamDecompressor, decompress_chunk
+from fileservice.fileutils import preallocate
+from .bundle import BundleCollector, BundleResult, ChunkReader, bundle_request, extract_archive
+from .delta_sync import DeltaSync, DeltaSyncResult
+from .local import receive_fd
+from .parallel_download import DownloadError, DownloadResult
+from .pool import ChannelPool, default_pool
+from .sendfile import SendfileDownload
+from .upload import Uploader, UploadResult
+
+logger = logging.getLogger(__name__)
+
+# Failures that say nothing about the request itself and are worth retrying
+RETRYABLE_CODES = frozenset({
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+    grpc.StatusCode.ABORTED,
+    grpc.StatusCode.INTERNAL,
+})
+
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.2
+MAX_BACKOFF = 5.0
+
+
+def is_retryable(error: grpc.RpcError) -> bool:
+    """Whether a failed call may be retried."""
+    code = error.code() if hasattr(error, 'code') else None
+    return code in RETRYABLE_CODES
+
+
+def retry_delay(attempt: int, backoff: float) -> float:
+    """Exponential backoff with full jitter for the given retry (1-based)."""
+    return random.uniform(0, min(MAX_BACKOFF, backoff * 2 ** (attempt - 1)))
+
+
+class ResumableTransfer:
+    """
+    State of a TransferFile download that can be restarted where it stopped.
+
+    The first request asks for metadata and the resume token; every retry
+    asks for the rest of the range from the current position with that
+    token, so the server refuses to resume if the file changed meanwhile.
+    Shared by the sync and async clients.
+    """
+
+    def __init__(
+            self,
+            remote_path: str,
+            offset: int = 0,
+            length: int = 0,
+            chunk_size: int = 0,
+            compression: str = ''
+    ):
+        self.remote_path = remote_path
+        self.start = offset
+        self.length = length
+        self.chunk_size = chunk_size
+        self.compression = compression
+        self.position = offset
+        self.size: Optional[int] = None
+        self.resume_token = ''
+        self.restarts = 0
+        self.finished = False
+
+    @property
+    def end(self) -> Optional[int]:
+        """End of the requested range, once known."""
+        if self.length:
+            return self.start + self.length
+        return self.size
+
+    @property
+    def done(self) -> bool:
+        """Whether the last chunk arrived, or every byte did before the stream was cut."""
+        return self.finished or (self.end is not None and self.position >= self.end)
+
+    def request(self) -> pb2.FileRequest:
+        """Request for the remaining part of the range."""
+        return pb2.FileRequest(
+            file_path=self.remote_path,
+            chunk_size=self.chunk_size,
+            include_metadata=not self.resume_token,
+            offset=self.position,
+            length=self.start + self.length - self.position if self.length else 0,
+            resume_token=self.resume_token,
+            compression=self.compression
+        )
+
+    def accept(self, response: pb2.FileChunkResponse) -> tuple[int, bytes]:
+        """
+        Process one response of the current attempt.
+
+        Returns:
+            Tuple of (file offset, raw content)
+
+        Raises:
+            DownloadError: If the server reports an error or the stream is out of order
+        """
+        if response.error:
+            raise DownloadError(f"{self.remote_path}: {response.error}")
+        if response.resume_token and not self.resume_token:
+            self.resume_token = response.resume_token
+        if response.HasField('metadata') and self.size is None:
+            self.size = response.metadata.size
+        if response.offset != self.position:
+            raise DownloadError(
+                f"{self.remote_path}: expected offset {self.position}, got {response.offset}")
+
+        data = decompress_chunk(response.compression, response.content) if response.content else b''
+        self.position += len(data)
+        if response.is_last:
+            self.finished = True
+        return response.offset, data
+
+    def should_retry(self, error: grpc.RpcError, attempt: int, retries: int) -> bool:
+        """Whether to restart after a failed attempt, logging the decision."""
+        if not is_retryable(error) or attempt > retries:
+            return False
+        self.restarts += 1
+        logger.warning(
+            f"Transfer of {self.remote_path} failed at offset {self.position} "
+            f"({error.code().name}); resuming (attempt {attempt}/{retries})")
+        return True
+
+
+class FileClient:
+    """
+    Synchronous client for the file service.
+
+    Calls go over channels from a shared ChannelPool, so creating clients is
+    cheap and repeated calls reuse the same connection. Downloads resume
+    from the last received byte after transient failures.
+    """
+
+    def __init__(
+            self,
+            target: str,
+            pool: Optional[ChannelPool] = None,
+            retries: int = DEFAULT_RETRIES,
+            backoff: float = DEFAULT_BACKOFF,
+            chunk_size: int = 0,
+            compression: str = '',
+            timeout: Optional[float] = None
+    ):
+        """
+        Args:
+            target: Server address, e.g. 'localhost:50051'
+            pool: Channel pool (None uses the process-wide default pool)
+            retries: Retries after transient failures; downloads reset the
+                count whenever a retry makes progress
+            backoff: Base delay between retries in seconds
+            chunk_size: Requested chunk size (0 lets the server choose)
+            compression: Chunk compression codec to request ('' for none)
+            timeout: Deadline for unary calls in seconds
+        """
+        self.target = target
+        self.pool = pool or default_pool()
+        self.retries = retries
+        self.backoff = backoff
+        self.chunk_size = chunk_size
+        self.compression = compression
+        self.timeout = timeout
+
+    @property
+    def stub(self):
+        return self.pool.stub(self.target)
+
+    def exists(self, remote_path: str, include_metadata: bool = False) -> pb2.FileExistsResponse:
+        """
+        Check whether a file exists, retrying transient failures.
+
+        Raises:
+            DownloadError: If the server reports an error
+        """
+        request = pb2.FileRequest(file_path=remote_path, include_metadata=include_metadata)
+        attempt = 0
+        while True:
+            try:
+                response = self.stub.IsFileExists(request, timeout=self.timeout)
+                break
+            except grpc.RpcError as e:
+                attempt += 1
+                if not is_retryable(e) or attempt > self.retries:
+                    raise
+                time.sleep(retry_delay(attempt, self.backoff))
+        if response.error:
+            raise DownloadError(f"{remote_path}: {response.error}")
+        return response
+
+    def _transfer(self, transfer: ResumableTransfer) -> Iterator[tuple[int, bytes]]:
+        attempt = 0
+        while not transfer.done:
+            progress = transfer.position
+            try:
+                for response in self.stub.TransferFile(transfer.request()):
+                    yield transfer.accept(response)
+                    if transfer.finished:
+                        break
+                else:
+                    raise DownloadError(f"{transfer.remote_path}: stream ended early")
+            except grpc.RpcError as e:
+                attempt = 1 if transfer.position > progress else attempt + 1
+                if not transfer.should_retry(e, attempt, self.retries):
+                    raise DownloadError(f"{transfer.remote_path}: {e.details()}") from e
+                time.sleep(retry_delay(attempt, self.backoff))
+
+    def iter_content(self, remote_path: str, offset: int = 0, length: int = 0) -> Iterator[bytes]:
+        """
+        Stream a file (or a byte range of it) as raw chunks.
+
+        Args:
+            remote_path: Path of the file on the server
+            offset: First byte to read
+            length: Bytes to read (0 = to end of file)
+
+        Raises:
+            DownloadError: If the server reports an error or retries run out
+        """
+        transfer = ResumableTransfer(remote_path, offset, length, self.chunk_size, self.compression)
+        for _, data in self._transfer(transfer):
+            if data:
+                yield data
+
+    def read(self, remote_path: str, offset: int = 0, length: int = 0) -> bytes:
+        """Read a whole file (or a byte range of it) into memory."""
+        return b''.join(self.iter_content(remote_path, offset, length))
+
+    def download_to(self, remote_path: str, file: BinaryIO) -> int:
+        """
+        Stream a file into a writable binary file object.
+
+        Returns:
+            Number of bytes written
+        """
+        written = 0
+        for data in self.iter_content(remote_path):
+            file.write(data)
+            written += len(data)
+        return written
+
+    def download(self, remote_path: str, local_path: str) -> DownloadResult:
+        """
+        Download a file straight to disk.
+
+        Chunks are written at their offsets into a preallocated
+        <local_path>.partial file, which replaces local_path once complete.
+
+        Returns:
+            DownloadResult with size, elapsed time and resume token
+
+        Raises:
+            DownloadError: If the transfer fails or retries run out
+        """
+        start_time = time.monotonic()
+        transfer = ResumableTransfer(remote_path, 0, 0, self.chunk_size, self.compression)
+        partial_path = f"{local_path}.partial"
+        fd = os.open(partial_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            allocated = False
+            for offset, data in self._transfer(transfer):
+                if not allocated and transfer.size is not None:
+                    preallocate(fd, transfer.size)
+                    allocated = True
+                if data:
+                    os.pwrite(fd, data, offset)
+            os.fsync(fd)
+        except BaseException:
+            os.close(fd)
+            os.remove(partial_path)
+            raise
+        os.close(fd)
+        os.replace(partial_path, local_path)
+
+        result = DownloadResult(
+            local_path=local_path,
+            size=transfer.position,
+            elapsed=time.monotonic() - start_time,
+            streams=1,
+            resume_token=transfer.resume_token
+        )
+        logger.info(
+            f"Downloaded {remote_path} in {result.elapsed:.2f}s "
+            f"({result.throughput / (1024 * 1024):.1f} MB/s, {transfer.restarts} restarts)")
+        return result
+
+    def download_sendfile(
+            self,
+            remote_path: str,
+            local_path: str,
+            offset: int = 0,
+            length: int = 0,
+            checksum: str = ''
+    ) -> DownloadResult:
+        """
+        Download a file (or byte range) over the server's sendfile side channel.
+
+        gRPC negotiates the transfer and reports the checksum; the data
+        arrives on a separate raw TCP connection to the same host, which the
+        server feeds with sendfile(). Much cheaper than TransferFile for
+        multi-GB files, but needs the side-channel port to be reachable and
+        isn't resumed after a failure (download() is).
+
+        Args:
+            remote_path: Path of the file on the server
+            local_path: Where to save the file (or range)
+            offset: First byte to fetch
+            length: Bytes to fetch (0 = to end of file)
+            checksum: Digest used to verify the data (default: fastest available)
+
+        Returns:
+            DownloadResult with size, elapsed time and resume token
+
+        Raises:
+            DownloadError: If the transfer fails or the data doesn't match the checksum
+        """
+        download = SendfileDownload(self.target, remote_path, local_path, offset, length, checksum)
+        call = self.stub.OpenSendfile(download.request())
+        try:
+            responses = iter(call)
+            download.receive(next(responses))
+            return download.finish(next(responses))
+        except BaseException as e:
+            download.abort()
+            if isinstance(e, grpc.RpcError):
+                raise DownloadError(f"{remote_path}: {e.details()}") from e
+            if isinstance(e, StopIteration):
+                raise DownloadError(f"{remote_path}: stream ended early") from None
+            raise
+        finally:
+            call.cancel()
+
+    def open_local(self, remote_path: str) -> BinaryIO:
+        """
+        Open a file through a server on the same host, for reading without RPCs.
+
+        The server checks the path like any other request and passes an
+        open read-only descriptor over its Unix domain socket (SCM_RIGHTS),
+        so reads go straight to the file instead of through protobuf
+        messages. The client must be connected to the server's Unix socket,
+        e.g. FileClient('unix:/run/fileservice.sock').
+
+        Returns:
+            Binary file object owning the descriptor
+
+        Raises:
+            DownloadError: If the server refuses or the descriptor can't be received
+        """
+        call = self.stub.OpenLocalFile(pb2.LocalFileRequest(file_path=remote_path))
+        fd = None
+        try:
+            responses = iter(call)
+            ticket = next(responses)
+            if ticket.error:
+                raise DownloadError(f"{remote_path}: {ticket.error}")
+            fd = receive_fd(ticket.fd_socket, ticket.token)
+            last = next(responses)
+            if last.error:
+                raise DownloadError(f"{remote_path}: {last.error}")
+            file = os.fdopen(fd, 'rb')
+            fd = None
+            return file
+        except grpc.RpcError as e:
+            raise DownloadError(f"{remote_path}: {e.details()}") from e
+        except StopIteration:
+            raise DownloadError(f"{remote_path}: stream ended early") from None
+        finally:
+            if fd is not None:
+                os.close(fd)
+            call.cancel()
+
+    def upload(self, local_path: str, remote_path: str, overwrite: bool = False) -> UploadResult:
+        """Upload a local file over the pooled channel; see Uploader.upload."""
+        uploader = Uploader(self.target, chunk_size=self.chunk_size, pool=self.pool)
+        return uploader.upload(local_path, remote_path, overwrite)
+
+    def sync(self, remote_path: str, local_path: str) -> DeltaSyncResult:
+        """Update a local copy with the delta protocol; see DeltaSync.sync."""
+        return DeltaSync(self.target, pool=self.pool).sync(remote_path, local_path)
+
+    def download_bundle(
+            self,
+            file: BinaryIO,
+            file_paths: Sequence[str] = (),
+            directory: str = '',
+            patterns: Sequence[str] = (),
+            max_depth: int = 0,
+            compression: str = ''
+    ) -> BundleResult:
+        """
+        Write a tar archive of many files to a file object, as sent.
+
+        With compression ('gzip' or 'zstd') the archive is written compressed,
+        e.g. as a .tar.gz. Bundles are not resumable, so failures aren't retried.
+
+        Args:
+            file: Writable binary file object
+            file_paths: Files to include (relative to directory when it is set)
+            directory: Directory to archive, filtered by patterns when no file_paths are given
+            patterns: Globs matched against names or relative paths
+            max_depth: Levels to descend under directory (0 = unlimited)
+            compression: Whole-archive compression codec
+
+        Returns:
+            BundleResult with counts and the files that couldn't be archived
+
+        Raises:
+            DownloadError: If the server ends the bundle with an error
+        """
+        request = bundle_request(file_paths, directory, patterns, max_depth, compression, self.chunk_size)
+        collector = BundleCollector()
+        for response in self.stub.TransferBundle(request):
+            content = collector.accept(response)
+            if content:
+                file.write(content)
+        return collector.result
+
+    def extract_bundle(
+            self,
+            destination: str,
+            file_paths: Sequence[str] = (),
+            directory: str = '',
+            patterns: Sequence[str] = (),
+            max_depth: int = 0,
+            compression: str = ''
+    ) -> BundleResult:
+        """
+        Fetch a bundle and unpack it into a local directory as it streams in.
+
+        Arguments are as for download_bundle; compression only affects the
+        wire. Member names that would escape destination are rejected.
+
+        Raises:
+            DownloadError: If the server ends the bundle with an error, or
+                it holds a member that is unsafe to extract
+        """
+        request = bundle_request(file_paths, directory, patterns, max_depth, compression, self.chunk_size)
+        collector = BundleCollector()
+        decompressor = StreamDecompressor(compression)
+
+        def archive() -> Iterator[bytes]:
+            for response in self.stub.TransferBundle(request):
+                content = collector.accept(response)
+                if content:
+                    yield decompressor.decompress(content)
+
+        chunks = archive()
+        with tarfile.open(fileobj=ChunkReader(chunks), mode='r|') as tar:
+            extract_archive(tar, destination)
+        # tarfile stops at the end-of-archive marker; the counts come after it
+        for _ in chunks:
+            pass
+        return collector.result
+
+    def search(
+            self,
+            directory: str,
+            query: str = '',
+            patterns: Sequence[str] = (),
+            regex: bool = False,
+            ignore_case: bool = False,
+            max_results: int = 0,
+            **options
+    ) -> Iterator[pb2.SearchMatch]:
+        """
+        Search a directory on the server by file name and contents.
+
+        Args:
+            directory: Directory to search
+            query: Content to find ('' matches file names only)
+            patterns: Globs matched against names or relative paths
+            regex: Whether query is a regular expression
+            ignore_case: Match ASCII letters case-insensitively
+            max_results: Stop after this many matches (0 = no limit)
+            **options: Other SearchRequest fields, e.g. max_depth or max_file_size
+
+        Yields:
+            SearchMatch messages as the server finds them
+
+        Raises:
+            DownloadError: If the server reports an error
+        """
+        request = pb2.SearchRequest(
+            directory_path=directory, query=query, patterns=patterns, regex=regex,
+            ignore_case=ignore_case, max_results=max_results, **options)
+        for response in self.stub.SearchFiles(request):
+            if response.error:
+                raise DownloadError(f"Search of {directory} failed: {response.error}")
+            yield from response.matches
+
+    def follow(
+            self,
+            remote_path: str,
+            offset: int = 0,
+            idle_timeout: int = 0,
+            batch_delay_ms: int = 0
+    ) -> Iterator[pb2.TailChunk]:
+        """
+        Follow a growing file on the server, tail -F style.
+
+        Closing the generator cancels the call.
+
+        Args:
+            remote_path: File to follow
+            offset: Start offset; negative values count back from the end
+            idle_timeout: End after this many seconds without data (0 = never)
+            batch_delay_ms: How long the server waits to batch small appends
+
+        Yields:
+            TailChunk messages; check truncated/rotated, after which offsets restart at 0
+
+        Raises:
+            DownloadError: If the server reports an error
+        """
+        request = pb2.TailRequest(
+            file_path=remote_path, offset=offset, chunk_size=self.chunk_size,
+            idle_timeout=idle_timeout, batch_delay_ms=batch_delay_ms)
+        call = self.stub.TailFile(request)
+        try:
+            for response in call:
+                if response.error:
+                    raise DownloadError(f"{remote_path}: {response.error}")
+                yield response
+        finally:
+            call.cancel()
+
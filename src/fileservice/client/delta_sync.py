@@ -0,0 +1,143 @@
+import contextlib
+import hashlib
+import io
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterator, Optional
+
+import grpc
+
+from fileservice import file_service_pb2 as pb2
+from fileservice import file_service_pb2_grpc as pb2_grpc
+from fileservice.delta import DeltaOp, apply_delta, choose_block_size, compute_signatures
+from .parallel_download import MAX_MESSAGE_SIZE, DownloadError
+
+if TYPE_CHECKING:
+    from .pool import ChannelPool
+
+logger = logging.getLogger(__name__)
+
+# Signatures sent per request message
+SIGNATURES_PER_MESSAGE = 8192
+
+
+@dataclass
+class DeltaSyncResult:
+    """Outcome of a completed delta sync."""
+
+    local_path: str
+    size: int
+    literal_bytes: int
+    matched_bytes: int
+    elapsed: float
+
+    @property
+    def saved_ratio(self) -> float:
+        """Fraction of the file that didn't have to be sent."""
+        return self.matched_bytes / self.size if self.size else 0.0
+
+
+class DeltaSync:
+    """Brings a local copy up to date by fetching only the changed blocks."""
+
+    def __init__(self, target: str, block_size: int = 0, pool: Optional['ChannelPool'] = None):
+        """
+        Args:
+            target: Server address, e.g. 'localhost:50051'
+            block_size: Signature block size (0 picks one from the local file size)
+            pool: Channel pool to use (None opens a channel per sync)
+        """
+        self.target = target
+        self.block_size = block_size
+        self.pool = pool
+
+    def _requests(
+            self,
+            remote_path: str,
+            local_path: str,
+            block_size: int
+    ) -> Iterator[pb2.DeltaRequest]:
+        """Stream signatures of the local copy in batches."""
+        request = pb2.DeltaRequest(file_path=remote_path, block_size=block_size)
+        if os.path.exists(local_path):
+            with open(local_path, 'rb') as basis:
+                for sig in compute_signatures(basis, block_size):
+                    request.signatures.add(
+                        index=sig.index, weak=sig.weak, strong=sig.strong, length=sig.length)
+                    if len(request.signatures) >= SIGNATURES_PER_MESSAGE:
+                        yield request
+                        request = pb2.DeltaRequest()
+        yield request
+
+    def sync(self, remote_path: str, local_path: str) -> DeltaSyncResult:
+        """
+        Update local_path to match remote_path.
+
+        Args:
+            remote_path: Path of the file on the server
+            local_path: Local copy to update (created if missing)
+
+        Returns:
+            DeltaSyncResult with literal and matched byte counts
+
+        Raises:
+            DownloadError: If the server reports an error or the result doesn't verify
+        """
+        start_time = time.monotonic()
+        basis_size = os.path.getsize(local_path) if os.path.exists(local_path) else 0
+        block_size = self.block_size or choose_block_size(basis_size)
+        last = pb2.DeltaChunkResponse()
+
+        def ops(responses) -> Iterator[DeltaOp]:
+            nonlocal last
+            for response in responses:
+                if response.error:
+                    raise DownloadError(response.error)
+                if response.is_last:
+                    last = response
+                    break
+                yield DeltaOp(response.offset, response.content,
+                              response.copy_block, response.copy_count)
+
+        partial_path = f"{local_path}.partial"
+        if self.pool:
+            channel_context = contextlib.nullcontext(self.pool.channel(self.target))
+        else:
+            channel_context = grpc.insecure_channel(self.target, options=[
+                ('grpc.max_receive_message_length', MAX_MESSAGE_SIZE),
+            ])
+        with channel_context as channel:
+            stub = pb2_grpc.FileServiceStub(channel)
+            responses = stub.GetFileDelta(self._requests(remote_path, local_path, block_size))
+
+            try:
+                with open(partial_path, 'wb') as output:
+                    basis = open(local_path, 'rb') if basis_size else io.BytesIO()
+                    with basis:
+                        size = apply_delta(basis, ops(responses), output, block_size)
+
+                digest = hashlib.sha256()
+                with open(partial_path, 'rb') as output:
+                    for block in iter(lambda: output.read(1024 * 1024), b''):
+                        digest.update(block)
+                if digest.hexdigest() != last.sha256:
+                    raise DownloadError("Checksum mismatch after applying delta")
+
+                os.replace(partial_path, local_path)
+            finally:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+
+        result = DeltaSyncResult(
+            local_path=local_path,
+            size=size,
+            literal_bytes=last.literal_bytes,
+            matched_bytes=last.matched_bytes,
+            elapsed=time.monotonic() - start_time
+        )
+        logger.info(
+            f"Synced {remote_path}: {result.literal_bytes} literal bytes, "
+            f"{result.saved_ratio:.0%} reused from local copy")
+        return result
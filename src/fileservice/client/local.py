@@ -0,0 +1,35 @@
+"""Client side of OpenLocalFile: receiving file descriptors from a same-host server."""
+import socket
+
+from .parallel_download import DownloadError
+
+# Seconds to wait for the descriptor socket
+CONNECT_TIMEOUT = 10.0
+
+
+def receive_fd(fd_socket: str, token: str, timeout: float = CONNECT_TIMEOUT) -> int:
+    """
+    Collect the descriptor a ticket was issued for.
+
+    Args:
+        fd_socket: Path of the server's descriptor-passing socket
+        token: One-time token from the OpenLocalFile call
+        timeout: Seconds to wait for the connection and the descriptor
+
+    Returns:
+        The received file descriptor, owned by the caller
+
+    Raises:
+        DownloadError: If the socket can't be reached or no descriptor arrives
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(fd_socket)
+            sock.sendall(token.encode('ascii'))
+            _, fds, _, _ = socket.recv_fds(sock, 1, 1)
+    except OSError as e:
+        raise DownloadError(f"Could not receive descriptor from {fd_socket}: {e}") from e
+    if not fds:
+        raise DownloadError(f"No descriptor received from {fd_socket}")
+    return fds[0]
@@ -0,0 +1,250 @@
+import logging
+import os
+import threading
+import time
+from concurrent import futures
+from dataclasses import dataclass
+
+import grpc
+
+from fileservice import file_service_pb2 as pb2
+from fileservice import file_service_pb2_grpc as pb2_grpc
+from fileservice.checksums import StreamingDigest, available_algorithms
+from fileservice.fileutils import preallocate
+
+logger = logging.getLogger(__name__)
+
+# Allow the largest chunks the server may send (8MB) plus message overhead
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+
+# Don't split files into ranges smaller than this (8MB)
+MIN_RANGE_SIZE = 8 * 1024 * 1024
+
+
+class DownloadError(Exception):
+    """Raised when a download fails or cannot be verified."""
+
+
+@dataclass
+class DownloadResult:
+    """Outcome of a completed download."""
+
+    local_path: str
+    size: int
+    elapsed: float
+    streams: int
+    resume_token: str
+
+    @property
+    def throughput(self) -> float:
+        """Average throughput in bytes per second."""
+        return self.size / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class ParallelDownloader:
+    """
+    Downloads a file by fetching byte ranges over concurrent TransferFile streams.
+
+    Ranges are written into <local_path>.partial, which replaces local_path
+    only once every range arrived and matched the checksum the server
+    computed for it. The first failing range cancels the others.
+    """
+
+    def __init__(
+            self,
+            target: str,
+            streams: int = 4,
+            chunk_size: int = 0,
+            min_range_size: int = MIN_RANGE_SIZE,
+            checksum: str = ''
+    ):
+        """
+        Args:
+            target: Server address, e.g. 'localhost:50051'
+            streams: Maximum number of concurrent range streams
+            chunk_size: Requested chunk size (0 lets the server choose)
+            min_range_size: Smallest range worth giving its own stream
+            checksum: Digest to verify each range with (default: fastest available)
+        """
+        self.target = target
+        self.streams = max(1, streams)
+        self.chunk_size = chunk_size
+        self.min_range_size = min_range_size
+        self.checksum = checksum or available_algorithms()[0]
+
+    def _open_channel(self) -> grpc.Channel:
+        """Open a channel with its own connection so streams don't share a flow-control window."""
+        return grpc.insecure_channel(self.target, options=[
+            ('grpc.use_local_subchannel_pool', 1),
+            ('grpc.max_receive_message_length', MAX_MESSAGE_SIZE),
+        ])
+
+    def _probe(self, stub: pb2_grpc.FileServiceStub, remote_path: str) -> tuple[int, str]:
+        """
+        Fetch the file size and resume token without transferring the file.
+
+        Returns:
+            Tuple of (file_size, resume_token)
+        """
+        request = pb2.FileRequest(file_path=remote_path, include_metadata=True, length=1)
+        for response in stub.TransferFile(request):
+            if response.error:
+                raise DownloadError(response.error)
+            return response.metadata.size, response.resume_token
+        raise DownloadError("Server closed the stream without a response")
+
+    def _split_ranges(self, file_size: int) -> list[tuple[int, int]]:
+        """Split a file into at most `streams` contiguous (start, end) ranges."""
+        if file_size == 0:
+            return [(0, 0)]
+
+        count = max(1, min(self.streams, file_size // self.min_range_size))
+        range_size = -(-file_size // count)  # Ceiling division
+        return [
+            (start, min(start + range_size, file_size))
+            for start in range(0, file_size, range_size)
+        ]
+
+    def _fetch_range(
+            self,
+            remote_path: str,
+            resume_token: str,
+            fd: int,
+            start: int,
+            end: int,
+            calls: list,
+            aborted: threading.Event
+    ) -> int:
+        """
+        Stream one byte range straight into the destination file.
+
+        The call is added to calls so a failing range can cancel it.
+
+        Returns:
+            Number of bytes written
+
+        Raises:
+            DownloadError: If the range fails, is incomplete or doesn't match its checksum
+        """
+        request = pb2.FileRequest(
+            file_path=remote_path,
+            chunk_size=self.chunk_size,
+            offset=start,
+            length=end - start,
+            resume_token=resume_token,
+            checksums=[self.checksum]
+        )
+        digest = StreamingDigest([self.checksum])
+        written = 0
+        last = None
+        with self._open_channel() as channel:
+            call = pb2_grpc.FileServiceStub(channel).TransferFile(request)
+            calls.append(call)
+            if aborted.is_set():
+                call.cancel()
+            for response in call:
+                if response.error:
+                    raise DownloadError(f"Range {start}-{end}: {response.error}")
+                if response.content:
+                    os.pwrite(fd, response.content, response.offset)
+                    digest.update(response.content)
+                    written += len(response.content)
+                if response.is_last:
+                    last = response
+                    break
+
+        if last is None or last.offset != end or written != end - start:
+            raise DownloadError(f"Range {start}-{end}: received {written} bytes")
+        expected = last.checksums.get(self.checksum)
+        actual = digest.hexdigests()[self.checksum]
+        if expected != actual:
+            raise DownloadError(
+                f"Range {start}-{end}: {self.checksum} mismatch ({actual} != {expected})")
+        return written
+
+    def _fetch_ranges(
+            self,
+            remote_path: str,
+            resume_token: str,
+            fd: int,
+            ranges: list[tuple[int, int]]
+    ) -> int:
+        """
+        Fetch all ranges concurrently, cancelling the rest when one fails.
+
+        Returns:
+            Total number of bytes written
+        """
+        calls = []
+        aborted = threading.Event()
+        with futures.ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            pending = [
+                executor.submit(
+                    self._fetch_range, remote_path, resume_token, fd, start, end, calls, aborted)
+                for start, end in ranges
+            ]
+            done, not_done = futures.wait(pending, return_when=futures.FIRST_EXCEPTION)
+            failed = next((future for future in done if future.exception()), None)
+            if failed is not None:
+                aborted.set()
+                for future in not_done:
+                    future.cancel()
+                for call in list(calls):
+                    call.cancel()
+                error = failed.exception()
+                if isinstance(error, DownloadError):
+                    raise error
+                raise DownloadError(f"{remote_path}: {error}") from error
+            return sum(future.result() for future in pending)
+
+    def download(self, remote_path: str, local_path: str) -> DownloadResult:
+        """
+        Download a remote file to a local path using parallel range streams.
+
+        Args:
+            remote_path: Path of the file on the server
+            local_path: Destination path on this machine
+
+        Returns:
+            DownloadResult with size, elapsed time and throughput
+
+        Raises:
+            DownloadError: If any range fails or the result doesn't verify; an
+                existing file at local_path is then left untouched
+        """
+        start_time = time.monotonic()
+
+        with self._open_channel() as channel:
+            file_size, resume_token = self._probe(pb2_grpc.FileServiceStub(channel), remote_path)
+
+        ranges = self._split_ranges(file_size)
+        logger.debug(f"Downloading {remote_path} ({file_size} bytes) in {len(ranges)} ranges")
+
+        partial_path = f"{local_path}.partial"
+        fd = os.open(partial_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            preallocate(fd, file_size)
+            total = self._fetch_ranges(remote_path, resume_token, fd, ranges)
+            os.fsync(fd)
+            actual_size = os.fstat(fd).st_size
+            if total != file_size or actual_size != file_size:
+                raise DownloadError(
+                    f"Size mismatch: expected {file_size}, received {total}, wrote {actual_size}")
+        except BaseException:
+            os.close(fd)
+            os.remove(partial_path)
+            raise
+        os.close(fd)
+        os.replace(partial_path, local_path)
+
+        result = DownloadResult(
+            local_path=local_path,
+            size=file_size,
+            elapsed=time.monotonic() - start_time,
+            streams=len(ranges),
+            resume_token=resume_token
+        )
+        logger.info(
+            f"Downloaded {remote_path} in {result.elapsed:.2f}s "
+            f"({result.throughput / (1024 * 1024):.1f} MB/s over {result.streams} streams)")
+        return result
@@ -0,0 +1,181 @@
+import asyncio
+import itertools
+import logging
+import threading
+import weakref
+from typing import AsyncIterator, Optional
+
+import grpc
+
+from fileservice import file_service_pb2_grpc as pb2_grpc
+from .parallel_download import MAX_MESSAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Ping idle connections every 30s so dead peers and NAT timeouts are noticed
+# before a call is made; the server permits pings down to every 10s
+KEEPALIVE_OPTIONS = [
+    ('grpc.keepalive_time_ms', 30000),
+    ('grpc.keepalive_timeout_ms', 10000),
+    ('grpc.keepalive_permit_without_calls', 1),
+    ('grpc.http2.max_pings_without_data', 0),
+]
+
+DEFAULT_OPTIONS = KEEPALIVE_OPTIONS + [
+    ('grpc.max_receive_message_length', MAX_MESSAGE_SIZE),
+    ('grpc.max_send_message_length', MAX_MESSAGE_SIZE),
+]
+
+
+def _channel_options(options: Optional[list], size: int) -> list:
+    options = list(DEFAULT_OPTIONS if options is None else options)
+    if size > 1:
+        # Give each channel of a target its own connection and flow-control window
+        options.append(('grpc.use_local_subchannel_pool', 1))
+    return options
+
+
+class ChannelPool:
+    """
+    Long-lived channels shared by every client of a process.
+
+    Channels are created on first use and kept open until close(); with
+    size > 1 each target gets that many channels on separate connections,
+    handed out round robin so concurrent streams don't queue behind one
+    HTTP/2 flow-control window. Thread safe.
+    """
+
+    def __init__(self, size: int = 1, options: Optional[list] = None):
+        """
+        Args:
+            size: Channels (connections) per target
+            options: Channel options (None uses keepalive and 16MB message limits)
+        """
+        self.size = max(1, size)
+        self.options = _channel_options(options, self.size)
+        self._lock = threading.Lock()
+        self._channels: dict[str, list[grpc.Channel]] = {}
+        self._next: dict[str, itertools.count] = {}
+
+    def channel(self, target: str) -> grpc.Channel:
+        """Get a channel to target, opening it on first use."""
+        with self._lock:
+            channels = self._channels.get(target)
+            if channels is None:
+                channels = self._channels[target] = [
+                    grpc.insecure_channel(target, options=self.options) for _ in range(self.size)]
+                self._next[target] = itertools.count()
+                logger.debug(f"Opened {self.size} channel(s) to {target}")
+            return channels[next(self._next[target]) % self.size]
+
+    def stub(self, target: str) -> pb2_grpc.FileServiceStub:
+        """Get a FileService stub on a pooled channel."""
+        return pb2_grpc.FileServiceStub(self.channel(target))
+
+    def close(self) -> None:
+        """Close every channel; the pool can be used again afterwards."""
+        with self._lock:
+            channels = [channel for group in self._channels.values() for channel in group]
+            self._channels.clear()
+            self._next.clear()
+        for channel in channels:
+            channel.close()
+
+    def __enter__(self) -> 'ChannelPool':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class AioChannelPool:
+    """
+    ChannelPool for grpc.aio channels.
+
+    An aio channel belongs to the event loop it was created on, so channels
+    are pooled per (loop, target). A loop's channels are closed when it
+    shuts down its async generators, which asyncio.run() does before closing
+    the loop; loops closed by hand should await close() first.
+    """
+
+    def __init__(self, size: int = 1, options: Optional[list] = None):
+        """
+        Args:
+            size: Channels (connections) per target
+            options: Channel options (None uses keepalive and 16MB message limits)
+        """
+        self.size = max(1, size)
+        self.options = _channel_options(options, self.size)
+        # Per loop: channels and round robin counter by target, and the
+        # generator that closes them at loop shutdown
+        self._loops: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def channel(self, target: str) -> grpc.aio.Channel:
+        """Get a channel to target for the running loop, opening it on first use."""
+        loop = asyncio.get_running_loop()
+        entry = self._loops.get(loop)
+        if entry is None:
+            watcher = self._close_at_shutdown(loop)
+            # Run it to its yield now, which registers it with the loop
+            # for shutdown_asyncgens()
+            try:
+                watcher.asend(None).send(None)
+            except StopIteration:
+                pass
+            entry = self._loops[loop] = ({}, watcher)
+        groups = entry[0]
+        group = groups.get(target)
+        if group is None:
+            group = groups[target] = (
+                [grpc.aio.insecure_channel(target, options=self.options) for _ in range(self.size)],
+                itertools.count())
+            logger.debug(f"Opened {self.size} aio channel(s) to {target}")
+        channels, counter = group
+        return channels[next(counter) % self.size]
+
+    def stub(self, target: str) -> pb2_grpc.FileServiceStub:
+        """Get a FileService stub on a pooled channel."""
+        return pb2_grpc.FileServiceStub(self.channel(target))
+
+    async def _close_at_shutdown(self, loop: asyncio.AbstractEventLoop) -> AsyncIterator[None]:
+        """Parked until the loop (or close()) closes it, then closes the loop's channels."""
+        try:
+            yield
+        finally:
+            groups, _ = self._loops.pop(loop, ({}, None))
+            for channels, _ in groups.values():
+                for channel in channels:
+                    await channel.close()
+
+    async def close(self) -> None:
+        """Close the channels of the running loop."""
+        entry = self._loops.get(asyncio.get_running_loop())
+        if entry is not None:
+            await entry[1].aclose()
+
+    def stats(self) -> dict:
+        """Loops with open channels and the channels open across them."""
+        entries = list(self._loops.values())
+        return {
+            'loops': len(entries),
+            'channels': sum(len(channels) for groups, _ in entries for channels, _ in groups.values()),
+        }
+
+    async def __aenter__(self) -> 'AioChannelPool':
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+
+_default_pool: Optional[ChannelPool] = None
+_default_lock = threading.Lock()
+
+
+def default_pool() -> ChannelPool:
+    """The process-wide pool used by clients that aren't given one."""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = ChannelPool()
+        return _default_pool
@@ -0,0 +1,156 @@
+"""Client side of the sendfile side channel (OpenSendfile)."""
+import logging
+import os
+import socket
+import time
+
+from fileservice import file_service_pb2 as pb2
+from fileservice.checksums import StreamingDigest, available_algorithms
+from fileservice.fileutils import preallocate
+from .parallel_download import DownloadError, DownloadResult
+
+logger = logging.getLogger(__name__)
+
+# Receive buffer for the side channel (4MB)
+RECV_BUFFER_SIZE = 4 * 1024 * 1024
+
+# Seconds to wait for the side-channel connection to be accepted
+CONNECT_TIMEOUT = 10.0
+
+
+def side_channel_host(target: str) -> str:
+    """
+    Host part of a 'host:port' gRPC target, where the side channel listens too.
+
+    Raises:
+        DownloadError: If the target isn't a plain host:port address
+    """
+    host, separator, port = target.rpartition(':')
+    if not separator or not port.isdigit() or '/' in host:
+        raise DownloadError(f"sendfile needs a host:port target, not {target!r}")
+    return host.strip('[]')
+
+
+class SendfileDownload:
+    """
+    State of one OpenSendfile download; shared by the sync and async clients.
+
+    The caller makes the call, passes the first (ticket) message to
+    receive(), which blocks while the data arrives on the side channel,
+    then passes the last message to finish(), which checks the byte count
+    and checksum against what was received and moves the file into place.
+    """
+
+    def __init__(
+            self,
+            target: str,
+            remote_path: str,
+            local_path: str,
+            offset: int = 0,
+            length: int = 0,
+            checksum: str = ''
+    ):
+        """
+        Args:
+            target: Server address, e.g. 'localhost:50051'
+            remote_path: Path of the file on the server
+            local_path: Where to save the file (or range)
+            offset: First byte to fetch
+            length: Bytes to fetch (0 = to end of file)
+            checksum: Digest to verify the data with (default: fastest available)
+        """
+        self.host = side_channel_host(target)
+        self.remote_path = remote_path
+        self.local_path = local_path
+        self.partial_path = f"{local_path}.partial"
+        self.offset = offset
+        self.length = length
+        self.checksum = checksum or available_algorithms()[0]
+        self.digest = StreamingDigest([self.checksum])
+        self.received = 0
+        self.resume_token = ''
+        self.started_at = time.monotonic()
+
+    def request(self) -> pb2.SendfileRequest:
+        return pb2.SendfileRequest(
+            file_path=self.remote_path,
+            offset=self.offset,
+            length=self.length,
+            checksums=[self.checksum]
+        )
+
+    def receive(self, ticket: pb2.SendfileResponse) -> int:
+        """
+        Connect to the side channel and write the data to the partial file.
+
+        Returns:
+            Bytes received
+
+        Raises:
+            DownloadError: If the server reported an error or the connection failed
+        """
+        if ticket.error:
+            raise DownloadError(f"{self.remote_path}: {ticket.error}")
+        self.resume_token = ticket.resume_token
+        fd = os.open(self.partial_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            preallocate(fd, ticket.length)
+            with socket.create_connection((self.host, ticket.port), timeout=CONNECT_TIMEOUT) as sock:
+                sock.settimeout(None)
+                sock.sendall(ticket.token.encode('ascii'))
+                self._copy(sock, fd, ticket.length)
+            os.fsync(fd)
+        except OSError as e:
+            raise DownloadError(f"{self.remote_path}: side channel failed: {e}") from e
+        finally:
+            os.close(fd)
+        return self.received
+
+    def _copy(self, sock: socket.socket, fd: int, length: int) -> None:
+        buffer = bytearray(RECV_BUFFER_SIZE)
+        view = memoryview(buffer)
+        while self.received < length:
+            size = sock.recv_into(view, min(len(buffer), length - self.received))
+            if size == 0:
+                break  # The server stopped early; its last message says why
+            data = view[:size]
+            self.digest.update(data)
+            os.pwrite(fd, data, self.received)
+            self.received += size
+
+    def finish(self, last: pb2.SendfileResponse) -> DownloadResult:
+        """
+        Verify the transfer against the server's last message and keep the file.
+
+        Raises:
+            DownloadError: If the server reported an error or the data doesn't match
+        """
+        if last.error:
+            raise DownloadError(f"{self.remote_path}: {last.error}")
+        if last.bytes_sent != self.received:
+            raise DownloadError(
+                f"{self.remote_path}: received {self.received} of {last.bytes_sent} bytes")
+        expected = last.checksums.get(self.checksum)
+        actual = self.digest.hexdigests()[self.checksum]
+        if expected != actual:
+            raise DownloadError(f"{self.remote_path}: {self.checksum} mismatch ({actual} != {expected})")
+        os.replace(self.partial_path, self.local_path)
+
+        result = DownloadResult(
+            local_path=self.local_path,
+            size=self.received,
+            elapsed=time.monotonic() - self.started_at,
+            streams=1,
+            resume_token=self.resume_token
+        )
+        logger.info(
+            f"Downloaded {self.remote_path} over sendfile in {result.elapsed:.2f}s "
+            f"({result.throughput / (1024 * 1024):.1f} MB/s)")
+        return result
+
+    def abort(self) -> None:
+        """Remove the partial file after a failure."""
+        try:
+            os.remove(self.partial_path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,125 @@
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterator, Optional
+
+import grpc
+
+from fileservice import file_service_pb2 as pb2
+from fileservice import file_service_pb2_grpc as pb2_grpc
+from fileservice.chunking import optimize_chunk_size
+
+if TYPE_CHECKING:
+    from .pool import ChannelPool
+
+logger = logging.getLogger(__name__)
+
+# fsync on the server every 64MB by default
+DEFAULT_FSYNC_INTERVAL = 64 * 1024 * 1024
+
+
+class UploadError(Exception):
+    """Raised when the server rejects or fails an upload."""
+
+
+@dataclass
+class UploadResult:
+    """Outcome of a completed upload."""
+
+    remote_path: str
+    size: int
+    elapsed: float
+
+    @property
+    def throughput(self) -> float:
+        """Average throughput in bytes per second."""
+        return self.size / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class Uploader:
+    """Streams local files to the server with UploadFile."""
+
+    def __init__(
+            self,
+            target: str,
+            fsync_interval: int = DEFAULT_FSYNC_INTERVAL,
+            chunk_size: int = 0,
+            pool: Optional['ChannelPool'] = None
+    ):
+        """
+        Args:
+            target: Server address, e.g. 'localhost:50051'
+            fsync_interval: Bytes the server writes between fsyncs (0 = only at the end)
+            chunk_size: Chunk size to send (0 picks one from the file size)
+            pool: Channel pool to use (None opens a channel per upload)
+        """
+        self.target = target
+        self.fsync_interval = fsync_interval
+        self.chunk_size = chunk_size
+        self.pool = pool
+
+    def _chunks(
+            self,
+            local_path: str,
+            remote_path: str,
+            overwrite: bool
+    ) -> Iterator[pb2.UploadChunk]:
+        """Read the local file into UploadChunks, options on the first."""
+        total_size = os.path.getsize(local_path)
+        chunk_size = optimize_chunk_size(total_size, self.chunk_size)
+
+        with open(local_path, 'rb') as file:
+            offset = 0
+            chunk = pb2.UploadChunk(
+                file_path=remote_path,
+                total_size=total_size,
+                overwrite=overwrite,
+                fsync_interval=self.fsync_interval
+            )
+            while True:
+                content = file.read(chunk_size)
+                chunk.content = content
+                chunk.offset = offset
+                chunk.is_last = len(content) < chunk_size
+                yield chunk
+                if chunk.is_last:
+                    break
+                offset += len(content)
+                chunk = pb2.UploadChunk()
+
+    def upload(self, local_path: str, remote_path: str, overwrite: bool = False) -> UploadResult:
+        """
+        Upload a local file.
+
+        Args:
+            local_path: File to send
+            remote_path: Destination path on the server
+            overwrite: Whether to replace an existing file
+
+        Returns:
+            UploadResult with size and throughput
+
+        Raises:
+            UploadError: If the server reports an error
+        """
+        start_time = time.monotonic()
+        chunks = self._chunks(local_path, remote_path, overwrite)
+        if self.pool:
+            response = self.pool.stub(self.target).UploadFile(chunks)
+        else:
+            with grpc.insecure_channel(self.target) as channel:
+                response = pb2_grpc.FileServiceStub(channel).UploadFile(chunks)
+
+        if not response.success:
+            raise UploadError(response.error)
+
+        result = UploadResult(
+            remote_path=remote_path,
+            size=response.bytes_written,
+            elapsed=time.monotonic() - start_time
+        )
+        logger.info(
+            f"Uploaded {local_path} to {remote_path} "
+            f"({result.throughput / (1024 * 1024):.1f} MB/s)")
+        return result
@@ -0,0 +1,207 @@
+"""Chunk compression codecs shared by the server and clients."""
+import logging
+import zlib
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd support is optional
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Bytes sampled from the start of a range to estimate compressibility (64KB)
+SAMPLE_SIZE = 64 * 1024
+
+# Skip compression unless the sample shrinks below this fraction of its size
+MAX_SAMPLE_RATIO = 0.9
+
+# MIME types whose contents are already compressed
+INCOMPRESSIBLE_MIME_PREFIXES = ('image/', 'video/', 'audio/', 'font/woff')
+INCOMPRESSIBLE_MIME_TYPES = {
+    'application/gzip',
+    'application/java-archive',
+    'application/vnd.android.package-archive',
+    'application/x-7z-compressed',
+    'application/x-apple-diskimage',
+    'application/x-bzip2',
+    'application/x-gzip',
+    'application/x-rar-compressed',
+    'application/x-xz',
+    'application/zip',
+    'application/zstd',
+}
+
+# Accepted level ranges per codec
+LEVEL_RANGES = {
+    'zlib': (1, 9),
+    'gzip': (1, 9),
+    'zstd': (1, 22),
+}
+
+
+def available_codecs() -> list[str]:
+    """List the codecs usable in this process."""
+    codecs = ['zlib']
+    if zstandard is not None:
+        codecs.append('zstd')
+    return codecs
+
+
+class ChunkCompressor:
+    """Compresses chunks independently so any chunk can be decoded on its own."""
+
+    def __init__(self, codec: str, level: int = 0):
+        """
+        Args:
+            codec: 'zlib' or 'zstd'
+            level: Compression level (0 = codec default)
+
+        Raises:
+            ValueError: If the codec is unavailable or the level is out of range
+        """
+        if codec not in available_codecs():
+            raise ValueError(f"Unsupported compression: {codec}")
+
+        low, high = LEVEL_RANGES[codec]
+        if level and not low <= level <= high:
+            raise ValueError(f"Compression level for {codec} must be between {low} and {high}")
+
+        self.codec = codec
+        self.level = level
+        if codec == 'zstd':
+            self._zstd = zstandard.ZstdCompressor(level=level or 3)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a single chunk."""
+        if self.codec == 'zstd':
+            return self._zstd.compress(data)
+        return zlib.compress(data, self.level or 6)
+
+
+def decompress_chunk(codec: str, data: bytes) -> bytes:
+    """
+    Decode a chunk produced by ChunkCompressor.
+
+    Args:
+        codec: Codec named in the chunk ('' for raw content)
+        data: Chunk content
+
+    Returns:
+        Raw chunk bytes
+    """
+    if not codec:
+        return data
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    if codec == 'zstd' and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unsupported compression: {codec}")
+
+
+def should_compress(
+        compressor: ChunkCompressor,
+        mime_type: Optional[str],
+        sample: bytes
+) -> bool:
+    """
+    Decide whether a file is worth compressing.
+
+    Args:
+        compressor: Compressor the stream would use
+        mime_type: MIME type guessed for the file
+        sample: Leading bytes of the range to be sent
+
+    Returns:
+        False for already-compressed media and archives, or when the sample
+        doesn't shrink enough to pay for the CPU time
+    """
+    if mime_type and (mime_type in INCOMPRESSIBLE_MIME_TYPES
+                      or mime_type.startswith(INCOMPRESSIBLE_MIME_PREFIXES)):
+        logger.debug(f"Skipping compression for {mime_type}")
+        return False
+
+    if not sample:
+        return False
+
+    ratio = len(compressor.compress(sample)) / len(sample)
+    if ratio > MAX_SAMPLE_RATIO:
+        logger.debug(f"Skipping compression, sample ratio {ratio:.2f}")
+        return False
+    return True
+
+
+def available_stream_codecs() -> list[str]:
+    """List the codecs usable for whole-stream compression in this process."""
+    codecs = ['gzip']
+    if zstandard is not None:
+        codecs.append('zstd')
+    return codecs
+
+
+class StreamCompressor:
+    """
+    Compresses a byte stream as a single gzip or zstd frame.
+
+    Unlike ChunkCompressor the output only decodes as a whole, which is what
+    archive formats such as .tar.gz and .tar.zst expect.
+    """
+
+    def __init__(self, codec: str, level: int = 0):
+        """
+        Args:
+            codec: 'gzip' or 'zstd'
+            level: Compression level (0 = codec default)
+
+        Raises:
+            ValueError: If the codec is unavailable or the level is out of range
+        """
+        if codec not in available_stream_codecs():
+            raise ValueError(f"Unsupported compression: {codec}")
+
+        low, high = LEVEL_RANGES[codec]
+        if level and not low <= level <= high:
+            raise ValueError(f"Compression level for {codec} must be between {low} and {high}")
+
+        self.codec = codec
+        if codec == 'zstd':
+            self._compressor = zstandard.ZstdCompressor(level=level or 3).compressobj()
+        else:
+            # wbits 31 writes a gzip header and trailer
+            self._compressor = zlib.compressobj(level or 6, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        """Feed data; returns whatever compressed output is ready (possibly b'')."""
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        """End the stream and return the remaining output."""
+        return self._compressor.flush()
+
+
+class StreamDecompressor:
+    """Decodes a stream produced by StreamCompressor incrementally."""
+
+    def __init__(self, codec: str):
+        """
+        Args:
+            codec: 'gzip', 'zstd' or '' for an uncompressed stream
+
+        Raises:
+            ValueError: If the codec is unavailable
+        """
+        if codec and codec not in available_stream_codecs():
+            raise ValueError(f"Unsupported compression: {codec}")
+        self.codec = codec
+        if codec == 'zstd':
+            self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+        elif codec == 'gzip':
+            self._decompressor = zlib.decompressobj(31)
+        else:
+            self._decompressor = None
+
+    def decompress(self, data: bytes) -> bytes:
+        """Decode the next piece of the stream."""
+        if self._decompressor is None or not data:
+            return data
+        return self._decompressor.decompress(data)
@@ -0,0 +1,311 @@
+"""rsync-style block signatures and delta encoding shared by the server and clients."""
+import hashlib
+from itertools import accumulate
+from typing import BinaryIO, Callable, Iterable, Iterator, NamedTuple, Optional
+
+# Block size bounds (512B - 1MB) and the smallest size picked automatically
+MIN_BLOCK_SIZE = 512
+MAX_BLOCK_SIZE = 1024 * 1024
+DEFAULT_BLOCK_SIZE = 8 * 1024
+
+# Largest literal run sent in one message (1MB)
+MAX_LITERAL_SIZE = 1024 * 1024
+
+# Fraction of the target that may be searched byte by byte for shifted
+# blocks; past it, unmatched data is sent as literals block by block
+MAX_ROLLING_FRACTION = 0.05
+
+# Bytes that may be searched byte by byte regardless of the target size (256KB)
+MIN_ROLLING_BUDGET = 256 * 1024
+
+# Bytes of the target read at a time when encoding a delta (8MB)
+DELTA_WINDOW = 8 * 1024 * 1024
+
+
+class BlockSignature(NamedTuple):
+    """Signature of one block of the basis file."""
+
+    index: int
+    weak: int
+    strong: bytes
+    length: int
+
+
+class DeltaOp(NamedTuple):
+    """One delta instruction: literal data, or a run of basis blocks to copy."""
+
+    offset: int             # Offset in the target file this op produces
+    data: bytes = b""       # Literal bytes (empty for copy ops)
+    copy_block: int = 0     # First basis block to copy
+    copy_count: int = 0     # Number of consecutive basis blocks (0 = literal)
+
+
+def choose_block_size(file_size: int) -> int:
+    """Pick a block size of roughly sqrt(file_size), rounded up to a power of two."""
+    size = DEFAULT_BLOCK_SIZE
+    while size * size < file_size and size < MAX_BLOCK_SIZE:
+        size *= 2
+    return size
+
+
+def weak_checksum(block) -> tuple[int, int]:
+    """
+    Compute the rsync rolling checksum components of a block.
+
+    Returns:
+        Tuple of (a, b) where a is the byte sum and b the position-weighted sum
+    """
+    a = sum(block) & 0xffff
+    # sum((L - i) * x_i) is the sum of the prefix sums
+    b = sum(accumulate(block)) & 0xffff
+    return a, b
+
+
+def strong_hash(block) -> bytes:
+    """Strong hash used to confirm weak checksum matches."""
+    return hashlib.blake2b(block, digest_size=16).digest()
+
+
+def compute_signatures(file: BinaryIO, block_size: int) -> Iterator[BlockSignature]:
+    """
+    Compute block signatures for a basis file.
+
+    Args:
+        file: Basis file opened in binary mode
+        block_size: Size of each block in bytes
+
+    Yields:
+        BlockSignature for each block, including a short final block
+    """
+    index = 0
+    while True:
+        block = file.read(block_size)
+        if not block:
+            break
+        a, b = weak_checksum(block)
+        yield BlockSignature(index, a | (b << 16), strong_hash(block), len(block))
+        index += 1
+
+
+def generate_delta(
+        data,
+        signatures: Iterable[BlockSignature],
+        block_size: int,
+        max_literal: int = MAX_LITERAL_SIZE,
+        rolling_budget: Optional[int] = None
+) -> Iterator[DeltaOp]:
+    """
+    Encode a target buffer against basis signatures.
+
+    Args:
+        data: Target file contents (bytes, mmap or memoryview)
+        signatures: Signatures of the basis file
+        block_size: Block size the signatures were computed with
+        max_literal: Largest literal op to emit
+        rolling_budget: Bytes that may be searched byte by byte (see
+            generate_delta_from)
+
+    Yields:
+        DeltaOp instructions that rebuild the target from the basis
+    """
+    return generate_delta_from(
+        lambda offset, length: data[offset:offset + length], len(data),
+        signatures, block_size, max_literal, rolling_budget)
+
+
+def generate_delta_from(
+        read: Callable[[int, int], bytes],
+        size: int,
+        signatures: Iterable[BlockSignature],
+        block_size: int,
+        max_literal: int = MAX_LITERAL_SIZE,
+        rolling_budget: Optional[int] = None,
+        window: int = DELTA_WINDOW,
+        digest=None
+) -> Iterator[DeltaOp]:
+    """
+    Encode a target, read front to back in windows, against basis signatures.
+
+    Aligned matches are checked first, so unchanged and appended files cost
+    one checksum per block. The byte-by-byte rolling search only runs in
+    regions that don't match, until the blocks line up again. It runs in
+    Python, far slower than sending the bytes, so it is budgeted: once the
+    budget is spent, the rest is only checked block by block, so
+    mostly-changed files (and shifts longer than the budget) degrade to a
+    plain transfer.
+
+    Each byte of the target is read once, in order, and only about a
+    window of it is held at a time.
+
+    Args:
+        read: Returns up to length bytes of the target at an offset
+        size: Bytes of the target to encode
+        signatures: Signatures of the basis file
+        block_size: Block size the signatures were computed with
+        max_literal: Largest literal op to emit
+        rolling_budget: Bytes that may be searched byte by byte (None =
+            MAX_ROLLING_FRACTION of the target, at least MIN_ROLLING_BUDGET)
+        window: Bytes read at a time (raised to fit a literal run and a block)
+        digest: Optional hash object updated with the target as it is read,
+            so it describes exactly the bytes the delta was built from
+
+    Yields:
+        DeltaOp instructions that rebuild the target from the basis
+
+    Raises:
+        OSError: If the target ends before size bytes (truncated meanwhile)
+    """
+    table: dict[int, dict[bytes, int]] = {}
+    tail: Optional[BlockSignature] = None
+    for sig in signatures:
+        if sig.length == block_size:
+            table.setdefault(sig.weak, {}).setdefault(sig.strong, sig.index)
+        else:
+            tail = sig
+
+    window = max(window, 2 * (max_literal + block_size))
+    buffer = b""
+    base = 0
+    pos = 0
+    literal_start = 0
+    run_start = run_block = run_count = 0
+    match_end = 0
+    a = b = None
+    budget = rolling_budget
+    if budget is None:
+        budget = max(int(size * MAX_ROLLING_FRACTION), MIN_ROLLING_BUDGET)
+
+    def fill(end: int) -> None:
+        # Read on to at least end, dropping what precedes the pending literal
+        nonlocal buffer, base
+        position = base + len(buffer)
+        if end <= position:
+            return
+        parts = [buffer[literal_start - base:]]
+        length = min(size, max(end, literal_start + window)) - position
+        while length > 0:
+            part = read(position, length)
+            if not part:
+                raise OSError(f"File ended at {position} of {size} bytes while reading it")
+            if digest is not None:
+                digest.update(part)
+            parts.append(part)
+            position += len(part)
+            length -= len(part)
+        buffer, base = b"".join(parts), literal_start
+
+    def flush_literal(end: int) -> Iterator[DeltaOp]:
+        for chunk_start in range(literal_start, end, max_literal):
+            chunk_end = min(chunk_start + max_literal, end)
+            yield DeltaOp(chunk_start, buffer[chunk_start - base:chunk_end - base])
+
+    while pos + block_size <= size and table:
+        # The rolling search reads one byte past the current block
+        fill(min(pos + block_size + 1, size))
+        start = pos - base
+        if a is None:
+            a, b = weak_checksum(buffer[start:start + block_size])
+
+        candidates = table.get(a | (b << 16))
+        if candidates:
+            index = candidates.get(strong_hash(buffer[start:start + block_size]))
+            if index is not None:
+                if literal_start < pos:
+                    if run_count:
+                        yield DeltaOp(run_start, copy_block=run_block, copy_count=run_count)
+                        run_count = 0
+                    yield from flush_literal(pos)
+
+                # Extend the current copy run when blocks stay consecutive
+                if run_count and index == run_block + run_count:
+                    run_count += 1
+                else:
+                    if run_count:
+                        yield DeltaOp(run_start, copy_block=run_block, copy_count=run_count)
+                    run_start, run_block, run_count = pos, index, 1
+
+                pos += block_size
+                literal_start = match_end = pos
+                a = b = None
+                continue
+
+        if pos + block_size >= size:
+            break
+
+        if budget > 0:
+            # Roll the window forward until a weak checksum matches, the
+            # literal run is full, the budget runs out or the read-ahead ends
+            limit = min(size - block_size, literal_start + max_literal, pos + budget,
+                        base + len(buffer) - block_size) - base
+            i = start
+            while i < limit:
+                old, new = buffer[i], buffer[i + block_size]
+                a = (a - old + new) & 0xffff
+                b = (b - block_size * old + a) & 0xffff
+                i += 1
+                if a | (b << 16) in table:
+                    break
+            budget -= i - start
+            pos = base + i
+        else:
+            # Out of budget: only check blocks in line with the last match
+            pos = min(pos + block_size - (pos - match_end) % block_size, size - block_size)
+            a = b = None
+
+        if pos - literal_start >= max_literal and run_count:
+            yield DeltaOp(run_start, copy_block=run_block, copy_count=run_count)
+            run_count = 0
+        if pos - literal_start >= max_literal:
+            yield from flush_literal(pos)
+            literal_start = pos
+
+    if run_count:
+        yield DeltaOp(run_start, copy_block=run_block, copy_count=run_count)
+
+    # A short trailing block can only match the basis file's own tail
+    if tail is not None and size - literal_start == tail.length:
+        fill(size)
+        if strong_hash(buffer[literal_start - base:]) == tail.strong:
+            yield DeltaOp(literal_start, copy_block=tail.index, copy_count=1)
+            literal_start = size
+    while literal_start < size:
+        end = min(literal_start + max_literal, size)
+        fill(end)
+        yield from flush_literal(end)
+        literal_start = end
+
+
+def apply_delta(
+        basis: BinaryIO,
+        ops: Iterable[DeltaOp],
+        output: BinaryIO,
+        block_size: int
+) -> int:
+    """
+    Rebuild a target file from the basis file and delta instructions.
+
+    Args:
+        basis: Basis file opened for binary reading
+        ops: Delta instructions in target order
+        output: File opened for binary writing
+        block_size: Block size the signatures were computed with
+
+    Returns:
+        Number of bytes written
+    """
+    written = 0
+    for op in ops:
+        if op.copy_count:
+            basis.seek(op.copy_block * block_size)
+            remaining = op.copy_count * block_size
+            while remaining:
+                block = basis.read(min(remaining, MAX_LITERAL_SIZE))
+                if not block:
+                    break
+                output.write(block)
+                written += len(block)
+                remaining -= len(block)
+        else:
+            output.write(op.data)
+            written += len(op.data)
+    return written
@@ -0,0 +1,45 @@
+"""Low-level file helpers shared by the server and clients."""
+import os
+
+
+def preallocate(fd: int, size: int) -> None:
+    """
+    Reserve space for a file up front so writes don't fragment or fail midway.
+
+    Args:
+        fd: File descriptor open for writing
+        size: Final size of the file in bytes
+    """
+    if size <= 0:
+        return
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except (AttributeError, OSError):
+        # posix_fallocate is unavailable on macOS and some filesystems
+        os.ftruncate(fd, size)
+
+
+def fsync_directory(path: str) -> None:
+    """Flush a directory entry change (such as a rename) to disk."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass  # Not supported for directories on every platform
+    finally:
+        os.close(fd)
+
+
+def current_umask() -> int:
+    """
+    Read the process umask.
+
+    os.umask() can only be read by setting it, so call this once at
+    startup rather than while other threads may be creating files.
+    """
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return mask
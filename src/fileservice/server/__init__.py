@@ -0,0 +1,4 @@
+from .aio_server import AioFileServer
+from .server import FileServer
+
+__all__ = ['AioFileServer', 'FileServer']
@@ -0,0 +1,120 @@
+import logging
+from concurrent import futures
+from typing import Optional
+
+import grpc
+
+from .aio_service import AsyncFileServiceServicer
+from .local_transport import LocalFdListener, fd_socket_path
+from .port_manager import PortManager
+from .server import SERVER_OPTIONS
+from .service import FileServiceServicer
+from .. import file_service_pb2_grpc
+
+logger = logging.getLogger(__name__)
+
+
+class AioFileServer:
+    """asyncio server built on grpc.aio, with the same lifecycle as FileServer."""
+
+    def __init__(
+            self,
+            io_workers: int = 32,
+            ports: Optional[list[int]] = None,
+            service: Optional[FileServiceServicer] = None,
+            unix_socket: Optional[str] = None
+    ):
+        """
+        Args:
+            io_workers: Threads available for blocking file reads
+            ports: Candidate ports to listen on
+            service: Synchronous servicer with the RPC logic (None creates one)
+            unix_socket: Also listen on this Unix domain socket path, for
+                same-host clients; enables OpenLocalFile
+        """
+        self.io_workers = io_workers
+        self._port_manager = PortManager(ports)
+        self._server: Optional[grpc.aio.Server] = None
+        self._port: Optional[int] = None
+        self._executor: Optional[futures.ThreadPoolExecutor] = None
+        self._service = service or FileServiceServicer()
+        self.unix_socket = unix_socket
+        if unix_socket and self._service.local_fds is None:
+            self._service.local_fds = LocalFdListener(fd_socket_path(unix_socket))
+
+    async def start(self) -> bool:
+        """Start the gRPC server."""
+        try:
+            if self._server:
+                logger.warning("Server already running")
+                return False
+
+            # Get available port first
+            port = self._port_manager.get_available_port()
+            if not port:
+                logger.error("No available ports")
+                return False
+
+            # Create and start server
+            self._executor = futures.ThreadPoolExecutor(
+                max_workers=self.io_workers, thread_name_prefix='fileservice-io')
+            self._service.metrics.watch_executor('io', self._executor)
+            self._server = grpc.aio.server(options=SERVER_OPTIONS)
+            file_service_pb2_grpc.add_FileServiceServicer_to_server(
+                AsyncFileServiceServicer(self._service, self._executor), self._server)
+
+            server_address = f'[::]:{port}'
+            self._server.add_insecure_port(server_address)
+            if self.unix_socket:
+                # gRPC replaces a stale socket file and removes it again on stop
+                self._server.add_insecure_port(f'unix:{self.unix_socket}')
+                self._service.local_fds.start()
+            await self._server.start()
+
+            self._port = port
+            logger.info(f"Async server started on port {port}"
+                        + (f" and {self.unix_socket}" if self.unix_socket else ""))
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to start server: {e}")
+            await self.stop()  # Cleanup on failure
+            return False
+
+    async def stop(self, grace: Optional[float] = None) -> None:
+        """Stop the server and release resources."""
+        if self._server:
+            try:
+                await self._server.stop(grace)
+                self._port_manager.release_port(self._port)
+            finally:
+                self._server = None
+                self._port = None
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._service.close()
+
+    @property
+    def port(self) -> Optional[int]:
+        """Get current server port."""
+        return self._port
+
+    @property
+    def service(self) -> FileServiceServicer:
+        """The servicer, e.g. to change bandwidth limits while running."""
+        return self._service
+
+    async def wait_for_termination(self, timeout: Optional[float] = None) -> None:
+        """Wait for server termination."""
+        if self._server:
+            await self._server.wait_for_termination(timeout)
+
+    async def __aenter__(self) -> 'AioFileServer':
+        """Async context manager entry."""
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        """Async context manager exit."""
+        await self.stop()
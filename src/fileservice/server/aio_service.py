@@ -0,0 +1,253 @@
+import asyncio
+import logging
+import queue
+import threading
+from concurrent import futures
+from typing import AsyncIterator, Iterator, Optional
+
+import grpc
+
+from fileservice import file_service_pb2 as pb2
+from fileservice import file_service_pb2_grpc as pb2_grpc
+from .service import FileServiceServicer
+
+logger = logging.getLogger(__name__)
+
+# Client-streamed messages buffered ahead of the blocking handler
+MAX_PENDING_REQUESTS = 8
+
+
+class AsyncFileServiceServicer(pb2_grpc.FileServiceServicer):
+    """
+    asyncio implementation of File Service functionality.
+
+    Request handling is shared with FileServiceServicer; only the blocking
+    file I/O is pushed onto an executor, one step at a time, so a stream
+    holds a thread only while a chunk is being read rather than for the
+    whole transfer.
+    """
+
+    def __init__(
+            self,
+            servicer: Optional[FileServiceServicer] = None,
+            executor: Optional[futures.Executor] = None
+    ):
+        """
+        Args:
+            servicer: Synchronous servicer that implements the RPC logic
+            executor: Executor for blocking file I/O (None uses the loop default)
+        """
+        self._servicer = servicer or FileServiceServicer()
+        self._executor = executor
+
+    async def _run(self, func, *args):
+        """Run a blocking call on the I/O executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def _stream(self, iterator: Iterator) -> AsyncIterator:
+        """
+        Drain a blocking iterator without blocking the event loop.
+
+        Steps run on the I/O executor under a per-stream lock. If the client
+        goes away while a step is running there, close() is queued behind
+        it on the executor, so the open file is released as soon as that
+        step returns instead of when the generator is collected.
+
+        Args:
+            iterator: Generator returned by a synchronous streaming RPC
+
+        Yields:
+            Each response produced by the iterator
+        """
+        lock = threading.Lock()
+        sentinel = object()
+
+        def step():
+            with lock:
+                return next(iterator, sentinel)
+
+        def close():
+            with lock:
+                iterator.close()
+
+        finished = False
+        try:
+            while True:
+                response = await self._run(step)
+                if response is sentinel:
+                    finished = True
+                    break
+                yield response
+        finally:
+            if not finished:
+                self._close_later(close)
+
+    def _close_later(self, close) -> None:
+        """Run a stream's close() on the I/O executor without waiting for it."""
+        def report(future: asyncio.Future) -> None:
+            if not future.cancelled() and future.exception() is not None:
+                logger.warning(f"Error closing stream: {future.exception()}")
+
+        try:
+            asyncio.get_running_loop().run_in_executor(self._executor, close).add_done_callback(report)
+        except RuntimeError as e:
+            # Loop or executor already shut down; the generator is closed when collected
+            logger.debug(f"Could not close stream: {e}")
+
+    async def _consume(self, request_iterator: AsyncIterator, handler, context):
+        """
+        Feed a client stream to a blocking request-streaming handler.
+
+        The handler runs on the I/O executor and reads from a bounded queue,
+        so a slow disk pushes back on the client instead of buffering the
+        whole stream in memory.
+
+        Args:
+            request_iterator: Async iterator of client messages
+            handler: Synchronous handler taking (request_iterator, context)
+            context: gRPC servicer context
+
+        Returns:
+            The handler's response
+        """
+        loop = asyncio.get_running_loop()
+        pending: queue.Queue = queue.Queue()
+        slots = asyncio.Semaphore(MAX_PENDING_REQUESTS)
+        end = object()
+
+        def requests():
+            while True:
+                item = pending.get()
+                loop.call_soon_threadsafe(slots.release)
+                if item is end:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+
+        worker = asyncio.ensure_future(self._run(handler, requests(), context))
+        try:
+            async for request in request_iterator:
+                acquire = asyncio.ensure_future(slots.acquire())
+                await asyncio.wait({acquire, worker}, return_when=asyncio.FIRST_COMPLETED)
+                if not acquire.done():
+                    # The handler finished without reading the rest of the stream
+                    acquire.cancel()
+                    break
+                pending.put(request)
+            pending.put(end)
+        except BaseException as e:
+            # Surface client cancellation to the handler instead of a clean end
+            pending.put(e if isinstance(e, Exception) else ConnectionError("Stream cancelled"))
+            raise
+        return await worker
+
+    async def IsFileExists(
+            self,
+            request: pb2.FileRequest,
+            context: grpc.aio.ServicerContext
+    ) -> pb2.FileExistsResponse:
+        """Check if a file exists and optionally return its metadata."""
+        return await self._run(self._servicer.IsFileExists, request, context)
+
+    async def BatchFileExists(
+            self,
+            request: pb2.BatchFileRequest,
+            context: grpc.aio.ServicerContext
+    ) -> AsyncIterator[pb2.BatchFileExistsResponse]:
+        """Check many paths in parallel and stream results as they complete."""
+        async for response in self._stream(self._servicer.BatchFileExists(request, context)):
+            yield response
+
+    async def GetFileContents(
+            self,
+            request: pb2.FileRequest,
+            context: grpc.aio.ServicerContext
+    ) -> AsyncIterator[pb2.FileChunkResponse]:
+        """Stream file contents to the client."""
+        async for response in self._stream(self._servicer.GetFileContents(request, context)):
+            yield response
+
+    async def TransferFile(
+            self,
+            request: pb2.FileRequest,
+            context: grpc.aio.ServicerContext
+    ) -> AsyncIterator[pb2.FileChunkResponse]:
+        """Transfer large files with optimized streaming and progress tracking."""
+        async for response in self._stream(self._servicer.TransferFile(request, context)):
+            yield response
+
+    async def UploadFile(
+            self,
+            request_iterator: AsyncIterator[pb2.UploadChunk],
+            context: grpc.aio.ServicerContext
+    ) -> pb2.UploadResponse:
+        """Receive a file from the client."""
+        return await self._consume(request_iterator, self._servicer.UploadFile, context)
+
+    async def ListDirectory(
+            self,
+            request: pb2.ListDirectoryRequest,
+            context: grpc.aio.ServicerContext
+    ) -> AsyncIterator[pb2.ListDirectoryResponse]:
+        """Stream the entries of a directory tree in batches."""
+        async for response in self._stream(self._servicer.ListDirectory(request, context)):
+            yield response
+
+    async def GetFileDelta(
+            self,
+            request_iterator: AsyncIterator[pb2.DeltaRequest],
+            context: grpc.aio.ServicerContext
+    ) -> AsyncIterator[pb2.DeltaChunkResponse]:
+        """Stream the differences between a file and the client's copy of it."""
+        # Signatures are needed in full before matching starts
+        requests = [request async for request in request_iterator]
+        async for response in self._stream(
+                self._servicer.GetFileDelta(iter(requests), context)):
+            yield response
+
+    async def TransferBundle(
+            self,
+            request: pb2.BundleRequest,
+            context: grpc.aio.ServicerContext
+    ) -> AsyncIterator[pb2.BundleChunk]:
+        """Stream many files as one tar archive."""
+        async for response in self._stream(self._servicer.TransferBundle(request, context)):
+            yield response
+
+    async def SearchFiles(
+            self,
+            request: pb2.SearchRequest,
+            context: grpc.aio.ServicerContext
+    ) -> AsyncIterator[pb2.SearchResponse]:
+        """Search a directory tree by file name and contents."""
+        async for response in self._stream(self._servicer.SearchFiles(request, context)):
+            yield response
+
+    async def TailFile(
+            self,
+            request: pb2.TailRequest,
+            context: grpc.aio.ServicerContext
+    ) -> AsyncIterator[pb2.TailChunk]:
+        """Follow a file, streaming data as it is appended."""
+        async for response in self._stream(self._servicer.TailFile(request, context)):
+            yield response
+
+    async def OpenSendfile(
+            self,
+            request: pb2.SendfileRequest,
+            context: grpc.aio.ServicerContext
+    ) -> AsyncIterator[pb2.SendfileResponse]:
+        """Send a file over the sendfile side channel, reporting the outcome."""
+        async for response in self._stream(self._servicer.OpenSendfile(request, context)):
+            yield response
+
+    async def OpenLocalFile(
+            self,
+            request: pb2.LocalFileRequest,
+            context: grpc.aio.ServicerContext
+    ) -> AsyncIterator[pb2.LocalFileResponse]:
+        """Hand a same-host client an open read-only file descriptor."""
+        async for response in self._stream(self._servicer.OpenLocalFile(request, context)):
+            yield response
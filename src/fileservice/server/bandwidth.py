@@ -0,0 +1,354 @@
+"""Token-bucket bandwidth limits, per peer and global, shared max-min fairly."""
+import json
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bucket depth in seconds of the configured rate
+DEFAULT_BURST_SECONDS = 0.25
+
+# How often per-peer shares are recomputed from observed demand
+REBALANCE_INTERVAL = 0.5
+
+# Peers not seen for this long stop counting towards the fair share
+PEER_IDLE_TIMEOUT = 5.0
+
+
+def peer_key(peer: Optional[str]) -> str:
+    """
+    Reduce a gRPC peer string to the client host.
+
+    Connections from the same host share one allowance, so opening
+    parallel streams does not multiply a client's bandwidth.
+
+    Args:
+        peer: Value of context.peer(), e.g. 'ipv4:10.0.0.5:51234'
+
+    Returns:
+        The peer without its port ('local' when there is no peer)
+    """
+    if not peer:
+        return 'local'
+    scheme, _, address = peer.partition(':')
+    if scheme in ('ipv4', 'ipv6') and ':' in address:
+        return f"{scheme}:{address.rsplit(':', 1)[0]}"
+    return peer
+
+
+def fair_share(capacity: float, demands: list[float]) -> float:
+    """
+    Max-min fair level for dividing capacity between peers.
+
+    Peers demanding less than the level keep their demand and the rest split
+    what is left evenly; unmet demand is passed as math.inf.
+
+    Args:
+        capacity: Total rate to divide
+        demands: Observed rate each peer wants
+
+    Returns:
+        The per-peer cap; when every demand fits, the largest demand plus the leftover
+    """
+    if not demands:
+        return capacity
+    remaining = capacity
+    count = len(demands)
+    for demand in sorted(demands):
+        level = remaining / count
+        if demand >= level:
+            return level
+        remaining -= demand
+        count -= 1
+    return max(demands) + remaining
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that lets callers borrow ahead of the refill.
+
+    reserve() always takes the tokens and returns how long the caller must
+    wait for the bucket to pay off the debt, so a chunk larger than the
+    burst is still allowed and concurrent callers queue up in arrival order.
+    """
+
+    def __init__(
+            self,
+            rate: float,
+            burst_seconds: float = DEFAULT_BURST_SECONDS,
+            clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            rate: Bytes per second (0 = unlimited)
+            burst_seconds: Bucket depth in seconds of rate
+            clock: Monotonic time source
+        """
+        self._lock = threading.Lock()
+        self._clock = clock
+        self._rate = rate
+        self.burst_seconds = burst_seconds
+        self._tokens = self.burst
+        self._updated = clock()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    @property
+    def burst(self) -> float:
+        return self._rate * self.burst_seconds
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def set_rate(self, rate: float) -> None:
+        """Change the refill rate; outstanding debt is kept."""
+        with self._lock:
+            now = self._clock()
+            if self._rate <= 0:
+                # Coming from unlimited, start with a full bucket
+                self._rate = rate
+                self._tokens = self.burst
+            else:
+                self._refill(now)
+                self._rate = rate
+                self._tokens = min(self._tokens, self.burst)
+            self._updated = now
+
+    def reserve(self, nbytes: int) -> float:
+        """
+        Take nbytes from the bucket.
+
+        Returns:
+            Seconds to wait before sending them (0 when tokens were available)
+        """
+        with self._lock:
+            if self._rate <= 0:
+                return 0.0
+            self._refill(self._clock())
+            self._tokens -= nbytes
+            return -self._tokens / self._rate if self._tokens < 0 else 0.0
+
+
+@dataclass
+class PeerUsage:
+    """Bandwidth accounting for one peer."""
+    bucket: TokenBucket
+    joined: float
+    last_seen: float
+    bytes: int = 0
+    throttle_seconds: float = 0.0
+    window_bytes: int = 0
+    window_wait: float = 0.0  # Time held back by the peer's own bucket
+
+
+def load_limits(path: str) -> dict:
+    """
+    Read bandwidth limits from a JSON file, e.g. {"global_rate": 100, "peer_rate": 20}.
+
+    Rates are in MB/s like the command line options; a missing key keeps
+    the current limit and 0 removes it.
+
+    Returns:
+        Keyword arguments for BandwidthLimiter.set_limits(), in bytes per second
+
+    Raises:
+        OSError: If the file can't be read
+        ValueError: If it isn't a JSON object of non-negative rates
+    """
+    with open(path) as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError("expected a JSON object")
+    limits = {}
+    for key in ('global_rate', 'peer_rate'):
+        if key not in config:
+            continue
+        rate = config[key]
+        if isinstance(rate, bool) or not isinstance(rate, (int, float)) or rate < 0:
+            raise ValueError(f"{key} must be a non-negative number of MB/s")
+        limits[key] = rate * 1024 * 1024
+    unknown = set(config) - {'global_rate', 'peer_rate'}
+    if unknown:
+        raise ValueError(f"unknown keys: {', '.join(sorted(unknown))}")
+    return limits
+
+
+class BandwidthLimiter:
+    """
+    Per-peer and global bandwidth limits for streaming RPCs.
+
+    Every peer has its own bucket, refilled at its share of the global rate
+    (capped by peer_rate), and all peers also draw from the global bucket.
+    Shares are recomputed every rebalance_interval: peers that were not
+    throttled keep what they used, and the unused bandwidth is split evenly
+    between the peers that were.
+
+    Limits can be changed at any time with set_limits() (main.py reloads
+    them from --limits-file on SIGHUP); the time spent throttled is
+    reported by stats(). throttle() waits by sleeping in the calling
+    thread, so under the asyncio server a throttled stream holds one of
+    the I/O executor threads for as long as it waits.
+    """
+
+    def __init__(
+            self,
+            global_rate: float = 0,
+            peer_rate: float = 0,
+            burst_seconds: float = DEFAULT_BURST_SECONDS,
+            rebalance_interval: float = REBALANCE_INTERVAL,
+            idle_timeout: float = PEER_IDLE_TIMEOUT,
+            clock: Callable[[], float] = time.monotonic,
+            sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        Args:
+            global_rate: Bytes per second across all peers (0 = unlimited)
+            peer_rate: Bytes per second for any single peer (0 = unlimited)
+            burst_seconds: Bucket depth in seconds of rate
+            rebalance_interval: Seconds between fair share recomputations
+            idle_timeout: Seconds after which a silent peer is forgotten
+            clock: Monotonic time source
+            sleep: Function used to wait when throttled
+        """
+        self._lock = threading.Lock()
+        self._clock = clock
+        self._sleep = sleep
+        self.burst_seconds = burst_seconds
+        self.rebalance_interval = rebalance_interval
+        self.idle_timeout = idle_timeout
+        self._global_rate = global_rate
+        self._peer_rate = peer_rate
+        self._global = TokenBucket(global_rate, burst_seconds, clock)
+        self._peers: dict[str, PeerUsage] = {}
+        self._window_start = clock()
+        self._bytes = 0
+        self._throttle_seconds = 0.0
+        self._throttled = 0
+
+    @property
+    def global_rate(self) -> float:
+        return self._global_rate
+
+    @property
+    def peer_rate(self) -> float:
+        return self._peer_rate
+
+    @property
+    def enabled(self) -> bool:
+        return self._global_rate > 0 or self._peer_rate > 0
+
+    def set_limits(self, global_rate: Optional[float] = None, peer_rate: Optional[float] = None) -> None:
+        """
+        Change limits at runtime; streams in progress pick them up on their next chunk.
+
+        Args:
+            global_rate: New bytes per second across all peers (None keeps it, 0 = unlimited)
+            peer_rate: New bytes per second per peer (None keeps it, 0 = unlimited)
+        """
+        with self._lock:
+            if global_rate is not None:
+                self._global_rate = global_rate
+                self._global.set_rate(global_rate)
+            if peer_rate is not None:
+                self._peer_rate = peer_rate
+            self._rebalance(self._clock())
+        logger.info(f"Bandwidth limits: global={self._global_rate:.0f} B/s, "
+                    f"per peer={self._peer_rate:.0f} B/s")
+
+    def throttle(self, peer: str, nbytes: int) -> float:
+        """
+        Account for nbytes sent to (or received from) peer, waiting if over the limit.
+
+        Args:
+            peer: Peer key, see peer_key()
+            nbytes: Bytes about to be transferred
+
+        Returns:
+            Seconds spent waiting
+        """
+        if nbytes <= 0 or not self.enabled:
+            return 0.0
+
+        with self._lock:
+            now = self._clock()
+            usage = self._peers.get(peer)
+            if usage is None:
+                usage = PeerUsage(TokenBucket(0, self.burst_seconds, self._clock), now, now)
+                self._peers[peer] = usage
+                self._rebalance(now)
+            elif now - self._window_start >= self.rebalance_interval:
+                self._rebalance(now)
+                self._start_window(now)
+            usage.last_seen = now
+
+        peer_wait = usage.bucket.reserve(nbytes)
+        wait = max(peer_wait, self._global.reserve(nbytes))
+
+        with self._lock:
+            usage.bytes += nbytes
+            usage.window_bytes += nbytes
+            # Only the peer's own share counts as unmet demand; the global
+            # bucket can be in debt because of other peers
+            usage.window_wait += peer_wait
+            usage.throttle_seconds += wait
+            self._bytes += nbytes
+            if wait > 0:
+                self._throttle_seconds += wait
+                self._throttled += 1
+
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def _rebalance(self, now: float) -> None:
+        """Recompute every peer's share from demand seen in the current window."""
+        for peer, usage in list(self._peers.items()):
+            if now - usage.last_seen > self.idle_timeout:
+                del self._peers[peer]
+
+        elapsed = max(now - self._window_start, 1e-6)
+        demands = [
+            # Throttled or just-joined peers want more than they got
+            math.inf if usage.window_wait > 0 or usage.joined >= self._window_start
+            else usage.window_bytes / elapsed
+            for usage in self._peers.values()
+        ]
+        share = fair_share(self._global_rate, demands) if self._global_rate > 0 else math.inf
+        if self._peer_rate > 0:
+            share = min(share, self._peer_rate)
+        rate = 0 if math.isinf(share) else share
+        for usage in self._peers.values():
+            if usage.bucket.rate != rate:
+                usage.bucket.set_rate(rate)
+
+    def _start_window(self, now: float) -> None:
+        self._window_start = now
+        for usage in self._peers.values():
+            usage.window_bytes = 0
+            usage.window_wait = 0.0
+
+    def stats(self) -> dict:
+        """Limits, bytes and throttle wait time, in total and per active peer."""
+        with self._lock:
+            return {
+                'global_rate': self._global_rate,
+                'peer_rate': self._peer_rate,
+                'bytes': self._bytes,
+                'throttle_seconds': self._throttle_seconds,
+                'throttled_chunks': self._throttled,
+                'peers': {
+                    peer: {
+                        'share': usage.bucket.rate,
+                        'bytes': usage.bytes,
+                        'throttle_seconds': usage.throttle_seconds,
+                    }
+                    for peer, usage in self._peers.items()
+                },
+            }
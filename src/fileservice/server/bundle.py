@@ -0,0 +1,258 @@
+"""Tar archives of many files, streamed with pipelined reads."""
+import logging
+import os
+import stat
+import tarfile
+from collections import deque
+from concurrent import futures
+from dataclasses import dataclass
+from typing import BinaryIO, Iterable, Iterator, Optional, Sequence, Union
+
+from ..compression import StreamCompressor
+from .directory_listing import iter_directory, matches
+
+logger = logging.getLogger(__name__)
+
+TAR_BLOCK = 512
+
+# Files up to this size are read whole on the thread pool (256KB)
+DEFAULT_INLINE_SIZE = 256 * 1024
+
+# Files opened (and small files read) ahead of the one being archived
+DEFAULT_READ_AHEAD = 64
+
+
+@dataclass
+class BundleEntry:
+    """A file to archive."""
+
+    path: str
+    name: str
+    follow_symlinks: bool = True
+
+
+@dataclass
+class BundleError:
+    """A file that was skipped, or archived incompletely."""
+
+    name: str
+    error: str
+
+
+@dataclass
+class _Loaded:
+    entry: BundleEntry
+    stat: os.stat_result
+    data: Optional[bytes] = None
+    file: Optional[BinaryIO] = None
+    link: Optional[str] = None
+
+
+def bundle_entries(
+        file_paths: Sequence[str],
+        directory: str = '',
+        patterns: Sequence[str] = (),
+        max_depth: int = 0
+) -> Iterator[Union[BundleEntry, BundleError]]:
+    """
+    Resolve a bundle request into the files to archive, in archive order.
+
+    Without a directory every path is archived under its own path minus the
+    leading '/'. With one, file_paths are taken relative to it, or when there
+    are none the tree is walked and filtered by patterns; symlinks found by
+    the walk are archived as links rather than followed.
+
+    Yields:
+        BundleEntry for each file, BundleError for paths that can't be used
+    """
+    if not directory:
+        for path in file_paths:
+            yield BundleEntry(path, os.path.normpath(path).lstrip('/'))
+        return
+
+    for path in file_paths:
+        name = os.path.normpath(path)
+        if os.path.isabs(name) or name == '..' or name.startswith('../'):
+            yield BundleError(path, "Path is outside the bundle directory")
+        else:
+            yield BundleEntry(os.path.join(directory, name), name)
+    if file_paths:
+        return
+
+    for parts, entry in iter_directory(directory, max_depth):
+        if entry.is_dir(follow_symlinks=False):
+            continue
+        relative_path = '/'.join(parts)
+        if matches(entry.name, relative_path, patterns):
+            yield BundleEntry(entry.path, relative_path, follow_symlinks=False)
+
+
+def tar_header(name: str, st: os.stat_result, size: int, link: Optional[str] = None) -> bytes:
+    """Build the tar (pax) header block(s) for one entry."""
+    info = tarfile.TarInfo(name)
+    info.mtime = int(st.st_mtime)
+    info.mode = stat.S_IMODE(st.st_mode)
+    if link is not None:
+        info.type = tarfile.SYMTYPE
+        info.linkname = link
+    else:
+        info.size = size
+    return info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape')
+
+
+def _load(entry: BundleEntry, inline_size: int) -> _Loaded:
+    """Open (and for small files, read) one entry; runs on the thread pool."""
+    st = os.stat(entry.path) if entry.follow_symlinks else os.lstat(entry.path)
+    if stat.S_ISLNK(st.st_mode):
+        return _Loaded(entry, st, link=os.readlink(entry.path))
+    if not stat.S_ISREG(st.st_mode):
+        raise OSError("Not a regular file")
+
+    file = open(entry.path, 'rb')
+    try:
+        st = os.fstat(file.fileno())
+        if st.st_size <= inline_size:
+            with file:
+                return _Loaded(entry, st, data=file.read())
+        return _Loaded(entry, st, file=file)
+    except BaseException:
+        file.close()
+        raise
+
+
+def _discard(future: futures.Future) -> None:
+    """Close the file of a load that finished after its bundle was abandoned."""
+    if not future.cancelled() and future.exception() is None and future.result().file:
+        future.result().file.close()
+
+
+class BundleStream:
+    """
+    Writes a tar archive of many files as a stream of chunks.
+
+    Opening files and reading small ones runs on a thread pool up to
+    read_ahead entries ahead of the archive writer, so per-file latency
+    (open, stat, a cold read) overlaps instead of adding up. Larger files
+    are opened ahead but streamed by the writer in chunk_size blocks.
+    Files that can't be read are left out and reported as BundleErrors
+    alongside the chunk written after them; a file that shrinks while
+    being streamed is zero-padded to the size in its header.
+    """
+
+    def __init__(
+            self,
+            entries: Iterable[Union[BundleEntry, BundleError]],
+            executor: futures.Executor,
+            compressor: Optional[StreamCompressor] = None,
+            chunk_size: int = 1024 * 1024,
+            inline_size: int = DEFAULT_INLINE_SIZE,
+            read_ahead: int = DEFAULT_READ_AHEAD
+    ):
+        """
+        Args:
+            entries: Files to archive, as produced by bundle_entries
+            executor: Thread pool for opening and reading files
+            compressor: Whole-archive compressor (None for a plain tar)
+            chunk_size: Archive bytes per yielded chunk (before compression)
+            inline_size: Files up to this size are read whole on the pool
+            read_ahead: Entries loaded ahead of the writer
+        """
+        self._entries = iter(entries)
+        self._executor = executor
+        self._compressor = compressor
+        self.chunk_size = max(TAR_BLOCK, chunk_size)
+        self.inline_size = inline_size
+        self.read_ahead = max(1, read_ahead)
+        self.file_count = 0
+        self.total_bytes = 0
+        self._out = bytearray()
+        self._errors: list[BundleError] = []
+
+    def _write(self, data: bytes) -> None:
+        if self._compressor:
+            data = self._compressor.compress(data)
+        self._out += data
+
+    def _take(self) -> tuple[bytes, list[BundleError]]:
+        chunk = (bytes(self._out), self._errors)
+        self._out = bytearray()
+        self._errors = []
+        return chunk
+
+    def _stream_file(self, loaded: _Loaded) -> Iterator[tuple[bytes, list[BundleError]]]:
+        """Write one large file block by block, yielding full chunks."""
+        size = loaded.stat.st_size
+        remaining = size
+        with loaded.file as file:
+            while remaining:
+                block = file.read(min(self.chunk_size, remaining))
+                if not block:
+                    self._errors.append(BundleError(loaded.entry.name, "File shrank while archiving"))
+                    self._write(bytes(remaining))
+                    break
+                self._write(block)
+                remaining -= len(block)
+                if len(self._out) >= self.chunk_size:
+                    yield self._take()
+        self.total_bytes += size - remaining
+
+    def __iter__(self) -> Iterator[tuple[bytes, list[BundleError]]]:
+        """
+        Yields:
+            Tuple of (archive bytes, errors for files handled since the last chunk)
+        """
+        pending = deque()
+
+        def fill():
+            while len(pending) < self.read_ahead:
+                item = next(self._entries, None)
+                if item is None:
+                    return
+                if isinstance(item, BundleError):
+                    pending.append(item)
+                else:
+                    pending.append((item, self._executor.submit(_load, item, self.inline_size)))
+
+        try:
+            fill()
+            while pending:
+                item = pending.popleft()
+                fill()
+                if isinstance(item, BundleError):
+                    self._errors.append(item)
+                    continue
+
+                entry, future = item
+                try:
+                    loaded = future.result()
+                except OSError as e:
+                    self._errors.append(BundleError(entry.name, e.strerror or str(e)))
+                    continue
+
+                if loaded.link is not None:
+                    self._write(tar_header(entry.name, loaded.stat, 0, loaded.link))
+                elif loaded.data is not None:
+                    self._write(tar_header(entry.name, loaded.stat, len(loaded.data)))
+                    self._write(loaded.data)
+                    self._write(bytes(-len(loaded.data) % TAR_BLOCK))
+                    self.total_bytes += len(loaded.data)
+                else:
+                    size = loaded.stat.st_size
+                    self._write(tar_header(entry.name, loaded.stat, size))
+                    yield from self._stream_file(loaded)
+                    self._write(bytes(-size % TAR_BLOCK))
+                self.file_count += 1
+
+                if len(self._out) >= self.chunk_size:
+                    yield self._take()
+
+            # End-of-archive marker: two zero blocks
+            self._write(bytes(2 * TAR_BLOCK))
+            if self._compressor:
+                self._out += self._compressor.flush()
+            yield self._take()
+        finally:
+            # Don't keep reading files for a client that went away
+            for item in pending:
+                if isinstance(item, tuple) and not item[1].cancel():
+                    item[1].add_done_callback(_discard)
@@ -0,0 +1,115 @@
+import abc
+import logging
+import mmap
+import os
+from typing import BinaryIO, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+Chunk = Union[bytes, memoryview]
+
+
+class ChunkSource(abc.ABC):
+    """Random-access reader that the streaming RPCs pull chunks from."""
+
+    def __init__(self, size: int):
+        self.size = size
+
+    @abc.abstractmethod
+    def read(self, offset: int, size: int) -> Chunk:
+        """
+        Read up to `size` bytes starting at `offset`.
+
+        Args:
+            offset: Byte offset in the file
+            size: Maximum number of bytes to return
+
+        Returns:
+            Bytes-like chunk, empty at end of file
+        """
+
+    def close(self) -> None:
+        """Release any resources held by the source."""
+
+    def __enter__(self) -> 'ChunkSource':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class FileChunkSource(ChunkSource):
+    """Reads chunks with positional reads on an open file."""
+
+    def __init__(self, file: BinaryIO, size: int):
+        super().__init__(size)
+        self._fd = file.fileno()
+
+    def read(self, offset: int, size: int) -> Chunk:
+        return os.pread(self._fd, size, offset)
+
+
+class MmapChunkSource(ChunkSource):
+    """
+    Serves chunks as memoryview slices of a read-only memory map.
+
+    Pages are faulted in from the page cache rather than read by syscall.
+    The streaming RPCs still copy each slice into its message (protobuf
+    bytes fields only accept bytes), so this saves no copy over
+    FileChunkSource. Truncating the file while it is mapped makes access to
+    the missing pages raise SIGBUS, which kills the whole server rather
+    than failing one RPC, so this is opt-in for trees of immutable files.
+    """
+
+    def __init__(self, file: BinaryIO, size: int):
+        super().__init__(size)
+        self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(self._mmap, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+            self._mmap.madvise(mmap.MADV_SEQUENTIAL)
+        self._view = memoryview(self._mmap)
+
+    def read(self, offset: int, size: int) -> Chunk:
+        return self._view[offset:offset + size]
+
+    def close(self) -> None:
+        try:
+            self._view.release()
+            self._mmap.close()
+        except BufferError:
+            # A caller still holds a slice; the map is freed once it's dropped
+            logger.debug("Memory map still exported, deferring close")
+
+
+class BytesChunkSource(ChunkSource):
+    """Serves chunks as memoryview slices of file content already in memory."""
+
+    def __init__(self, data: bytes):
+        super().__init__(len(data))
+        self._view = memoryview(data)
+
+    def read(self, offset: int, size: int) -> Chunk:
+        return self._view[offset:offset + size]
+
+
+def open_chunk_source(
+        file: BinaryIO,
+        size: int,
+        mmap_threshold: Optional[int] = None
+) -> ChunkSource:
+    """
+    Pick a chunk source for an open file.
+
+    Args:
+        file: File opened in binary read mode
+        size: Current size of the file
+        mmap_threshold: Minimum size to memory-map (None, the default, disables mmap)
+
+    Returns:
+        MmapChunkSource for files at or above the threshold, FileChunkSource otherwise
+    """
+    if mmap_threshold is not None and size > 0 and size >= mmap_threshold:
+        try:
+            return MmapChunkSource(file, size)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Falling back to positional reads: {e}")
+    return FileChunkSource(file, size)
@@ -0,0 +1,226 @@
+"""Byte-budgeted in-memory cache of small, frequently requested files."""
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+# Total bytes of file content kept in memory (256MB)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Larger files are streamed from disk instead (64MB)
+DEFAULT_MAX_FILE_SIZE = 64 * 1024 * 1024
+
+# Files are cached from their second request on; one-off reads go straight to disk
+DEFAULT_ADMIT_AFTER = 2
+
+# Recently missed files remembered for admission
+MAX_TRACKED_MISSES = 4096
+
+EVICTION_POLICIES = ('lru', 'lfu')
+
+ContentVersion = tuple[int, int, int]
+
+
+def content_version(stat: os.stat_result) -> ContentVersion:
+    """Fields that change whenever the file content changes."""
+    return stat.st_mtime_ns, stat.st_ctime_ns, stat.st_size
+
+
+def load_file(file_path: str, stat: os.stat_result) -> Optional[bytes]:
+    """
+    Read a whole file if it still matches stat.
+
+    Returns:
+        The content, or None if the file changed since stat was taken
+    """
+    with open(file_path, 'rb') as file:
+        if content_version(os.fstat(file.fileno())) != content_version(stat):
+            return None
+        data = file.read()
+    return data if len(data) == stat.st_size else None
+
+
+@dataclass
+class CacheEntry:
+    version: ContentVersion
+    data: bytes
+    hits: int = 0
+    last_used: int = 0
+
+
+class ContentCache:
+    """
+    Cache of whole-file contents with a total byte budget.
+
+    Entries are keyed by device and inode, so every path to a file shares
+    one copy, and are only served while the file's mtime, ctime and size
+    still match the stat taken for the request. A file is only loaded once
+    it has missed admit_after times, and concurrent misses for the same
+    file wait for a single load.
+
+    Eviction is least recently used ('lru') or least frequently used with
+    recency breaking ties ('lfu').
+    """
+
+    def __init__(
+            self,
+            max_bytes: int = DEFAULT_MAX_BYTES,
+            max_file_size: int = DEFAULT_MAX_FILE_SIZE,
+            policy: str = 'lru',
+            admit_after: int = DEFAULT_ADMIT_AFTER
+    ):
+        """
+        Args:
+            max_bytes: Total content size kept in memory (0 disables the cache)
+            max_file_size: Larger files are never cached
+            policy: Eviction policy, 'lru' or 'lfu'
+            admit_after: Requests of a file before it is loaded into the cache
+        """
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self.policy = policy
+        self.admit_after = admit_after
+        self._cond = threading.Condition()
+        self._entries: dict[tuple[int, int], CacheEntry] = {}
+        self._loading: set[tuple[int, int]] = set()
+        self._missed: OrderedDict[tuple[int, int], int] = OrderedDict()
+        self._clock = itertools.count()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self.skipped = 0
+
+    def cacheable(self, stat: os.stat_result) -> bool:
+        """Whether a file of this size may be cached at all."""
+        return 0 < stat.st_size <= min(self.max_file_size, self.max_bytes)
+
+    def get(self, stat: os.stat_result) -> Optional[bytes]:
+        """
+        Cached content of the file version described by stat, without loading it.
+
+        Returns:
+            The content, or None if not cached
+        """
+        with self._cond:
+            return self._lookup(stat)
+
+    def get_or_load(self, stat: os.stat_result, loader: Callable[[], Optional[bytes]]) -> Optional[bytes]:
+        """
+        Cached content of the file version described by stat, loading it on a miss.
+
+        Args:
+            stat: Current stat of the file
+            loader: Reads the file; returns None if it no longer matches stat
+
+        Returns:
+            The content, or None if the file isn't cacheable, hasn't been requested
+            often enough yet, or changed while loading
+        """
+        if not self.cacheable(stat):
+            with self._cond:
+                self.skipped += 1
+            return None
+
+        key = (stat.st_dev, stat.st_ino)
+        with self._cond:
+            while True:
+                data = self._lookup(stat, count_miss=False)
+                if data is not None:
+                    return data
+                if key not in self._loading:
+                    break
+                self._cond.wait()
+            self.misses += 1
+            if not self._admit(key):
+                return None
+            self._loading.add(key)
+
+        data = None
+        try:
+            data = loader()
+        finally:
+            with self._cond:
+                self._loading.discard(key)
+                if data is not None:
+                    self._insert(key, CacheEntry(content_version(stat), data))
+                self._cond.notify_all()
+        return data
+
+    def _admit(self, key: tuple[int, int]) -> bool:
+        misses = self._missed.pop(key, 0) + 1
+        if misses >= self.admit_after:
+            return True
+        self._missed[key] = misses
+        if len(self._missed) > MAX_TRACKED_MISSES:
+            self._missed.popitem(last=False)
+        return False
+
+    def _lookup(self, stat: os.stat_result, count_miss: bool = True) -> Optional[bytes]:
+        key = (stat.st_dev, stat.st_ino)
+        entry = self._entries.get(key)
+        if entry is None or entry.version != content_version(stat):
+            if count_miss:
+                self.misses += 1
+            return None
+        if self.policy == 'lru':
+            # Dicts keep insertion order, so the first entry is the least recently used
+            self._entries[key] = self._entries.pop(key)
+        entry.hits += 1
+        entry.last_used = next(self._clock)
+        self.hits += 1
+        return entry.data
+
+    def _insert(self, key: tuple[int, int], entry: CacheEntry) -> None:
+        old = self._entries.pop(key, None)
+        if old:
+            self.bytes -= len(old.data)
+        size = len(entry.data)
+        while self._entries and self.bytes + size > self.max_bytes:
+            self._evict()
+        entry.last_used = next(self._clock)
+        self._entries[key] = entry
+        self.bytes += size
+
+    def _evict(self) -> None:
+        if self.policy == 'lfu':
+            key = min(self._entries, key=lambda k: (self._entries[k].hits, self._entries[k].last_used))
+        else:
+            key = next(iter(self._entries))
+        entry = self._entries.pop(key)
+        self.bytes -= len(entry.data)
+        self.evictions += 1
+        self.evicted_bytes += len(entry.data)
+
+    def invalidate(self, stat: os.stat_result) -> None:
+        """Drop the cached content of the file described by stat."""
+        with self._cond:
+            entry = self._entries.pop((stat.st_dev, stat.st_ino), None)
+            if entry:
+                self.bytes -= len(entry.data)
+
+    def clear(self) -> None:
+        with self._cond:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        """Hit ratio, eviction counters and current usage."""
+        with self._cond:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'evicted_bytes': self.evicted_bytes,
+                'skipped': self.skipped,
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+            }
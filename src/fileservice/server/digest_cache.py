@@ -0,0 +1,69 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+# Default number of cached digests
+DEFAULT_MAX_ENTRIES = 4096
+
+DigestKey = tuple[int, int, int, int, str]
+
+
+class DigestCache:
+    """
+    Bounded LRU cache of whole-file digests.
+
+    Entries are keyed by device, inode, mtime and size, so any change to the
+    file produces a different key and stale digests are never returned.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[DigestKey, str] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(stat: os.stat_result, algorithm: str) -> DigestKey:
+        return stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size, algorithm
+
+    def get(self, stat: os.stat_result, algorithm: str) -> Optional[str]:
+        """
+        Look up a digest for the file version described by stat.
+
+        Returns:
+            Hex digest, or None if not cached
+        """
+        key = self._key(stat, algorithm)
+        with self._lock:
+            digest = self._entries.get(key)
+            if digest is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return digest
+
+    def get_many(self, stat: os.stat_result, algorithms) -> dict[str, str]:
+        """Cached digests for whichever of the algorithms are available."""
+        digests = {}
+        for algorithm in algorithms:
+            digest = self.get(stat, algorithm)
+            if digest is not None:
+                digests[algorithm] = digest
+        return digests
+
+    def put(self, stat: os.stat_result, algorithm: str, digest: str) -> None:
+        """Store a digest for the file version described by stat."""
+        key = self._key(stat, algorithm)
+        with self._lock:
+            self._entries[key] = digest
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
@@ -0,0 +1,91 @@
+import base64
+import fnmatch
+import logging
+import os
+from typing import Iterator, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+PathParts = tuple[str, ...]
+
+
+def encode_cursor(parts: PathParts) -> str:
+    """Encode the position after an entry as an opaque page token."""
+    return base64.urlsafe_b64encode('/'.join(parts).encode()).decode()
+
+
+def decode_cursor(token: str) -> Optional[PathParts]:
+    """
+    Decode a page token produced by encode_cursor.
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    if not token:
+        return None
+    try:
+        return tuple(base64.urlsafe_b64decode(token.encode()).decode().split('/'))
+    except Exception as e:
+        raise ValueError(f"Invalid page token: {e}") from None
+
+
+def matches(name: str, relative_path: str, patterns: Sequence[str]) -> bool:
+    """Whether an entry matches any glob pattern (all entries match when there are none)."""
+    if not patterns:
+        return True
+    return any(
+        fnmatch.fnmatchcase(name, pattern) or fnmatch.fnmatchcase(relative_path, pattern)
+        for pattern in patterns
+    )
+
+
+def iter_directory(
+        root: str,
+        max_depth: int = 0,
+        after: Optional[PathParts] = None
+) -> Iterator[tuple[PathParts, os.DirEntry]]:
+    """
+    Walk a directory tree in a stable order using os.scandir.
+
+    Entries come out depth-first with names sorted within each directory,
+    which is the same as ordering by their relative path components. That
+    makes a cursor a plain comparison and lets whole subtrees before it be
+    skipped without being read. Only the directories on the current path
+    are held in memory, never the whole tree. Symlinked directories are
+    listed but not followed.
+
+    Args:
+        root: Directory to walk
+        max_depth: Levels to descend (1 = direct children, 0 = unlimited)
+        after: Resume after this entry (relative path components)
+
+    Yields:
+        Tuple of (relative path components, DirEntry)
+    """
+    def scan(path: str) -> list[os.DirEntry]:
+        try:
+            with os.scandir(path) as it:
+                return sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            logger.debug(f"Skipping unreadable directory {path}: {e}")
+            return []
+
+    stack = [((), iter(scan(root)))]
+    while stack:
+        prefix, entries = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+
+        parts = prefix + (entry.name,)
+        inside_cursor = after is not None and after[:len(parts)] == parts
+
+        if after is None or parts > after:
+            yield parts, entry
+        elif not inside_cursor:
+            # Everything under this entry sorts before the cursor
+            continue
+
+        if (max_depth == 0 or len(parts) < max_depth) and entry.is_dir(follow_symlinks=False):
+            stack.append((parts, iter(scan(entry.path))))
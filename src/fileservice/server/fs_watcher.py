@@ -0,0 +1,126 @@
+import logging
+import os
+import threading
+from typing import Callable
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # Callers fall back to polling or TTLs
+    FileSystemEventHandler = object
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+# Each watched directory costs an inotify instance / FSEvents stream and a thread
+DEFAULT_MAX_WATCHES = 32
+
+EventCallback = Callable[[str, bool], None]
+
+
+class _DirectoryHandler(FileSystemEventHandler):
+    """Forwards events under one directory to the registered callbacks."""
+
+    def __init__(self):
+        super().__init__()
+        self.callbacks: list[EventCallback] = []
+
+    def on_any_event(self, event) -> None:
+        for path in (event.src_path, getattr(event, 'dest_path', '')):
+            if not path:
+                continue
+            for callback in list(self.callbacks):
+                try:
+                    callback(os.fsdecode(path), event.is_directory)
+                except Exception as e:
+                    logger.error(f"Watcher callback failed for {path}: {e}")
+
+
+class FileSystemWatcher:
+    """
+    Shared watchdog observer with per-directory callbacks.
+
+    Callbacks receive the changed path and whether it is a directory. The
+    number of watched directories is bounded; watch() returns False when a
+    directory can't be watched so callers can fall back to polling or TTLs.
+    """
+
+    def __init__(self, max_watches: int = DEFAULT_MAX_WATCHES):
+        self.max_watches = max_watches
+        self._lock = threading.Lock()
+        self._observer = None
+        self._watches: dict[str, tuple[object, _DirectoryHandler]] = {}
+
+    @property
+    def available(self) -> bool:
+        """Whether watchdog is installed."""
+        return Observer is not None
+
+    def watch(self, directory: str, callback: EventCallback) -> bool:
+        """
+        Register a callback for changes directly inside a directory.
+
+        Args:
+            directory: Absolute directory path
+            callback: Called with (path, is_directory) from the observer thread
+
+        Returns:
+            True if the directory is being watched
+        """
+        if not self.available:
+            return False
+
+        with self._lock:
+            entry = self._watches.get(directory)
+            if entry is None:
+                if len(self._watches) >= self.max_watches:
+                    return False
+                try:
+                    if self._observer is None:
+                        self._observer = Observer()
+                        self._observer.start()
+                    handler = _DirectoryHandler()
+                    watch = self._observer.schedule(handler, directory, recursive=False)
+                except Exception as e:
+                    logger.debug(f"Unable to watch {directory}: {e}")
+                    return False
+                entry = self._watches[directory] = (watch, handler)
+
+            if callback not in entry[1].callbacks:
+                entry[1].callbacks.append(callback)
+            return True
+
+    def unwatch(self, directory: str, callback: EventCallback) -> None:
+        """
+        Remove a callback, and the watch once no callbacks remain.
+
+        Must not be called from a watcher callback.
+        """
+        with self._lock:
+            entry = self._watches.get(directory)
+            if entry is None:
+                return
+            watch, handler = entry
+            if callback in handler.callbacks:
+                handler.callbacks.remove(callback)
+            if handler.callbacks:
+                return
+            del self._watches[directory]
+            try:
+                self._observer.unschedule(watch)
+            except Exception as e:
+                logger.debug(f"Unable to unwatch {directory}: {e}")
+
+    def is_watching(self, directory: str) -> bool:
+        """Whether a directory currently has a watch."""
+        with self._lock:
+            return directory in self._watches
+
+    def stop(self) -> None:
+        """Stop the observer and drop all watches."""
+        with self._lock:
+            observer, self._observer = self._observer, None
+            self._watches.clear()
+        if observer is not None:
+            observer.stop()
+            observer.join(timeout=2.0)
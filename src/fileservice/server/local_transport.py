@@ -0,0 +1,73 @@
+"""Same-host transport: file descriptors handed to local clients over a Unix domain socket."""
+import logging
+import os
+import socket
+import stat
+from typing import Optional
+
+from .tickets import SideChannelListener, TicketRegistry
+
+logger = logging.getLogger(__name__)
+
+# The descriptor-passing socket sits next to the gRPC one
+FD_SOCKET_SUFFIX = '.fd'
+
+
+def fd_socket_path(unix_socket: str) -> str:
+    """Path of the descriptor-passing socket that belongs to a gRPC Unix socket."""
+    return unix_socket + FD_SOCKET_SUFFIX
+
+
+def is_local_peer(peer: Optional[str]) -> bool:
+    """Whether a gRPC peer string belongs to a call made over a Unix domain socket."""
+    return bool(peer) and peer.startswith('unix:')
+
+
+def remove_stale_socket(path: str) -> None:
+    """Remove a socket file left behind by a previous run; other files are left alone."""
+    try:
+        if stat.S_ISSOCK(os.lstat(path).st_mode):
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def send_fd(connection: socket.socket, fd: int) -> None:
+    """Pass an open file descriptor to the peer with SCM_RIGHTS."""
+    socket.send_fds(connection, [b'F'], [fd])
+
+
+class LocalFdListener(SideChannelListener):
+    """
+    Unix domain socket on which local clients collect file descriptors.
+
+    The RPC that claims a connection sends one descriptor over it with
+    SCM_RIGHTS and closes it. The socket file gets the same permissions as
+    any other file the server creates (umask), like the gRPC socket.
+    """
+
+    name = 'local-fd'
+
+    def __init__(self, path: str, registry: Optional[TicketRegistry] = None):
+        """
+        Args:
+            path: Filesystem path of the socket
+            registry: Tickets issued for this listener (None creates one)
+        """
+        super().__init__(registry)
+        self.path = path
+
+    def _bind(self) -> socket.socket:
+        remove_stale_socket(self.path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.bind(self.path)
+            sock.listen(128)
+        except OSError:
+            sock.close()
+            raise
+        logger.info(f"Passing file descriptors on {self.path}")
+        return sock
+
+    def _unbind(self) -> None:
+        remove_stale_socket(self.path)
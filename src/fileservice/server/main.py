@@ -1,11 +1,21 @@
+import argparse
+import asyncio
 import logging
 import signal
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union
 
 import google.protobuf
-from fileservice.server import FileServer
+from fileservice.chunking import ADAPTIVE_MAX_CHUNK, CHUNK_POLICIES, AdaptiveChunkPolicy
+from fileservice.server import AioFileServer, FileServer
+from fileservice.server.bandwidth import BandwidthLimiter, load_limits
+from fileservice.server.content_cache import DEFAULT_MAX_BYTES, EVICTION_POLICIES, ContentCache
+from fileservice.server.metrics import MetricsServer
+from fileservice.server.prefork import PreforkServer, WorkerChannel, serve_worker
+from fileservice.server.profiling import DEFAULT_MAX_PROFILES, DEFAULT_PROFILE_DIR, RpcProfiler
+from fileservice.server.sendfile import SendfileListener
+from fileservice.server.service import FileServiceServicer
 # Ensure the google.protobuf module is correctly added to sys.path
 sys.path.insert(0, google.protobuf.__path__[0])
 # Configure detailed logging
@@ -20,14 +30,18 @@ logger = logging.getLogger(__name__)
 logger.info("Starting FileService app...")
 
 
-def handle_shutdown(signum: int, frame, server: Optional[FileServer] = None) -> None:
+def handle_shutdown(
+        signum: int,
+        frame,
+        server: Optional[Union[FileServer, PreforkServer]] = None
+) -> None:
     """
     Handle shutdown signals gracefully.
 
     Args:
         signum: Signal number
         frame: Current stack frame
-        server: Optional FileServer instance to stop
+        server: Optional FileServer, or PreforkServer whose workers to stop
     """
     logger.info(f"Received signal {signum}")
     if server:
@@ -42,13 +56,354 @@ def get_base_path() -> Path:
     return Path(__file__).parent
 
 
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="FileService gRPC server")
+    parser.add_argument(
+        '--mode',
+        choices=['thread', 'aio'],
+        default='thread',
+        help="Server implementation: thread pool or asyncio (grpc.aio)"
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help="Server processes sharing the port via SO_REUSEPORT (thread mode, Linux "
+             "only; refused elsewhere)"
+    )
+    parser.add_argument(
+        '--max-workers',
+        type=int,
+        default=10,
+        help="Worker threads (thread mode) or file I/O threads (aio mode)"
+    )
+    parser.add_argument(
+        '--max-tails',
+        type=int,
+        default=None,
+        help="TailFile follows served at once; each holds a worker (or I/O) thread "
+             "while it waits, so the default is half of --max-workers (0 = no limit)"
+    )
+    parser.add_argument(
+        '--chunk-policy',
+        choices=sorted(CHUNK_POLICIES),
+        default='adaptive',
+        help="How TransferFile sizes chunks: adaptive to throughput or static by file size"
+    )
+    parser.add_argument(
+        '--max-chunk-kb',
+        type=int,
+        default=ADAPTIVE_MAX_CHUNK // 1024,
+        help="Largest adaptive TransferFile chunk in KB; the default fits gRPC's 4MB "
+             "default receive limit, larger values need clients that raise "
+             "grpc.max_receive_message_length"
+    )
+    parser.add_argument(
+        '--mmap-threshold-mb',
+        type=int,
+        default=0,
+        help="Serve files at least this large in MB from a memory map (0 = pread). "
+             "Only for trees whose files are never truncated or rewritten in place: "
+             "a file shrinking under the map crashes the server with SIGBUS"
+    )
+    parser.add_argument(
+        '--upload-root',
+        action='append',
+        default=[],
+        metavar='DIR',
+        help="Allow UploadFile to write into this directory tree (repeatable; "
+             "uploads are refused without one)"
+    )
+    parser.add_argument(
+        '--global-rate',
+        type=float,
+        default=0,
+        help="Bandwidth limit across all clients in MB/s (0 = unlimited); with "
+             "--mode aio, throttled streams hold an I/O thread while they wait"
+    )
+    parser.add_argument(
+        '--peer-rate',
+        type=float,
+        default=0,
+        help="Bandwidth limit per client host in MB/s (0 = unlimited)"
+    )
+    parser.add_argument(
+        '--limits-file',
+        default=None,
+        help="JSON file with global_rate/peer_rate in MB/s, applied at startup and "
+             "reloaded on SIGHUP; its values override --global-rate and --peer-rate"
+    )
+    parser.add_argument(
+        '--content-cache-mb',
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="Memory for caching frequently requested small files in MB (0 disables)"
+    )
+    parser.add_argument(
+        '--content-cache-policy',
+        choices=EVICTION_POLICIES,
+        default='lru',
+        help="Content cache eviction policy"
+    )
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=0,
+        help="Serve Prometheus metrics at http://HOST:PORT/metrics (0 disables); "
+             "with --workers, worker N serves its own at PORT+1+N and PORT has "
+             "worker states and /health"
+    )
+    parser.add_argument(
+        '--metrics-host',
+        default='127.0.0.1',
+        help="Interface for the metrics endpoint"
+    )
+    parser.add_argument(
+        '--unix-socket',
+        default=None,
+        help="Also listen on this Unix domain socket for same-host clients, which "
+             "enables OpenLocalFile (with --workers, only worker 0 listens on it)"
+    )
+    parser.add_argument(
+        '--sendfile-port',
+        type=int,
+        default=0,
+        help="Port of the OpenSendfile side channel (0 picks a free one; "
+             "with --workers, worker N listens on PORT+N)"
+    )
+    parser.add_argument(
+        '--profile-rate',
+        type=float,
+        default=0.0,
+        help="Fraction of RPCs to profile (0 disables; SIGUSR2 toggles at runtime)"
+    )
+    parser.add_argument(
+        '--profile-dir',
+        default=DEFAULT_PROFILE_DIR,
+        help="Directory for profiles, trimmed to the newest --profile-max-files"
+    )
+    parser.add_argument(
+        '--profile-memory',
+        action='store_true',
+        help="Also trace allocations of profiled RPCs with tracemalloc"
+    )
+    parser.add_argument(
+        '--profile-max-files',
+        type=int,
+        default=DEFAULT_MAX_PROFILES,
+        help="Profiles kept in --profile-dir"
+    )
+    # Ignore unknown arguments such as the ones macOS passes to app bundles
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+def create_service(args: argparse.Namespace) -> FileServiceServicer:
+    """Build the servicer from command line options."""
+    bandwidth = BandwidthLimiter(
+        global_rate=args.global_rate * 1024 * 1024,
+        peer_rate=args.peer_rate * 1024 * 1024
+    )
+    content_cache = ContentCache(
+        max_bytes=args.content_cache_mb * 1024 * 1024,
+        policy=args.content_cache_policy
+    )
+    profiler = RpcProfiler(
+        directory=args.profile_dir,
+        sample_rate=args.profile_rate,
+        memory=args.profile_memory,
+        max_files=args.profile_max_files
+    )
+    if args.chunk_policy == AdaptiveChunkPolicy.name:
+        chunk_policy = AdaptiveChunkPolicy(max_size=args.max_chunk_kb * 1024)
+    else:
+        chunk_policy = CHUNK_POLICIES[args.chunk_policy]()
+    if args.limits_file:
+        reload_limits(bandwidth, args.limits_file)
+    return FileServiceServicer(
+        mmap_threshold=args.mmap_threshold_mb * 1024 * 1024 or None,
+        chunk_policy=chunk_policy,
+        bandwidth=bandwidth,
+        content_cache=content_cache,
+        profiler=profiler,
+        sendfile=SendfileListener(port=args.sendfile_port),
+        upload_roots=args.upload_root,
+        max_tails=max(1, args.max_workers // 2) if args.max_tails is None else args.max_tails
+    )
+
+
+def toggle_profiling(profiler: RpcProfiler, default_rate: float) -> None:
+    """Switch RPC profiling off, or back on at the configured rate (1% if none was given)."""
+    profiler.configure(sample_rate=0.0 if profiler.enabled else (default_rate or 0.01))
+
+
+def reload_limits(bandwidth: BandwidthLimiter, path: Optional[str]) -> None:
+    """Apply the bandwidth limits file; on errors the current limits are kept."""
+    if not path:
+        logger.warning("Ignoring SIGHUP: no --limits-file to reload")
+        return
+    try:
+        bandwidth.set_limits(**load_limits(path))
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not load bandwidth limits from {path}: {e}")
+
+
+def start_metrics(args: argparse.Namespace, service: FileServiceServicer) -> Optional[MetricsServer]:
+    """Start the metrics endpoint if a port was given."""
+    if not args.metrics_port:
+        return None
+    metrics_server = MetricsServer(service.metrics.registry, args.metrics_port, args.metrics_host)
+    metrics_server.start()
+    return metrics_server
+
+
+def worker_stats(service: FileServiceServicer) -> dict:
+    """Counters a pre-fork worker reports to its supervisor."""
+    metrics = service.metrics
+    return {
+        'requests': metrics.requests.total(),
+        'active_streams': metrics.active.total(),
+        'bytes_sent': metrics.bytes_sent.total(),
+        'bytes_received': metrics.bytes_received.total(),
+    }
+
+
+def run_worker(port: int, channel: WorkerChannel, args: argparse.Namespace) -> None:
+    """Entry point of a pre-fork worker process."""
+    if args.sendfile_port:
+        # Tickets are per process, so each worker needs its own side-channel port
+        args = argparse.Namespace(**{**vars(args), 'sendfile_port': args.sendfile_port + channel.index})
+    # A Unix socket path can't be shared between processes the way a port can
+    server = FileServer(
+        max_workers=args.max_workers, ports=[port], service=create_service(args), reuse_port=True,
+        unix_socket=args.unix_socket if channel.index == 0 else None)
+    metrics_server = None
+    if args.metrics_port:
+        metrics_server = MetricsServer(
+            server.service.metrics.registry, args.metrics_port + 1 + channel.index, args.metrics_host)
+        metrics_server.start()
+
+    signal.signal(signal.SIGTERM, lambda s, f: handle_shutdown(s, f, server))
+    signal.signal(signal.SIGINT, lambda s, f: handle_shutdown(s, f, server))
+    if hasattr(signal, 'SIGUSR2'):
+        signal.signal(signal.SIGUSR2,
+                      lambda s, f: toggle_profiling(server.service.profiler, args.profile_rate))
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP,
+                      lambda s, f: reload_limits(server.service.bandwidth, args.limits_file))
+
+    if not server.start():
+        logger.error(f"Worker {channel.index} failed to start")
+        sys.exit(1)
+    try:
+        serve_worker(channel, lambda: worker_stats(server.service),
+                     lambda: handle_shutdown(signal.SIGTERM, None, server))
+    finally:
+        server.stop(grace=2.0)
+        if metrics_server:
+            metrics_server.stop()
+
+
+def serve_prefork(args: argparse.Namespace) -> None:
+    """Run worker processes until the supervisor is stopped by a signal."""
+    server = PreforkServer(args.workers, run_worker, (args,))
+    metrics_server = None
+    if args.metrics_port:
+        metrics_server = MetricsServer(
+            server.registry, args.metrics_port, args.metrics_host, health=server.health)
+        metrics_server.start()
+
+    signal.signal(signal.SIGTERM, lambda s, f: handle_shutdown(s, f, server))
+    signal.signal(signal.SIGINT, lambda s, f: handle_shutdown(s, f, server))
+    for name in ('SIGUSR2', 'SIGHUP'):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), lambda s, f: server.signal_workers(s))
+
+    logger.info(f"Starting {args.workers} file service worker processes...")
+    if not server.start():
+        logger.error("Failed to start server")
+        sys.exit(1)
+
+    logger.info(f"Server running on port {server.port}")
+    try:
+        server.wait_for_termination()
+    finally:
+        server.stop(grace=2.0)
+        if metrics_server:
+            metrics_server.stop()
+
+
+async def serve_aio(args: argparse.Namespace) -> None:
+    """Run the asyncio server until it is stopped by a signal."""
+    server = AioFileServer(
+        io_workers=args.max_workers, service=create_service(args), unix_socket=args.unix_socket)
+    metrics_server = start_metrics(args, server.service)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(
+            sig, lambda s=sig: asyncio.ensure_future(_shutdown_aio(s, server)))
+    if hasattr(signal, 'SIGUSR2'):
+        loop.add_signal_handler(
+            signal.SIGUSR2, toggle_profiling, server.service.profiler, args.profile_rate)
+    if hasattr(signal, 'SIGHUP'):
+        loop.add_signal_handler(
+            signal.SIGHUP, reload_limits, server.service.bandwidth, args.limits_file)
+
+    logger.info("Starting async file service server...")
+    if not await server.start():
+        logger.error("Failed to start server")
+        sys.exit(1)
+
+    logger.info(f"Server running on port {server.port}")
+    try:
+        await server.wait_for_termination()
+    finally:
+        if metrics_server:
+            metrics_server.stop()
+
+
+async def _shutdown_aio(signum: int, server: AioFileServer) -> None:
+    """Async counterpart of handle_shutdown for the asyncio server."""
+    logger.info(f"Received signal {signum}")
+    await server.stop(grace=2.0)
+
+
 def main() -> None:
     """Main entry point for the file service server."""
-    server = FileServer()
+    args = parse_args()
+
+    if args.workers > 1:
+        if args.mode == 'aio':
+            logger.error("--workers runs thread-mode servers; it can't be combined with --mode aio")
+            sys.exit(2)
+        if not sys.platform.startswith('linux'):
+            # Elsewhere SO_REUSEPORT is missing (Windows) or hands every
+            # connection to one of the sockets (macOS/BSD), so extra
+            # workers would sit idle
+            logger.error(f"--workers needs Linux's SO_REUSEPORT load balancing, not {sys.platform}")
+            sys.exit(2)
+        serve_prefork(args)
+        return
+
+    if args.mode == 'aio':
+        asyncio.run(serve_aio(args))
+        return
+
+    server = FileServer(
+        max_workers=args.max_workers, service=create_service(args), unix_socket=args.unix_socket)
+    metrics_server = start_metrics(args, server.service)
 
     # Set up signal handlers
     signal.signal(signal.SIGTERM, lambda s, f: handle_shutdown(s, f, server))
     signal.signal(signal.SIGINT, lambda s, f: handle_shutdown(s, f, server))
+    if hasattr(signal, 'SIGUSR2'):
+        signal.signal(signal.SIGUSR2,
+                      lambda s, f: toggle_profiling(server.service.profiler, args.profile_rate))
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP,
+                      lambda s, f: reload_limits(server.service.bandwidth, args.limits_file))
 
     logger.info("Starting file service server...")
     if not server.start():
@@ -63,6 +418,8 @@ def main() -> None:
         logger.info("Shutting down...")
     finally:
         server.stop(grace=2.0)
+        if metrics_server:
+            metrics_server.stop()
 
     BASE_PATH = get_base_path()
     logger.info(f"Application base path: {BASE_PATH}")
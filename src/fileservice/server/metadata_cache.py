@@ -0,0 +1,221 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from .fs_watcher import FileSystemWatcher
+
+logger = logging.getLogger(__name__)
+
+# Default bounds for the cache
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_TTL = 2.0  # Seconds, used only for entries whose directory isn't watched
+
+_MISSING = object()
+
+
+class MetadataCache:
+    """
+    Bounded LRU cache for per-path lookups such as validation and metadata.
+
+    Entries are dropped when watchdog reports a change in the file's
+    directory. Entries in directories that can't be watched expire after
+    a TTL instead.
+    """
+
+    def __init__(
+            self,
+            max_entries: int = DEFAULT_MAX_ENTRIES,
+            ttl: float = DEFAULT_TTL,
+            watcher: Optional[FileSystemWatcher] = None
+    ):
+        """
+        Args:
+            max_entries: Maximum number of cached values
+            ttl: Lifetime in seconds of entries that aren't covered by a watch
+            watcher: Filesystem watcher (None creates one)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._watcher = watcher or FileSystemWatcher()
+        self._lock = threading.Lock()
+        # key -> (value, expiry or None, indexed paths)
+        self._entries: OrderedDict[Hashable, tuple[Any, Optional[float], tuple[str, ...]]] = OrderedDict()
+        self._by_path: dict[str, set[Hashable]] = {}
+        self._dir_refs: dict[str, int] = {}
+        self._unwatch_pending: set[str] = set()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _paths_for(file_path: str) -> tuple[str, ...]:
+        """Paths whose changes affect a lookup: the path as given and its target."""
+        absolute = os.path.abspath(file_path)
+        real = os.path.realpath(file_path)
+        return (absolute,) if real == absolute else (absolute, real)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Look up a cached value.
+
+        Args:
+            key: Cache key
+            default: Returned on a miss
+
+        Returns:
+            The cached value, or default on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expiry, _ = entry
+                if expiry is None or expiry > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+            self.misses += 1
+            return default
+
+    def begin(self, file_path: str) -> tuple[int, bool]:
+        """
+        Prepare to compute a value for a path.
+
+        Call this before the lookup that produces the value: it starts
+        watching the path's directory so changes made while the lookup runs
+        are not missed. Pass the result to put().
+
+        Returns:
+            Opaque token for put()
+        """
+        self._flush_unwatches()
+        with self._lock:
+            generation = self._generation
+        watched = all(
+            self._watcher.watch(os.path.dirname(path), self._on_change)
+            for path in self._paths_for(file_path)
+        )
+        return generation, watched
+
+    def put(self, key: Hashable, file_path: str, value: Any, token: tuple[int, bool]) -> None:
+        """
+        Cache a value computed for a path.
+
+        Args:
+            key: Cache key
+            file_path: Path the value was computed for
+            value: Value to cache
+            token: Token returned by begin()
+        """
+        generation, watched = token
+        paths = self._paths_for(file_path)
+
+        with self._lock:
+            if generation != self._generation:
+                # Something changed while the value was being computed
+                self._unwatch_pending.update(os.path.dirname(path) for path in paths)
+                return
+            if key in self._entries:
+                self._remove(key)
+
+            expiry = None if watched else time.monotonic() + self.ttl
+            self._entries[key] = (value, expiry, paths)
+            for path in paths:
+                self._by_path.setdefault(path, set()).add(key)
+                directory = os.path.dirname(path)
+                self._dir_refs[directory] = self._dir_refs.get(directory, 0) + 1
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, path: str, is_directory: bool = False) -> None:
+        """
+        Drop entries affected by a change to a path.
+
+        Args:
+            path: Changed path
+            is_directory: Whether the path is a directory (drops everything below it)
+        """
+        with self._lock:
+            self._generation += 1
+            if is_directory:
+                prefix = path.rstrip(os.sep) + os.sep
+                paths = [p for p in self._by_path if p == path or p.startswith(prefix)]
+            else:
+                paths = [path] if path in self._by_path else []
+
+            for changed in paths:
+                for key in list(self._by_path.get(changed, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def _on_change(self, path: str, is_directory: bool) -> None:
+        """Watcher callback."""
+        self.invalidate(path, is_directory)
+
+    def _remove(self, key: Hashable) -> None:
+        """Remove an entry and its path index. Caller holds the lock."""
+        _, _, paths = self._entries.pop(key)
+        for path in paths:
+            keys = self._by_path.get(path)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_path[path]
+
+            directory = os.path.dirname(path)
+            refs = self._dir_refs.get(directory, 0) - 1
+            if refs > 0:
+                self._dir_refs[directory] = refs
+            else:
+                self._dir_refs.pop(directory, None)
+                # Unwatching joins watcher threads, so do it outside callbacks
+                self._unwatch_pending.add(directory)
+
+    def _flush_unwatches(self) -> None:
+        """Release watches on directories that no longer have entries."""
+        with self._lock:
+            if not self._unwatch_pending:
+                return
+            directories = [d for d in self._unwatch_pending if d not in self._dir_refs]
+            self._unwatch_pending.clear()
+        for directory in directories:
+            self._watcher.unwatch(directory, self._on_change)
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._generation += 1
+            for key in list(self._entries):
+                self._remove(key)
+        self._flush_unwatches()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'watched_directories': len(self._dir_refs),
+                'watcher_available': self._watcher.available,
+            }
+
+    def close(self) -> None:
+        """Drop all entries and stop watching."""
+        with self._lock:
+            self._entries.clear()
+            self._by_path.clear()
+            self._dir_refs.clear()
+            self._unwatch_pending.clear()
+        self._watcher.stop()
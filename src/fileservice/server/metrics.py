@@ -0,0 +1,463 @@
+"""Service metrics in the Prometheus text exposition format."""
+import abc
+import bisect
+import functools
+import json
+import logging
+import math
+import threading
+import time
+from concurrent import futures
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# RPC durations from sub-millisecond existence checks to multi-minute transfers
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# Powers of two from 1KB to 16MB
+CHUNK_SIZE_BUCKETS = tuple(2 ** n for n in range(10, 25))
+
+# Streams publish their locally accumulated chunk metrics every this many messages
+FLUSH_EVERY = 64
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+Labels = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Labels, values: Labels, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(abc.ABC):
+    """A named family of samples, one per combination of label values."""
+
+    type = 'untyped'
+
+    def __init__(self, name: str, help_text: str, labelnames: Labels = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        """Yield (name suffix, formatted labels, value) for every sample."""
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        lines.extend(f'{self.name}{suffix}{labels} {_format_value(value)}'
+                     for suffix, labels, value in self.samples())
+        return lines
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def __init__(self, name: str, help_text: str, labelnames: Labels = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Labels = ()) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def total(self) -> float:
+        """Sum over all label values."""
+        with self._lock:
+            return sum(self._values.values())
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield '', _format_labels(self.labelnames, labels), value
+
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+
+class LocalHistogram:
+    """Unsynchronized histogram owned by one stream, merged into a Histogram in batches."""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Labels = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+        self._values: dict[Labels, LocalHistogram] = {}
+
+    def local(self) -> LocalHistogram:
+        """A private histogram with the same buckets, for merge()."""
+        return LocalHistogram(self.buckets)
+
+    def _get(self, labels: Labels) -> LocalHistogram:
+        values = self._values.get(labels)
+        if values is None:
+            values = self._values[labels] = LocalHistogram(self.buckets)
+        return values
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        with self._lock:
+            self._get(labels).observe(value)
+
+    def merge(self, local: LocalHistogram, labels: Labels = ()) -> None:
+        """Add a local histogram's observations and reset it."""
+        if not local.count:
+            return
+        with self._lock:
+            values = self._get(labels)
+            for i, count in enumerate(local.counts):
+                values.counts[i] += count
+            values.sum += local.sum
+            values.count += local.count
+        local.counts = [0] * len(local.counts)
+        local.sum = 0.0
+        local.count = 0
+
+    def samples(self):
+        with self._lock:
+            values = [(labels, list(h.counts), h.sum, h.count) for labels, h in self._values.items()]
+        for labels, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if math.isinf(bound) else f'le="{bound}"'
+                yield '_bucket', _format_labels(self.labelnames, labels, le), cumulative
+            yield '_sum', _format_labels(self.labelnames, labels), total
+            yield '_count', _format_labels(self.labelnames, labels), count
+
+
+class CallbackMetric(Metric):
+    """Metric whose samples are read from a callback at scrape time."""
+
+    def __init__(
+            self,
+            name: str,
+            help_text: str,
+            callback: Callable[[], dict[Labels, float]],
+            labelnames: Labels = (),
+            metric_type: str = 'gauge'
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.type = metric_type
+        self._callback = callback
+
+    def samples(self):
+        try:
+            values = self._callback()
+        except Exception as e:
+            logger.debug(f"Metric callback for {self.name} failed: {e}")
+            return
+        for labels, value in values.items():
+            yield '', _format_labels(self.labelnames, labels), value
+
+
+class MetricsRegistry:
+    """Ordered collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicate metric: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class ServiceMetrics:
+    """
+    Metrics of one FileServiceServicer.
+
+    RPC-level counters are updated once per call. Per-message values (bytes,
+    chunk sizes) are accumulated in the stream's own locals and published
+    every FLUSH_EVERY messages and at the end of the stream, so the chunk
+    loop never takes a lock.
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+        register = self.registry.register
+        self.requests = register(Counter(
+            'fileservice_rpc_requests_total', 'RPCs handled, by outcome', ('rpc', 'status')))
+        self.duration = register(Histogram(
+            'fileservice_rpc_duration_seconds', 'Time to complete an RPC', ('rpc',), LATENCY_BUCKETS))
+        self.active = register(Gauge(
+            'fileservice_active_streams', 'Streaming RPCs in progress', ('rpc',)))
+        self.bytes_sent = register(Counter(
+            'fileservice_bytes_sent_total', 'File content bytes sent to clients', ('rpc',)))
+        self.bytes_received = register(Counter(
+            'fileservice_bytes_received_total', 'File content bytes received from clients', ('rpc',)))
+        self.messages_sent = register(Counter(
+            'fileservice_messages_sent_total', 'Response messages sent', ('rpc',)))
+        self.chunk_size = register(Histogram(
+            'fileservice_chunk_size_bytes', 'Size of file content per message', ('rpc',),
+            CHUNK_SIZE_BUCKETS))
+        self._executors: dict[str, futures.ThreadPoolExecutor] = {}
+        register(CallbackMetric(
+            'fileservice_thread_pool_queue_depth', 'Tasks waiting for a worker thread',
+            self._queue_depths, ('pool',)))
+
+    def watch_executor(self, pool: str, executor: futures.ThreadPoolExecutor) -> None:
+        """Report the queue depth of a thread pool under the given name."""
+        self._executors[pool] = executor
+
+    def _queue_depths(self) -> dict[Labels, float]:
+        return {
+            (pool,): executor._work_queue.qsize()
+            for pool, executor in list(self._executors.items())
+            if hasattr(executor, '_work_queue')
+        }
+
+    def register_stats(self, prefix: str, help_text: str, stats: Callable[[], dict]) -> None:
+        """
+        Expose the numeric fields of a component's stats() as {prefix}_{field}.
+
+        Args:
+            prefix: Metric name prefix, e.g. 'fileservice_content_cache'
+            help_text: Description of the component
+            stats: Callable returning a dict of values; non-numeric ones are skipped
+        """
+        try:
+            fields = [key for key, value in stats().items()
+                      if isinstance(value, (int, float))]
+        except Exception as e:
+            logger.debug(f"Not exporting {prefix} stats: {e}")
+            return
+        for field in fields:
+            self.registry.register(CallbackMetric(
+                f'{prefix}_{field}', f'{help_text}: {field.replace("_", " ")}',
+                lambda field=field: {(): float(stats()[field])},
+                metric_type='untyped'))
+
+    def track_call(self, rpc: str, call: Callable, *args):
+        """Run a unary RPC handler, recording its outcome and duration."""
+        start = time.perf_counter()
+        status = 'exception'
+        try:
+            response = call(*args)
+            status = 'error' if getattr(response, 'error', '') else 'ok'
+            return response
+        finally:
+            self.requests.inc((rpc, status))
+            self.duration.observe(time.perf_counter() - start, (rpc,))
+
+    def track_stream(self, rpc: str, responses: Iterator) -> Iterator:
+        """
+        Pass a response stream through, recording bytes, chunk sizes and outcome.
+
+        Args:
+            rpc: RPC name used as label
+            responses: Generator returned by the RPC handler
+
+        Yields:
+            The handler's responses, unchanged
+        """
+        labels = (rpc,)
+        chunk_sizes = self.chunk_size.local()
+        sent = 0
+        messages = 0
+        status = 'cancelled'
+        self.active.inc(labels)
+        start = time.perf_counter()
+        try:
+            for response in responses:
+                content = getattr(response, 'content', b'')
+                if content:
+                    sent += len(content)
+                    chunk_sizes.observe(len(content))
+                if getattr(response, 'error', ''):
+                    status = 'error'
+                messages += 1
+                if messages % FLUSH_EVERY == 0:
+                    self._flush_sent(labels, sent, FLUSH_EVERY, chunk_sizes)
+                    sent = 0
+                yield response
+            if status != 'error':
+                status = 'ok'
+        except GeneratorExit:
+            raise
+        except BaseException:
+            status = 'exception'
+            raise
+        finally:
+            # Release the handler's resources now rather than when it's collected
+            close = getattr(responses, 'close', None)
+            if close:
+                close()
+            self._flush_sent(labels, sent, messages % FLUSH_EVERY, chunk_sizes)
+            self.active.dec(labels)
+            self.requests.inc((rpc, status))
+            self.duration.observe(time.perf_counter() - start, labels)
+
+    def _flush_sent(self, labels: Labels, sent: int, messages: int, chunk_sizes: LocalHistogram) -> None:
+        if sent:
+            self.bytes_sent.inc(labels, sent)
+        if messages:
+            self.messages_sent.inc(labels, messages)
+        self.chunk_size.merge(chunk_sizes, labels)
+
+    def count_received(self, rpc: str, requests: Iterator) -> Iterator:
+        """Pass a client stream through, counting the file content bytes in it."""
+        labels = (rpc,)
+        received = 0
+        try:
+            for request in requests:
+                received += len(getattr(request, 'content', b''))
+                if received >= 1 << 24:
+                    self.bytes_received.inc(labels, received)
+                    received = 0
+                yield request
+        finally:
+            if received:
+                self.bytes_received.inc(labels, received)
+
+
+def instrumented(kind: str):
+    """
+    Record metrics for a FileServiceServicer RPC method via self.metrics,
+    and profile the calls sampled by self.profiler.
+
+    Args:
+        kind: 'unary', 'server_stream', 'client_stream' or 'bidi'
+    """
+    def decorator(method):
+        rpc = method.__name__
+
+        @functools.wraps(method)
+        def wrapper(self, request, context):
+            metrics = self.metrics
+            session = self.profiler.sample(rpc)
+            if session:
+                request = session.tag_request(request)
+            if kind == 'client_stream':
+                request = metrics.count_received(rpc, request)
+            if kind in ('server_stream', 'bidi'):
+                responses = method(self, request, context)
+                if session:
+                    responses = session.profile_stream(responses)
+                return metrics.track_stream(rpc, responses)
+            if session:
+                return metrics.track_call(rpc, session.profile_call, method, self, request, context)
+            return metrics.track_call(rpc, method, self, request, context)
+
+        return wrapper
+
+    return decorator
+
+
+class MetricsServer:
+    """Serves a registry at /metrics, and optionally a health report at /health, over HTTP."""
+
+    def __init__(
+            self,
+            registry: MetricsRegistry,
+            port: int,
+            host: str = '127.0.0.1',
+            health: Optional[Callable[[], dict]] = None
+    ):
+        """
+        Args:
+            registry: Metrics to serve
+            port: Port to listen on (0 picks a free one)
+            host: Interface to bind; defaults to local connections only
+            health: Returns a JSON-serializable report with a 'status' field;
+                served with 503 unless the status is SERVING or DEGRADED
+        """
+        self.registry = registry
+        self.health = health
+        self.host = host
+        self.port = port
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> int:
+        """Start serving and return the bound port."""
+        registry = self.registry
+        health = self.health
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/metrics':
+                    status, content_type, body = 200, CONTENT_TYPE, registry.render().encode()
+                elif path == '/health' and health:
+                    report = health()
+                    status = 200 if report.get('status') in ('SERVING', 'DEGRADED') else 503
+                    content_type, body = 'application/json', json.dumps(report).encode()
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Metrics request: {format % args}")
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name='fileservice-metrics', daemon=True)
+        self._thread.start()
+        logger.info(f"Metrics available at http://{self.host}:{self.port}/metrics")
+        return self.port
+
+    def stop(self) -> None:
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+            self._thread = None
@@ -0,0 +1,413 @@
+"""Pre-fork mode: several server processes sharing one port via SO_REUSEPORT."""
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from multiprocessing.connection import Connection, wait
+from typing import Callable, Optional
+
+from .metrics import CallbackMetric, MetricsRegistry
+from .port_manager import PortManager
+
+logger = logging.getLogger(__name__)
+
+# Seconds between worker status reports
+DEFAULT_REPORT_INTERVAL = 1.0
+
+# Workers that haven't reported for this many intervals count as unhealthy
+STALE_REPORTS = 3
+
+# Minimum seconds between starts of the same worker, so a crashing worker doesn't spin
+RESTART_DELAY = 1.0
+
+# Health states, named as in the gRPC health checking protocol
+SERVING = 'SERVING'
+DEGRADED = 'DEGRADED'
+NOT_SERVING = 'NOT_SERVING'
+
+
+class WorkerChannel:
+    """A worker's end of the status pipe to its supervisor; picklable for spawn."""
+
+    def __init__(self, index: int, connection: Connection, parent_pid: int, interval: float):
+        self.index = index
+        self.interval = interval
+        self._connection = connection
+        self._parent_pid = parent_pid
+
+    def ready(self) -> None:
+        """Tell the supervisor the worker is accepting connections."""
+        self._send(('ready', os.getpid()))
+
+    def report(self, stats: dict) -> None:
+        """Send the worker's current counters."""
+        self._send(('stats', stats))
+
+    def orphaned(self) -> bool:
+        """Whether the supervisor has exited, leaving this worker behind."""
+        return os.getppid() != self._parent_pid
+
+    def _send(self, message: tuple) -> None:
+        try:
+            self._connection.send(message)
+        except OSError as e:
+            logger.debug(f"Worker {self.index} could not report: {e}")
+
+
+@dataclass
+class WorkerStatus:
+    """What the supervisor knows about one worker process."""
+
+    index: int
+    process: Optional[multiprocessing.process.BaseProcess] = None
+    connection: Optional[Connection] = None
+    pid: int = 0
+    ready: bool = False
+    restarts: int = 0
+    exit_code: Optional[int] = None
+    started_at: float = 0.0
+    reported_at: float = 0.0
+    stats: dict = field(default_factory=dict)
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.exitcode is None
+
+
+def reserve_port(port: int) -> socket.socket:
+    """
+    Bind (without listening) a SO_REUSEPORT socket to hold the port.
+
+    Only listening sockets receive connections, so this keeps other programs
+    off the port while workers come and go without taking any traffic.
+    """
+    try:
+        sock = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
+        address = ('::', port)
+    except OSError:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        address = ('0.0.0.0', port)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(address)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+class PreforkServer:
+    """
+    Runs N worker processes serving the same port.
+
+    The kernel spreads incoming connections across the workers' listening
+    sockets (SO_REUSEPORT), so per-chunk Python work in TransferFile and
+    friends runs on N GILs instead of one. Workers are started with the
+    spawn method, since gRPC doesn't survive fork() once it has started
+    threads, and call worker(port, channel, *worker_args). They report
+    readiness and counters over a pipe; the supervisor restarts workers
+    that die, aggregates their reports in health() and its metrics
+    registry, and on stop() sends SIGTERM so each worker shuts down
+    gracefully through its own signal handler.
+
+    A connection stays with the worker that accepted it, so a single
+    client multiplexing all its calls over one channel is still served by
+    one process; the gain comes from many clients or channels.
+    """
+
+    def __init__(
+            self,
+            workers: int,
+            worker: Callable,
+            worker_args: tuple = (),
+            ports: Optional[list[int]] = None,
+            report_interval: float = DEFAULT_REPORT_INTERVAL,
+            restart: bool = True
+    ):
+        """
+        Args:
+            workers: Number of worker processes
+            worker: Module-level function run in each worker as
+                worker(port, channel, *worker_args); it must call
+                channel.ready() once serving and exit on SIGTERM
+            worker_args: Further picklable arguments for worker
+            ports: Candidate ports to listen on
+            report_interval: Seconds between worker reports (channel.interval)
+            restart: Restart workers that exit unexpectedly
+        """
+        self.workers = max(1, workers)
+        self.report_interval = report_interval
+        self.restart = restart
+        self._worker = worker
+        self._worker_args = worker_args
+        self._port_manager = PortManager(ports)
+        self._context = multiprocessing.get_context('spawn')
+        self._statuses: list[WorkerStatus] = []
+        self._lock = threading.Lock()
+        self._reservation: Optional[socket.socket] = None
+        self._monitor: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._stopped = threading.Event()
+        self._port: Optional[int] = None
+        self.registry = MetricsRegistry()
+        self._register_metrics()
+
+    def start(self) -> bool:
+        """Reserve a port and start the workers."""
+        try:
+            if self._statuses:
+                logger.warning("Server already running")
+                return False
+
+            port = self._port_manager.get_available_port()
+            if not port:
+                logger.error("No available ports")
+                return False
+            self._reservation = reserve_port(port)
+            self._port = port
+
+            self._stopping.clear()
+            self._stopped.clear()
+            self._statuses = [WorkerStatus(index) for index in range(self.workers)]
+            for status in self._statuses:
+                self._spawn(status)
+            self._monitor = threading.Thread(
+                target=self._watch, name='fileservice-prefork', daemon=True)
+            self._monitor.start()
+            logger.info(f"Started {self.workers} worker processes on port {port}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to start workers: {e}")
+            self.stop()
+            return False
+
+    def _spawn(self, status: WorkerStatus) -> None:
+        reader, writer = self._context.Pipe(duplex=False)
+        channel = WorkerChannel(status.index, writer, os.getpid(), self.report_interval)
+        process = self._context.Process(
+            target=self._worker,
+            args=(self._port, channel) + tuple(self._worker_args),
+            name=f'fileservice-worker-{status.index}'
+        )
+        process.start()
+        # The child has its own copy now; closing ours lets the reader see EOF when it exits
+        writer.close()
+        with self._lock:
+            status.process = process
+            status.connection = reader
+            status.pid = process.pid
+            status.ready = False
+            status.exit_code = None
+            status.started_at = time.monotonic()
+            status.reported_at = 0.0
+            status.stats = {}
+
+    def _watch(self) -> None:
+        """Collect worker reports and restart workers that exit."""
+        while not self._stopping.is_set():
+            connections = {status.connection: status for status in self._statuses
+                           if status.connection is not None}
+            for connection in wait(list(connections), timeout=self.report_interval):
+                self._receive(connections[connection])
+            if not self._stopping.is_set():
+                self._reap()
+
+    def _receive(self, status: WorkerStatus) -> None:
+        try:
+            kind, value = status.connection.recv()
+        except (EOFError, OSError):
+            # The worker exited; _reap() notices once the process is gone
+            status.connection.close()
+            status.connection = None
+            return
+        with self._lock:
+            status.reported_at = time.monotonic()
+            if kind == 'ready':
+                status.ready = True
+                logger.info(f"Worker {status.index} (pid {value}) is serving")
+            elif kind == 'stats':
+                status.stats = value
+
+    def _reap(self) -> None:
+        for status in self._statuses:
+            if status.process is None or status.process.exitcode is None:
+                continue
+            if status.exit_code is None:
+                status.exit_code = status.process.exitcode
+                status.ready = False
+                logger.warning(f"Worker {status.index} (pid {status.pid}) exited "
+                               f"with code {status.exit_code}")
+            if self.restart and time.monotonic() - status.started_at >= RESTART_DELAY:
+                if status.connection is not None:
+                    status.connection.close()
+                    status.connection = None
+                with self._lock:
+                    status.process.close()
+                    status.process = None
+                    status.restarts += 1
+                self._spawn(status)
+
+    def stop(self, grace: Optional[float] = None) -> None:
+        """
+        Stop all workers and release the port.
+
+        Args:
+            grace: Seconds a worker may take to finish before it is killed;
+                each worker applies its own grace period on SIGTERM
+        """
+        self._stopping.set()
+        if self._monitor:
+            self._monitor.join()
+            self._monitor = None
+
+        processes = [status.process for status in self._statuses if status.alive]
+        for process in processes:
+            process.terminate()
+        deadline = time.monotonic() + (grace or 0) + 5.0
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.exitcode is None:
+                logger.warning(f"Worker pid {process.pid} did not stop, killing it")
+                process.kill()
+                process.join()
+        for status in self._statuses:
+            if status.connection is not None:
+                status.connection.close()
+                status.connection = None
+        self._statuses = []
+
+        if self._reservation:
+            self._reservation.close()
+            self._reservation = None
+        if self._port is not None:
+            self._port_manager.release_port(self._port)
+            self._port = None
+        self._stopped.set()
+
+    def signal_workers(self, signum: int) -> None:
+        """Forward a signal (e.g. SIGUSR2 to toggle profiling) to every worker."""
+        for status in self._statuses:
+            if status.alive:
+                try:
+                    os.kill(status.pid, signum)
+                except ProcessLookupError:
+                    pass
+
+    def health(self) -> dict:
+        """
+        Aggregated health of the workers.
+
+        Returns:
+            Dict with the overall status (SERVING when every worker is up and
+            reporting, DEGRADED when some are, NOT_SERVING when none are),
+            per-worker details and the sum of the workers' counters
+        """
+        now = time.monotonic()
+        stale_after = self.report_interval * STALE_REPORTS
+        workers = []
+        totals: dict[str, float] = {}
+        with self._lock:
+            for status in self._statuses:
+                healthy = (status.alive and status.ready
+                           and now - status.reported_at <= stale_after)
+                workers.append({
+                    'index': status.index,
+                    'pid': status.pid,
+                    'alive': status.alive,
+                    'ready': status.ready,
+                    'healthy': healthy,
+                    'restarts': status.restarts,
+                    'exit_code': status.exit_code,
+                    'last_report_seconds': round(now - status.reported_at, 3) if status.reported_at else None,
+                    'stats': dict(status.stats),
+                })
+                for key, value in status.stats.items():
+                    totals[key] = totals.get(key, 0) + value
+
+        serving = sum(worker['healthy'] for worker in workers)
+        if workers and serving == len(workers):
+            overall = SERVING
+        elif serving:
+            overall = DEGRADED
+        else:
+            overall = NOT_SERVING
+        return {'status': overall, 'port': self._port, 'workers': workers, 'totals': totals}
+
+    def _register_metrics(self) -> None:
+        register = self.registry.register
+        register(CallbackMetric(
+            'fileservice_workers', 'Worker processes by state', self._worker_counts, ('state',)))
+        register(CallbackMetric(
+            'fileservice_worker_restarts_total', 'Worker processes restarted after exiting',
+            lambda: {(): sum(status.restarts for status in self._statuses)},
+            metric_type='counter'))
+        register(CallbackMetric(
+            'fileservice_worker_stat', 'Counters reported by each worker',
+            self._worker_stats, ('worker', 'stat'), metric_type='untyped'))
+
+    def _worker_counts(self) -> dict:
+        workers = self.health()['workers']
+        return {
+            ('alive',): sum(worker['alive'] for worker in workers),
+            ('healthy',): sum(worker['healthy'] for worker in workers),
+        }
+
+    def _worker_stats(self) -> dict:
+        with self._lock:
+            return {
+                (str(status.index), key): value
+                for status in self._statuses
+                for key, value in status.stats.items()
+            }
+
+    @property
+    def port(self) -> Optional[int]:
+        """Get current server port."""
+        return self._port
+
+    def wait_for_termination(self, timeout: Optional[float] = None) -> None:
+        """Wait until stop() has completed."""
+        self._stopped.wait(timeout)
+
+    def __enter__(self) -> 'PreforkServer':
+        """Context manager entry."""
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        """Context manager exit."""
+        self.stop()
+
+
+def serve_worker(channel: WorkerChannel, stats: Callable[[], dict], shutdown: Callable[[], None]) -> None:
+    """
+    Report to the supervisor until the worker is stopped by a signal.
+
+    Runs on the worker's main thread so signal handlers can interrupt it.
+
+    Args:
+        channel: Pipe to the supervisor
+        stats: Returns the counters to report every channel.interval seconds
+        shutdown: Called if the supervisor disappears
+    """
+    channel.ready()
+    while True:
+        channel.report(stats())
+        if channel.orphaned():
+            logger.warning("Supervisor exited, shutting down worker")
+            shutdown()
+            return
+        time.sleep(channel.interval)
+
+
+def default_workers() -> int:
+    """One worker per available CPU."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
@@ -0,0 +1,309 @@
+"""Sampling cProfile/tracemalloc hooks for servicer RPCs."""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_DIR = os.path.join(tempfile.gettempdir(), 'fileservice-profiles')
+
+# Profiles kept in the output directory; older ones are deleted
+DEFAULT_MAX_PROFILES = 100
+
+# Sampled calls allowed to run at the same time
+DEFAULT_MAX_ACTIVE = 4
+
+# Functions and allocation sites listed in each summary
+SUMMARY_LINES = 25
+
+
+def _request_paths(message) -> list[str]:
+    for field in ('file_path', 'directory_path'):
+        path = getattr(message, field, '')
+        if path:
+            return [path]
+    return list(getattr(message, 'file_paths', []))
+
+
+class ProfileSession:
+    """
+    Profile of one sampled RPC.
+
+    Stream handlers are resumed by gRPC, possibly on a different thread
+    each time, so the CPU profiler is enabled around every step of the
+    handler only. Time spent between steps (serializing and sending the
+    previous message, or waiting for flow control) is measured separately
+    as send_seconds.
+    """
+
+    def __init__(self, profiler: 'RpcProfiler', rpc: str, cpu: bool, memory: bool):
+        self._profiler = profiler
+        self.rpc = rpc
+        self.paths: list[str] = []
+        self.started = time.time()
+        self.handler_seconds = 0.0
+        self.send_seconds = 0.0
+        self.bytes_sent = 0
+        self.messages = 0
+        self.status = 'ok'
+        self.cpu_profile = cProfile.Profile() if cpu else None
+        self._memory = memory
+        self._snapshot = None
+        if memory:
+            self._snapshot = profiler.start_tracing()
+
+    def tag_request(self, request):
+        """Record the request path; client streams are tagged from their first message."""
+        if hasattr(request, 'DESCRIPTOR'):
+            self.paths = _request_paths(request)
+            return request
+        return self._tag_stream(request)
+
+    def _tag_stream(self, requests: Iterator) -> Iterator:
+        for request in requests:
+            if not self.paths:
+                self.paths = _request_paths(request)
+            yield request
+
+    def _run(self, func: Callable, *args):
+        start = time.perf_counter()
+        profile = self.cpu_profile
+        if profile:
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is active on this thread
+                profile = None
+        try:
+            return func(*args)
+        finally:
+            if profile:
+                profile.disable()
+            self.handler_seconds += time.perf_counter() - start
+
+    def profile_call(self, method: Callable, *args):
+        """Run a unary handler under the profiler."""
+        try:
+            response = self._run(method, *args)
+            if getattr(response, 'error', ''):
+                self.status = 'error'
+            return response
+        except BaseException:
+            self.status = 'exception'
+            raise
+        finally:
+            self.finish()
+
+    def profile_stream(self, responses: Iterator) -> Iterator:
+        """Pass a response stream through, profiling each step of the handler."""
+        sentinel = object()
+        try:
+            while True:
+                response = self._run(next, responses, sentinel)
+                if response is sentinel:
+                    break
+                self.bytes_sent += len(getattr(response, 'content', b''))
+                if getattr(response, 'error', ''):
+                    self.status = 'error'
+                self.messages += 1
+                yielded = time.perf_counter()
+                yield response
+                self.send_seconds += time.perf_counter() - yielded
+        except GeneratorExit:
+            self.status = 'cancelled'
+            raise
+        except BaseException:
+            self.status = 'exception'
+            raise
+        finally:
+            close = getattr(responses, 'close', None)
+            if close:
+                close()
+            self.finish()
+
+    def finish(self) -> None:
+        """Write the profile and release the sampling slot."""
+        snapshot = None
+        if self._memory:
+            snapshot = self._profiler.stop_tracing()
+        try:
+            self._profiler.write(self, snapshot)
+        except Exception as e:
+            logger.error(f"Failed to write profile for {self.rpc}: {e}")
+        finally:
+            self._profiler.release()
+
+    def summary(self, snapshot) -> dict:
+        """Tags, timings and the top functions and allocation sites."""
+        file_size = None
+        if self.paths:
+            try:
+                file_size = os.stat(self.paths[0]).st_size
+            except OSError:
+                pass
+        summary = {
+            'rpc': self.rpc,
+            'path': self.paths[0] if self.paths else '',
+            'path_count': len(self.paths),
+            'file_size': file_size,
+            'status': self.status,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'wall_seconds': round(time.time() - self.started, 6),
+            'handler_seconds': round(self.handler_seconds, 6),
+            'send_seconds': round(self.send_seconds, 6),
+            'messages': self.messages,
+            'bytes_sent': self.bytes_sent,
+        }
+        if self.cpu_profile:
+            text = io.StringIO()
+            pstats.Stats(self.cpu_profile, stream=text).sort_stats('cumulative').print_stats(SUMMARY_LINES)
+            summary['cpu'] = text.getvalue().splitlines()
+        if snapshot is not None and self._snapshot is not None:
+            summary['allocations'] = [
+                str(stat) for stat in snapshot.compare_to(self._snapshot, 'lineno')[:SUMMARY_LINES]]
+        return summary
+
+
+class RpcProfiler:
+    """
+    Samples a fraction of RPCs with cProfile and/or tracemalloc.
+
+    Each sampled call writes <name>.prof (pstats format, when CPU profiling
+    is on) and <name>.json (request path and size, timings, top functions
+    and allocation sites) to the output directory, which is trimmed to the
+    newest max_files profiles. Everything can be changed while the server
+    runs with configure().
+
+    tracemalloc is process-wide, so allocation diffs include whatever other
+    threads allocated during the call.
+    """
+
+    def __init__(
+            self,
+            directory: str = DEFAULT_PROFILE_DIR,
+            sample_rate: float = 0.0,
+            cpu: bool = True,
+            memory: bool = False,
+            max_files: int = DEFAULT_MAX_PROFILES,
+            max_active: int = DEFAULT_MAX_ACTIVE
+    ):
+        """
+        Args:
+            directory: Where profiles are written
+            sample_rate: Fraction of calls to profile (0 disables profiling)
+            cpu: Whether to run cProfile on sampled calls
+            memory: Whether to trace allocations of sampled calls
+            max_files: Profiles kept before the oldest are deleted
+            max_active: Sampled calls allowed at once; extra calls are not profiled
+        """
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.cpu = cpu
+        self.memory = memory
+        self.max_files = max_files
+        self.max_active = max_active
+        self._lock = threading.Lock()
+        self._active = 0
+        self._tracing = 0
+        self._sequence = 0
+        self.sampled = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 and (self.cpu or self.memory)
+
+    def configure(
+            self,
+            sample_rate: Optional[float] = None,
+            cpu: Optional[bool] = None,
+            memory: Optional[bool] = None,
+            directory: Optional[str] = None
+    ) -> None:
+        """Change sampling at runtime; None keeps the current value."""
+        with self._lock:
+            if sample_rate is not None:
+                self.sample_rate = sample_rate
+            if cpu is not None:
+                self.cpu = cpu
+            if memory is not None:
+                self.memory = memory
+            if directory is not None:
+                self.directory = directory
+        logger.info(f"RPC profiling: rate={self.sample_rate}, cpu={self.cpu}, "
+                    f"memory={self.memory}, directory={self.directory}")
+
+    def sample(self, rpc: str) -> Optional[ProfileSession]:
+        """
+        Decide whether to profile a call.
+
+        Returns:
+            A session for sampled calls, None otherwise
+        """
+        if not self.enabled or random.random() >= self.sample_rate:
+            return None
+        with self._lock:
+            if self._active >= self.max_active:
+                return None
+            self._active += 1
+            self.sampled += 1
+            cpu, memory = self.cpu, self.memory
+        return ProfileSession(self, rpc, cpu, memory)
+
+    def release(self) -> None:
+        with self._lock:
+            self._active -= 1
+
+    def start_tracing(self):
+        """Start tracemalloc if needed and return a snapshot to diff against."""
+        with self._lock:
+            self._tracing += 1
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+        return tracemalloc.take_snapshot()
+
+    def stop_tracing(self):
+        """Take the closing snapshot and stop tracemalloc after the last traced call."""
+        snapshot = tracemalloc.take_snapshot()
+        with self._lock:
+            self._tracing -= 1
+            if self._tracing == 0:
+                tracemalloc.stop()
+        return snapshot
+
+    def write(self, session: ProfileSession, snapshot) -> None:
+        """Write a finished session and rotate the output directory."""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+        label = re.sub(r'[^A-Za-z0-9_.-]+', '_', os.path.basename(session.paths[0])) if session.paths else ''
+        name = (f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(session.started))}"
+                f"-{os.getpid()}-{sequence:06d}-{session.rpc}" + (f"-{label}" if label else ''))
+        base = os.path.join(self.directory, name)
+
+        summary = session.summary(snapshot)
+        if session.cpu_profile:
+            session.cpu_profile.dump_stats(base + '.prof')
+            summary['profile'] = base + '.prof'
+        with open(base + '.json', 'w') as f:
+            json.dump(summary, f, indent=2)
+        self._rotate()
+
+    def _rotate(self) -> None:
+        names = sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith('.json'))
+        for name in names[:max(0, len(names) - self.max_files)]:
+            for suffix in ('.json', '.prof'):
+                try:
+                    os.remove(os.path.join(self.directory, name + suffix))
+                except FileNotFoundError:
+                    pass
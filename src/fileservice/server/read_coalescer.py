@@ -0,0 +1,230 @@
+"""Share reads between concurrent streams of the same file."""
+import logging
+import os
+import threading
+from typing import BinaryIO, Optional
+
+from .chunk_source import Chunk, ChunkSource
+
+logger = logging.getLogger(__name__)
+
+# Shared reads are done in blocks of this size (1MB)
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+# Blocks kept per shared file; streams further behind read on their own
+DEFAULT_RING_BLOCKS = 16
+
+
+class _Slot:
+    """One ring entry: the block it holds, or is being loaded into it."""
+    __slots__ = ('index', 'data', 'loading')
+
+    def __init__(self):
+        self.index = -1
+        self.data: Optional[bytes] = None
+        self.loading = False
+
+
+class SharedReader:
+    """
+    One reader and a ring of blocks shared by every stream of one file version.
+
+    Block i lives in slot i % ring_blocks. The first stream to need a block
+    reads it and the others wait for that read instead of issuing their own.
+    Streams that fall more than the ring behind find their block already
+    overwritten and are told to read on their own, so they never hold up
+    the streams in front.
+    """
+
+    def __init__(self, key: tuple, fd: int, size: int, block_size: int, ring_blocks: int):
+        self.key = key
+        self.size = size
+        self.block_size = block_size
+        self.users = 0
+        self.block_reads = 0
+        self.block_hits = 0
+        self._fd = fd
+        self._slots = [_Slot() for _ in range(ring_blocks)]
+        self._cond = threading.Condition()
+
+    def block(self, index: int) -> Optional[bytes]:
+        """
+        Get block `index`, reading it if no other stream has.
+
+        Returns:
+            The block's bytes, or None if the ring has already moved past it
+        """
+        slot = self._slots[index % len(self._slots)]
+        with self._cond:
+            while slot.index == index and slot.loading:
+                self._cond.wait()
+            if slot.index == index:
+                self.block_hits += 1
+                return slot.data
+            if slot.index > index:
+                return None
+            private = slot.loading
+            if not private:
+                slot.index = index
+                slot.loading = True
+                slot.data = None
+
+        if private:
+            # A lagging stream is filling this slot with an older block; don't wait for it
+            return os.pread(self._fd, self.block_size, index * self.block_size)
+
+        try:
+            data = os.pread(self._fd, self.block_size, index * self.block_size)
+        except BaseException:
+            with self._cond:
+                slot.index = -1
+                slot.loading = False
+                self._cond.notify_all()
+            raise
+
+        with self._cond:
+            slot.data = data
+            slot.loading = False
+            self.block_reads += 1
+            self._cond.notify_all()
+        return data
+
+    def clear(self) -> None:
+        """Drop buffered blocks."""
+        with self._cond:
+            for slot in self._slots:
+                if not slot.loading:
+                    slot.index = -1
+                    slot.data = None
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class CoalescedChunkSource(ChunkSource):
+    """
+    Chunk source that reads through a SharedReader while other streams
+    of the same file are active, and through its own source otherwise.
+    """
+
+    def __init__(self, coalescer: 'ReadCoalescer', shared: SharedReader, fallback: ChunkSource):
+        super().__init__(fallback.size)
+        self._coalescer = coalescer
+        self._shared: Optional[SharedReader] = shared
+        self._fallback = fallback
+
+    def read(self, offset: int, size: int) -> Chunk:
+        shared = self._shared
+        if shared is not None and shared.users > 1:
+            chunk = self._read_shared(shared, offset, size)
+            if chunk is not None:
+                return chunk
+            # Too far behind the other streams; continue independently
+            self._detach(fallback=True)
+        return self._fallback.read(offset, size)
+
+    def _read_shared(self, shared: SharedReader, offset: int, size: int) -> Optional[Chunk]:
+        end = min(offset + size, self.size)
+        block_size = shared.block_size
+        parts = []
+        position = offset
+        while position < end:
+            index = position // block_size
+            block = shared.block(index)
+            if block is None:
+                return None
+            start = position - index * block_size
+            part = memoryview(block)[start:start + end - position]
+            if not part:
+                break
+            parts.append(part)
+            position += len(part)
+        if not parts:
+            return b""
+        return parts[0] if len(parts) == 1 else b"".join(parts)
+
+    def _detach(self, fallback: bool = False) -> None:
+        if self._shared is not None:
+            self._coalescer.release(self._shared, fallback)
+            self._shared = None
+
+    def close(self) -> None:
+        self._detach()
+        self._fallback.close()
+
+
+class ReadCoalescer:
+    """
+    Registry of SharedReaders keyed by file version (device, inode, mtime, size).
+
+    A file that is streamed by several clients at once is read from disk
+    roughly once; ring memory is only used while at least two streams of
+    the same version are open.
+    """
+
+    def __init__(self, block_size: int = DEFAULT_BLOCK_SIZE, ring_blocks: int = DEFAULT_RING_BLOCKS):
+        """
+        Args:
+            block_size: Size of each shared read
+            ring_blocks: Blocks buffered per file (0 disables coalescing)
+        """
+        self.block_size = block_size
+        self.ring_blocks = ring_blocks
+        self._readers: dict[tuple, SharedReader] = {}
+        self._lock = threading.Lock()
+        self._streams = 0
+        self._fallbacks = 0
+        self._block_reads = 0
+        self._block_hits = 0
+
+    def open(self, file: BinaryIO, stat: os.stat_result, fallback: ChunkSource) -> ChunkSource:
+        """
+        Wrap a stream's own chunk source so it can share reads with other streams.
+
+        Args:
+            file: The stream's open file
+            stat: fstat of the open file
+            fallback: The stream's own chunk source, used when reads can't be shared
+
+        Returns:
+            A source that closes fallback when closed
+        """
+        if self.ring_blocks <= 0 or stat.st_size == 0:
+            return fallback
+
+        key = (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            shared = self._readers.get(key)
+            if shared is None:
+                shared = SharedReader(
+                    key, os.dup(file.fileno()), stat.st_size, self.block_size, self.ring_blocks)
+                self._readers[key] = shared
+            shared.users += 1
+            self._streams += 1
+        return CoalescedChunkSource(self, shared, fallback)
+
+    def release(self, shared: SharedReader, fallback: bool = False) -> None:
+        """Stop a stream from using a shared reader, closing it after the last one."""
+        with self._lock:
+            shared.users -= 1
+            if fallback:
+                self._fallbacks += 1
+            if shared.users == 0:
+                del self._readers[shared.key]
+                self._block_reads += shared.block_reads
+                self._block_hits += shared.block_hits
+                shared.close()
+            elif shared.users == 1:
+                # The remaining stream reads on its own again
+                shared.clear()
+
+    def stats(self) -> dict:
+        """Open shared files and totals for streams, shared block reads and hits, and fallbacks."""
+        with self._lock:
+            return {
+                'files': len(self._readers),
+                'streams': self._streams,
+                'block_reads': self._block_reads + sum(r.block_reads for r in self._readers.values()),
+                'block_hits': self._block_hits + sum(r.block_hits for r in self._readers.values()),
+                'fallbacks': self._fallbacks,
+            }
@@ -0,0 +1,332 @@
+"""Parallel file name and content search."""
+import logging
+import os
+import re
+import threading
+from collections import deque
+from concurrent import futures
+from dataclasses import dataclass
+from typing import Iterator, Optional, Sequence
+
+from .directory_listing import matches
+
+logger = logging.getLogger(__name__)
+
+# Bytes read and searched at a time, cut back to the last whole line (4MB)
+SEARCH_WINDOW = 4 * 1024 * 1024
+
+# Bytes of context kept on each side of a match when returning its line
+MAX_LINE_CONTEXT = 256
+
+# Files searched at once; also bounds the work wasted after an early stop
+DEFAULT_MAX_PENDING = 32
+
+# Files found but not yet submitted; directory scans pause past this
+MAX_QUEUED_FILES = 4096
+
+
+@dataclass
+class SearchHit:
+    """A matching file, or one match within it."""
+
+    path: str
+    offset: int = 0
+    length: int = 0
+    line_number: int = 0
+    line: str = ''
+
+
+class ContentMatcher:
+    """
+    Finds a literal or regular expression in file contents.
+
+    Case-sensitive literals use bytes.find; everything else is a
+    compiled bytes regex with re.MULTILINE, so ^ and $ match at line
+    boundaries as they do in grep.
+    """
+
+    def __init__(self, query: str, regex: bool = False, ignore_case: bool = False):
+        """
+        Args:
+            query: Text or pattern to find
+            regex: Whether query is a regular expression
+            ignore_case: Match ASCII letters case-insensitively
+
+        Raises:
+            ValueError: If the query is empty or not a valid expression
+        """
+        if not query:
+            raise ValueError("Empty search query")
+        needle = query.encode()
+        self._literal = needle if not regex and not ignore_case else None
+        self._pattern = None
+        if self._literal is None:
+            flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+            try:
+                self._pattern = re.compile(needle if regex else re.escape(needle), flags)
+            except re.error as e:
+                raise ValueError(f"Invalid regular expression: {e}") from None
+
+    def finditer(self, buffer) -> Iterator[tuple[int, int]]:
+        """Yield (start, end) of each non-overlapping match in a bytes-like buffer."""
+        if self._literal is not None:
+            length = len(self._literal)
+            position = buffer.find(self._literal)
+            while position >= 0:
+                yield position, position + length
+                position = buffer.find(self._literal, position + length)
+        else:
+            for match in self._pattern.finditer(buffer):
+                yield match.start(), match.end()
+
+    def search(
+            self,
+            name: str,
+            buffer,
+            max_matches: int = 0,
+            stop: Optional[threading.Event] = None,
+            offset: int = 0,
+            first_line: int = 1
+    ) -> list[SearchHit]:
+        """
+        Collect the matches in one file's contents, or one window of them.
+
+        Args:
+            name: Path reported for the hits
+            buffer: File contents as bytes
+            max_matches: Matches to collect (0 = all)
+            stop: Abandons the scan when set
+            offset: File offset of the buffer's first byte
+            first_line: Line number of the buffer's first line
+
+        Returns:
+            Hits with byte offsets, 1-based line numbers and the matching line
+        """
+        hits = []
+        line_number = first_line
+        counted = 0
+        size = len(buffer)
+        for start, end in self.finditer(buffer):
+            line_number += buffer.count(b'\n', counted, start)
+            counted = start
+
+            low = max(0, start - MAX_LINE_CONTEXT)
+            line_start = buffer.rfind(b'\n', low, start)
+            line_start = low if line_start < 0 else line_start + 1
+            high = min(size, end + MAX_LINE_CONTEXT)
+            line_end = buffer.find(b'\n', end, high)
+            line_end = high if line_end < 0 else line_end
+
+            hits.append(SearchHit(
+                path=name,
+                offset=offset + start,
+                length=end - start,
+                line_number=line_number,
+                line=buffer[line_start:line_end].decode('utf-8', errors='replace')
+            ))
+            if (max_matches and len(hits) >= max_matches) or (stop and stop.is_set()):
+                break
+        return hits
+
+
+def search_file(
+        path: str,
+        name: str,
+        matcher: ContentMatcher,
+        max_matches: int = 0,
+        max_file_size: int = 0,
+        stop: Optional[threading.Event] = None,
+        window: int = SEARCH_WINDOW
+) -> tuple[list[SearchHit], int]:
+    """
+    Search one file in windows of whole lines read with pread.
+
+    Only the size seen at open is searched, and a file truncated meanwhile
+    just ends early; log files are often written while they are searched,
+    which a memory map can't survive (touching pages past a new end raises
+    SIGBUS). Lines longer than a window are searched in pieces, so a match
+    crossing a piece boundary is missed.
+
+    Returns:
+        Tuple of (hits, bytes scanned); unreadable or skipped files scan 0 bytes
+    """
+    if stop and stop.is_set():
+        return [], 0
+    try:
+        with open(path, 'rb') as file:
+            fd = file.fileno()
+            size = os.fstat(fd).st_size
+            if size == 0 or (max_file_size and size > max_file_size):
+                return [], 0
+            hits = []
+            scanned = 0
+            line_number = 1
+            while scanned < size:
+                buffer = os.pread(fd, min(window, size - scanned), scanned)
+                if not buffer:
+                    break
+                if scanned + len(buffer) < size:
+                    cut = buffer.rfind(b'\n') + 1
+                    if cut:
+                        buffer = buffer[:cut]
+                remaining = max_matches - len(hits) if max_matches else 0
+                hits += matcher.search(name, buffer, remaining, stop, scanned, line_number)
+                scanned += len(buffer)
+                if (max_matches and len(hits) >= max_matches) or (stop and stop.is_set()):
+                    break
+                line_number += buffer.count(b'\n')
+            return hits, scanned
+    except (OSError, ValueError) as e:
+        logger.debug(f"Skipping {path} in search: {e}")
+        return [], 0
+
+
+def _scan(path: str) -> list[os.DirEntry]:
+    try:
+        with os.scandir(path) as it:
+            return sorted(it, key=lambda entry: entry.name)
+    except OSError as e:
+        logger.debug(f"Skipping unreadable directory {path}: {e}")
+        return []
+
+
+class DirectorySearch:
+    """
+    Searches a directory tree, streaming hits as files finish.
+
+    Directory scans and file searches both run on the given thread pool,
+    so walking the tree, opening files and faulting in their pages overlap.
+    Hits come out in completion order. Once max_results is reached the
+    remaining work is cancelled and running file scans stop at their next
+    match. Symlinks are neither followed nor searched.
+
+    Work is bounded: at most max_pending directory scans and file searches
+    run at once, and directories are only scanned while fewer than
+    MAX_QUEUED_FILES found files wait for a search, depth first, so a huge
+    tree doesn't pile up in memory ahead of the searches.
+
+    Matching itself holds the GIL (re and find don't release it), so the
+    pool speeds up the I/O-bound part of a search rather than the scanning.
+    """
+
+    def __init__(
+            self,
+            root: str,
+            executor: futures.Executor,
+            matcher: Optional[ContentMatcher] = None,
+            patterns: Sequence[str] = (),
+            max_depth: int = 0,
+            max_results: int = 0,
+            max_matches_per_file: int = 0,
+            max_file_size: int = 0,
+            max_pending: int = DEFAULT_MAX_PENDING
+    ):
+        """
+        Args:
+            root: Directory to search
+            executor: Thread pool for directory scans and file searches
+            matcher: Content to find (None matches file names only)
+            patterns: Globs matched against names or relative paths
+            max_depth: Levels to descend (1 = direct children, 0 = unlimited)
+            max_results: Hits after which the search stops (0 = no limit)
+            max_matches_per_file: Hits collected per file (0 = no limit)
+            max_file_size: Larger files aren't searched (0 = no limit)
+            max_pending: File searches submitted to the pool at once
+        """
+        self.root = root
+        self._executor = executor
+        self.matcher = matcher
+        self.patterns = list(patterns)
+        self.max_depth = max_depth
+        self.max_results = max_results
+        self.max_matches_per_file = max_matches_per_file
+        self.max_file_size = max_file_size
+        self.max_pending = max(1, max_pending)
+        self.results = 0
+        self.files_scanned = 0
+        self.bytes_scanned = 0
+        self.truncated = False
+
+    def _limit(self, hits: list[SearchHit]) -> list[SearchHit]:
+        if self.max_results:
+            hits = hits[:self.max_results - self.results]
+            if self.results + len(hits) >= self.max_results:
+                self.truncated = True
+        self.results += len(hits)
+        return hits
+
+    def __iter__(self) -> Iterator[list[SearchHit]]:
+        """
+        Yields:
+            Hits of each file (or batch of matching names) as they complete
+        """
+        stop = threading.Event()
+        scans: dict[futures.Future, tuple[str, ...]] = {}
+        searches: dict[futures.Future, str] = {}
+        waiting: deque[tuple[str, str]] = deque()
+        directories: list[tuple[str, tuple[str, ...]]] = [(self.root, ())]
+
+        try:
+            while scans or searches or waiting or directories:
+                while (directories and len(scans) < self.max_pending
+                       and len(waiting) < MAX_QUEUED_FILES):
+                    path, prefix = directories.pop()
+                    scans[self._executor.submit(_scan, path)] = prefix
+                while waiting and len(searches) < self.max_pending:
+                    path, name = waiting.popleft()
+                    future = self._executor.submit(
+                        search_file, path, name, self.matcher,
+                        self.max_matches_per_file, self.max_file_size, stop)
+                    searches[future] = name
+
+                done, _ = futures.wait(
+                    list(scans) + list(searches), return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    if future in scans:
+                        prefix = scans.pop(future)
+                        hits = self._scanned(prefix, future.result(), directories, waiting)
+                    else:
+                        del searches[future]
+                        hits, scanned = future.result()
+                        if scanned:
+                            self.files_scanned += 1
+                            self.bytes_scanned += scanned
+
+                    hits = self._limit(hits)
+                    if hits:
+                        yield hits
+                    if self.truncated:
+                        return
+        finally:
+            stop.set()
+            for future in list(scans) + list(searches):
+                future.cancel()
+
+    def _scanned(
+            self,
+            prefix: tuple[str, ...],
+            entries: list[os.DirEntry],
+            directories: list,
+            waiting: deque
+    ) -> list[SearchHit]:
+        """Queue a scanned directory's children; returns name-only hits."""
+        hits = []
+        subdirectories = []
+        for entry in entries:
+            parts = prefix + (entry.name,)
+            if entry.is_dir(follow_symlinks=False):
+                if self.max_depth == 0 or len(parts) < self.max_depth:
+                    subdirectories.append((entry.path, parts))
+                continue
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            relative_path = '/'.join(parts)
+            if not matches(entry.name, relative_path, self.patterns):
+                continue
+            if self.matcher is None:
+                hits.append(SearchHit(path=relative_path))
+            else:
+                waiting.append((entry.path, relative_path))
+        # Reversed onto the stack so siblings are scanned in name order
+        directories.extend(reversed(subdirectories))
+        return hits
@@ -0,0 +1,95 @@
+"""Raw TCP side channel for bulk transfers with os.sendfile()."""
+import logging
+import os
+import socket
+from typing import Callable, Optional
+
+from .tickets import SideChannelListener, TicketRegistry
+
+logger = logging.getLogger(__name__)
+
+# Bytes per sendfile() call; the bandwidth limiter is consulted between calls
+SENDFILE_BLOCK = 8 * 1024 * 1024
+
+
+def send_range(
+        sock: socket.socket,
+        fd: int,
+        start: int,
+        end: int,
+        throttle: Optional[Callable[[int], None]] = None
+) -> int:
+    """
+    Send a byte range of a file with sendfile(), without copying it through user space.
+
+    Args:
+        sock: Connected blocking socket
+        fd: File descriptor to read from; its offset is not changed
+        start: First byte to send
+        end: Byte offset to stop at
+        throttle: Called with each block's size before it is sent
+
+    Returns:
+        Bytes sent; less than requested if the file shrank
+
+    Raises:
+        OSError: If the connection fails
+    """
+    offset = start
+    while offset < end:
+        count = min(SENDFILE_BLOCK, end - offset)
+        if throttle:
+            throttle(count)
+        sent = os.sendfile(sock.fileno(), fd, offset, count)
+        if sent == 0:
+            break  # End of file
+        offset += sent
+    return offset - start
+
+
+class SendfileListener(SideChannelListener):
+    """
+    TCP side channel for OpenSendfile.
+
+    The RPC that claims a connection streams the file into it with
+    send_range() and closes it.
+    """
+
+    name = 'sendfile'
+
+    def __init__(
+            self,
+            port: int = 0,
+            host: str = '::',
+            registry: Optional[TicketRegistry] = None
+    ):
+        """
+        Args:
+            port: Port to listen on (0 picks a free one)
+            host: Interface to bind; '::' accepts IPv4 and IPv6 where dual-stack is available
+            registry: Tickets issued for this listener (None creates one)
+        """
+        super().__init__(registry)
+        self.host = host
+        self.port = port
+
+    def start(self) -> int:
+        """Start listening if not already, and return the bound port."""
+        super().start()
+        return self.port
+
+    def _bind(self) -> socket.socket:
+        family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if family == socket.AF_INET6:
+                sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+            sock.bind((self.host, self.port))
+            sock.listen(128)
+        except OSError:
+            sock.close()
+            raise
+        self.port = sock.getsockname()[1]
+        logger.info(f"Sendfile side channel listening on port {self.port}")
+        return sock
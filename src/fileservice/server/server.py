@@ -4,22 +4,54 @@ from typing import Optional
 
 import grpc
 
+from .local_transport import LocalFdListener, fd_socket_path
 from .port_manager import PortManager
 from .service import FileServiceServicer
 from .. import file_service_pb2_grpc
 
 logger = logging.getLogger(__name__)
 
+# Accept the largest upload chunks (8MB) plus message overhead
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+SERVER_OPTIONS = [
+    ('grpc.max_receive_message_length', MAX_MESSAGE_SIZE),
+    # Accept client keepalive pings on idle connections (pooled clients ping every 30s)
+    ('grpc.keepalive_permit_without_calls', 1),
+    ('grpc.http2.min_recv_ping_interval_without_data_ms', 10000),
+]
+
 
 class FileServer:
     """Base server class that handles port management and server lifecycle."""
 
-    def __init__(self, max_workers: int = 10, ports: Optional[list[int]] = None):
+    def __init__(
+            self,
+            max_workers: int = 10,
+            ports: Optional[list[int]] = None,
+            service: Optional[FileServiceServicer] = None,
+            reuse_port: bool = False,
+            unix_socket: Optional[str] = None
+    ):
+        """
+        Args:
+            max_workers: Threads handling RPCs
+            ports: Candidate ports to listen on
+            service: Servicer with the RPC logic (None creates one)
+            reuse_port: Listen on the first port with SO_REUSEPORT, sharing it
+                with other processes doing the same (see prefork.PreforkServer)
+            unix_socket: Also listen on this Unix domain socket path, for
+                same-host clients; enables OpenLocalFile
+        """
         self.max_workers = max_workers
+        self.reuse_port = reuse_port
         self._port_manager = PortManager(ports)
         self._server: Optional[grpc.Server] = None
         self._port: Optional[int] = None
-        self._service = FileServiceServicer()
+        self._service = service or FileServiceServicer()
+        self._executor: Optional[futures.ThreadPoolExecutor] = None
+        self.unix_socket = unix_socket
+        if unix_socket and self._service.local_fds is None:
+            self._service.local_fds = LocalFdListener(fd_socket_path(unix_socket))
 
     def start(self) -> bool:
         """Start the gRPC server."""
@@ -28,22 +60,35 @@ class FileServer:
                 logger.warning("Server already running")
                 return False
 
-            # Get available port first
-            port = self._port_manager.get_available_port()
+            # Get available port first; a shared port is already bound by its other listeners
+            if self.reuse_port:
+                port = self._port_manager.ports[0]
+                options = SERVER_OPTIONS + [('grpc.so_reuseport', 1)]
+            else:
+                port = self._port_manager.get_available_port()
+                options = SERVER_OPTIONS
             if not port:
                 logger.error("No available ports")
                 return False
 
             # Create and start server
-            self._server = grpc.server(futures.ThreadPoolExecutor(max_workers=self.max_workers))
+            self._executor = futures.ThreadPoolExecutor(max_workers=self.max_workers)
+            self._service.metrics.watch_executor('grpc', self._executor)
+            self._server = grpc.server(self._executor, options=options)
             file_service_pb2_grpc.add_FileServiceServicer_to_server(self._service, self._server)
 
             server_address = f'[::]:{port}'
-            self._server.add_insecure_port(server_address)
+            if not self._server.add_insecure_port(server_address):
+                raise RuntimeError(f"Could not bind {server_address}")
+            if self.unix_socket:
+                # gRPC replaces a stale socket file and removes it again on stop
+                self._server.add_insecure_port(f'unix:{self.unix_socket}')
+                self._service.local_fds.start()
             self._server.start()
 
             self._port = port
-            logger.info(f"Server started on port {port}")
+            logger.info(f"Server started on port {port}"
+                        + (f" and {self.unix_socket}" if self.unix_socket else ""))
             return True
 
         except Exception as e:
@@ -52,20 +97,34 @@ class FileServer:
             return False
 
     def stop(self, grace: Optional[float] = None) -> None:
-        """Stop the server and release resources."""
+        """
+        Stop the server and release resources.
+
+        Args:
+            grace: Seconds in-flight RPCs get to finish before they are
+                aborted (None aborts them at once); returns after that
+        """
         if self._server:
             try:
-                self._server.stop(grace)
+                # stop() returns at once; the servicer's executors and listeners
+                # have to outlive the RPCs still running in the grace period
+                self._server.stop(grace).wait()
                 self._port_manager.release_port(self._port)
             finally:
                 self._server = None
                 self._port = None
+                self._service.close()
 
     @property
     def port(self) -> Optional[int]:
         """Get current server port."""
         return self._port
 
+    @property
+    def service(self) -> FileServiceServicer:
+        """The servicer, e.g. to change bandwidth limits while running."""
+        return self._service
+
     def wait_for_termination(self, timeout: Optional[float] = None) -> None:
         """Wait for server termination."""
         if self._server:
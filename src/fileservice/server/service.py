@@ -1,38 +1,201 @@
+import contextlib
+import hashlib
 import logging
 import mimetypes
+import itertools
 import os
+import tempfile
+import threading
+import time
+from concurrent import futures
 from pathlib import Path
-from typing import Optional, Iterator, BinaryIO
+from typing import BinaryIO, Optional, Iterator
 
 import grpc
 
 # Import generated proto files (relative imports)
 from fileservice import file_service_pb2 as pb2
 from fileservice import file_service_pb2_grpc as pb2_grpc
+from fileservice.checksums import StreamingDigest
+from fileservice.chunking import MAX_CHUNK, AdaptiveChunkPolicy, ChunkSizer, optimize_chunk_size
+from fileservice.compression import SAMPLE_SIZE, ChunkCompressor, StreamCompressor, should_compress
+from fileservice.delta import MAX_BLOCK_SIZE, MIN_BLOCK_SIZE, BlockSignature, generate_delta_from
+from fileservice.fileutils import current_umask, fsync_directory, preallocate
+from .bandwidth import BandwidthLimiter, peer_key
+from .bundle import BundleStream, bundle_entries
+from .chunk_source import BytesChunkSource, ChunkSource, open_chunk_source
+from .content_cache import ContentCache, load_file
+from .digest_cache import DigestCache
+from .directory_listing import decode_cursor, encode_cursor, iter_directory, matches
+from .fs_watcher import FileSystemWatcher
+from .local_transport import LocalFdListener, is_local_peer, send_fd
+from .metadata_cache import MetadataCache
+from .metrics import ServiceMetrics, instrumented
+from .profiling import RpcProfiler
+from .read_coalescer import ReadCoalescer
+from .search import ContentMatcher, DirectorySearch
+from .sendfile import SendfileListener, send_range
+from .tail import DEFAULT_BATCH_DELAY, FileTail
 
 logger = logging.getLogger(__name__)
 
 # Default chunk size (1MB)
 DEFAULT_CHUNK_SIZE = 1024 * 1024
 
+# Results per BatchFileExists message and threads used for stat calls
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_STAT_WORKERS = 16
+
+# Entries per ListDirectory message
+DEFAULT_LIST_BATCH_SIZE = 1000
+
+# Matches per SearchFiles message
+DEFAULT_SEARCH_BATCH_SIZE = 100
+
+# Files followed at once by TailFile; each follow holds a worker thread
+DEFAULT_MAX_TAILS = 4
+
+# Marks a metadata cache miss (None is a valid cached value)
+_CACHE_MISS = object()
+
 
 class FileServiceServicer(pb2_grpc.FileServiceServicer):
     """Implementation of File Service functionality."""
 
-    def __init__(self):
+    def __init__(
+            self,
+            mmap_threshold: Optional[int] = None,
+            metadata_cache: Optional[MetadataCache] = None,
+            stat_workers: int = DEFAULT_STAT_WORKERS,
+            digest_cache: Optional[DigestCache] = None,
+            chunk_policy=None,
+            bandwidth: Optional[BandwidthLimiter] = None,
+            read_coalescer: Optional[ReadCoalescer] = None,
+            content_cache: Optional[ContentCache] = None,
+            metrics: Optional[ServiceMetrics] = None,
+            profiler: Optional[RpcProfiler] = None,
+            sendfile: Optional[SendfileListener] = None,
+            local_fds: Optional[LocalFdListener] = None,
+            upload_roots: Optional[list[str]] = None,
+            max_tails: int = DEFAULT_MAX_TAILS
+    ):
+        """
+        Args:
+            mmap_threshold: Minimum file size served from a memory map (None, the
+                default, reads with pread; only map trees whose files are never
+                truncated in place, which would crash the server with SIGBUS)
+            metadata_cache: Cache for path validation and metadata (None creates one)
+            stat_workers: Threads used to stat paths in batch requests
+            digest_cache: Cache of whole-file checksums (None creates one)
+            chunk_policy: TransferFile chunk sizing policy (None = AdaptiveChunkPolicy)
+            bandwidth: Rate limits for streamed data (None creates an unlimited one)
+            read_coalescer: Shares reads between concurrent streams of a file (None creates one)
+            content_cache: In-memory cache of small file contents (None creates one)
+            metrics: RPC and transfer metrics (None creates a private registry)
+            profiler: Samples RPCs with cProfile/tracemalloc (None creates a disabled one)
+            sendfile: Side-channel listener for OpenSendfile, started on first use
+                (None creates one on a free port)
+            local_fds: Descriptor-passing socket for OpenLocalFile (None disables
+                the RPC; FileServer sets one up and starts it with unix_socket)
+            upload_roots: Directory trees UploadFile may write into (None or
+                empty refuses all uploads)
+            max_tails: TailFile streams served at once (0 = no limit); keep it
+                below the server's worker threads so follows can't starve
+                other RPCs
+        """
         # Initialize mimetypes database
         mimetypes.init()
+        self.mmap_threshold = mmap_threshold
+        self.metadata_cache = metadata_cache or MetadataCache()
+        self.stat_workers = stat_workers
+        self._stat_executor: Optional[futures.ThreadPoolExecutor] = None
+        self._tail_watcher: Optional[FileSystemWatcher] = None
+        self.max_tails = max_tails
+        self._tail_slots = threading.Semaphore(max_tails) if max_tails else None
+        self.digest_cache = digest_cache or DigestCache()
+        self.chunk_policy = chunk_policy or AdaptiveChunkPolicy()
+        self.bandwidth = bandwidth or BandwidthLimiter()
+        self.read_coalescer = read_coalescer or ReadCoalescer()
+        self.content_cache = content_cache or ContentCache()
+        self.metrics = metrics or ServiceMetrics()
+        self.profiler = profiler or RpcProfiler()
+        self.sendfile = sendfile or SendfileListener()
+        self.local_fds = local_fds
+        self.upload_roots = [os.path.realpath(root) for root in upload_roots or []]
+        # Uploaded files get the permissions open() would give them
+        self._new_file_mode = 0o666 & ~current_umask()
+        for prefix, help_text, stats in (
+                ('fileservice_metadata_cache', 'Path metadata cache', self.metadata_cache.stats),
+                ('fileservice_digest_cache', 'Whole-file digest cache', self.digest_cache.stats),
+                ('fileservice_content_cache', 'In-memory file content cache', self.content_cache.stats),
+                ('fileservice_read_coalescer', 'Reads shared between streams', self.read_coalescer.stats),
+                ('fileservice_bandwidth', 'Bandwidth limiter', self.bandwidth.stats),
+                ('fileservice_sendfile_tickets', 'Sendfile side-channel tickets',
+                 self.sendfile.registry.stats)):
+            self.metrics.register_stats(prefix, help_text, stats)
+
+    def close(self) -> None:
+        """Release background resources such as filesystem watches."""
+        self.metadata_cache.close()
+        if self._stat_executor:
+            self._stat_executor.shutdown(wait=False, cancel_futures=True)
+            self._stat_executor = None
+        if self._tail_watcher:
+            self._tail_watcher.stop()
+            self._tail_watcher = None
+        self.sendfile.stop()
+        if self.local_fds:
+            self.local_fds.stop()
+
+    @property
+    def stat_executor(self) -> futures.ThreadPoolExecutor:
+        """Thread pool for parallel stat calls, bundle reads and searches, created on first use."""
+        if self._stat_executor is None:
+            self._stat_executor = futures.ThreadPoolExecutor(
+                max_workers=self.stat_workers, thread_name_prefix='fileservice-stat')
+            self.metrics.watch_executor('stat', self._stat_executor)
+        return self._stat_executor
+
+    @property
+    def tail_watcher(self) -> FileSystemWatcher:
+        """Watcher for files followed by TailFile, created on first use."""
+        if self._tail_watcher is None:
+            self._tail_watcher = FileSystemWatcher()
+        return self._tail_watcher
+
+    def _cached(self, kind: str, file_path: str, compute):
+        """
+        Return a cached per-path value, computing and caching it on a miss.
+
+        Args:
+            kind: Name of the value, part of the cache key
+            file_path: Path the value describes
+            compute: Callable taking file_path that produces the value
+        """
+        key = (kind, file_path)
+        value = self.metadata_cache.get(key, _CACHE_MISS)
+        if value is _CACHE_MISS:
+            token = self.metadata_cache.begin(file_path)
+            value = compute(file_path)
+            self.metadata_cache.put(key, file_path, value, token)
+        return value
 
     def _validate_path(self, file_path: str) -> tuple[bool, Optional[str]]:
         """
         Validate file path for security and accessibility.
 
+        Results are cached until the file's directory changes.
+
         Args:
             file_path: Path to validate
 
         Returns:
             Tuple of (is_valid, error_message)
         """
+        return self._cached('valid', file_path, self._check_path)
+
+    def _check_path(self, file_path: str) -> tuple[bool, Optional[str]]:
+        """Uncached path validation; see _validate_path."""
         try:
             path = Path(file_path).resolve()
 
@@ -53,48 +216,177 @@ class FileServiceServicer(pb2_grpc.FileServiceServicer):
         except Exception as e:
             return False, f"Path validation error: {str(e)}"
 
-    def _stream_file(self, file: BinaryIO, chunk_size: int) -> Iterator[pb2.FileChunkResponse]:
+    def _stream_file(
+            self,
+            source: ChunkSource,
+            sizer: ChunkSizer,
+            start: int = 0,
+            end: Optional[int] = None,
+            track_progress: bool = False,
+            compressor: Optional[ChunkCompressor] = None,
+            digest: Optional[StreamingDigest] = None,
+            peer: str = 'local'
+    ) -> Iterator[pb2.FileChunkResponse]:
         """
         Stream file contents in chunks.
 
         Args:
-            file: Open file object
-            chunk_size: Size of each chunk in bytes
+            source: Chunk source for the open file
+            sizer: Chooses the size of each chunk from measured send times
+            start: Byte offset to start streaming from
+            end: Byte offset to stop streaming at (None = end of file)
+            track_progress: Whether to fill in progress relative to the range
+            compressor: Optional compressor applied to each chunk
+            digest: Optional digest fed with the raw chunks, reported in the last chunk
+            peer: Bandwidth limiter key of the client
 
         Yields:
-            FileChunkResponse for each chunk
+            FileChunkResponse for each chunk, followed by a final empty chunk
         """
-        offset = 0
-        while True:
-            chunk = file.read(chunk_size)
+        end = source.size if end is None else end
+        offset = start
+        total = end - start
+        wire_bytes = 0
+
+        while offset < end:
+            chunk = source.read(offset, min(sizer.next_size(), end - offset))
             if not chunk:
                 break
 
-            yield pb2.FileChunkResponse(
+            # Protobuf bytes fields only accept bytes, so views are copied once here
+            chunk = bytes(chunk)
+            if digest:
+                digest.update(chunk)
+            response = pb2.FileChunkResponse(
                 content=chunk,
                 offset=offset,
-                is_last=False
+                is_last=False,
+                raw_size=len(chunk)
             )
+            if compressor:
+                compressed = compressor.compress(chunk)
+                # Chunks that don't shrink are sent raw
+                if len(compressed) < len(chunk):
+                    response.content = compressed
+                    response.compression = compressor.codec
+                    wire_bytes += len(compressed)
+                else:
+                    wire_bytes += len(chunk)
+            else:
+                wire_bytes += len(chunk)
 
             offset += len(chunk)
+            if track_progress:
+                response.progress = ((offset - start) / total) * 100 if total else 100
+
+            # gRPC resumes the generator once the message has been handed to the transport;
+            # throttling counts as send time so chunks shrink to match the allowed rate
+            sent_at = time.perf_counter()
+            self.bandwidth.throttle(peer, len(response.content))
+            yield response
+            sizer.record(len(chunk), time.perf_counter() - sent_at)
 
         # Send final chunk to indicate completion
-        yield pb2.FileChunkResponse(
+        last = pb2.FileChunkResponse(
             content=b"",
             offset=offset,
-            is_last=True
+            is_last=True,
+            progress=100 if track_progress else 0,
+            total_raw_bytes=offset - start,
+            total_wire_bytes=wire_bytes
         )
+        if digest:
+            last.checksums.update(digest.hexdigests())
+        yield last
+
+    @staticmethod
+    def _make_resume_token(stat: os.stat_result) -> str:
+        """
+        Build a resume token identifying the current version of a file.
+
+        Args:
+            stat: Result of stat() on the file
+
+        Returns:
+            Opaque token derived from the file size and modification time
+        """
+        return f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+    def _resolve_range(
+            self,
+            request: pb2.FileRequest,
+            stat: os.stat_result
+    ) -> tuple[int, int, Optional[str]]:
+        """
+        Work out the byte range to stream for a request.
+
+        Args:
+            request: FileRequest with optional offset, length and resume token
+            stat: Result of stat() on the opened file
+
+        Returns:
+            Tuple of (start, end, error_message)
+        """
+        file_size = stat.st_size
+
+        if request.resume_token and request.resume_token != self._make_resume_token(stat):
+            return 0, 0, "File has changed since the resume token was issued"
+
+        if request.offset > file_size:
+            return 0, 0, f"Offset {request.offset} is beyond end of file ({file_size} bytes)"
+
+        start = request.offset
+        end = min(start + request.length, file_size) if request.length else file_size
+        return start, end, None
+
+    def _select_compressor(
+            self,
+            request: pb2.FileRequest,
+            source: ChunkSource,
+            start: int,
+            end: int
+    ) -> Optional[ChunkCompressor]:
+        """
+        Pick the compressor for a stream, if compressing is worthwhile.
+
+        Args:
+            request: FileRequest with the requested codec and level
+            source: Chunk source for the open file
+            start: First byte of the range to be sent
+            end: End of the range to be sent
+
+        Returns:
+            ChunkCompressor, or None to send raw chunks
+
+        Raises:
+            ValueError: If the requested codec or level is not supported
+        """
+        if not request.compression:
+            return None
+
+        compressor = ChunkCompressor(request.compression, request.compression_level)
+        metadata = self._get_file_metadata(request.file_path)
+        sample = bytes(source.read(start, min(SAMPLE_SIZE, end - start)))
+        if not should_compress(compressor, metadata.mime_type if metadata else None, sample):
+            return None
+        return compressor
 
     def _get_file_metadata(self, file_path: str) -> Optional[pb2.FileMetadata]:
         """
         Get metadata for a file.
 
+        Results are cached until the file's directory changes.
+
         Args:
             file_path: Path to the file
 
         Returns:
             FileMetadata message or None if file doesn't exist
         """
+        return self._cached('metadata', file_path, self._read_file_metadata)
+
+    def _read_file_metadata(self, file_path: str) -> Optional[pb2.FileMetadata]:
+        """Uncached metadata lookup; see _get_file_metadata."""
         try:
             path = Path(file_path)
             if not path.exists():
@@ -113,53 +405,156 @@ class FileServiceServicer(pb2_grpc.FileServiceServicer):
             logger.error(f"Error getting metadata for {file_path}: {e}")
             return None
 
-    def GetFileContents(
+    def _stream_request(
             self,
             request: pb2.FileRequest,
-            context: grpc.ServicerContext
+            context: grpc.ServicerContext,
+            track_progress: bool
     ) -> Iterator[pb2.FileChunkResponse]:
         """
-        Stream file contents to the client.
+        Validate a FileRequest and stream the requested range.
+
+        Shared by GetFileContents and TransferFile. TransferFile passes
+        track_progress=True, which also sizes chunks with the chunk policy.
 
         Args:
             request: FileRequest containing file path and options
             context: gRPC servicer context
+            track_progress: Whether to report progress and optimize the chunk size
 
         Yields:
-            FileChunkResponse containing file chunks and metadata
+            FileChunkResponse messages; metadata and resume token on the first,
+            checksums on the last
         """
-        try:
-            # Validate file path
-            is_valid, error_msg = self._validate_path(request.file_path)
-            if not is_valid:
+        # Validate file path
+        is_valid, error_msg = self._validate_path(request.file_path)
+        if not is_valid:
+            yield pb2.FileChunkResponse(
+                error=error_msg,
+                is_last=True
+            )
+            return
+
+        # Get file metadata if requested
+        metadata = None
+        if request.include_metadata:
+            metadata = self._get_file_metadata(request.file_path)
+
+        # Open and stream the requested range of the file
+        with self._open_source(request.file_path) as (file, stat, source):
+            start, end, error_msg = self._resolve_range(request, stat)
+            if error_msg:
                 yield pb2.FileChunkResponse(
                     error=error_msg,
                     is_last=True
                 )
                 return
 
-            # Get chunk size from request or use default
-            chunk_size = request.chunk_size or DEFAULT_CHUNK_SIZE
+            if track_progress:
+                # Size chunks with the configured policy
+                sizer = self.chunk_policy.new_stream(stat.st_size, request.chunk_size)
+            else:
+                # Get chunk size from request or use default
+                sizer = ChunkSizer(request.chunk_size or DEFAULT_CHUNK_SIZE)
 
-            # Get file metadata if requested
-            metadata = None
-            if request.include_metadata:
-                metadata = self._get_file_metadata(request.file_path)
+            # Whole-file digests can be reused until the file changes
+            whole_file = start == 0 and end == stat.st_size
+            digest = None
+            if request.checksums:
+                known = self.digest_cache.get_many(stat, request.checksums) if whole_file else {}
+                digest = StreamingDigest(request.checksums, known)
 
-            # Open and stream the file
-            with open(request.file_path, 'rb') as file:
-                # Send first chunk with metadata
-                first_chunk = file.read(chunk_size)
-                yield pb2.FileChunkResponse(
-                    content=first_chunk,
-                    offset=0,
-                    is_last=False,
-                    metadata=metadata
-                )
+            first_chunk = True
+            compressor = self._select_compressor(request, source, start, end)
+            for response in self._stream_file(
+                    source, sizer, start, end, track_progress=track_progress,
+                    compressor=compressor, digest=digest, peer=self._peer(context)):
+                if first_chunk:
+                    # Send metadata and resume token with the first chunk
+                    if metadata:
+                        response.metadata.CopyFrom(metadata)
+                    response.resume_token = self._make_resume_token(stat)
+                    first_chunk = False
+                if response.is_last and digest and whole_file:
+                    self._cache_digests(file, stat, digest, response)
+                yield response
+
+    @contextlib.contextmanager
+    def _open_source(self, file_path: str) -> Iterator[tuple[Optional[BinaryIO], os.stat_result, ChunkSource]]:
+        """
+        Open a file for streaming.
+
+        Files small enough for the content cache are served from memory while
+        they match the current stat; others are read from disk, sharing reads
+        with concurrent streams of the same file version.
+
+        Args:
+            file_path: Path of the file to stream
+
+        Yields:
+            Tuple of (open file, or None when served from memory; stat of the
+            streamed version; chunk source)
+        """
+        stat = os.stat(file_path)
+        data = self.content_cache.get_or_load(stat, lambda: load_file(file_path, stat))
+        if data is not None:
+            yield None, stat, BytesChunkSource(data)
+            return
+
+        with open(file_path, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            source = self.read_coalescer.open(
+                file, stat, open_chunk_source(file, stat.st_size, self.mmap_threshold))
+            with source:
+                yield file, stat, source
+
+    @staticmethod
+    def _peer(context: Optional[grpc.ServicerContext]) -> str:
+        """Bandwidth limiter key for the client behind context."""
+        return peer_key(context.peer() if context else None)
 
-                # Stream remaining chunks
-                for chunk in self._stream_file(file, chunk_size):
-                    yield chunk
+    @staticmethod
+    def _on_cancel(context: Optional[grpc.ServicerContext], callback) -> None:
+        """Run callback when the RPC ends, so blocking work notices a client that went away."""
+        if hasattr(context, 'add_callback'):
+            context.add_callback(callback)
+        elif hasattr(context, 'add_done_callback'):
+            context.add_done_callback(lambda _: callback())
+
+    def _cache_digests(
+            self,
+            file: Optional[BinaryIO],
+            stat: os.stat_result,
+            digest: StreamingDigest,
+            response: pb2.FileChunkResponse
+    ) -> None:
+        """Remember freshly computed whole-file digests if the file didn't change meanwhile."""
+        if file is not None:
+            # Content served from memory is a snapshot of exactly this version
+            current = os.fstat(file.fileno())
+            if (current.st_mtime_ns, current.st_size) != (stat.st_mtime_ns, stat.st_size):
+                return
+        for algorithm in digest.computing:
+            self.digest_cache.put(stat, algorithm, response.checksums[algorithm])
+
+    @instrumented('server_stream')
+    def GetFileContents(
+            self,
+            request: pb2.FileRequest,
+            context: grpc.ServicerContext
+    ) -> Iterator[pb2.FileChunkResponse]:
+        """
+        Stream file contents to the client.
+
+        Args:
+            request: FileRequest containing file path and options
+            context: gRPC servicer context
+
+        Yields:
+            FileChunkResponse containing file chunks and metadata
+        """
+        try:
+            yield from self._stream_request(request, context, track_progress=False)
 
         except Exception as e:
             error_msg = f"Error streaming file contents: {str(e)}"
@@ -169,6 +564,7 @@ class FileServiceServicer(pb2_grpc.FileServiceServicer):
                 is_last=True
             )
 
+    @instrumented('server_stream')
     def TransferFile(
             self,
             request: pb2.FileRequest,
@@ -177,6 +573,9 @@ class FileServiceServicer(pb2_grpc.FileServiceServicer):
         """
         Transfer large files with optimized streaming and progress tracking.
 
+        Supports byte ranges via offset/length. Passing the resume token from
+        an earlier stream makes the transfer fail if the file has changed.
+
         Args:
             request: FileRequest containing file path and options
             context: gRPC servicer context
@@ -185,69 +584,353 @@ class FileServiceServicer(pb2_grpc.FileServiceServicer):
             FileChunkResponse containing file chunks, progress, and metadata
         """
         try:
-            # Validate file path
-            is_valid, error_msg = self._validate_path(request.file_path)
-            if not is_valid:
-                yield pb2.FileChunkResponse(
-                    error=error_msg,
-                    is_last=True,
-                    metadata=None
-                )
-                return
+            yield from self._stream_request(request, context, track_progress=True)
+
+        except Exception as e:
+            error_msg = f"Error transferring file: {str(e)}"
+            logger.error(error_msg)
+            yield pb2.FileChunkResponse(
+                error=error_msg,
+                is_last=True,
+                metadata=None
+            )
 
-            # Get file size for progress tracking
-            file_size = os.path.getsize(request.file_path)
+    @instrumented('client_stream')
+    def UploadFile(
+            self,
+            request_iterator: Iterator[pb2.UploadChunk],
+            context: grpc.ServicerContext
+    ) -> pb2.UploadResponse:
+        """
+        Receive a file from the client.
 
-            # Optimize chunk size based on file size
-            chunk_size = self._optimize_chunk_size(file_size, request.chunk_size)
+        Data goes to a temporary file in the destination directory,
+        preallocated to the announced size, with writes coalesced to the
+        same chunk size used for downloads and fsyncs batched every
+        fsync_interval bytes. The file is renamed into place only after the
+        final chunk arrives, with the mode of the file it replaces, or the
+        umask-based mode of a newly created file. Uploads are refused
+        unless the destination is inside one of upload_roots.
 
-            # Get metadata if requested
-            metadata = None
-            if request.include_metadata:
-                metadata = self._get_file_metadata(request.file_path)
+        Args:
+            request_iterator: UploadChunks; the first carries path and options
+            context: gRPC servicer context
 
-            first_chunk = True
-            with open(request.file_path, 'rb') as file:
-                total_sent = 0
+        Returns:
+            UploadResponse with the outcome and metadata of the stored file
+        """
+        temp_path = None
+        try:
+            first = next(request_iterator, None)
+            if first is None:
+                return pb2.UploadResponse(error="Empty upload")
+
+            target = os.path.abspath(first.file_path)
+            directory = os.path.dirname(target)
+            error_msg = self._check_upload_directory(directory)
+            if error_msg:
+                return pb2.UploadResponse(error=error_msg)
+            if os.path.isdir(target):
+                return pb2.UploadResponse(error="Path is a directory")
+            if os.path.exists(target) and not first.overwrite:
+                return pb2.UploadResponse(error="File already exists")
+            try:
+                mode = os.stat(target).st_mode & 0o7777
+            except FileNotFoundError:
+                mode = self._new_file_mode
+
+            fd, temp_path = tempfile.mkstemp(
+                dir=directory, prefix=f".{os.path.basename(target)}.", suffix=".upload")
+            with os.fdopen(fd, 'wb', buffering=0) as out:
+                # mkstemp creates the file 0600, which os.replace would keep
+                os.fchmod(fd, mode)
+                preallocate(fd, first.total_size)
+                write_size = self._optimize_chunk_size(first.total_size)
+                peer = self._peer(context)
+                buffer = bytearray()
+                written = 0
+                synced = 0
+                complete = False
+
+                for chunk in itertools.chain([first], request_iterator):
+                    if chunk.offset != written + len(buffer):
+                        return pb2.UploadResponse(
+                            error=f"Unexpected offset {chunk.offset}, expected {written + len(buffer)}")
+
+                    self.bandwidth.throttle(peer, len(chunk.content))
+                    buffer += chunk.content
+                    if len(buffer) >= write_size or chunk.is_last:
+                        out.write(buffer)
+                        written += len(buffer)
+                        buffer.clear()
+
+                    if first.fsync_interval and written - synced >= first.fsync_interval:
+                        os.fsync(fd)
+                        synced = written
 
-                while True:
-                    chunk = file.read(chunk_size)
-                    if not chunk:
+                    if chunk.is_last:
+                        complete = True
                         break
 
-                    total_sent += len(chunk)
-                    progress = (total_sent / file_size) * 100 if file_size > 0 else 100
+                if not complete:
+                    return pb2.UploadResponse(error="Upload ended before the final chunk")
+                if first.total_size and written != first.total_size:
+                    return pb2.UploadResponse(
+                        error=f"Received {written} bytes, expected {first.total_size}")
+
+                os.fsync(fd)
+
+            if os.path.isfile(target):
+                self.content_cache.invalidate(os.stat(target))
+            os.replace(temp_path, target)
+            temp_path = None
+            fsync_directory(directory)
+
+            # Don't wait for the watcher to notice the new file
+            self.metadata_cache.invalidate(target)
+            self.metadata_cache.invalidate(os.path.realpath(target))
+
+            return pb2.UploadResponse(
+                success=True,
+                bytes_written=written,
+                metadata=self._get_file_metadata(target)
+            )
+
+        except Exception as e:
+            error_msg = f"Error uploading file: {str(e)}"
+            logger.error(error_msg)
+            return pb2.UploadResponse(error=error_msg)
+
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _check_upload_directory(self, directory: str) -> Optional[str]:
+        """
+        Check that uploads may be written into a directory.
+
+        Returns:
+            Error message, or None if the directory is inside an upload root
+        """
+        if not self.upload_roots:
+            return "Uploads are disabled on this server"
+        # Resolve symlinks so a link can't lead out of the roots
+        real = os.path.realpath(directory)
+        if not any(os.path.commonpath([root, real]) == root for root in self.upload_roots):
+            return "Path is outside the upload directories"
+        if not os.path.isdir(real):
+            return "Directory does not exist"
+        return None
+
+    @instrumented('server_stream')
+    def ListDirectory(
+            self,
+            request: pb2.ListDirectoryRequest,
+            context: grpc.ServicerContext
+    ) -> Iterator[pb2.ListDirectoryResponse]:
+        """
+        Stream the entries of a directory tree in batches.
+
+        Args:
+            request: ListDirectoryRequest with depth, pattern and paging options
+            context: gRPC servicer context
+
+        Yields:
+            ListDirectoryResponse batches; the last one carries the next page token
+        """
+        try:
+            root = request.directory_path
+            if not os.path.exists(root):
+                yield pb2.ListDirectoryResponse(error="Directory does not exist", is_last=True)
+                return
+            if not os.path.isdir(root):
+                yield pb2.ListDirectoryResponse(error="Path is not a directory", is_last=True)
+                return
+
+            after = decode_cursor(request.page_token)
+            batch_size = request.batch_size or DEFAULT_LIST_BATCH_SIZE
+            patterns = list(request.patterns)
+
+            response = pb2.ListDirectoryResponse()
+            count = 0
+            last_parts = after
+            for parts, entry in iter_directory(root, request.max_depth, after):
+                relative_path = '/'.join(parts)
+                if not matches(entry.name, relative_path, patterns):
+                    continue
+
+                if request.page_size and count >= request.page_size:
+                    response.next_page_token = encode_cursor(last_parts)
+                    break
+
+                try:
+                    # DirEntry caches this stat (and needs no syscall for the type)
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue  # Removed while listing
+
+                response.entries.add(
+                    path=relative_path,
+                    is_directory=entry.is_dir(follow_symlinks=False),
+                    is_symlink=entry.is_symlink(),
+                    size=stat.st_size,
+                    modified_time=int(stat.st_mtime),
+                    permissions=oct(stat.st_mode)[-3:]
+                )
+                count += 1
+                last_parts = parts
+
+                if len(response.entries) >= batch_size:
+                    yield response
+                    response = pb2.ListDirectoryResponse()
+
+            response.is_last = True
+            yield response
+
+        except Exception as e:
+            error_msg = f"Error listing directory: {str(e)}"
+            logger.error(error_msg)
+            yield pb2.ListDirectoryResponse(
+                error=error_msg,
+                is_last=True
+            )
+
+    @instrumented('bidi')
+    def GetFileDelta(
+            self,
+            request_iterator: Iterator[pb2.DeltaRequest],
+            context: grpc.ServicerContext
+    ) -> Iterator[pb2.DeltaChunkResponse]:
+        """
+        Stream the differences between a file and the client's copy of it.
+
+        The client streams block signatures of its copy; the server answers
+        with literal data for changed regions and references to client
+        blocks for everything else.
 
-                    response = pb2.FileChunkResponse(
-                        content=chunk,
-                        offset=total_sent,
-                        is_last=False,
-                        progress=progress,
-                        metadata=None
+        Args:
+            request_iterator: DeltaRequests carrying the path, block size and signatures
+            context: gRPC servicer context
+
+        Yields:
+            DeltaChunkResponse instructions, ending with transfer statistics
+        """
+        try:
+            file_path = None
+            block_size = 0
+            include_metadata = False
+            signatures = []
+            for request in request_iterator:
+                if file_path is None:
+                    file_path = request.file_path
+                    block_size = request.block_size
+                    include_metadata = request.include_metadata
+                signatures.extend(
+                    BlockSignature(sig.index, sig.weak, sig.strong, sig.length)
+                    for sig in request.signatures
+                )
+
+            if file_path is None:
+                yield pb2.DeltaChunkResponse(error="Empty delta request", is_last=True)
+                return
+
+            if not MIN_BLOCK_SIZE <= block_size <= MAX_BLOCK_SIZE:
+                yield pb2.DeltaChunkResponse(
+                    error=f"Block size must be between {MIN_BLOCK_SIZE} and {MAX_BLOCK_SIZE}",
+                    is_last=True
+                )
+                return
+
+            # Validate file path
+            is_valid, error_msg = self._validate_path(file_path)
+            if not is_valid:
+                yield pb2.DeltaChunkResponse(error=error_msg, is_last=True)
+                return
+
+            metadata = None
+            if include_metadata:
+                metadata = self._get_file_metadata(file_path)
+
+            with self._open_source(file_path) as (_, stat, source):
+                file_size = stat.st_size
+                literal_bytes = 0
+                matched_bytes = 0
+                first_chunk = True
+                peer = self._peer(context)
+                # Hashed as it is read, so the digest matches the delta even
+                # if the file changes afterwards
+                digest = hashlib.sha256()
+
+                ops = generate_delta_from(source.read, file_size, signatures, block_size, digest=digest)
+                for op in ops:
+                    response = pb2.DeltaChunkResponse(
+                        content=op.data,
+                        offset=op.offset,
+                        copy_block=op.copy_block,
+                        copy_count=op.copy_count
                     )
+                    if op.copy_count:
+                        matched_bytes += min(op.copy_count * block_size, file_size - op.offset)
+                    else:
+                        literal_bytes += len(op.data)
+
                     if first_chunk and metadata:
                         response.metadata.CopyFrom(metadata)
-                    yield response
                     first_chunk = False
+                    self.bandwidth.throttle(peer, len(op.data))
+                    yield response
 
-                    yield pb2.FileChunkResponse(
-                        content=chunk,
-                        offset=total_sent,
-                        is_last=False,
-                        progress=progress,
-                        metadata=metadata if first_chunk else None
-                    )
-                    first_chunk = False
+                last = pb2.DeltaChunkResponse(
+                    offset=file_size,
+                    is_last=True,
+                    literal_bytes=literal_bytes,
+                    matched_bytes=matched_bytes,
+                    sha256=digest.hexdigest()
+                )
+                if first_chunk and metadata:
+                    last.metadata.CopyFrom(metadata)
+                yield last
 
         except Exception as e:
-            error_msg = f"Error transferring file: {str(e)}"
+            error_msg = f"Error generating file delta: {str(e)}"
             logger.error(error_msg)
-            yield pb2.FileChunkResponse(
+            yield pb2.DeltaChunkResponse(
+                error=error_msg,
+                is_last=True
+            )
+
+    def _check_exists(self, file_path: str, include_metadata: bool) -> pb2.FileExistsResponse:
+        """
+        Check whether a path exists, with metadata if requested.
+
+        Args:
+            file_path: Path to check
+            include_metadata: Whether to attach metadata for existing paths
+
+        Returns:
+            FileExistsResponse for the path
+        """
+        try:
+            exists = self._cached('exists', file_path, os.path.exists)
+            metadata = None
+            if exists and include_metadata:
+                metadata = self._get_file_metadata(file_path)
+            return pb2.FileExistsResponse(
+                exists=exists,
+                error="",
+                metadata=metadata  # Left unset for non-existent files
+            )
+
+        except Exception as e:
+            error_msg = f"Error checking file existence: {str(e)}"
+            logger.error(error_msg)
+            return pb2.FileExistsResponse(
+                exists=False,
                 error=error_msg,
-                is_last=True,
                 metadata=None
             )
 
+    @instrumented('unary')
     def IsFileExists(
             self,
             request: pb2.FileRequest,
@@ -263,23 +946,430 @@ class FileServiceServicer(pb2_grpc.FileServiceServicer):
         Returns:
             FileExistsResponse with existence status and optional metadata
         """
+        return self._check_exists(request.file_path, request.include_metadata)
+
+    @instrumented('server_stream')
+    def BatchFileExists(
+            self,
+            request: pb2.BatchFileRequest,
+            context: grpc.ServicerContext
+    ) -> Iterator[pb2.BatchFileExistsResponse]:
+        """
+        Check many paths in parallel and stream results as they complete.
+
+        Args:
+            request: BatchFileRequest containing the paths and options
+            context: gRPC servicer context
+
+        Yields:
+            BatchFileExistsResponse messages, each holding up to batch_size results
+        """
+        batch_size = request.batch_size or DEFAULT_BATCH_SIZE
+        pending = {
+            self.stat_executor.submit(self._check_exists, file_path, request.include_metadata):
+                (index, file_path)
+            for index, file_path in enumerate(request.file_paths)
+        }
+
         try:
-            file_path = request.file_path
-            exists = os.path.exists(file_path)
-            return pb2.FileExistsResponse(
-                exists=exists,
-                error="",
-                metadata=None  # Always return None for non-existent files
+            batch = pb2.BatchFileExistsResponse()
+            for future in futures.as_completed(pending):
+                index, file_path = pending[future]
+                result = batch.results.add()
+                result.CopyFrom(future.result())
+                result.file_path = file_path
+                result.index = index
+
+                if len(batch.results) >= batch_size:
+                    yield batch
+                    batch = pb2.BatchFileExistsResponse()
+
+            if batch.results:
+                yield batch
+        finally:
+            # Don't keep stat-ing paths for a client that went away
+            for future in pending:
+                future.cancel()
+
+    @instrumented('server_stream')
+    def TransferBundle(
+            self,
+            request: pb2.BundleRequest,
+            context: grpc.ServicerContext
+    ) -> Iterator[pb2.BundleChunk]:
+        """
+        Stream many files as one tar archive.
+
+        Args:
+            request: BundleRequest with the paths or directory and patterns
+            context: gRPC servicer context
+
+        Yields:
+            BundleChunk messages carrying the archive and per-file errors;
+            the last one carries the file count and total bytes
+        """
+        try:
+            directory = request.directory_path
+            if directory and not os.path.exists(directory):
+                yield pb2.BundleChunk(error="Directory does not exist", is_last=True)
+                return
+            if directory and not os.path.isdir(directory):
+                yield pb2.BundleChunk(error="Path is not a directory", is_last=True)
+                return
+            if not directory and not request.file_paths:
+                yield pb2.BundleChunk(error="No files requested", is_last=True)
+                return
+
+            compressor = None
+            if request.compression:
+                try:
+                    compressor = StreamCompressor(request.compression, request.compression_level)
+                except ValueError as e:
+                    yield pb2.BundleChunk(error=str(e), is_last=True)
+                    return
+
+            entries = bundle_entries(
+                list(request.file_paths), directory, list(request.patterns), request.max_depth)
+            bundle = BundleStream(
+                entries,
+                self.stat_executor,
+                compressor,
+                chunk_size=min(request.chunk_size or DEFAULT_CHUNK_SIZE, MAX_CHUNK)
+            )
+            peer = self._peer(context)
+            for content, errors in bundle:
+                chunk = pb2.BundleChunk(content=content)
+                for error in errors:
+                    chunk.file_errors.add(path=error.name, error=error.error)
+                self.bandwidth.throttle(peer, len(content))
+                yield chunk
+
+            yield pb2.BundleChunk(
+                is_last=True,
+                file_count=bundle.file_count,
+                total_bytes=bundle.total_bytes
             )
 
         except Exception as e:
-            error_msg = f"Error checking file existence: {str(e)}"
+            error_msg = f"Error creating bundle: {str(e)}"
             logger.error(error_msg)
-            return pb2.FileExistsResponse(
-                exists=False,
-                error=error_msg,
-                metadata=None
+            yield pb2.BundleChunk(error=error_msg, is_last=True)
+
+    @instrumented('server_stream')
+    def SearchFiles(
+            self,
+            request: pb2.SearchRequest,
+            context: grpc.ServicerContext
+    ) -> Iterator[pb2.SearchResponse]:
+        """
+        Search a directory tree by file name and contents.
+
+        Args:
+            request: SearchRequest with the directory, globs, query and limits
+            context: gRPC servicer context
+
+        Yields:
+            SearchResponse batches as matches are found; the last one carries
+            scan totals and whether the result limit cut the search short
+        """
+        try:
+            root = request.directory_path
+            if not os.path.exists(root):
+                yield pb2.SearchResponse(error="Directory does not exist", is_last=True)
+                return
+            if not os.path.isdir(root):
+                yield pb2.SearchResponse(error="Path is not a directory", is_last=True)
+                return
+
+            matcher = None
+            if request.query:
+                try:
+                    matcher = ContentMatcher(request.query, request.regex, request.ignore_case)
+                except ValueError as e:
+                    yield pb2.SearchResponse(error=str(e), is_last=True)
+                    return
+
+            search = DirectorySearch(
+                root,
+                self.stat_executor,
+                matcher,
+                patterns=list(request.patterns),
+                max_depth=request.max_depth,
+                max_results=request.max_results,
+                max_matches_per_file=request.max_matches_per_file,
+                max_file_size=request.max_file_size
+            )
+            batch_size = request.batch_size or DEFAULT_SEARCH_BATCH_SIZE
+            response = pb2.SearchResponse()
+            for hits in search:
+                for hit in hits:
+                    response.matches.add(
+                        path=hit.path,
+                        offset=hit.offset,
+                        length=hit.length,
+                        line_number=hit.line_number,
+                        line=hit.line
+                    )
+                    if len(response.matches) >= batch_size:
+                        yield response
+                        response = pb2.SearchResponse()
+                # Send what a finished file produced rather than wait for a full batch
+                if response.matches:
+                    yield response
+                    response = pb2.SearchResponse()
+
+            yield pb2.SearchResponse(
+                is_last=True,
+                files_scanned=search.files_scanned,
+                bytes_scanned=search.bytes_scanned,
+                truncated=search.truncated
+            )
+
+        except Exception as e:
+            error_msg = f"Error searching directory: {str(e)}"
+            logger.error(error_msg)
+            yield pb2.SearchResponse(error=error_msg, is_last=True)
+
+    @instrumented('server_stream')
+    def TailFile(
+            self,
+            request: pb2.TailRequest,
+            context: grpc.ServicerContext
+    ) -> Iterator[pb2.TailChunk]:
+        """
+        Follow a file, streaming data as it is appended.
+
+        The stream holds a worker thread until the client cancels it or
+        idle_timeout passes without new data, so at most max_tails follows
+        run at once and further ones are refused.
+
+        Args:
+            request: TailRequest with the path, start offset and batching options
+            context: gRPC servicer context
+
+        Yields:
+            TailChunk messages with appended data and truncation/rotation notices
+        """
+        slot = False
+        try:
+            is_valid, error = self._check_path(request.file_path)
+            if not is_valid:
+                yield pb2.TailChunk(error=error, is_last=True)
+                return
+            if self._tail_slots:
+                slot = self._tail_slots.acquire(blocking=False)
+                if not slot:
+                    yield pb2.TailChunk(
+                        error=f"Too many files are being followed (limit {self.max_tails})", is_last=True)
+                    return
+
+            batch_delay = request.batch_delay_ms / 1000 if request.batch_delay_ms else DEFAULT_BATCH_DELAY
+            tail = FileTail(
+                request.file_path,
+                request.offset,
+                self.tail_watcher,
+                chunk_size=min(request.chunk_size or DEFAULT_CHUNK_SIZE, MAX_CHUNK),
+                batch_delay=batch_delay,
+                idle_timeout=request.idle_timeout
             )
+            # Wake the tail when the client goes away
+            self._on_cancel(context, tail.stop)
+
+            peer = self._peer(context)
+            for event in tail:
+                self.bandwidth.throttle(peer, len(event.content))
+                yield pb2.TailChunk(
+                    content=event.content,
+                    offset=event.offset,
+                    truncated=event.truncated,
+                    rotated=event.rotated
+                )
+
+            yield pb2.TailChunk(offset=tail.position, is_last=True)
+
+        except Exception as e:
+            error_msg = f"Error following file: {str(e)}"
+            logger.error(error_msg)
+            yield pb2.TailChunk(error=error_msg, is_last=True)
+        finally:
+            if slot:
+                self._tail_slots.release()
+
+    @instrumented('server_stream')
+    def OpenSendfile(
+            self,
+            request: pb2.SendfileRequest,
+            context: grpc.ServicerContext
+    ) -> Iterator[pb2.SendfileResponse]:
+        """
+        Send a file or byte range over a raw TCP side channel.
+
+        The first message carries a one-time token and the side-channel
+        port. The client connects to that port on the server's host, writes
+        the token and reads `length` bytes, which are pushed with sendfile()
+        straight from the page cache instead of being copied into protobuf
+        messages. The last message reports the bytes sent and the requested
+        checksums. The call holds a worker thread for the whole transfer.
+
+        Args:
+            request: SendfileRequest with the path, optional range and checksums
+            context: gRPC servicer context
+
+        Yields:
+            The ticket message, then the final message with the outcome
+        """
+        try:
+            is_valid, error_msg = self._validate_path(request.file_path)
+            if not is_valid:
+                yield pb2.SendfileResponse(error=error_msg, is_last=True)
+                return
+
+            port = self.sendfile.start()
+            with open(request.file_path, 'rb') as file:
+                stat = os.fstat(file.fileno())
+                start, end, error_msg = self._resolve_range(request, stat)
+                if error_msg:
+                    yield pb2.SendfileResponse(error=error_msg, is_last=True)
+                    return
+
+                whole_file = start == 0 and end == stat.st_size
+                digest = None
+                if request.checksums:
+                    known = self.digest_cache.get_many(stat, request.checksums) if whole_file else {}
+                    digest = StreamingDigest(request.checksums, known)
+
+                ticket = self.sendfile.registry.issue()
+                self._on_cancel(context, ticket.cancel)
+                first = pb2.SendfileResponse(
+                    token=ticket.token,
+                    port=port,
+                    offset=start,
+                    length=end - start,
+                    resume_token=self._make_resume_token(stat)
+                )
+                if request.include_metadata:
+                    metadata = self._get_file_metadata(request.file_path)
+                    if metadata:
+                        first.metadata.CopyFrom(metadata)
+                yield first
+
+                connection = ticket.wait()
+                if connection is None:
+                    yield pb2.SendfileResponse(error="Side channel was not opened in time", is_last=True)
+                    return
+                peer = self._peer(context)
+                try:
+                    sent = send_range(connection, file.fileno(), start, end,
+                                      lambda size: self.bandwidth.throttle(peer, size))
+                finally:
+                    connection.close()
+                self.metrics.bytes_sent.inc(('OpenSendfile',), sent)
+
+                current = os.fstat(file.fileno())
+                if sent < end - start or (current.st_mtime_ns, current.st_size) != (stat.st_mtime_ns, stat.st_size):
+                    yield pb2.SendfileResponse(
+                        error="File changed during transfer", bytes_sent=sent, is_last=True)
+                    return
+
+                last = pb2.SendfileResponse(bytes_sent=sent, is_last=True)
+                if digest:
+                    # Hashing re-reads the range, now warm in the page cache
+                    if digest.computing:
+                        self._digest_range(file.fileno(), start, end, digest)
+                    last.checksums.update(digest.hexdigests())
+                    if whole_file:
+                        self._cache_digests(file, stat, digest, last)
+                yield last
+
+        except Exception as e:
+            error_msg = f"Error sending file: {str(e)}"
+            logger.error(error_msg)
+            yield pb2.SendfileResponse(error=error_msg, is_last=True)
+
+    @instrumented('server_stream')
+    def OpenLocalFile(
+            self,
+            request: pb2.LocalFileRequest,
+            context: grpc.ServicerContext
+    ) -> Iterator[pb2.LocalFileResponse]:
+        """
+        Hand a same-host client an open read-only descriptor of a file.
+
+        Only served to calls made over the server's Unix domain socket. The
+        first message carries a one-time token and the descriptor socket;
+        the client connects to it, writes the token and receives the
+        descriptor with SCM_RIGHTS, then reads the file directly. The last
+        message confirms the handover.
+
+        Args:
+            request: LocalFileRequest with the path
+            context: gRPC servicer context
+
+        Yields:
+            The ticket message, then the final message with the outcome
+        """
+        try:
+            if self.local_fds is None:
+                yield pb2.LocalFileResponse(
+                    error="Local file descriptors are not enabled on this server", is_last=True)
+                return
+            if context is not None and not is_local_peer(context.peer()):
+                yield pb2.LocalFileResponse(
+                    error="OpenLocalFile is only available over the Unix domain socket", is_last=True)
+                return
+
+            is_valid, error_msg = self._validate_path(request.file_path)
+            if not is_valid:
+                yield pb2.LocalFileResponse(error=error_msg, is_last=True)
+                return
+
+            self.local_fds.start()
+            fd = os.open(request.file_path, os.O_RDONLY)
+            try:
+                stat = os.fstat(fd)
+                ticket = self.local_fds.registry.issue()
+                self._on_cancel(context, ticket.cancel)
+                first = pb2.LocalFileResponse(
+                    token=ticket.token,
+                    fd_socket=self.local_fds.path,
+                    size=stat.st_size,
+                    resume_token=self._make_resume_token(stat)
+                )
+                if request.include_metadata:
+                    metadata = self._get_file_metadata(request.file_path)
+                    if metadata:
+                        first.metadata.CopyFrom(metadata)
+                yield first
+
+                connection = ticket.wait()
+                if connection is None:
+                    yield pb2.LocalFileResponse(
+                        error="Descriptor socket was not opened in time", is_last=True)
+                    return
+                try:
+                    send_fd(connection, fd)
+                finally:
+                    connection.close()
+            finally:
+                os.close(fd)
+
+            yield pb2.LocalFileResponse(is_last=True)
+
+        except Exception as e:
+            error_msg = f"Error opening local file: {str(e)}"
+            logger.error(error_msg)
+            yield pb2.LocalFileResponse(error=error_msg, is_last=True)
+
+    @staticmethod
+    def _digest_range(fd: int, start: int, end: int, digest: StreamingDigest) -> None:
+        """Feed a byte range of a file to a digest."""
+        offset = start
+        while offset < end:
+            data = os.pread(fd, min(DEFAULT_CHUNK_SIZE, end - offset), offset)
+            if not data:
+                break
+            digest.update(data)
+            offset += len(data)
 
     def _optimize_chunk_size(self, file_size: int, requested_size: int = None) -> int:
         """
@@ -292,28 +1382,4 @@ class FileServiceServicer(pb2_grpc.FileServiceServicer):
         Returns:
             Optimized chunk size in bytes
         """
-        # Define size thresholds
-        SMALL_FILE = 10 * 1024 * 1024  # 10MB
-        MEDIUM_FILE = 100 * 1024 * 1024  # 100MB
-        LARGE_FILE = 1024 * 1024 * 1024  # 1GB
-
-        # Define chunk sizes
-        DEFAULT_CHUNK = 1 * 1024 * 1024  # 1MB
-        SMALL_CHUNK = 512 * 1024  # 512KB
-        MEDIUM_CHUNK = 2 * 1024 * 1024  # 2MB
-        LARGE_CHUNK = 4 * 1024 * 1024  # 4MB
-        MAX_CHUNK = 8 * 1024 * 1024  # 8MB
-
-        if requested_size:
-            # Honor requested size but cap it at MAX_CHUNK
-            return min(requested_size, MAX_CHUNK)
-
-        # Choose chunk size based on file size
-        if file_size < SMALL_FILE:
-            return SMALL_CHUNK
-        elif file_size < MEDIUM_FILE:
-            return MEDIUM_CHUNK
-        elif file_size < LARGE_FILE:
-            return LARGE_CHUNK
-        else:
-            return MAX_CHUNK
+        return optimize_chunk_size(file_size, requested_size)
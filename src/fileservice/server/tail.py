@@ -0,0 +1,190 @@
+"""Following a growing file, tail -F style."""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional
+
+from .fs_watcher import FileSystemWatcher
+
+logger = logging.getLogger(__name__)
+
+# Largest message sent for appended data (1MB)
+DEFAULT_TAIL_CHUNK_SIZE = 1024 * 1024
+
+# How long to wait for more appends before sending a partial message
+DEFAULT_BATCH_DELAY = 0.05
+
+# Re-check interval when the directory can't be watched
+DEFAULT_POLL_INTERVAL = 0.25
+
+# Re-check interval with a watch, in case an event is missed
+WATCHED_RECHECK_INTERVAL = 2.0
+
+
+@dataclass
+class TailEvent:
+    """Appended data, or a marker that the followed file was truncated or replaced."""
+
+    content: bytes
+    offset: int
+    truncated: bool = False
+    rotated: bool = False
+
+
+class FileTail:
+    """
+    Follows a file by name, yielding data as it is appended.
+
+    Waits on watchdog events for the file's directory, falling back to
+    polling when it can't be watched. Reads that come back short wait up
+    to batch_delay for further appends so a chatty writer produces a few
+    large messages rather than many tiny ones. A file that shrinks below
+    the read position is treated as truncated (copytruncate rotation) and
+    read again from the start; when the path is replaced by a new file
+    (rename-and-create rotation) the old file is read to its end and the
+    new one is followed from offset 0.
+
+    Iteration blocks its thread while waiting; call stop() from another
+    thread to end it.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            offset: int = 0,
+            watcher: Optional[FileSystemWatcher] = None,
+            chunk_size: int = DEFAULT_TAIL_CHUNK_SIZE,
+            batch_delay: float = DEFAULT_BATCH_DELAY,
+            idle_timeout: float = 0,
+            poll_interval: float = DEFAULT_POLL_INTERVAL,
+            clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            path: File to follow
+            offset: Where to start; negative values count back from the end
+            watcher: Filesystem watcher for change notifications (None polls)
+            chunk_size: Largest content per event
+            batch_delay: Seconds to wait for more appends before a short event
+            idle_timeout: End after this many seconds without data (0 = never)
+            poll_interval: Re-check interval when the directory isn't watched
+            clock: Monotonic time source
+        """
+        self.path = os.path.abspath(path)
+        self._names = {self.path, os.path.realpath(path)}
+        self.offset = offset
+        self._watcher = watcher
+        self.chunk_size = max(1, chunk_size)
+        self.batch_delay = batch_delay
+        self.idle_timeout = idle_timeout
+        self.poll_interval = poll_interval
+        self._clock = clock
+        self._wake = threading.Event()
+        self._stopped = False
+        self.watching = False
+        self.position = 0
+        self.truncations = 0
+        self.rotations = 0
+
+    def stop(self) -> None:
+        """End iteration; safe to call from any thread."""
+        self._stopped = True
+        self._wake.set()
+
+    def _on_change(self, path: str, is_directory: bool) -> None:
+        """Watcher callback."""
+        if path in self._names:
+            self._wake.set()
+
+    def _replacement(self, identity: tuple[int, int]):
+        """Open the file now at our path if it isn't the one being followed."""
+        try:
+            st = os.stat(self.path)
+            if (st.st_dev, st.st_ino) == identity:
+                return None
+            return open(self.path, 'rb')
+        except FileNotFoundError:
+            return None  # Renamed away and not recreated yet
+
+    def _read_batch(self, fd: int) -> bytes:
+        """Read from the position, waiting up to batch_delay to fill a chunk."""
+        data = os.pread(fd, self.chunk_size, self.position)
+        if not data:
+            return data
+        deadline = self._clock() + self.batch_delay
+        while len(data) < self.chunk_size and not self._stopped:
+            remaining = deadline - self._clock()
+            if remaining <= 0:
+                break
+            self._wake.wait(remaining)
+            self._wake.clear()
+            data += os.pread(fd, self.chunk_size - len(data), self.position + len(data))
+        return data
+
+    def __iter__(self) -> Iterator[TailEvent]:
+        """
+        Yields:
+            TailEvents until stopped or idle for idle_timeout
+
+        Raises:
+            OSError: If the file can't be opened
+        """
+        file = open(self.path, 'rb')
+        directory = os.path.dirname(self.path)
+        try:
+            st = os.fstat(file.fileno())
+            identity = (st.st_dev, st.st_ino)
+            if self.offset < 0:
+                self.position = max(0, st.st_size + self.offset)
+            elif self.offset > st.st_size:
+                # The file was truncated since the client last read it
+                self.truncations += 1
+                yield TailEvent(b'', 0, truncated=True)
+            else:
+                self.position = self.offset
+
+            self.watching = self._watcher is not None and self._watcher.watch(directory, self._on_change)
+            recheck = WATCHED_RECHECK_INTERVAL if self.watching else self.poll_interval
+            idle_since = self._clock()
+
+            while not self._stopped:
+                self._wake.clear()
+                data = self._read_batch(file.fileno())
+                if data:
+                    yield TailEvent(data, self.position)
+                    self.position += len(data)
+                    idle_since = self._clock()
+                    continue
+
+                if os.fstat(file.fileno()).st_size < self.position:
+                    logger.debug(f"{self.path} truncated at {self.position}")
+                    self.truncations += 1
+                    self.position = 0
+                    yield TailEvent(b'', 0, truncated=True)
+                    continue
+
+                replacement = self._replacement(identity)
+                if replacement is not None:
+                    logger.debug(f"{self.path} replaced, following the new file")
+                    file.close()
+                    file = replacement
+                    st = os.fstat(file.fileno())
+                    identity = (st.st_dev, st.st_ino)
+                    self.rotations += 1
+                    self.position = 0
+                    yield TailEvent(b'', 0, rotated=True)
+                    continue
+
+                wait = recheck
+                if self.idle_timeout:
+                    idle_left = idle_since + self.idle_timeout - self._clock()
+                    if idle_left <= 0:
+                        return
+                    wait = min(wait, idle_left)
+                self._wake.wait(wait)
+        finally:
+            file.close()
+            if self.watching:
+                self._watcher.unwatch(directory, self._on_change)
@@ -0,0 +1,247 @@
+"""One-time tokens handing side-channel connections to the RPC that issued them."""
+import abc
+import logging
+import secrets
+import socket
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Token length on the wire: hex of 16 random bytes
+TOKEN_LENGTH = 32
+
+# Seconds a client has to connect after receiving its token
+DEFAULT_TICKET_TTL = 30.0
+
+# Seconds a new connection has to present its token
+HANDSHAKE_TIMEOUT = 10.0
+
+
+def recv_exactly(sock: socket.socket, size: int) -> bytes:
+    """Read exactly size bytes, or fewer if the peer closes the connection."""
+    data = bytearray()
+    while len(data) < size:
+        received = sock.recv(size - len(data))
+        if not received:
+            break
+        data += received
+    return bytes(data)
+
+
+class Ticket:
+    """
+    A pending side-channel connection.
+
+    The RPC that issued the ticket waits for a connection presenting its
+    token; the listener delivers it. Either side can lose the race with
+    cancel(): a connection delivered to a cancelled ticket is refused, and
+    cancelling after delivery shuts the connection down, which also
+    unblocks a transfer in progress on it.
+    """
+
+    def __init__(self, token: str, expires_at: float, on_close: Callable[['Ticket'], None]):
+        self.token = token
+        self.expires_at = expires_at
+        self._on_close = on_close
+        self._lock = threading.Lock()
+        self._arrived = threading.Event()
+        self._connection: Optional[socket.socket] = None
+        self.cancelled = False
+
+    def deliver(self, connection: socket.socket) -> bool:
+        """Hand over a connection; False if the ticket was cancelled meanwhile."""
+        with self._lock:
+            if self.cancelled or self._connection is not None:
+                return False
+            self._connection = connection
+        self._arrived.set()
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[socket.socket]:
+        """
+        Wait for the client to connect.
+
+        Returns:
+            The connection, or None if the ticket expired or was cancelled
+        """
+        if timeout is None:
+            timeout = max(0.0, self.expires_at - time.monotonic())
+        self._arrived.wait(timeout)
+        with self._lock:
+            if self.cancelled:
+                return None
+            if self._connection is None:
+                self.cancelled = True
+        self._on_close(self)
+        return self._connection
+
+    def cancel(self) -> None:
+        """Withdraw the ticket; safe to call from any thread, any number of times."""
+        with self._lock:
+            self.cancelled = True
+            connection = self._connection
+        self._arrived.set()
+        self._on_close(self)
+        if connection is not None:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class TicketRegistry:
+    """Issues tickets and matches presented tokens against them."""
+
+    def __init__(self, ttl: float = DEFAULT_TICKET_TTL, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            ttl: Seconds a ticket stays valid without a connection
+            clock: Monotonic time source
+        """
+        self.ttl = ttl
+        self._clock = clock
+        self._tickets: dict[str, Ticket] = {}
+        self._lock = threading.Lock()
+        self.issued = 0
+        self.claimed = 0
+        self.rejected = 0
+
+    def issue(self) -> Ticket:
+        """Create a ticket with a fresh random token."""
+        ticket = Ticket(secrets.token_hex(TOKEN_LENGTH // 2), self._clock() + self.ttl, self._remove)
+        with self._lock:
+            self._tickets[ticket.token] = ticket
+            self.issued += 1
+        return ticket
+
+    def claim(self, token: str, connection: socket.socket) -> bool:
+        """
+        Deliver a connection to the ticket with this token, consuming it.
+
+        Returns:
+            Whether a live ticket took the connection; the caller closes it otherwise
+        """
+        with self._lock:
+            ticket = self._tickets.pop(token, None)
+        if ticket is None or self._clock() > ticket.expires_at or not ticket.deliver(connection):
+            with self._lock:
+                self.rejected += 1
+            return False
+        with self._lock:
+            self.claimed += 1
+        return True
+
+    def _remove(self, ticket: Ticket) -> None:
+        with self._lock:
+            if self._tickets.get(ticket.token) is ticket:
+                del self._tickets[ticket.token]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._tickets)
+
+    def stats(self) -> dict:
+        """Ticket counters."""
+        with self._lock:
+            return {
+                'pending': len(self._tickets),
+                'issued': self.issued,
+                'claimed': self.claimed,
+                'rejected': self.rejected,
+            }
+
+
+class SideChannelListener(abc.ABC):
+    """
+    Accepts side-channel connections and hands them to waiting RPCs.
+
+    A client connects and writes the TOKEN_LENGTH-character token it got
+    over gRPC; the connection is then delivered to the ticket's RPC, which
+    uses it and closes it. Connections that present an unknown or expired
+    token are closed. Each handshake runs on a short-lived thread so a slow
+    client can't hold up the accept loop. Subclasses create the listening
+    socket in _bind().
+    """
+
+    name = 'side-channel'
+
+    def __init__(self, registry: Optional[TicketRegistry] = None):
+        """
+        Args:
+            registry: Tickets issued for this listener (None creates one)
+        """
+        self.registry = registry if registry is not None else TicketRegistry()
+        self._sock: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._sock is not None
+
+    @abc.abstractmethod
+    def _bind(self) -> socket.socket:
+        """Create, bind and listen on the socket."""
+
+    def _unbind(self) -> None:
+        """Clean up after the socket is closed."""
+
+    def start(self) -> None:
+        """Start listening if not already."""
+        with self._lock:
+            if self._sock is not None:
+                return
+            self._sock = self._bind()
+            self._thread = threading.Thread(
+                target=self._accept, args=(self._sock,), name=f'fileservice-{self.name}', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop accepting connections; connections already handed over are unaffected."""
+        with self._lock:
+            sock, self._sock = self._sock, None
+            thread, self._thread = self._thread, None
+        if sock is None:
+            return
+        try:
+            # Wakes the blocked accept() on Linux; close() alone doesn't
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+        if thread:
+            thread.join(timeout=5)
+        self._unbind()
+
+    def _accept(self, sock: socket.socket) -> None:
+        while True:
+            try:
+                connection, address = sock.accept()
+            except OSError:
+                return  # Listener closed
+            threading.Thread(
+                target=self._handshake, args=(connection, address),
+                name=f'fileservice-{self.name}-handshake', daemon=True).start()
+
+    def _handshake(self, connection: socket.socket, address) -> None:
+        peer = address[0] if isinstance(address, tuple) else 'local client'
+        try:
+            connection.settimeout(HANDSHAKE_TIMEOUT)
+            token = recv_exactly(connection, TOKEN_LENGTH).decode('ascii', errors='replace')
+            # Hand over a blocking socket; sendfile() fails on one with a timeout
+            connection.settimeout(None)
+            if len(token) == TOKEN_LENGTH and self.registry.claim(token, connection):
+                return
+            logger.warning(f"Rejected {self.name} connection from {peer}: invalid token")
+        except OSError as e:
+            logger.debug(f"{self.name} handshake with {peer} failed: {e}")
+        connection.close()
+
+    def __enter__(self) -> 'SideChannelListener':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
@@ -0,0 +1,86 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+
+import grpc
+
+from fileservice import file_service_pb2 as pb2
+from fileservice import file_service_pb2_grpc as pb2_grpc
+from fileservice.server import AioFileServer
+from fileservice.server.aio_service import AsyncFileServiceServicer
+
+
+class TestAioFileServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        """Start an asyncio server and open a client channel to it."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, "data.bin")
+        self.data = os.urandom(600 * 1024)
+        with open(self.file_path, "wb") as f:
+            f.write(self.data)
+
+        self.server = AioFileServer(io_workers=4, ports=[50171, 50172, 50173])
+        self.assertTrue(await self.server.start())
+        self.channel = grpc.aio.insecure_channel(f"localhost:{self.server.port}")
+        self.stub = pb2_grpc.FileServiceStub(self.channel)
+
+    async def asyncTearDown(self):
+        await self.channel.close()
+        await self.server.stop()
+        os.remove(self.file_path)
+        os.rmdir(self.temp_dir)
+
+    async def test_is_file_exists(self):
+        """Test the unary RPC through the asyncio server."""
+        response = await self.stub.IsFileExists(pb2.FileRequest(file_path=self.file_path))
+        self.assertTrue(response.exists)
+
+    async def test_transfer_file(self):
+        """Test streaming a file through the asyncio server."""
+        request = pb2.FileRequest(file_path=self.file_path, chunk_size=64 * 1024)
+        content = b''
+        async for response in self.stub.TransferFile(request):
+            self.assertFalse(response.error)
+            content += response.content
+        self.assertEqual(content, self.data)
+
+    async def test_concurrent_streams_exceed_io_workers(self):
+        """Test that more streams than I/O threads can run at once."""
+        async def fetch():
+            request = pb2.FileRequest(file_path=self.file_path, chunk_size=32 * 1024)
+            chunks = [r.content async for r in self.stub.GetFileContents(request)]
+            return b''.join(chunks)
+
+        results = await asyncio.gather(*(fetch() for _ in range(20)))
+        self.assertTrue(all(result == self.data for result in results))
+
+    async def test_cancelled_step_closes_stream(self):
+        """Test that a stream cancelled mid-read is closed once the read returns."""
+        release = threading.Event()
+        reading = threading.Event()
+        closed = threading.Event()
+
+        def responses():
+            try:
+                yield 1
+                reading.set()
+                release.wait(5)
+                yield 2
+            finally:
+                closed.set()
+
+        loop = asyncio.get_running_loop()
+        generator = responses()  # Held so only an explicit close() can finish it
+        stream = AsyncFileServiceServicer(self.server.service)._stream(generator)
+        self.assertEqual(await stream.__anext__(), 1)
+        pending = asyncio.ensure_future(stream.__anext__())
+        await loop.run_in_executor(None, reading.wait, 5)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+
+        self.assertFalse(closed.is_set())
+        release.set()
+        self.assertTrue(await loop.run_in_executor(None, closed.wait, 5))
@@ -0,0 +1,140 @@
+import json
+import math
+import os
+import tempfile
+import unittest
+
+from fileservice import file_service_pb2 as pb2
+from fileservice.server.bandwidth import BandwidthLimiter, TokenBucket, fair_share, load_limits, peer_key
+from fileservice.server.main import reload_limits
+from fileservice.server.service import FileServiceServicer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+
+
+class TestBandwidth(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def limiter(self, **kwargs):
+        return BandwidthLimiter(clock=self.clock, sleep=self.clock.sleep, **kwargs)
+
+    def test_peer_key(self):
+        """Test that peers are keyed by host so parallel connections share a limit."""
+        self.assertEqual(peer_key('ipv4:10.0.0.5:51234'), 'ipv4:10.0.0.5')
+        self.assertEqual(peer_key('ipv6:[::1]:40000'), 'ipv6:[::1]')
+        self.assertEqual(peer_key('unix:/tmp/sock'), 'unix:/tmp/sock')
+        self.assertEqual(peer_key(None), 'local')
+
+    def test_fair_share(self):
+        """Test max-min fair levels with satisfied and unsatisfied peers."""
+        self.assertEqual(fair_share(1000, [math.inf, math.inf]), 500)
+        self.assertEqual(fair_share(1000, [100, math.inf, math.inf]), 450)
+        self.assertEqual(fair_share(1000, [100, 200]), 900)
+
+    def test_token_bucket_debt(self):
+        """Test that reservations beyond the burst wait off the debt."""
+        bucket = TokenBucket(1000, burst_seconds=0.25, clock=self.clock)
+        self.assertEqual(bucket.reserve(250), 0.0)
+        self.assertAlmostEqual(bucket.reserve(500), 0.5)
+        self.clock.now = 0.5
+        self.assertEqual(bucket.reserve(0), 0.0)
+
+    def test_disabled_limiter_does_not_wait(self):
+        """Test that the default limiter never throttles."""
+        limiter = self.limiter()
+        self.assertEqual(limiter.throttle('a', 10 ** 9), 0.0)
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_peer_rate(self):
+        """Test that a single peer is held to the per-peer rate."""
+        limiter = self.limiter(peer_rate=1000)
+        self.assertAlmostEqual(limiter.throttle('a', 1250), 1.0)
+        self.assertEqual(self.clock.sleeps, [1.0])
+
+        stats = limiter.stats()
+        self.assertEqual(stats['bytes'], 1250)
+        self.assertEqual(stats['throttled_chunks'], 1)
+        self.assertAlmostEqual(stats['peers']['a']['throttle_seconds'], 1.0)
+
+    def test_unused_share_is_redistributed(self):
+        """Test that bandwidth a light peer leaves unused goes to a busy one."""
+        limiter = self.limiter(global_rate=1000)
+        limiter.throttle('light', 10)
+        limiter.throttle('busy', 2000)
+        self.assertEqual(limiter.stats()['peers']['busy']['share'], 500)
+
+        # First full window: the light peer only sends 10 bytes, unthrottled
+        self.clock.now = 0.6
+        limiter.throttle('light', 10)
+        limiter.throttle('busy', 2000)
+
+        self.clock.now = 1.2
+        limiter.throttle('busy', 10)
+        share = limiter.stats()['peers']['busy']['share']
+        self.assertGreater(share, 900)
+        self.assertLess(share, 1000)
+
+    def test_set_limits_at_runtime(self):
+        """Test that new limits apply to the next chunk of existing peers."""
+        limiter = self.limiter(global_rate=10 ** 6)
+        limiter.throttle('a', 1000)
+
+        limiter.set_limits(global_rate=0, peer_rate=1000)
+        self.assertEqual(limiter.stats()['peers']['a']['share'], 1000)
+        self.assertAlmostEqual(limiter.throttle('a', 1250), 1.0)
+
+        limiter.set_limits(peer_rate=0)
+        self.assertEqual(limiter.throttle('a', 10 ** 6), 0.0)
+
+    def test_limits_file(self):
+        """Test reloading limits from a JSON file, keeping the current ones on errors."""
+        limiter = self.limiter(global_rate=1000)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "limits.json")
+            with open(path, "w") as f:
+                json.dump({"peer_rate": 2}, f)
+            reload_limits(limiter, path)
+            self.assertEqual((limiter.global_rate, limiter.peer_rate), (1000, 2 * 1024 * 1024))
+
+            with open(path, "w") as f:
+                json.dump({"global_rate": -1}, f)
+            with self.assertRaises(ValueError):
+                load_limits(path)
+            reload_limits(limiter, path)
+            reload_limits(limiter, os.path.join(temp_dir, "missing.json"))
+            self.assertEqual((limiter.global_rate, limiter.peer_rate), (1000, 2 * 1024 * 1024))
+
+    def test_transfer_is_throttled(self):
+        """Test that TransferFile data passes through the limiter."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "data.bin")
+            data = os.urandom(300 * 1024)
+            with open(file_path, "wb") as f:
+                f.write(data)
+
+            limiter = self.limiter(peer_rate=100 * 1024)
+            servicer = FileServiceServicer(bandwidth=limiter)
+            request = pb2.FileRequest(file_path=file_path, chunk_size=64 * 1024)
+            chunks = list(servicer.TransferFile(request, None))
+            servicer.close()
+
+        self.assertEqual(b''.join(chunk.content for chunk in chunks), data)
+        stats = limiter.stats()
+        self.assertEqual(stats['peers']['local']['bytes'], len(data))
+        self.assertGreater(stats['throttle_seconds'], 0)
+        self.assertAlmostEqual(sum(self.clock.sleeps), stats['throttle_seconds'])
+
+
+if __name__ == '__main__':
+    unittest.main()
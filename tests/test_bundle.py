@@ -0,0 +1,240 @@
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+from concurrent import futures
+
+from fileservice import file_service_pb2 as pb2
+from fileservice.client import ChannelPool, DownloadError, FileClient
+from fileservice.client.bundle import _extract_checked, extract_archive
+from fileservice.compression import StreamDecompressor
+from fileservice.server.bundle import BundleEntry, BundleStream
+from fileservice.server.server import FileServer
+from fileservice.server.service import FileServiceServicer
+
+
+class ShrinkingExecutor(futures.Executor):
+    """Runs loads inline, then truncates the loaded file to simulate a concurrent writer."""
+
+    def submit(self, fn, *args):
+        future = futures.Future()
+        future.set_result(fn(*args))
+        os.truncate(args[0].path, 100)
+        return future
+
+
+class TestBundle(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.temp_dir, "results")
+        self.files = {
+            "a.txt": b"alpha",
+            "logs/run1.log": os.urandom(300 * 1024),
+            "logs/run2.log": b"",
+            "logs/deep/x.xml": b"<x/>" * 1000,
+        }
+        for name, data in self.files.items():
+            path = os.path.join(self.root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+        os.symlink("a.txt", os.path.join(self.root, "link.txt"))
+        self.servicer = FileServiceServicer()
+
+    def tearDown(self):
+        self.servicer.close()
+        shutil.rmtree(self.temp_dir)
+
+    def bundle(self, **kwargs):
+        chunks = list(self.servicer.TransferBundle(pb2.BundleRequest(**kwargs), None))
+        last = chunks[-1]
+        self.assertTrue(last.is_last)
+        decompressor = StreamDecompressor(kwargs.get('compression', ''))
+        archive = b''.join(decompressor.decompress(chunk.content) for chunk in chunks)
+        errors = [(e.path, e.error) for chunk in chunks for e in chunk.file_errors]
+        return archive, errors, last
+
+    def members(self, archive):
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+            return {
+                member.name: tar.extractfile(member).read() if member.isfile() else member.linkname
+                for member in tar.getmembers()
+            }
+
+    def test_directory_bundle(self):
+        """Test archiving a directory tree, with symlinks stored as links."""
+        archive, errors, last = self.bundle(directory_path=self.root, chunk_size=64 * 1024)
+        members = self.members(archive)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(members["link.txt"], "a.txt")
+        for name, data in self.files.items():
+            self.assertEqual(members[name], data)
+        self.assertEqual(last.file_count, len(self.files) + 1)
+        self.assertEqual(last.total_bytes, sum(len(data) for data in self.files.values()))
+
+    def test_patterns_and_depth(self):
+        """Test filtering a directory bundle with globs and a depth limit."""
+        archive, _, _ = self.bundle(directory_path=self.root, patterns=["*.log"], max_depth=2)
+        self.assertEqual(sorted(self.members(archive)), ["logs/run1.log", "logs/run2.log"])
+
+    def test_inline_errors(self):
+        """Test that unreadable paths are reported without aborting the bundle."""
+        paths = [
+            os.path.join(self.root, "a.txt"),
+            os.path.join(self.root, "missing.txt"),
+            os.path.join(self.root, "logs"),
+            os.path.join(self.root, "logs/deep/x.xml"),
+        ]
+        archive, errors, last = self.bundle(file_paths=paths)
+
+        names = sorted(self.members(archive))
+        self.assertEqual(names, [paths[0].lstrip('/'), paths[3].lstrip('/')])
+        self.assertEqual([path for path, _ in errors], [paths[1].lstrip('/'), paths[2].lstrip('/')])
+        self.assertEqual(last.file_count, 2)
+
+    def test_relative_paths_outside_directory(self):
+        """Test that relative paths may not escape the bundle directory."""
+        archive, errors, _ = self.bundle(directory_path=self.root, file_paths=["a.txt", "../x"])
+        self.assertEqual(list(self.members(archive)), ["a.txt"])
+        self.assertEqual(errors, [("../x", "Path is outside the bundle directory")])
+
+    def test_compressed_bundles(self):
+        """Test gzip and zstd compression of the whole archive."""
+        for codec in ("gzip", "zstd"):
+            with self.subTest(codec=codec):
+                archive, _, _ = self.bundle(directory_path=self.root, compression=codec)
+                self.assertEqual(self.members(archive)["logs/deep/x.xml"], self.files["logs/deep/x.xml"])
+
+        request = pb2.BundleRequest(directory_path=self.root, compression="rar")
+        [last] = self.servicer.TransferBundle(request, None)
+        self.assertIn("Unsupported compression", last.error)
+
+    def test_request_errors(self):
+        """Test missing directories and empty requests."""
+        _, _, last = self.bundle(directory_path=os.path.join(self.temp_dir, "nope"))
+        self.assertEqual(last.error, "Directory does not exist")
+        _, _, last = self.bundle()
+        self.assertEqual(last.error, "No files requested")
+
+    def test_file_shrinking_while_archived(self):
+        """Test that a streamed file that shrinks is padded and reported."""
+        path = os.path.join(self.root, "logs/run1.log")
+        bundle = BundleStream(
+            [BundleEntry(path, "run1.log")], ShrinkingExecutor(), chunk_size=4096, inline_size=0)
+        chunks = list(bundle)
+
+        archive = b''.join(content for content, _ in chunks)
+        errors = [error for _, batch in chunks for error in batch]
+        data = self.members(archive)["run1.log"]
+        self.assertEqual(len(data), len(self.files["logs/run1.log"]))
+        self.assertEqual(data[:100], self.files["logs/run1.log"][:100])
+        self.assertEqual(data[100:].count(0), len(data) - 100)
+        self.assertEqual([error.name for error in errors], ["run1.log"])
+
+
+class TestExtractArchive(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.destination = os.path.join(self.temp_dir, "out")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def archive(self, *members):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            for name, kind, value in members:
+                info = tarfile.TarInfo(name)
+                info.type = kind
+                if kind == tarfile.REGTYPE:
+                    info.mode, info.size = 0o6777, len(value)
+                    tar.addfile(info, io.BytesIO(value))
+                else:
+                    info.linkname = value
+                    tar.addfile(info)
+        buffer.seek(0)
+        return tarfile.open(fileobj=buffer, mode="r|")
+
+    def test_unsafe_members_rejected(self):
+        """Test that both extraction paths refuse members escaping the destination."""
+        unsafe = [
+            ("../evil.txt", tarfile.REGTYPE, b"x"),
+            ("link", tarfile.SYMTYPE, "../../etc/passwd"),
+            ("hard", tarfile.LNKTYPE, "/etc/passwd"),
+            ("dev", tarfile.CHRTYPE, ""),
+        ]
+        for extract in (extract_archive, _extract_checked):
+            for member in unsafe:
+                with self.subTest(extract=extract.__name__, name=member[0]):
+                    with self.assertRaises(DownloadError), self.archive(member) as tar:
+                        extract(tar, self.destination)
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, "evil.txt")))
+
+    def test_checked_extract(self):
+        """Test the fallback for interpreters without the 'data' filter."""
+        members = [
+            ("sub/a.txt", tarfile.REGTYPE, b"alpha"),
+            ("sub/link.txt", tarfile.SYMTYPE, "a.txt"),
+        ]
+        with self.archive(*members) as tar:
+            _extract_checked(tar, self.destination)
+
+        path = os.path.join(self.destination, "sub", "a.txt")
+        self.assertEqual(os.stat(path).st_mode & 0o7777, 0o755)
+        self.assertEqual(os.stat(path).st_uid, os.getuid())
+        with open(os.path.join(self.destination, "sub", "link.txt"), "rb") as f:
+            self.assertEqual(f.read(), b"alpha")
+
+
+class TestBundleClient(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FileServer(ports=[50211, 50212, 50213])
+        assert cls.server.start()
+        cls.pool = ChannelPool()
+        cls.client = FileClient(f"localhost:{cls.server.port}", pool=cls.pool)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+        cls.server.stop()
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.temp_dir, "src")
+        os.makedirs(os.path.join(self.root, "sub"))
+        for index in range(50):
+            with open(os.path.join(self.root, "sub", f"f{index}.txt"), "w") as f:
+                f.write(f"file {index}\n" * index)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_extract_bundle(self):
+        """Test fetching and unpacking a compressed bundle in one pass."""
+        destination = os.path.join(self.temp_dir, "out")
+        result = self.client.extract_bundle(destination, directory=self.root, compression="gzip")
+
+        self.assertEqual(result.file_count, 50)
+        self.assertEqual(result.errors, [])
+        with open(os.path.join(destination, "sub", "f7.txt")) as f:
+            self.assertEqual(f.read(), "file 7\n" * 7)
+
+    def test_download_bundle(self):
+        """Test saving the archive as sent, with inline errors in the result."""
+        buffer = io.BytesIO()
+        result = self.client.download_bundle(
+            buffer, file_paths=["sub/f1.txt", "sub/none.txt"], directory=self.root)
+
+        self.assertEqual(result.file_count, 1)
+        self.assertEqual([path for path, _ in result.errors], ["sub/none.txt"])
+        buffer.seek(0)
+        with tarfile.open(fileobj=buffer) as tar:
+            self.assertEqual(tar.getnames(), ["sub/f1.txt"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import hashlib
+import os
+import tempfile
+import unittest
+
+from fileservice import file_service_pb2 as pb2
+from fileservice.checksums import available_algorithms, new_hasher
+from fileservice.server.service import FileServiceServicer
+
+
+class TestStreamingChecksums(unittest.TestCase):
+    def setUp(self):
+        self.servicer = FileServiceServicer()
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, "data.bin")
+        self.data = os.urandom(700 * 1024)
+        with open(self.file_path, "wb") as f:
+            f.write(self.data)
+
+    def tearDown(self):
+        self.servicer.close()
+        os.remove(self.file_path)
+        os.rmdir(self.temp_dir)
+
+    def _last_chunk(self, method: str = "TransferFile", **kwargs) -> pb2.FileChunkResponse:
+        request = pb2.FileRequest(file_path=self.file_path, chunk_size=64 * 1024, **kwargs)
+        chunks = list(getattr(self.servicer, method)(request, None))
+        self.assertFalse(chunks[-1].error)
+        return chunks[-1]
+
+    def test_digests_in_last_chunk(self):
+        """Test that every requested digest matches the file."""
+        algorithms = available_algorithms()
+        for method in ("TransferFile", "GetFileContents"):
+            last = self._last_chunk(method, checksums=algorithms)
+
+            for algorithm in algorithms:
+                hasher = new_hasher(algorithm)
+                hasher.update(self.data)
+                self.assertEqual(last.checksums[algorithm], hasher.hexdigest())
+
+    def test_repeat_request_uses_cache(self):
+        """Test that a second whole-file request is answered from the digest cache."""
+        first = self._last_chunk(checksums=["sha256"])
+        second = self._last_chunk(checksums=["sha256"])
+
+        self.assertEqual(first.checksums, second.checksums)
+        self.assertEqual(self.servicer.digest_cache.stats()['hits'], 1)
+
+    def test_range_digest_not_cached(self):
+        """Test that range digests cover the range and aren't cached."""
+        last = self._last_chunk(checksums=["sha256"], offset=100, length=5000)
+
+        self.assertEqual(last.checksums["sha256"],
+                         hashlib.sha256(self.data[100:5100]).hexdigest())
+        self.assertEqual(self.servicer.digest_cache.stats()['entries'], 0)
+
+    def test_changed_file_rehashed(self):
+        """Test that a modified file doesn't get the old cached digest."""
+        self._last_chunk(checksums=["sha256"])
+        with open(self.file_path, "ab") as f:
+            f.write(b"more")
+
+        last = self._last_chunk(checksums=["sha256"])
+
+        self.assertEqual(last.checksums["sha256"],
+                         hashlib.sha256(self.data + b"more").hexdigest())
+
+    def test_unsupported_algorithm(self):
+        """Test that unknown algorithms are reported as errors."""
+        request = pb2.FileRequest(file_path=self.file_path, checksums=["crc7"])
+
+        chunks = list(self.servicer.TransferFile(request, None))
+
+        self.assertEqual(len(chunks), 1)
+        self.assertIn("unsupported checksum", chunks[0].error.lower())
@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+
+import grpc
+
+from fileservice import file_service_pb2 as pb2
+from fileservice import file_service_pb2_grpc as pb2_grpc
+from fileservice.chunking import (
+    ADAPTIVE_MAX_CHUNK,
+    ADAPTIVE_MIN_CHUNK,
+    AdaptiveChunkPolicy,
+    AdaptiveChunkSizer,
+    ChunkSizer,
+    StaticChunkPolicy,
+    optimize_chunk_size,
+)
+from fileservice.server.server import FileServer
+from fileservice.server.service import FileServiceServicer
+
+
+class TestChunkSizing(unittest.TestCase):
+    def test_adaptive_grows_for_fast_consumer(self):
+        """Test that chunks double per step up to the maximum when sends are fast."""
+        sizer = AdaptiveChunkSizer(1024 * 1024)
+        sizes = []
+        for _ in range(10):
+            size = sizer.next_size()
+            sizes.append(size)
+            sizer.record(size, 0.001)
+
+        self.assertEqual(sizes[1], 2 * 1024 * 1024)
+        self.assertEqual(sizer.next_size(), ADAPTIVE_MAX_CHUNK)
+
+    def test_adaptive_fits_default_message_limit(self):
+        """Test that adaptive streams start and stay below gRPC's 4MB default, even for huge files."""
+        sizer = AdaptiveChunkPolicy().new_stream(2 * 1024 * 1024 * 1024)
+        self.assertLessEqual(sizer.next_size(), ADAPTIVE_MAX_CHUNK)
+        for _ in range(10):
+            sizer.record(sizer.next_size(), 0.0001)
+        self.assertEqual(sizer.next_size(), ADAPTIVE_MAX_CHUNK)
+
+    def test_stock_channel_receives_adaptive_stream(self):
+        """Test that a client with default channel options can download with the adaptive policy."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "data.bin")
+            data = os.urandom(20 * 1024 * 1024)
+            with open(file_path, "wb") as f:
+                f.write(data)
+
+            with FileServer(ports=[50281, 50282, 50283]) as server:
+                with grpc.insecure_channel(f"localhost:{server.port}") as channel:
+                    stub = pb2_grpc.FileServiceStub(channel)
+                    request = pb2.FileRequest(file_path=file_path, include_metadata=True)
+                    chunks = list(stub.TransferFile(request))
+
+        self.assertTrue(chunks[-1].is_last)
+        self.assertEqual(b''.join(chunk.content for chunk in chunks), data)
+
+    def test_adaptive_shrinks_for_slow_consumer(self):
+        """Test that chunks halve per step down to the minimum when sends are slow."""
+        sizer = AdaptiveChunkSizer(1024 * 1024)
+        for _ in range(20):
+            sizer.record(sizer.next_size(), 5.0)
+
+        self.assertEqual(sizer.next_size(), ADAPTIVE_MIN_CHUNK)
+
+    def test_adaptive_sizes_are_aligned(self):
+        """Test that adaptive sizes stay multiples of 64KB."""
+        sizer = AdaptiveChunkSizer(1024 * 1024)
+        sizer.record(1024 * 1024, 0.07)
+        self.assertEqual(sizer.next_size() % (64 * 1024), 0)
+
+    def test_static_policy_matches_optimize_chunk_size(self):
+        """Test that the static policy keeps the original file-size based sizes."""
+        policy = StaticChunkPolicy()
+        for file_size in (1024, 50 * 1024 * 1024, 2 * 1024 * 1024 * 1024):
+            self.assertEqual(policy.new_stream(file_size).next_size(),
+                             optimize_chunk_size(file_size))
+
+    def test_requested_size_is_fixed(self):
+        """Test that an explicit client chunk size is not adapted."""
+        sizer = AdaptiveChunkPolicy().new_stream(10 * 1024 * 1024, 100000)
+        self.assertIs(type(sizer), ChunkSizer)
+        sizer.record(100000, 0.0001)
+        self.assertEqual(sizer.next_size(), 100000)
+
+    def test_transfer_with_adaptive_policy(self):
+        """Test TransferFile content and offsets when chunk sizes change mid-stream."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "data.bin")
+            data = os.urandom(3 * 1024 * 1024 + 11)
+            with open(file_path, "wb") as f:
+                f.write(data)
+
+            servicer = FileServiceServicer(
+                chunk_policy=AdaptiveChunkPolicy(min_size=64 * 1024, max_size=1024 * 1024)
+            )
+            chunks = list(servicer.TransferFile(pb2.FileRequest(file_path=file_path), None))
+            servicer.close()
+
+        offset = 0
+        for chunk in chunks:
+            self.assertEqual(chunk.offset, offset)
+            offset += len(chunk.content)
+        self.assertTrue(chunks[-1].is_last)
+        self.assertEqual(b''.join(chunk.content for chunk in chunks), data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+from fileservice import file_service_pb2 as pb2
+from fileservice.server.chunk_source import (
+    FileChunkSource,
+    MmapChunkSource,
+    open_chunk_source,
+)
+from fileservice.server.service import FileServiceServicer
+
+
+class TestChunkSource(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, "data.bin")
+        self.data = os.urandom(256 * 1024 + 7)
+        with open(self.file_path, "wb") as f:
+            f.write(self.data)
+
+    def tearDown(self):
+        os.remove(self.file_path)
+        os.rmdir(self.temp_dir)
+
+    def test_sources_return_same_chunks(self):
+        """Test that mmap and positional reads agree, including at EOF."""
+        with open(self.file_path, "rb") as file:
+            size = len(self.data)
+            with FileChunkSource(file, size) as plain, MmapChunkSource(file, size) as mapped:
+                for offset in (0, 4096, size - 3, size):
+                    self.assertEqual(bytes(plain.read(offset, 8192)),
+                                     bytes(mapped.read(offset, 8192)))
+
+    def test_open_chunk_source_threshold(self):
+        """Test that only files at or above the threshold are memory-mapped."""
+        with open(self.file_path, "rb") as file:
+            size = len(self.data)
+            with open_chunk_source(file, size, mmap_threshold=size) as source:
+                self.assertIsInstance(source, MmapChunkSource)
+            with open_chunk_source(file, size, mmap_threshold=size + 1) as source:
+                self.assertIsInstance(source, FileChunkSource)
+            with open_chunk_source(file, size, mmap_threshold=None) as source:
+                self.assertIsInstance(source, FileChunkSource)
+            with open_chunk_source(file, size) as source:
+                self.assertIsInstance(source, FileChunkSource)
+
+    def test_truncated_during_transfer(self):
+        """Test that a file truncated mid-stream ends the stream short by default."""
+        servicer = FileServiceServicer()
+        request = pb2.FileRequest(file_path=self.file_path, chunk_size=64 * 1024)
+
+        responses = servicer.TransferFile(request, None)
+        first = next(responses)
+        os.truncate(self.file_path, 100 * 1024)
+        chunks = [first] + list(responses)
+
+        self.assertTrue(chunks[-1].is_last)
+        self.assertEqual(chunks[-1].offset, 100 * 1024)
+        self.assertEqual(b''.join(chunk.content for chunk in chunks), self.data[:100 * 1024])
+
+    def test_transfer_from_mmap(self):
+        """Test TransferFile content when every file is memory-mapped."""
+        servicer = FileServiceServicer(mmap_threshold=0)
+        request = pb2.FileRequest(file_path=self.file_path, chunk_size=10000, offset=5)
+
+        chunks = list(servicer.TransferFile(request, None))
+
+        self.assertTrue(chunks[-1].is_last)
+        self.assertEqual(b''.join(chunk.content for chunk in chunks), self.data[5:])
@@ -0,0 +1,221 @@
+import asyncio
+import io
+import os
+import tempfile
+import unittest
+
+import grpc
+
+from fileservice.client import (
+    AioChannelPool,
+    AsyncFileClient,
+    ChannelPool,
+    DownloadError,
+    FileClient,
+)
+from fileservice.server.server import FileServer
+from fileservice.server.service import FileServiceServicer
+
+
+class FlakyServicer(FileServiceServicer):
+    """Cuts the next `failures` TransferFile streams after `cut_after` responses."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = 0
+        self.cut_after = 2
+        self.on_cut = None
+        self.requests = []
+
+    def TransferFile(self, request, context):
+        self.requests.append(request)
+        cut = self.failures > 0
+        if cut:
+            self.failures -= 1
+        for index, response in enumerate(super().TransferFile(request, context)):
+            if cut and index == self.cut_after:
+                if self.on_cut:
+                    self.on_cut()
+                context.abort(grpc.StatusCode.UNAVAILABLE, "injected failure")
+            yield response
+
+
+def setUpModule():
+    global server, servicer, target
+    servicer = FlakyServicer(upload_roots=[tempfile.gettempdir()])
+    server = FileServer(ports=[50201, 50202, 50203], service=servicer)
+    assert server.start()
+    target = f"localhost:{server.port}"
+
+
+def tearDownModule():
+    server.stop()
+
+
+class ClientTestCase:
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.temp_dir, "source.bin")
+        self.data = os.urandom(1024 * 1024 + 321)
+        with open(self.source, "wb") as f:
+            f.write(self.data)
+        servicer.failures = 0
+        servicer.cut_after = 2
+        servicer.on_cut = None
+        servicer.requests.clear()
+
+    def tearDown(self):
+        for name in os.listdir(self.temp_dir):
+            os.remove(os.path.join(self.temp_dir, name))
+        os.rmdir(self.temp_dir)
+
+
+class TestFileClient(ClientTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.pool = ChannelPool()
+        self.client = FileClient(target, pool=self.pool, backoff=0.01, chunk_size=64 * 1024)
+
+    def tearDown(self):
+        self.pool.close()
+        super().tearDown()
+
+    def test_pool_reuses_channels(self):
+        """Test that clients share pooled channels and larger pools round robin."""
+        self.assertIs(self.pool.channel(target), FileClient(target, pool=self.pool).pool.channel(target))
+        with ChannelPool(size=2) as pool:
+            channels = {id(pool.channel(target)) for _ in range(4)}
+        self.assertEqual(len(channels), 2)
+
+    def test_download_resumes_after_failure(self):
+        """Test that a cut stream is resumed from the received offset with the resume token."""
+        servicer.failures = 2
+        destination = os.path.join(self.temp_dir, "copy.bin")
+        result = self.client.download(self.source, destination)
+
+        with open(destination, "rb") as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertEqual(result.size, len(self.data))
+        first, *resumed = servicer.requests
+        self.assertEqual(len(resumed), 2)
+        self.assertEqual(resumed[0].offset, 2 * 64 * 1024)
+        self.assertEqual(resumed[1].offset, 4 * 64 * 1024)
+        self.assertTrue(all(r.resume_token == result.resume_token for r in resumed))
+        self.assertFalse(os.path.exists(destination + ".partial"))
+
+    def test_resume_rejected_when_file_changes(self):
+        """Test that a download fails instead of mixing two versions of a file."""
+        def rewrite():
+            with open(self.source, "ab") as f:
+                f.write(b"more")
+
+        servicer.failures = 1
+        servicer.on_cut = rewrite
+        destination = os.path.join(self.temp_dir, "copy.bin")
+        with self.assertRaisesRegex(DownloadError, "changed"):
+            self.client.download(self.source, destination)
+        self.assertFalse(os.path.exists(destination + ".partial"))
+
+    def test_retries_exhausted(self):
+        """Test that a stream failing without progress gives up after the retry limit."""
+        servicer.failures = 10
+        servicer.cut_after = 0
+        client = FileClient(target, pool=self.pool, retries=1, backoff=0.01, chunk_size=1024)
+        with self.assertRaises(DownloadError):
+            client.read(self.source, length=4096)
+        self.assertEqual(len(servicer.requests), 2)
+
+    def test_missing_file(self):
+        """Test that server errors are not retried."""
+        with self.assertRaises(DownloadError):
+            self.client.read(os.path.join(self.temp_dir, "missing"))
+        self.assertEqual(len(servicer.requests), 1)
+
+    def test_read_range_compressed(self):
+        """Test reading a byte range with compressed chunks into memory and a file object."""
+        client = FileClient(target, pool=self.pool, compression="zlib")
+        self.assertEqual(client.read(self.source, offset=1000, length=5000), self.data[1000:6000])
+
+        buffer = io.BytesIO()
+        self.assertEqual(client.download_to(self.source, buffer), len(self.data))
+        self.assertEqual(buffer.getvalue(), self.data)
+
+    def test_upload_and_exists(self):
+        """Test uploading over the pooled channel and checking the result."""
+        remote = os.path.join(self.temp_dir, "uploaded.bin")
+        result = self.client.upload(self.source, remote)
+        self.assertEqual(result.size, len(self.data))
+        response = self.client.exists(remote, include_metadata=True)
+        self.assertTrue(response.exists)
+        self.assertEqual(response.metadata.size, len(self.data))
+
+
+class TestAsyncFileClient(ClientTestCase, unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.pool = AioChannelPool()
+        self.client = AsyncFileClient(target, pool=self.pool, backoff=0.01, chunk_size=64 * 1024)
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+
+    async def test_download_resumes_after_failure(self):
+        """Test the async download path with a cut stream."""
+        servicer.failures = 1
+        destination = os.path.join(self.temp_dir, "copy.bin")
+        result = await self.client.download(self.source, destination)
+
+        with open(destination, "rb") as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertEqual(result.size, len(self.data))
+        self.assertEqual(servicer.requests[1].offset, 2 * 64 * 1024)
+
+    async def test_read_and_stream_to_file(self):
+        """Test reading into memory and streaming into a file object."""
+        self.assertEqual(await self.client.read(self.source, length=100), self.data[:100])
+        buffer = io.BytesIO()
+        self.assertEqual(await self.client.download_to(self.source, buffer), len(self.data))
+        self.assertEqual(buffer.getvalue(), self.data)
+
+    async def test_upload_and_exists(self):
+        """Test async upload and existence check."""
+        remote = os.path.join(self.temp_dir, "uploaded.bin")
+        result = await self.client.upload(self.source, remote)
+        self.assertEqual(result.size, len(self.data))
+        self.assertTrue((await self.client.exists(remote)).exists)
+        with self.assertRaises(DownloadError):
+            await self.client.read(os.path.join(self.temp_dir, "missing"))
+
+
+class TestAioChannelPool(unittest.TestCase):
+    def test_channels_closed_with_their_loop(self):
+        """Test that each asyncio.run() loop's channels are closed and dropped when it ends."""
+        pool = AioChannelPool(size=2)
+        channels = []
+
+        async def call():
+            client = AsyncFileClient(target, pool=pool)
+            self.assertFalse((await client.exists(os.path.join(tempfile.gettempdir(), "missing"))).exists)
+            self.assertEqual(pool.stats(), {'loops': 1, 'channels': 2})
+            channels.append(pool.channel(target))
+
+        for _ in range(30):
+            asyncio.run(call())
+        self.assertEqual(pool.stats(), {'loops': 0, 'channels': 0})
+        self.assertEqual(len({id(channel) for channel in channels}), 30)
+
+    def test_close_then_reuse(self):
+        """Test that close() drops the loop's channels and the pool opens new ones after."""
+        pool = AioChannelPool()
+
+        async def run():
+            first = pool.channel(target)
+            await pool.close()
+            self.assertEqual(pool.stats()['channels'], 0)
+            self.assertIsNot(pool.channel(target), first)
+
+        asyncio.run(run())
+        self.assertEqual(pool.stats()['channels'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
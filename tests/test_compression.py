@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from fileservice import file_service_pb2 as pb2
+from fileservice.compression import available_codecs, decompress_chunk
+from fileservice.server.service import FileServiceServicer
+
+
+class TestCompression(unittest.TestCase):
+    def setUp(self):
+        self.servicer = FileServiceServicer()
+        self.temp_dir = tempfile.mkdtemp()
+
+        self.log_file = os.path.join(self.temp_dir, "app.log")
+        with open(self.log_file, "w") as f:
+            for i in range(20000):
+                f.write(f"2024-01-01 12:00:{i % 60:02d} INFO request {i} handled\n")
+
+        self.random_file = os.path.join(self.temp_dir, "blob.bin")
+        with open(self.random_file, "wb") as f:
+            f.write(os.urandom(300 * 1024))
+
+        self.image_file = os.path.join(self.temp_dir, "photo.png")
+        with open(self.image_file, "wb") as f:
+            f.write(b"\0" * 100 * 1024)
+
+    def tearDown(self):
+        for name in os.listdir(self.temp_dir):
+            os.remove(os.path.join(self.temp_dir, name))
+        os.rmdir(self.temp_dir)
+
+    def _transfer(self, file_path: str, compression: str, **kwargs) -> list:
+        request = pb2.FileRequest(
+            file_path=file_path,
+            chunk_size=64 * 1024,
+            compression=compression,
+            **kwargs
+        )
+        return list(self.servicer.TransferFile(request, None))
+
+    def _decode(self, chunks: list) -> bytes:
+        return b''.join(decompress_chunk(c.compression, c.content) for c in chunks)
+
+    def test_compressible_file_round_trip(self):
+        """Test zlib-compressed chunks decode back to the original file."""
+        chunks = self._transfer(self.log_file, "zlib", compression_level=6)
+
+        with open(self.log_file, "rb") as f:
+            original = f.read()
+        self.assertEqual(self._decode(chunks), original)
+        self.assertTrue(all(c.compression == "zlib" for c in chunks[:-1]))
+
+        last = chunks[-1]
+        self.assertEqual(last.total_raw_bytes, len(original))
+        self.assertLess(last.total_wire_bytes, last.total_raw_bytes // 4)
+        self.assertEqual(sum(c.raw_size for c in chunks), len(original))
+
+    @unittest.skipUnless("zstd" in available_codecs(), "zstandard not installed")
+    def test_zstd_range_round_trip(self):
+        """Test zstd compression over a byte range."""
+        chunks = self._transfer(self.log_file, "zstd", offset=100, length=200000)
+
+        with open(self.log_file, "rb") as f:
+            f.seek(100)
+            original = f.read(200000)
+        self.assertEqual(self._decode(chunks), original)
+
+    def test_skips_incompressible_data(self):
+        """Test that random data is sent raw after sampling."""
+        chunks = self._transfer(self.random_file, "zlib")
+
+        self.assertTrue(all(c.compression == "" for c in chunks))
+        self.assertEqual(chunks[-1].total_wire_bytes, chunks[-1].total_raw_bytes)
+
+    def test_skips_media_mime_types(self):
+        """Test that media files are sent raw regardless of content."""
+        chunks = self._transfer(self.image_file, "zlib")
+
+        self.assertTrue(all(c.compression == "" for c in chunks))
+
+    def test_unsupported_codec(self):
+        """Test that an unknown codec is reported as an error."""
+        chunks = self._transfer(self.log_file, "lzma")
+
+        self.assertEqual(len(chunks), 1)
+        self.assertIn("unsupported compression", chunks[0].error.lower())
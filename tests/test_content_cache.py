@@ -0,0 +1,116 @@
+import os
+import tempfile
+import unittest
+
+from fileservice import file_service_pb2 as pb2
+from fileservice.server.content_cache import ContentCache, load_file
+from fileservice.server.service import FileServiceServicer
+
+
+class TestContentCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for path in os.listdir(self.temp_dir):
+            os.remove(os.path.join(self.temp_dir, path))
+        os.rmdir(self.temp_dir)
+
+    def write(self, name, data):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def fetch(self, cache, path):
+        stat = os.stat(path)
+        return cache.get_or_load(stat, lambda: load_file(path, stat))
+
+    def test_admission_and_hits(self):
+        """Test that files are cached from their second request and then served from memory."""
+        path = self.write("a.txt", b"config")
+        cache = ContentCache(max_bytes=1024)
+
+        self.assertIsNone(self.fetch(cache, path))
+        self.assertEqual(self.fetch(cache, path), b"config")
+        self.assertEqual(self.fetch(cache, path), b"config")
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+        self.assertAlmostEqual(stats['hit_ratio'], 1 / 3)
+        self.assertEqual(stats['bytes'], 6)
+
+    def test_changed_file_is_reloaded(self):
+        """Test that an entry is only served while the file matches the current stat."""
+        path = self.write("a.txt", b"old")
+        cache = ContentCache(max_bytes=1024, admit_after=1)
+        self.assertEqual(self.fetch(cache, path), b"old")
+
+        with open(path, "wb") as f:
+            f.write(b"newer")
+        os.utime(path, ns=(0, 10 ** 9))
+        self.assertIsNone(cache.get(os.stat(path)))
+        self.assertEqual(self.fetch(cache, path), b"newer")
+        self.assertEqual(cache.stats()['bytes'], 5)
+
+    def test_size_cutoff(self):
+        """Test that files above the cutoff are skipped."""
+        path = self.write("big.bin", b"x" * 100)
+        cache = ContentCache(max_bytes=1024, max_file_size=99, admit_after=1)
+        self.assertIsNone(self.fetch(cache, path))
+        self.assertEqual(cache.stats()['skipped'], 1)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used file is evicted to stay within budget."""
+        cache = ContentCache(max_bytes=250, admit_after=1)
+        a, b, c = (self.write(name, name.encode() * 100) for name in "abc")
+        self.fetch(cache, a)
+        self.fetch(cache, b)
+        self.fetch(cache, a)
+        self.fetch(cache, c)
+
+        self.assertIsNotNone(cache.get(os.stat(a)))
+        self.assertIsNone(cache.get(os.stat(b)))
+        stats = cache.stats()
+        self.assertEqual((stats['evictions'], stats['evicted_bytes']), (1, 100))
+        self.assertLessEqual(stats['bytes'], 250)
+
+    def test_lfu_eviction(self):
+        """Test that the least frequently used file is evicted under the lfu policy."""
+        cache = ContentCache(max_bytes=250, admit_after=1, policy='lfu')
+        a, b, c = (self.write(name, name.encode() * 100) for name in "abc")
+        self.fetch(cache, a)
+        self.fetch(cache, a)
+        self.fetch(cache, a)
+        self.fetch(cache, b)
+        self.fetch(cache, c)
+
+        # LRU would have evicted a, the least recently used
+        self.assertIsNotNone(cache.get(os.stat(a)))
+        self.assertIsNone(cache.get(os.stat(b)))
+        self.assertIsNotNone(cache.get(os.stat(c)))
+
+    def test_transfer_served_from_cache(self):
+        """Test that repeated TransferFile calls are served from memory with identical output."""
+        data = os.urandom(300 * 1024)
+        path = self.write("data.bin", data)
+        cache = ContentCache(max_bytes=1024 * 1024)
+        servicer = FileServiceServicer(content_cache=cache)
+        request = pb2.FileRequest(file_path=path, chunk_size=64 * 1024, checksums=["sha256"])
+
+        runs = [list(servicer.TransferFile(request, None)) for _ in range(3)]
+        servicer.close()
+
+        for chunks in runs:
+            self.assertEqual(b''.join(chunk.content for chunk in chunks), data)
+        self.assertEqual(runs[0][-1].checksums, runs[2][-1].checksums)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_invalid_policy(self):
+        """Test that unknown eviction policies are rejected."""
+        with self.assertRaises(ValueError):
+            ContentCache(policy='fifo')
+
+
+if __name__ == '__main__':
+    unittest.main()
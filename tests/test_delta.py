@@ -0,0 +1,170 @@
+import hashlib
+import io
+import os
+import random
+import tempfile
+import unittest
+
+from fileservice import file_service_pb2 as pb2
+from fileservice.client import DeltaSync
+from fileservice.delta import apply_delta, compute_signatures, generate_delta, generate_delta_from
+from fileservice.server.server import FileServer
+from fileservice.server.service import FileServiceServicer
+
+BLOCK_SIZE = 1024
+
+
+def encode(basis: bytes, target: bytes) -> list:
+    signatures = list(compute_signatures(io.BytesIO(basis), BLOCK_SIZE))
+    return list(generate_delta(target, signatures, BLOCK_SIZE))
+
+
+def rebuild(basis: bytes, ops: list) -> bytes:
+    output = io.BytesIO()
+    apply_delta(io.BytesIO(basis), ops, output, BLOCK_SIZE)
+    return output.getvalue()
+
+
+class TestDeltaEncoding(unittest.TestCase):
+    def setUp(self):
+        self.basis = random.Random(1).randbytes(200 * BLOCK_SIZE + 100)
+
+    def test_identical_file_is_all_copies(self):
+        """Test that an unchanged file needs no literal data."""
+        ops = encode(self.basis, self.basis)
+
+        self.assertEqual(sum(len(op.data) for op in ops), 0)
+        self.assertEqual(rebuild(self.basis, ops), self.basis)
+
+    def test_appended_file(self):
+        """Test that only appended bytes are sent as literals."""
+        target = self.basis + b"new log lines\n" * 50
+        ops = encode(self.basis, target)
+
+        self.assertLessEqual(sum(len(op.data) for op in ops), 100 + 14 * 50)
+        self.assertEqual(rebuild(self.basis, ops), target)
+
+    def test_inserted_and_edited_bytes(self):
+        """Test that the rolling search resynchronises after an insertion."""
+        target = bytearray(self.basis)
+        target[5000:5000] = b"inserted"
+        target[90000:90010] = b"0123456789"
+        target = bytes(target)
+        ops = encode(self.basis, target)
+
+        self.assertLess(sum(len(op.data) for op in ops), len(target) // 10)
+        self.assertEqual(rebuild(self.basis, ops), target)
+
+    def test_rolling_budget(self):
+        """Test that aligned blocks still match once the rolling budget is spent."""
+        target = bytearray(self.basis)
+        target[10:20] = b"0123456789"
+        target[150 * BLOCK_SIZE:150 * BLOCK_SIZE] = b"shift"
+        target = bytes(target)
+        signatures = list(compute_signatures(io.BytesIO(self.basis), BLOCK_SIZE))
+        ops = list(generate_delta(target, signatures, BLOCK_SIZE, rolling_budget=100))
+
+        literal = sum(len(op.data) for op in ops)
+        self.assertGreater(literal, 40 * BLOCK_SIZE)
+        self.assertLess(literal, 60 * BLOCK_SIZE)
+        self.assertEqual(rebuild(self.basis, ops), target)
+
+    def test_windowed_reads(self):
+        """Test that reading the target in windows gives the same delta, reading each byte once."""
+        target = bytearray(self.basis)
+        target[5000:5000] = b"inserted"
+        target[90000:90010] = b"0123456789"
+        target = bytes(target) + b"appended" * 100
+        signatures = list(compute_signatures(io.BytesIO(self.basis), BLOCK_SIZE))
+        reads = []
+
+        def read(offset, length):
+            reads.append((offset, length))
+            return target[offset:offset + length]
+
+        digest = hashlib.sha256()
+        ops = list(generate_delta_from(
+            read, len(target), signatures, BLOCK_SIZE, max_literal=4 * BLOCK_SIZE, window=0, digest=digest))
+
+        self.assertEqual(ops, list(generate_delta(target, signatures, BLOCK_SIZE, max_literal=4 * BLOCK_SIZE)))
+        self.assertEqual(rebuild(self.basis, ops), target)
+        self.assertEqual(digest.hexdigest(), hashlib.sha256(target).hexdigest())
+        self.assertGreater(len(reads), 10)
+        self.assertLessEqual(max(length for _, length in reads), 10 * BLOCK_SIZE)
+        self.assertEqual([offset for offset, _ in reads],
+                         [sum(length for _, length in reads[:i]) for i in range(len(reads))])
+
+    def test_truncated_target(self):
+        """Test that a target ending early raises instead of encoding a short file."""
+        signatures = list(compute_signatures(io.BytesIO(self.basis), BLOCK_SIZE))
+        with self.assertRaises(OSError):
+            list(generate_delta_from(
+                lambda offset, length: self.basis[offset:min(offset + length, 1000)],
+                len(self.basis), signatures, BLOCK_SIZE))
+
+    def test_empty_basis(self):
+        """Test that everything is literal without a basis file."""
+        ops = encode(b"", self.basis)
+
+        self.assertEqual(rebuild(b"", ops), self.basis)
+
+
+class TestGetFileDelta(unittest.TestCase):
+    def setUp(self):
+        self.servicer = FileServiceServicer()
+        self.temp_dir = tempfile.mkdtemp()
+        self.remote = os.path.join(self.temp_dir, "remote.bin")
+        self.local = os.path.join(self.temp_dir, "local.bin")
+        data = os.urandom(512 * 1024)
+        with open(self.local, "wb") as f:
+            f.write(data)
+        with open(self.remote, "wb") as f:
+            f.write(data[:1000] + b"edit" + data[1000:] + b"tail")
+
+    def tearDown(self):
+        for name in os.listdir(self.temp_dir):
+            os.remove(os.path.join(self.temp_dir, name))
+        os.rmdir(self.temp_dir)
+
+    def test_servicer_reports_statistics(self):
+        """Test GetFileDelta end to end against the servicer."""
+        with open(self.local, "rb") as f:
+            sigs = [
+                pb2.BlockSignature(index=s.index, weak=s.weak, strong=s.strong, length=s.length)
+                for s in compute_signatures(f, BLOCK_SIZE)
+            ]
+        requests = iter([
+            pb2.DeltaRequest(file_path=self.remote, block_size=BLOCK_SIZE, signatures=sigs[:100]),
+            pb2.DeltaRequest(signatures=sigs[100:]),
+        ])
+
+        responses = list(self.servicer.GetFileDelta(requests, None))
+
+        last = responses[-1]
+        self.assertTrue(last.is_last)
+        self.assertFalse(last.error)
+        self.assertEqual(last.literal_bytes + last.matched_bytes, os.path.getsize(self.remote))
+        self.assertGreater(last.matched_bytes, 0.9 * os.path.getsize(self.remote))
+
+    def test_invalid_block_size(self):
+        """Test that out-of-range block sizes are rejected."""
+        requests = iter([pb2.DeltaRequest(file_path=self.remote, block_size=1)])
+
+        responses = list(self.servicer.GetFileDelta(requests, None))
+
+        self.assertEqual(len(responses), 1)
+        self.assertIn("block size", responses[0].error.lower())
+
+    def test_client_sync(self):
+        """Test that DeltaSync updates the local copy over gRPC."""
+        server = FileServer(ports=[50181, 50182, 50183])
+        self.assertTrue(server.start())
+        try:
+            result = DeltaSync(f"localhost:{server.port}", block_size=BLOCK_SIZE).sync(
+                self.remote, self.local)
+        finally:
+            server.stop()
+
+        with open(self.remote, "rb") as a, open(self.local, "rb") as b:
+            self.assertEqual(a.read(), b.read())
+        self.assertGreater(result.saved_ratio, 0.9)
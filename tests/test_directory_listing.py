@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from fileservice import file_service_pb2 as pb2
+from fileservice.server.service import FileServiceServicer
+
+
+class TestListDirectory(unittest.TestCase):
+    def setUp(self):
+        self.servicer = FileServiceServicer()
+        self.temp_dir = tempfile.mkdtemp()
+        for relative_path in ["a.log", "b.txt", "logs/1.log", "logs/2.log",
+                              "logs/old/0.log", "z/readme.md"]:
+            path = os.path.join(self.temp_dir, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(relative_path)
+
+    def tearDown(self):
+        self.servicer.close()
+        shutil.rmtree(self.temp_dir)
+
+    def _list(self, **kwargs) -> tuple[list, list]:
+        request = pb2.ListDirectoryRequest(directory_path=self.temp_dir, **kwargs)
+        responses = list(self.servicer.ListDirectory(request, None))
+        return responses, [entry for r in responses for entry in r.entries]
+
+    def test_recursive_listing(self):
+        """Test a full listing with stat data in stable order."""
+        responses, entries = self._list(batch_size=3)
+
+        self.assertEqual([e.path for e in entries], [
+            "a.log", "b.txt", "logs", "logs/1.log", "logs/2.log",
+            "logs/old", "logs/old/0.log", "z", "z/readme.md",
+        ])
+        self.assertEqual(len(responses), 4)
+        self.assertTrue(responses[-1].is_last)
+        self.assertFalse(responses[-1].next_page_token)
+        self.assertTrue(entries[2].is_directory)
+        self.assertEqual(entries[0].size, len("a.log"))
+
+    def test_depth_and_patterns(self):
+        """Test depth limits combined with glob filters."""
+        _, entries = self._list(max_depth=2, patterns=["*.log"])
+
+        self.assertEqual([e.path for e in entries], ["a.log", "logs/1.log", "logs/2.log"])
+
+    def test_paging_with_cursor(self):
+        """Test that following page tokens returns every entry exactly once."""
+        seen = []
+        token = ""
+        while True:
+            responses, entries = self._list(page_size=2, page_token=token)
+            seen.extend(e.path for e in entries)
+            token = responses[-1].next_page_token
+            if not token:
+                break
+
+        _, everything = self._list()
+        self.assertEqual(seen, [e.path for e in everything])
+
+    def test_not_a_directory(self):
+        """Test listing a regular file."""
+        request = pb2.ListDirectoryRequest(directory_path=os.path.join(self.temp_dir, "a.log"))
+
+        responses = list(self.servicer.ListDirectory(request, None))
+
+        self.assertEqual(len(responses), 1)
+        self.assertIn("not a directory", responses[0].error.lower())
@@ -139,4 +139,87 @@ class TestFileTransfer(unittest.TestCase):
 
         # Verify only first chunk has metadata
         for chunk in chunks[1:]:
-            self.assertIsNone(chunk.metadata)
\ No newline at end of file
+            self.assertFalse(chunk.HasField("metadata"))
+
+    def test_transfer_byte_range(self):
+        """Test transferring only a byte range of a file."""
+        offset = 1000
+        length = 300 * 1024
+        request = pb2.FileRequest(
+            file_path=self.medium_file,
+            offset=offset,
+            length=length,
+            chunk_size=64 * 1024
+        )
+
+        chunks = list(self.servicer.TransferFile(request, None))
+
+        self.assertTrue(chunks[-1].is_last)
+        self.assertEqual(chunks[0].offset, offset)
+        self.assertEqual(chunks[-1].offset, offset + length)
+        self.assertEqual(chunks[-1].progress, 100.0)
+
+        content = b''.join(chunk.content for chunk in chunks)
+        with open(self.medium_file, 'rb') as f:
+            f.seek(offset)
+            original = f.read(length)
+        self.assertEqual(content, original)
+
+    def test_transfer_resume(self):
+        """Test resuming an interrupted transfer with the resume token."""
+        request = pb2.FileRequest(
+            file_path=self.small_file,
+            chunk_size=16 * 1024
+        )
+
+        # Take the first two chunks, then drop the stream
+        stream = self.servicer.TransferFile(request, None)
+        received = [next(stream), next(stream)]
+        stream.close()
+        resume_token = received[0].resume_token
+        self.assertTrue(resume_token)
+
+        partial = b''.join(chunk.content for chunk in received)
+        request = pb2.FileRequest(
+            file_path=self.small_file,
+            chunk_size=16 * 1024,
+            offset=len(partial),
+            resume_token=resume_token
+        )
+        chunks = list(self.servicer.TransferFile(request, None))
+
+        self.assertFalse(chunks[-1].error)
+        content = partial + b''.join(chunk.content for chunk in chunks)
+        with open(self.small_file, 'rb') as f:
+            self.assertEqual(content, f.read())
+
+    def test_transfer_resume_file_changed(self):
+        """Test that resuming is refused once the file has changed."""
+        request = pb2.FileRequest(file_path=self.small_file)
+        resume_token = next(self.servicer.TransferFile(request, None)).resume_token
+
+        with open(self.small_file, "ab") as f:
+            f.write(b"appended")
+
+        request = pb2.FileRequest(
+            file_path=self.small_file,
+            offset=1024,
+            resume_token=resume_token
+        )
+        chunks = list(self.servicer.TransferFile(request, None))
+
+        self.assertEqual(len(chunks), 1)
+        self.assertTrue(chunks[0].is_last)
+        self.assertIn("changed", chunks[0].error.lower())
+
+    def test_transfer_offset_beyond_end(self):
+        """Test transfer with an offset past the end of the file."""
+        request = pb2.FileRequest(
+            file_path=self.small_file,
+            offset=os.path.getsize(self.small_file) + 1
+        )
+
+        chunks = list(self.servicer.TransferFile(request, None))
+
+        self.assertEqual(len(chunks), 1)
+        self.assertIn("beyond end", chunks[0].error.lower())
\ No newline at end of file
@@ -0,0 +1,113 @@
+import asyncio
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+from fileservice import file_service_pb2 as pb2
+from fileservice.client import AioChannelPool, AsyncFileClient, ChannelPool, DownloadError, FileClient
+from fileservice.server.aio_server import AioFileServer
+from fileservice.server.local_transport import fd_socket_path
+from fileservice.server.server import FileServer
+from fileservice.server.service import FileServiceServicer
+
+
+class TestLocalTransport(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.temp_dir, "fs.sock")
+        self.path = os.path.join(self.temp_dir, "data.bin")
+        self.data = os.urandom(256 * 1024)
+        with open(self.path, "wb") as f:
+            f.write(self.data)
+
+        # Leave a stale socket file behind, as a crashed server would
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(fd_socket_path(self.socket_path))
+        stale.close()
+
+        self.server = FileServer(ports=[50271, 50272, 50273], unix_socket=self.socket_path)
+        self.assertTrue(self.server.start())
+        self.pool = ChannelPool()
+        self.client = FileClient(f"unix:{self.socket_path}", pool=self.pool)
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def test_unix_socket_listener(self):
+        """Test that the server answers on its Unix socket and removes it on stop."""
+        self.assertTrue(self.client.exists(self.path).exists)
+        self.assertEqual(self.client.read(self.path), self.data)
+
+        self.pool.close()
+        self.server.stop()
+        self.assertFalse(os.path.exists(self.socket_path))
+        self.assertFalse(os.path.exists(fd_socket_path(self.socket_path)))
+
+    def test_open_local(self):
+        """Test receiving a read-only descriptor of the file."""
+        with self.client.open_local(self.path) as f:
+            self.assertEqual(f.read(), self.data)
+            with self.assertRaises(OSError):
+                os.write(f.fileno(), b"x")
+        with self.assertRaises(DownloadError):
+            self.client.open_local(os.path.join(self.temp_dir, "missing"))
+
+    def test_open_local_async(self):
+        """Test the asyncio client."""
+        async def open_local():
+            async with AioChannelPool() as pool:
+                client = AsyncFileClient(f"unix:{self.socket_path}", pool=pool)
+                with await client.open_local(self.path) as f:
+                    return f.read()
+
+        self.assertEqual(asyncio.run(open_local()), self.data)
+
+    def test_refused_over_tcp(self):
+        """Test that descriptors are only handed out on the Unix socket."""
+        client = FileClient(f"localhost:{self.server.port}", pool=self.pool)
+        with self.assertRaisesRegex(DownloadError, "only available over the Unix domain socket"):
+            client.open_local(self.path)
+
+    def test_disabled_without_unix_socket(self):
+        """Test that a servicer without a descriptor socket refuses the RPC."""
+        servicer = FileServiceServicer()
+        try:
+            [response] = servicer.OpenLocalFile(pb2.LocalFileRequest(file_path=self.path), None)
+            self.assertIn("not enabled", response.error)
+        finally:
+            servicer.close()
+
+
+class TestAioLocalTransport(unittest.TestCase):
+    def test_aio_server_unix_socket(self):
+        """Test the Unix socket listener and descriptor passing of the asyncio server."""
+        temp_dir = tempfile.mkdtemp()
+        socket_path = os.path.join(temp_dir, "aio.sock")
+        path = os.path.join(temp_dir, "data.txt")
+        with open(path, "wb") as f:
+            f.write(b"local data")
+
+        async def run():
+            server = AioFileServer(ports=[50274, 50275, 50276], unix_socket=socket_path)
+            self.assertTrue(await server.start())
+            try:
+                async with AioChannelPool() as pool:
+                    client = AsyncFileClient(f"unix:{socket_path}", pool=pool)
+                    with await client.open_local(path) as f:
+                        return f.read()
+            finally:
+                await server.stop()
+
+        try:
+            self.assertEqual(asyncio.run(run()), b"local data")
+            self.assertFalse(os.path.exists(socket_path))
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
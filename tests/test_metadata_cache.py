@@ -0,0 +1,94 @@
+import os
+import tempfile
+import time
+import unittest
+
+from fileservice.server.fs_watcher import FileSystemWatcher
+from fileservice.server.metadata_cache import MetadataCache
+from fileservice.server.service import FileServiceServicer
+
+
+def wait_for(condition, timeout: float = 3.0) -> bool:
+    """Poll until condition() is true or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+class TestMetadataCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, "config.txt")
+        with open(self.file_path, "w") as f:
+            f.write("v1")
+
+    def tearDown(self):
+        for name in os.listdir(self.temp_dir):
+            os.remove(os.path.join(self.temp_dir, name))
+        os.rmdir(self.temp_dir)
+
+    def test_hits_and_misses(self):
+        """Test that repeated lookups are served from the cache."""
+        servicer = FileServiceServicer()
+        try:
+            for _ in range(3):
+                self.assertEqual(servicer._validate_path(self.file_path), (True, None))
+                self.assertEqual(servicer._get_file_metadata(self.file_path).size, 2)
+
+            stats = servicer.metadata_cache.stats()
+            self.assertEqual(stats['misses'], 2)
+            self.assertEqual(stats['hits'], 4)
+        finally:
+            servicer.close()
+
+    def test_invalidated_by_filesystem_events(self):
+        """Test that a change to the file drops its cached metadata."""
+        servicer = FileServiceServicer()
+        try:
+            self.assertEqual(servicer._get_file_metadata(self.file_path).size, 2)
+            with open(self.file_path, "w") as f:
+                f.write("version 2")
+
+            self.assertTrue(wait_for(
+                lambda: servicer._get_file_metadata(self.file_path).size == 9))
+            self.assertGreater(servicer.metadata_cache.stats()['invalidations'], 0)
+        finally:
+            servicer.close()
+
+    def test_negative_result_invalidated_on_create(self):
+        """Test that creating a missing file is picked up."""
+        servicer = FileServiceServicer()
+        new_file = os.path.join(self.temp_dir, "new.txt")
+        try:
+            self.assertFalse(servicer._validate_path(new_file)[0])
+            with open(new_file, "w") as f:
+                f.write("created")
+
+            self.assertTrue(wait_for(lambda: servicer._validate_path(new_file)[0]))
+        finally:
+            servicer.close()
+
+    def test_ttl_fallback_without_watcher(self):
+        """Test that entries expire when their directory can't be watched."""
+        cache = MetadataCache(ttl=0.05, watcher=FileSystemWatcher(max_watches=0))
+        token = cache.begin(self.file_path)
+        cache.put('metadata', self.file_path, 'value', token)
+
+        self.assertEqual(cache.get('metadata'), 'value')
+        time.sleep(0.1)
+        self.assertIsNone(cache.get('metadata'))
+        cache.close()
+
+    def test_lru_eviction(self):
+        """Test that the cache stays within its entry bound."""
+        cache = MetadataCache(max_entries=2, watcher=FileSystemWatcher(max_watches=0))
+        for key in ('a', 'b', 'c'):
+            cache.put(key, self.file_path, key, cache.begin(self.file_path))
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('c'), 'c')
+        self.assertEqual(cache.stats()['evictions'], 1)
+        cache.close()
@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+import urllib.request
+
+from fileservice import file_service_pb2 as pb2
+from fileservice.server.metrics import (
+    Counter,
+    Histogram,
+    MetricsRegistry,
+    MetricsServer,
+    ServiceMetrics,
+)
+from fileservice.server.service import FileServiceServicer
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, "data.bin")
+        self.data = os.urandom(300 * 1024)
+        with open(self.file_path, "wb") as f:
+            f.write(self.data)
+        self.metrics = ServiceMetrics()
+        self.servicer = FileServiceServicer(metrics=self.metrics, upload_roots=[self.temp_dir])
+
+    def tearDown(self):
+        self.servicer.close()
+        for name in os.listdir(self.temp_dir):
+            os.remove(os.path.join(self.temp_dir, name))
+        os.rmdir(self.temp_dir)
+
+    def test_text_format(self):
+        """Test counter and histogram rendering in the Prometheus text format."""
+        registry = MetricsRegistry()
+        counter = registry.register(Counter('requests_total', 'Requests', ('rpc',)))
+        histogram = registry.register(Histogram('size_bytes', 'Sizes', ('rpc',), (10, 100)))
+        counter.inc(('a"b',), 2)
+        histogram.observe(5, ('x',))
+        histogram.observe(50, ('x',))
+        histogram.observe(500, ('x',))
+
+        lines = registry.render().splitlines()
+        self.assertIn('# TYPE requests_total counter', lines)
+        self.assertIn('requests_total{rpc="a\\"b"} 2', lines)
+        self.assertIn('size_bytes_bucket{rpc="x",le="10"} 1', lines)
+        self.assertIn('size_bytes_bucket{rpc="x",le="100"} 2', lines)
+        self.assertIn('size_bytes_bucket{rpc="x",le="+Inf"} 3', lines)
+        self.assertIn('size_bytes_sum{rpc="x"} 555.0', lines)
+        self.assertIn('size_bytes_count{rpc="x"} 3', lines)
+
+    def test_stream_metrics(self):
+        """Test that a transfer records its outcome, bytes and chunk sizes."""
+        request = pb2.FileRequest(file_path=self.file_path, chunk_size=64 * 1024)
+        chunks = list(self.servicer.TransferFile(request, None))
+
+        labels = ('TransferFile',)
+        self.assertEqual(self.metrics.requests.value(('TransferFile', 'ok')), 1)
+        self.assertEqual(self.metrics.bytes_sent.value(labels), len(self.data))
+        self.assertEqual(self.metrics.messages_sent.value(labels), len(chunks))
+        self.assertEqual(self.metrics.active.value(labels), 0)
+        self.assertIn('fileservice_chunk_size_bytes_count{rpc="TransferFile"} 5',
+                      self.metrics.registry.render())
+
+    def test_error_and_cancelled_streams(self):
+        """Test that error responses and abandoned streams are counted separately."""
+        missing = pb2.FileRequest(file_path=os.path.join(self.temp_dir, "missing"))
+        list(self.servicer.GetFileContents(missing, None))
+        self.assertEqual(self.metrics.requests.value(('GetFileContents', 'error')), 1)
+
+        request = pb2.FileRequest(file_path=self.file_path, chunk_size=1024)
+        stream = self.servicer.GetFileContents(request, None)
+        next(stream)
+        stream.close()
+        self.assertEqual(self.metrics.requests.value(('GetFileContents', 'cancelled')), 1)
+        self.assertEqual(self.metrics.active.value(('GetFileContents',)), 0)
+
+    def test_unary_and_upload_metrics(self):
+        """Test IsFileExists outcome and UploadFile received bytes."""
+        self.servicer.IsFileExists(pb2.FileRequest(file_path=self.file_path), None)
+        self.assertEqual(self.metrics.requests.value(('IsFileExists', 'ok')), 1)
+
+        target = os.path.join(self.temp_dir, "upload.bin")
+        chunks = [
+            pb2.UploadChunk(file_path=target, total_size=6, content=b"abc", offset=0),
+            pb2.UploadChunk(content=b"def", offset=3, is_last=True),
+        ]
+        response = self.servicer.UploadFile(iter(chunks), None)
+        self.assertTrue(response.success)
+        self.assertEqual(self.metrics.bytes_received.value(('UploadFile',)), 6)
+        self.assertEqual(self.metrics.requests.value(('UploadFile', 'ok')), 1)
+
+    def test_http_endpoint(self):
+        """Test scraping /metrics over HTTP, including component stats."""
+        list(self.servicer.TransferFile(pb2.FileRequest(file_path=self.file_path), None))
+        server = MetricsServer(self.metrics.registry, port=0)
+        port = server.start()
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+                self.assertTrue(response.headers['Content-Type'].startswith('text/plain'))
+                body = response.read().decode()
+        finally:
+            server.stop()
+
+        self.assertIn('fileservice_rpc_requests_total{rpc="TransferFile",status="ok"} 1', body)
+        self.assertIn('fileservice_content_cache_hit_ratio', body)
+        self.assertIn('fileservice_bandwidth_throttle_seconds', body)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+
+from fileservice.client import DownloadError, ParallelDownloader
+from fileservice.server.server import FileServer
+
+
+class TestParallelDownload(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Start a server for the downloader to talk to."""
+        cls.server = FileServer(ports=[50161, 50162, 50163])
+        assert cls.server.start()
+        cls.target = f"localhost:{cls.server.port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.temp_dir, "source.bin")
+        with open(self.source, "wb") as f:
+            f.write(os.urandom(3 * 1024 * 1024 + 123))
+
+    def tearDown(self):
+        for name in os.listdir(self.temp_dir):
+            os.remove(os.path.join(self.temp_dir, name))
+        os.rmdir(self.temp_dir)
+
+    def test_download_in_parallel_ranges(self):
+        """Test that ranges are reassembled into an identical file."""
+        destination = os.path.join(self.temp_dir, "copy.bin")
+        downloader = ParallelDownloader(
+            self.target, streams=4, chunk_size=64 * 1024, min_range_size=512 * 1024)
+
+        result = downloader.download(self.source, destination)
+
+        self.assertEqual(result.streams, 4)
+        self.assertEqual(result.size, os.path.getsize(self.source))
+        self.assertGreater(result.throughput, 0)
+        with open(self.source, "rb") as a, open(destination, "rb") as b:
+            self.assertEqual(a.read(), b.read())
+
+    def test_download_empty_file(self):
+        """Test downloading a zero-byte file."""
+        empty = os.path.join(self.temp_dir, "empty.bin")
+        open(empty, "wb").close()
+        destination = os.path.join(self.temp_dir, "empty_copy.bin")
+
+        result = ParallelDownloader(self.target).download(empty, destination)
+
+        self.assertEqual(result.size, 0)
+        self.assertEqual(os.path.getsize(destination), 0)
+
+    def test_failed_range_keeps_existing_file(self):
+        """Test that a failing range leaves an existing destination untouched."""
+        destination = os.path.join(self.temp_dir, "copy.bin")
+        with open(destination, "wb") as f:
+            f.write(b"previous version")
+
+        class StaleDownloader(ParallelDownloader):
+            def _probe(self, stub, remote_path):
+                size, _ = super()._probe(stub, remote_path)
+                return size, "stale-token"
+
+        downloader = StaleDownloader(self.target, streams=4, min_range_size=512 * 1024)
+        with self.assertRaises(DownloadError):
+            downloader.download(self.source, destination)
+
+        with open(destination, "rb") as f:
+            self.assertEqual(f.read(), b"previous version")
+        self.assertFalse(os.path.exists(destination + ".partial"))
+
+    def test_download_nonexistent_file(self):
+        """Test that a missing remote file raises DownloadError."""
+        with self.assertRaises(DownloadError):
+            ParallelDownloader(self.target).download(
+                os.path.join(self.temp_dir, "missing.bin"),
+                os.path.join(self.temp_dir, "out.bin"))
@@ -0,0 +1,96 @@
+import json
+import os
+import signal
+import tempfile
+import time
+import unittest
+import urllib.error
+import urllib.request
+
+import grpc
+
+from fileservice import file_service_pb2 as pb2
+from fileservice import file_service_pb2_grpc as pb2_grpc
+from fileservice.server.main import parse_args, run_worker
+from fileservice.server.metrics import MetricsServer
+from fileservice.server.prefork import DEGRADED, NOT_SERVING, SERVING, PreforkServer
+from fileservice.server.server import FileServer
+
+
+def wait_for(condition, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+class TestReusePort(unittest.TestCase):
+    def test_servers_share_port(self):
+        """Test that FileServers with reuse_port can listen on the same port."""
+        first = FileServer(ports=[50241], reuse_port=True)
+        second = FileServer(ports=[50241], reuse_port=True)
+        try:
+            self.assertTrue(first.start())
+            self.assertTrue(second.start())
+            self.assertEqual(first.port, second.port)
+        finally:
+            first.stop()
+            second.stop()
+
+
+class TestPreforkServer(unittest.TestCase):
+    def setUp(self):
+        args = parse_args(['--max-workers', '4', '--content-cache-mb', '0'])
+        self.server = PreforkServer(2, run_worker, (args,), ports=[50242, 50243], report_interval=0.2)
+        self.assertTrue(self.server.start())
+        self.assertTrue(wait_for(lambda: self.server.health()['status'] == SERVING))
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_serving_and_health(self):
+        """Test that workers serve requests and report aggregated counters."""
+        with tempfile.NamedTemporaryFile() as f:
+            for _ in range(4):
+                # A fresh channel per call lets the kernel pick a worker each time
+                with grpc.insecure_channel(f"localhost:{self.server.port}") as channel:
+                    stub = pb2_grpc.FileServiceStub(channel)
+                    self.assertTrue(stub.IsFileExists(pb2.FileRequest(file_path=f.name)).exists)
+
+        health = self.server.health()
+        self.assertEqual(len({worker['pid'] for worker in health['workers']}), 2)
+        self.assertTrue(wait_for(lambda: self.server.health()['totals'].get('requests') == 4))
+        self.assertIn('fileservice_workers{state="healthy"} 2', self.server.registry.render())
+
+        metrics_server = MetricsServer(self.server.registry, 0, health=self.server.health)
+        port = metrics_server.start()
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health") as response:
+                self.assertEqual(json.load(response)['status'], SERVING)
+        finally:
+            metrics_server.stop()
+
+    def test_restarts_dead_worker(self):
+        """Test that a killed worker degrades health until it is replaced."""
+        victim = self.server.health()['workers'][0]
+        os.kill(victim['pid'], signal.SIGKILL)
+        self.assertTrue(wait_for(lambda: self.server.health()['status'] == DEGRADED, 5))
+        self.assertTrue(wait_for(lambda: self.server.health()['status'] == SERVING))
+
+        worker = self.server.health()['workers'][0]
+        self.assertNotEqual(worker['pid'], victim['pid'])
+        self.assertEqual(worker['restarts'], 1)
+
+    def test_graceful_stop(self):
+        """Test that stop() shuts workers down through their SIGTERM handlers."""
+        processes = [status.process for status in self.server._statuses]
+        self.server.stop(grace=1.0)
+        self.assertEqual([process.exitcode for process in processes], [0, 0])
+        self.assertEqual(self.server.health()['status'], NOT_SERVING)
+        self.assertIsNone(self.server.port)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import json
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+
+from fileservice import file_service_pb2 as pb2
+from fileservice.server.profiling import RpcProfiler
+from fileservice.server.service import FileServiceServicer
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.profile_dir = os.path.join(self.temp_dir, "profiles")
+        self.file_path = os.path.join(self.temp_dir, "data.bin")
+        self.data = os.urandom(200 * 1024)
+        with open(self.file_path, "wb") as f:
+            f.write(self.data)
+        self.profiler = RpcProfiler(directory=self.profile_dir)
+        self.servicer = FileServiceServicer(profiler=self.profiler)
+
+    def tearDown(self):
+        self.servicer.close()
+        shutil.rmtree(self.temp_dir)
+
+    def summaries(self):
+        if not os.path.isdir(self.profile_dir):
+            return []
+        result = []
+        for name in sorted(os.listdir(self.profile_dir)):
+            if name.endswith('.json'):
+                with open(os.path.join(self.profile_dir, name)) as f:
+                    result.append(json.load(f))
+        return result
+
+    def test_disabled_by_default(self):
+        """Test that nothing is profiled at the default sample rate."""
+        list(self.servicer.TransferFile(pb2.FileRequest(file_path=self.file_path), None))
+        self.assertEqual(self.summaries(), [])
+        self.assertEqual(self.profiler.sampled, 0)
+
+    def test_stream_profile(self):
+        """Test that a sampled transfer writes a tagged summary and a loadable profile."""
+        self.profiler.configure(sample_rate=1.0)
+        request = pb2.FileRequest(file_path=self.file_path, chunk_size=64 * 1024)
+        chunks = list(self.servicer.TransferFile(request, None))
+        self.assertEqual(b''.join(chunk.content for chunk in chunks), self.data)
+
+        [summary] = self.summaries()
+        self.assertEqual(summary['rpc'], 'TransferFile')
+        self.assertEqual(summary['path'], self.file_path)
+        self.assertEqual(summary['file_size'], len(self.data))
+        self.assertEqual(summary['status'], 'ok')
+        self.assertEqual(summary['bytes_sent'], len(self.data))
+        self.assertEqual(summary['messages'], len(chunks))
+        self.assertTrue(summary['cpu'])
+        self.assertNotIn('allocations', summary)
+        stats = pstats.Stats(summary['profile'])
+        self.assertTrue(stats.total_calls)
+
+    def test_unary_and_runtime_toggle(self):
+        """Test unary profiling and switching sampling off while running."""
+        self.profiler.configure(sample_rate=1.0)
+        request = pb2.FileRequest(file_path=self.file_path)
+        self.assertTrue(self.servicer.IsFileExists(request, None).exists)
+        self.profiler.configure(sample_rate=0.0)
+        self.servicer.IsFileExists(request, None)
+
+        [summary] = self.summaries()
+        self.assertEqual(summary['rpc'], 'IsFileExists')
+        self.assertEqual(self.profiler.sampled, 1)
+
+    def test_memory_tracing(self):
+        """Test that allocation sites are recorded when memory tracing is on."""
+        self.profiler.configure(sample_rate=1.0, cpu=False, memory=True)
+        list(self.servicer.GetFileContents(pb2.FileRequest(file_path=self.file_path), None))
+
+        [summary] = self.summaries()
+        self.assertIn('allocations', summary)
+        self.assertNotIn('cpu', summary)
+        self.assertNotIn('profile', summary)
+
+    def test_error_and_cancelled_status(self):
+        """Test that error responses and abandoned streams are tagged as such."""
+        self.profiler.configure(sample_rate=1.0)
+        missing = pb2.FileRequest(file_path=os.path.join(self.temp_dir, "missing"))
+        list(self.servicer.GetFileContents(missing, None))
+        stream = self.servicer.GetFileContents(
+            pb2.FileRequest(file_path=self.file_path, chunk_size=1024), None)
+        next(stream)
+        stream.close()
+
+        self.assertEqual([summary['status'] for summary in self.summaries()], ['error', 'cancelled'])
+
+    def test_rotation(self):
+        """Test that only the newest max_files profiles are kept."""
+        self.profiler.configure(sample_rate=1.0)
+        self.profiler.max_files = 3
+        request = pb2.FileRequest(file_path=self.file_path)
+        for _ in range(5):
+            self.servicer.IsFileExists(request, None)
+
+        names = os.listdir(self.profile_dir)
+        self.assertEqual(len([name for name in names if name.endswith('.json')]), 3)
+        self.assertEqual(len([name for name in names if name.endswith('.prof')]), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from fileservice import file_service_pb2 as pb2
+from fileservice.server.chunk_source import FileChunkSource
+from fileservice.server.content_cache import ContentCache
+from fileservice.server.read_coalescer import ReadCoalescer
+from fileservice.server.service import FileServiceServicer
+
+BLOCK = 4096
+
+
+class TestReadCoalescer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, "data.bin")
+        self.data = os.urandom(10 * BLOCK + 123)
+        with open(self.file_path, "wb") as f:
+            f.write(self.data)
+        self.files = []
+
+    def tearDown(self):
+        for file in self.files:
+            file.close()
+        os.remove(self.file_path)
+        os.rmdir(self.temp_dir)
+
+    def open_source(self, coalescer):
+        file = open(self.file_path, "rb")
+        self.files.append(file)
+        stat = os.fstat(file.fileno())
+        return coalescer.open(file, stat, FileChunkSource(file, stat.st_size))
+
+    def read_all(self, source, chunk_size=3000):
+        return b''.join(bytes(source.read(offset, chunk_size))
+                        for offset in range(0, source.size, chunk_size))
+
+    def test_lockstep_streams_share_reads(self):
+        """Test that streams reading together read each block from disk once."""
+        coalescer = ReadCoalescer(block_size=BLOCK, ring_blocks=4)
+        first = self.open_source(coalescer)
+        second = self.open_source(coalescer)
+
+        for offset in range(0, len(self.data), 5000):
+            self.assertEqual(bytes(first.read(offset, 5000)), self.data[offset:offset + 5000])
+            self.assertEqual(bytes(second.read(offset, 5000)), self.data[offset:offset + 5000])
+        first.close()
+        second.close()
+
+        stats = coalescer.stats()
+        self.assertEqual(stats['block_reads'], 11)
+        self.assertGreaterEqual(stats['block_hits'], 11)
+        self.assertEqual(stats['fallbacks'], 0)
+        self.assertEqual(stats['files'], 0)
+
+    def test_lone_stream_reads_directly(self):
+        """Test that no ring is filled while a file has a single stream."""
+        coalescer = ReadCoalescer(block_size=BLOCK, ring_blocks=4)
+        with self.open_source(coalescer) as source:
+            self.assertEqual(self.read_all(source), self.data)
+        self.assertEqual(coalescer.stats()['block_reads'], 0)
+
+    def test_slow_stream_falls_back(self):
+        """Test that a stream left behind by the ring reads on its own."""
+        coalescer = ReadCoalescer(block_size=BLOCK, ring_blocks=2)
+        fast = self.open_source(coalescer)
+        slow = self.open_source(coalescer)
+
+        self.assertEqual(self.read_all(fast), self.data)
+        self.assertEqual(self.read_all(slow), self.data)
+        self.assertEqual(coalescer.stats()['fallbacks'], 1)
+        fast.close()
+        slow.close()
+        self.assertEqual(coalescer.stats()['files'], 0)
+
+    def test_changed_file_is_not_shared(self):
+        """Test that streams of different file versions get separate readers."""
+        coalescer = ReadCoalescer(block_size=BLOCK, ring_blocks=4)
+        old = self.open_source(coalescer)
+        os.utime(self.file_path, ns=(0, 12345))
+        new = self.open_source(coalescer)
+        self.assertEqual(coalescer.stats()['files'], 2)
+        old.close()
+        new.close()
+
+    def test_disabled(self):
+        """Test that a zero-sized ring returns the stream's own source."""
+        coalescer = ReadCoalescer(ring_blocks=0)
+        source = self.open_source(coalescer)
+        self.assertIsInstance(source, FileChunkSource)
+
+    def test_concurrent_transfers(self):
+        """Test TransferFile content with many simultaneous streams of one file."""
+        coalescer = ReadCoalescer(block_size=BLOCK, ring_blocks=4)
+        servicer = FileServiceServicer(
+            read_coalescer=coalescer, content_cache=ContentCache(max_bytes=0))
+        request = pb2.FileRequest(file_path=self.file_path, chunk_size=2000)
+        results = [None] * 8
+        barrier = threading.Barrier(len(results))
+
+        def transfer(i):
+            barrier.wait()
+            chunks = list(servicer.TransferFile(request, None))
+            results[i] = b''.join(chunk.content for chunk in chunks)
+
+        threads = [threading.Thread(target=transfer, args=(i,)) for i in range(len(results))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        servicer.close()
+
+        for result in results:
+            self.assertEqual(result, self.data)
+        stats = coalescer.stats()
+        self.assertEqual(stats['streams'], 8)
+        self.assertEqual(stats['files'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
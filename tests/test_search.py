@@ -0,0 +1,145 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from concurrent import futures
+
+from fileservice import file_service_pb2 as pb2
+from fileservice.client import ChannelPool, DownloadError, FileClient
+from fileservice.server.search import SEARCH_WINDOW, ContentMatcher, DirectorySearch, search_file
+from fileservice.server.server import FileServer
+from fileservice.server.service import FileServiceServicer
+
+
+class TestSearch(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.write("app.log", b"start\nok\nFATAL: segfault in worker\nok\n")
+        self.write("other.log", b"nothing here\n")
+        self.write("nested/deep/db.log", b"fatal: disk full\nretry\nFATAL: segfault in db\n")
+        self.write("nested/readme.txt", b"FATAL: segfault is documented here\n")
+        self.big = b"x" * (SEARCH_WINDOW + 1000) + b"\nFATAL: segfault at the end\n"
+        self.write("big.log", self.big)
+        self.servicer = FileServiceServicer()
+
+    def tearDown(self):
+        self.servicer.close()
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, name, data):
+        path = os.path.join(self.temp_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def search(self, **kwargs):
+        request = pb2.SearchRequest(directory_path=self.temp_dir, **kwargs)
+        responses = list(self.servicer.SearchFiles(request, None))
+        self.assertTrue(responses[-1].is_last)
+        matches = [match for response in responses for match in response.matches]
+        return sorted(matches, key=lambda m: (m.path, m.offset)), responses[-1]
+
+    def test_literal_search(self):
+        """Test matches carry offsets, line numbers and lines, including past the first window."""
+        matches, last = self.search(query="FATAL: segfault", patterns=["*.log"])
+
+        self.assertEqual([m.path for m in matches], ["app.log", "big.log", "nested/deep/db.log"])
+        app, big, db = matches
+        self.assertEqual((app.offset, app.length, app.line_number), (9, 15, 3))
+        self.assertEqual(app.line, "FATAL: segfault in worker")
+        self.assertEqual(big.offset, self.big.index(b"FATAL"))
+        self.assertEqual(big.line_number, 2)
+        self.assertEqual(big.line, "FATAL: segfault at the end")
+        self.assertEqual(db.line_number, 3)
+        self.assertEqual(last.files_scanned, 4)
+        self.assertFalse(last.truncated)
+
+    def test_regex_ignore_case(self):
+        """Test regular expressions with case folding and line anchors."""
+        matches, _ = self.search(query=r"^fatal: \w+", regex=True, ignore_case=True,
+                                 patterns=["db.log"])
+        self.assertEqual([m.line for m in matches], ["fatal: disk full", "FATAL: segfault in db"])
+
+    def test_name_only_search(self):
+        """Test matching names by glob with a depth limit and no query."""
+        matches, last = self.search(patterns=["*.log"], max_depth=2)
+        self.assertEqual([m.path for m in matches], ["app.log", "big.log", "other.log"])
+        self.assertEqual(last.files_scanned, 0)
+
+    def test_result_limits(self):
+        """Test stopping at max_results and capping matches per file."""
+        matches, last = self.search(query="FATAL", max_results=2)
+        self.assertEqual(len(matches), 2)
+        self.assertTrue(last.truncated)
+
+        matches, last = self.search(query="ok", max_matches_per_file=1, patterns=["app.log"])
+        self.assertEqual([m.line_number for m in matches], [2])
+        self.assertFalse(last.truncated)
+
+    def test_max_file_size(self):
+        """Test that files above max_file_size are skipped."""
+        matches, last = self.search(query="FATAL", max_file_size=1024)
+        self.assertNotIn("big.log", [m.path for m in matches])
+        self.assertEqual(last.bytes_scanned, sum(
+            os.path.getsize(os.path.join(self.temp_dir, name))
+            for name in ("app.log", "other.log", "nested/deep/db.log", "nested/readme.txt")))
+
+    def test_errors(self):
+        """Test invalid expressions and missing directories."""
+        _, last = self.search(query="(", regex=True)
+        self.assertIn("Invalid regular expression", last.error)
+        request = pb2.SearchRequest(directory_path=os.path.join(self.temp_dir, "none"))
+        [last] = self.servicer.SearchFiles(request, None)
+        self.assertEqual(last.error, "Directory does not exist")
+
+    def test_stop_event(self):
+        """Test that a stopped search doesn't open more files."""
+        stop = threading.Event()
+        stop.set()
+        path = os.path.join(self.temp_dir, "app.log")
+        self.assertEqual(search_file(path, "app.log", ContentMatcher("FATAL"), stop=stop), ([], 0))
+
+    def test_windows(self):
+        """Test that searching in small windows finds what a whole-file search does."""
+        data = b"".join(b"line %d%s\n" % (i, b" FATAL" if i % 7 == 0 else b"") for i in range(300))
+        self.write("windows.log", data)
+        path = os.path.join(self.temp_dir, "windows.log")
+        matcher = ContentMatcher(r"^line \d+ FATAL$", regex=True)
+
+        expected = matcher.search("windows.log", data)
+        self.assertEqual(len(expected), 43)
+        self.assertEqual(search_file(path, "windows.log", matcher, window=64), (expected, len(data)))
+        hits, _ = search_file(path, "windows.log", matcher, max_matches=5, window=64)
+        self.assertEqual(hits, expected[:5])
+
+    def test_one_pending(self):
+        """Test that the walk completes when only one scan or search may run at a time."""
+        with futures.ThreadPoolExecutor(2) as executor:
+            search = DirectorySearch(self.temp_dir, executor, ContentMatcher("FATAL"), max_pending=1)
+            paths = sorted(hit.path for hits in search for hit in hits)
+        self.assertEqual(paths, ["app.log", "big.log", "nested/deep/db.log", "nested/readme.txt"])
+
+
+class TestSearchClient(unittest.TestCase):
+    def test_client_search(self):
+        """Test searching through the client library."""
+        temp_dir = tempfile.mkdtemp()
+        server = FileServer(ports=[50221, 50222, 50223])
+        self.assertTrue(server.start())
+        try:
+            with open(os.path.join(temp_dir, "a.log"), "w") as f:
+                f.write("one\nneedle\n")
+            with ChannelPool() as pool:
+                client = FileClient(f"localhost:{server.port}", pool=pool)
+                [match] = client.search(temp_dir, "needle")
+                self.assertEqual((match.path, match.line_number), ("a.log", 2))
+                with self.assertRaises(DownloadError):
+                    list(client.search(os.path.join(temp_dir, "missing")))
+        finally:
+            server.stop()
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+from fileservice import file_service_pb2 as pb2
+from fileservice.client import AioChannelPool, AsyncFileClient, ChannelPool, DownloadError, FileClient
+from fileservice.server.sendfile import SendfileListener
+from fileservice.server.server import FileServer
+from fileservice.server.service import FileServiceServicer
+from fileservice.server.tickets import TicketRegistry, recv_exactly
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTickets(unittest.TestCase):
+    def test_claim_once(self):
+        """Test that a token can be claimed once and only while valid."""
+        clock = FakeClock()
+        registry = TicketRegistry(ttl=10, clock=clock)
+        first, second = socket.socketpair()
+        try:
+            ticket = registry.issue()
+            self.assertFalse(registry.claim("0" * 32, first))
+            self.assertTrue(registry.claim(ticket.token, first))
+            self.assertFalse(registry.claim(ticket.token, second))
+            self.assertIs(ticket.wait(0), first)
+
+            expired = registry.issue()
+            clock.now = 11
+            self.assertFalse(registry.claim(expired.token, second))
+            self.assertEqual(registry.stats()['rejected'], 3)
+        finally:
+            first.close()
+            second.close()
+
+    def test_cancel_and_expiry(self):
+        """Test that cancelled or unclaimed tickets are withdrawn."""
+        registry = TicketRegistry()
+        connection, other = socket.socketpair()
+        try:
+            ticket = registry.issue()
+            ticket.cancel()
+            self.assertFalse(registry.claim(ticket.token, connection))
+
+            unclaimed = registry.issue()
+            self.assertIsNone(unclaimed.wait(0.01))
+            self.assertEqual(len(registry), 0)
+        finally:
+            connection.close()
+            other.close()
+
+
+class TestSendfileService(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "data.bin")
+        self.data = os.urandom(3 * 1024 * 1024 + 123)
+        with open(self.path, "wb") as f:
+            f.write(self.data)
+        self.listener = SendfileListener(host='127.0.0.1', registry=TicketRegistry(ttl=2))
+        self.servicer = FileServiceServicer(sendfile=self.listener)
+
+    def tearDown(self):
+        self.servicer.close()
+        shutil.rmtree(self.temp_dir)
+
+    def fetch(self, ticket, token=None):
+        with socket.create_connection(("127.0.0.1", ticket.port)) as sock:
+            sock.sendall((token or ticket.token).encode())
+            return recv_exactly(sock, ticket.length + 1)
+
+    def transfer(self, **kwargs):
+        responses = self.servicer.OpenSendfile(pb2.SendfileRequest(file_path=self.path, **kwargs), None)
+        ticket = next(responses)
+        self.assertFalse(ticket.error)
+        received = {}
+        reader = threading.Thread(target=lambda: received.update(data=self.fetch(ticket)))
+        reader.start()
+        last = next(responses)
+        reader.join()
+        self.assertTrue(last.is_last)
+        return ticket, received['data'], last
+
+    def test_whole_file(self):
+        """Test sending a whole file with its checksums in the last message."""
+        ticket, data, last = self.transfer(checksums=["sha256"], include_metadata=True)
+        self.assertEqual(data, self.data)
+        self.assertEqual((ticket.offset, ticket.length), (0, len(self.data)))
+        self.assertEqual(ticket.metadata.size, len(self.data))
+        self.assertEqual(last.bytes_sent, len(self.data))
+        self.assertEqual(last.checksums["sha256"], hashlib.sha256(self.data).hexdigest())
+
+    def test_range(self):
+        """Test sending a byte range."""
+        _, data, last = self.transfer(offset=1000, length=5000, checksums=["sha256"])
+        self.assertEqual(data, self.data[1000:6000])
+        self.assertEqual(last.checksums["sha256"], hashlib.sha256(data).hexdigest())
+
+    def test_invalid_token_and_expiry(self):
+        """Test that a wrong token gets no data and an unused ticket expires."""
+        responses = self.servicer.OpenSendfile(pb2.SendfileRequest(file_path=self.path), None)
+        ticket = next(responses)
+        self.assertEqual(self.fetch(ticket, token="f" * 32), b"")
+        last = next(responses)
+        self.assertEqual(last.error, "Side channel was not opened in time")
+
+    def test_request_errors(self):
+        """Test missing files and offsets past the end."""
+        [last] = self.servicer.OpenSendfile(
+            pb2.SendfileRequest(file_path=os.path.join(self.temp_dir, "none")), None)
+        self.assertEqual(last.error, "File does not exist")
+        [last] = self.servicer.OpenSendfile(
+            pb2.SendfileRequest(file_path=self.path, offset=len(self.data) + 1), None)
+        self.assertIn("beyond end of file", last.error)
+
+
+class TestSendfileClient(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FileServer(ports=[50251, 50252, 50253])
+        assert cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "big.bin")
+        self.data = os.urandom(5 * 1024 * 1024)
+        with open(self.path, "wb") as f:
+            f.write(self.data)
+        self.target = f"localhost:{self.server.port}"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read(self, path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    def test_download_sendfile(self):
+        """Test whole-file and range downloads with checksum verification."""
+        with ChannelPool() as pool:
+            client = FileClient(self.target, pool=pool)
+            local_path = os.path.join(self.temp_dir, "copy.bin")
+            result = client.download_sendfile(self.path, local_path)
+            self.assertEqual(result.size, len(self.data))
+            self.assertEqual(self.read(local_path), self.data)
+            self.assertTrue(result.resume_token)
+
+            part_path = os.path.join(self.temp_dir, "part.bin")
+            client.download_sendfile(self.path, part_path, offset=100, length=1000, checksum="sha256")
+            self.assertEqual(self.read(part_path), self.data[100:1100])
+
+            with self.assertRaises(DownloadError):
+                client.download_sendfile(os.path.join(self.temp_dir, "none"), part_path)
+            self.assertFalse(os.path.exists(part_path + ".partial"))
+
+    def test_async_download_sendfile(self):
+        """Test the asyncio client."""
+        local_path = os.path.join(self.temp_dir, "async.bin")
+
+        async def download():
+            async with AioChannelPool() as pool:
+                client = AsyncFileClient(self.target, pool=pool)
+                return await client.download_sendfile(self.path, local_path)
+
+        result = asyncio.run(download())
+        self.assertEqual(result.size, len(self.data))
+        self.assertEqual(self.read(local_path), self.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,48 @@
 """Basic server initialization test."""
+import os
+import tempfile
+import threading
 import unittest
+
+import grpc
+
+from fileservice import file_service_pb2 as pb2
+from fileservice import file_service_pb2_grpc as pb2_grpc
+from fileservice.server.bandwidth import BandwidthLimiter
 from fileservice.server.server import FileServer
+from fileservice.server.service import FileServiceServicer
+
 
 class TestFileServer(unittest.TestCase):
     def test_server_initialization(self):
         """Test basic server initialization."""
         server = FileServer()
-        self.assertIsNotNone(server)
\ No newline at end of file
+        self.assertIsNotNone(server)
+
+    def test_stop_waits_for_grace_period(self):
+        """Test that in-flight RPCs finish before the servicer is closed."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "data.bin")
+            data = os.urandom(512 * 1024)
+            with open(path, "wb") as f:
+                f.write(data)
+
+            service = FileServiceServicer(bandwidth=BandwidthLimiter(global_rate=512 * 1024))
+            active_at_close = []
+            close = service.close
+            service.close = lambda: (active_at_close.append(service.metrics.active.total()), close())
+            server = FileServer(ports=[50291, 50292, 50293], service=service)
+            self.assertTrue(server.start())
+
+            with grpc.insecure_channel(f"localhost:{server.port}") as channel:
+                stub = pb2_grpc.FileServiceStub(channel)
+                responses = stub.TransferFile(pb2.FileRequest(file_path=path, chunk_size=64 * 1024))
+                received = [next(responses)]
+                stopper = threading.Thread(target=server.stop, kwargs={'grace': 10})
+                stopper.start()
+                received.extend(responses)
+                stopper.join()
+
+            self.assertEqual(active_at_close, [0])
+            self.assertTrue(received[-1].is_last)
+            self.assertEqual(b"".join(r.content for r in received), data)
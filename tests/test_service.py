@@ -73,7 +73,35 @@ class TestFileService(unittest.TestCase):
         response = self.servicer.IsFileExists(request, None)
 
         self.assertFalse(response.exists)
-        self.assertIsNone(response.metadata)
+        self.assertFalse(response.HasField("metadata"))
+
+    def test_is_file_exists_without_metadata(self):
+        """Test IsFileExists leaves metadata unset unless requested."""
+        request = pb2.FileRequest(file_path=self.test_file_path)
+
+        response = self.servicer.IsFileExists(request, None)
+
+        self.assertTrue(response.exists)
+        self.assertFalse(response.HasField("metadata"))
+
+    def test_batch_file_exists(self):
+        """Test BatchFileExists with a mix of existing and missing paths."""
+        paths = [self.test_file_path, os.path.join(self.temp_dir, "missing.txt")] * 300
+        request = pb2.BatchFileRequest(
+            file_paths=paths,
+            include_metadata=True,
+            batch_size=100
+        )
+
+        batches = list(self.servicer.BatchFileExists(request, None))
+
+        results = [result for batch in batches for result in batch.results]
+        self.assertEqual(len(batches), 6)
+        self.assertEqual(sorted(result.index for result in results), list(range(len(paths))))
+        for result in results:
+            self.assertEqual(result.file_path, paths[result.index])
+            self.assertEqual(result.exists, result.index % 2 == 0)
+            self.assertEqual(result.HasField("metadata"), result.exists)
 
     def test_get_file_contents_success(self):
         """Test GetFileContents with valid file."""
@@ -100,6 +128,25 @@ class TestFileService(unittest.TestCase):
             original = f.read()
         self.assertEqual(content, original)
 
+    def test_get_file_contents_range(self):
+        """Test GetFileContents with an offset and length."""
+        request = pb2.FileRequest(
+            file_path=self.test_file_path,
+            chunk_size=1024,
+            offset=13,
+            length=2600
+        )
+
+        chunks = list(self.servicer.GetFileContents(request, None))
+
+        content = b''.join(chunk.content for chunk in chunks)
+        with open(self.test_file_path, 'rb') as f:
+            f.seek(13)
+            original = f.read(2600)
+        self.assertEqual(content, original)
+        self.assertTrue(chunks[0].resume_token)
+        self.assertTrue(chunks[-1].is_last)
+
     def test_get_file_contents_no_permission(self):
         """Test GetFileContents with no read permission."""
         request = pb2.FileRequest(
@@ -0,0 +1,195 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from fileservice import file_service_pb2 as pb2
+from fileservice.client import ChannelPool, DownloadError, FileClient
+from fileservice.server.fs_watcher import FileSystemWatcher
+from fileservice.server.server import FileServer
+from fileservice.server.service import FileServiceServicer
+from fileservice.server.tail import FileTail
+
+
+class TestFileTail(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "app.log")
+        with open(self.path, "wb") as f:
+            f.write(b"line 1\n")
+        self.watcher = FileSystemWatcher()
+
+    def tearDown(self):
+        self.watcher.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def append(self, data, path=None):
+        with open(path or self.path, "ab") as f:
+            f.write(data)
+
+    def follow(self, tail, actions, delay=0.1):
+        """Run actions on a thread while collecting events until the tail goes idle."""
+        def run():
+            for action in actions:
+                time.sleep(delay)
+                action()
+
+        writer = threading.Thread(target=run)
+        writer.start()
+        events = list(tail)
+        writer.join()
+        return events
+
+    def test_follows_appends(self):
+        """Test that appended data streams with offsets, using watch notifications."""
+        tail = FileTail(self.path, 0, self.watcher, idle_timeout=0.5)
+        events = self.follow(tail, [lambda: self.append(b"line 2\n"), lambda: self.append(b"line 3\n")])
+
+        self.assertTrue(tail.watching)
+        self.assertEqual(b''.join(e.content for e in events), b"line 1\nline 2\nline 3\n")
+        self.assertEqual([e.offset for e in events], [0, 7, 14])
+        self.assertEqual(tail.position, 21)
+
+    def test_polling_fallback(self):
+        """Test following without a watcher."""
+        tail = FileTail(self.path, -3, None, idle_timeout=0.5, poll_interval=0.02)
+        events = self.follow(tail, [lambda: self.append(b"more\n")])
+
+        self.assertFalse(tail.watching)
+        self.assertEqual(b''.join(e.content for e in events), b" 1\nmore\n")
+
+    def test_batches_small_appends(self):
+        """Test that bursts of small appends are sent as a few larger events."""
+        def burst():
+            for index in range(200):
+                self.append(f"{index}\n".encode())
+
+        tail = FileTail(self.path, 7, self.watcher, batch_delay=0.2, idle_timeout=0.5)
+        events = self.follow(tail, [burst])
+
+        self.assertEqual(b''.join(e.content for e in events),
+                         b''.join(f"{index}\n".encode() for index in range(200)))
+        self.assertLess(len(events), 10)
+
+    def test_truncation(self):
+        """Test that a truncated file is reported and read again from the start."""
+        def truncate():
+            with open(self.path, "wb") as f:
+                f.write(b"new\n")
+
+        tail = FileTail(self.path, 7, self.watcher, idle_timeout=0.5)
+        events = self.follow(tail, [truncate])
+
+        self.assertTrue(events[0].truncated)
+        self.assertEqual((events[1].content, events[1].offset), (b"new\n", 0))
+        self.assertEqual(tail.truncations, 1)
+
+    def test_rotation(self):
+        """Test that the old file is finished before following its replacement."""
+        def rotate():
+            self.append(b"last old line\n")
+            os.rename(self.path, self.path + ".1")
+            self.append(b"first new line\n")
+
+        tail = FileTail(self.path, 7, self.watcher, idle_timeout=0.5)
+        events = self.follow(tail, [rotate])
+
+        self.assertEqual(events[0].content, b"last old line\n")
+        self.assertTrue(events[1].rotated)
+        self.assertEqual((events[2].content, events[2].offset), (b"first new line\n", 0))
+
+    def test_offset_beyond_end(self):
+        """Test that a stale offset past the end is treated as a truncation."""
+        tail = FileTail(self.path, 100, None, idle_timeout=0.1, poll_interval=0.02)
+        events = list(tail)
+        self.assertTrue(events[0].truncated)
+        self.assertEqual(events[1].content, b"line 1\n")
+
+    def test_stop(self):
+        """Test that stop() ends a tail that is waiting for data."""
+        tail = FileTail(self.path, 0, self.watcher)
+        threading.Timer(0.2, tail.stop).start()
+        start = time.monotonic()
+        events = list(tail)
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertEqual(len(events), 1)
+
+
+class TestTailRpc(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "app.log")
+        with open(self.path, "wb") as f:
+            f.write(b"hello\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_tail_file(self):
+        """Test the servicer RPC, ending on the idle timeout."""
+        servicer = FileServiceServicer()
+        try:
+            chunks = list(servicer.TailFile(pb2.TailRequest(file_path=self.path, idle_timeout=1), None))
+            self.assertEqual(chunks[0].content, b"hello\n")
+            self.assertTrue(chunks[-1].is_last)
+            self.assertEqual(chunks[-1].offset, 6)
+
+            missing = pb2.TailRequest(file_path=os.path.join(self.temp_dir, "missing"))
+            [chunk] = servicer.TailFile(missing, None)
+            self.assertEqual(chunk.error, "File does not exist")
+        finally:
+            servicer.close()
+
+    def test_client_follow_and_cancel(self):
+        """Test following through the client and cancelling by closing the generator."""
+        server = FileServer(ports=[50231, 50232, 50233])
+        self.assertTrue(server.start())
+        try:
+            with ChannelPool() as pool:
+                client = FileClient(f"localhost:{server.port}", pool=pool)
+                stream = client.follow(self.path)
+                self.assertEqual(next(stream).content, b"hello\n")
+                with open(self.path, "ab") as f:
+                    f.write(b"world\n")
+                self.assertEqual(next(stream).content, b"world\n")
+                stream.close()
+        finally:
+            server.stop()
+
+    def test_max_tails(self):
+        """Test that follows past max_tails are refused until a slot is freed."""
+        servicer = FileServiceServicer(max_tails=1)
+        request = pb2.TailRequest(file_path=self.path, idle_timeout=1)
+        try:
+            first = servicer.TailFile(request, None)
+            self.assertEqual(next(first).content, b"hello\n")
+            [refused] = servicer.TailFile(request, None)
+            self.assertEqual(refused.error, "Too many files are being followed (limit 1)")
+
+            first.close()
+            self.assertEqual(next(servicer.TailFile(request, None)).content, b"hello\n")
+        finally:
+            servicer.close()
+
+    def test_follows_leave_workers_free(self):
+        """Test that a server with two worker threads keeps answering while one is following."""
+        server = FileServer(max_workers=2, ports=[50294, 50295, 50296],
+                            service=FileServiceServicer(max_tails=1))
+        self.assertTrue(server.start())
+        try:
+            with ChannelPool() as pool:
+                client = FileClient(f"localhost:{server.port}", pool=pool)
+                stream = client.follow(self.path)
+                self.assertEqual(next(stream).content, b"hello\n")
+                with self.assertRaisesRegex(DownloadError, "Too many files"):
+                    next(client.follow(self.path))
+                self.assertTrue(client.exists(self.path).exists)
+                stream.close()
+        finally:
+            server.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import asyncio
+import os
+import stat
+import tempfile
+import unittest
+
+from fileservice import file_service_pb2 as pb2
+from fileservice.client import Uploader, UploadError
+from fileservice.server import AioFileServer
+from fileservice.server.server import FileServer
+from fileservice.server.service import FileServiceServicer
+
+
+class TestUploadFile(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.servicer = FileServiceServicer(upload_roots=[self.temp_dir])
+        self.target = os.path.join(self.temp_dir, "artifact.bin")
+        self.data = os.urandom(200 * 1024)
+
+    def tearDown(self):
+        self.servicer.close()
+        for name in os.listdir(self.temp_dir):
+            os.remove(os.path.join(self.temp_dir, name))
+        os.rmdir(self.temp_dir)
+
+    def _chunks(self, data: bytes, chunk_size: int = 64 * 1024, **options) -> list:
+        offsets = list(range(0, len(data), chunk_size)) or [0]
+        chunks = [
+            pb2.UploadChunk(content=data[o:o + chunk_size], offset=o) for o in offsets
+        ]
+        chunks[0].file_path = self.target
+        chunks[0].total_size = len(data)
+        for name, value in options.items():
+            setattr(chunks[0], name, value)
+        chunks[-1].is_last = True
+        return chunks
+
+    def test_upload_success(self):
+        """Test a chunked upload lands atomically with its metadata."""
+        response = self.servicer.UploadFile(
+            iter(self._chunks(self.data, fsync_interval=64 * 1024)), None)
+
+        self.assertTrue(response.success, response.error)
+        self.assertEqual(response.bytes_written, len(self.data))
+        self.assertEqual(response.metadata.size, len(self.data))
+        with open(self.target, "rb") as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertEqual(os.listdir(self.temp_dir), ["artifact.bin"])
+
+    def test_incomplete_upload_is_discarded(self):
+        """Test that a stream without the final chunk leaves nothing behind."""
+        chunks = self._chunks(self.data)[:-1]
+
+        response = self.servicer.UploadFile(iter(chunks), None)
+
+        self.assertFalse(response.success)
+        self.assertIn("final chunk", response.error)
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_refuses_to_overwrite(self):
+        """Test that existing files are only replaced when asked."""
+        with open(self.target, "wb") as f:
+            f.write(b"old")
+
+        response = self.servicer.UploadFile(iter(self._chunks(self.data)), None)
+        self.assertIn("already exists", response.error)
+
+        response = self.servicer.UploadFile(iter(self._chunks(self.data, overwrite=True)), None)
+        self.assertTrue(response.success)
+
+    def test_file_modes(self):
+        """Test that new files follow the umask and replaced files keep their mode."""
+        umask = os.umask(0o027)
+        try:
+            servicer = FileServiceServicer(upload_roots=[self.temp_dir])
+        finally:
+            os.umask(umask)
+        try:
+            self.assertTrue(servicer.UploadFile(iter(self._chunks(self.data)), None).success)
+            self.assertEqual(stat.S_IMODE(os.stat(self.target).st_mode), 0o640)
+
+            os.chmod(self.target, 0o755)
+            response = servicer.UploadFile(iter(self._chunks(self.data, overwrite=True)), None)
+            self.assertTrue(response.success)
+            self.assertEqual(stat.S_IMODE(os.stat(self.target).st_mode), 0o755)
+        finally:
+            servicer.close()
+
+    def test_upload_roots(self):
+        """Test that uploads are refused by default and outside the upload roots."""
+        for roots, error in (([], "disabled"), ([os.path.join(self.temp_dir, "sub")], "outside")):
+            servicer = FileServiceServicer(upload_roots=roots)
+            try:
+                response = servicer.UploadFile(iter(self._chunks(self.data)), None)
+            finally:
+                servicer.close()
+            self.assertIn(error, response.error)
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+        os.symlink("/", os.path.join(self.temp_dir, "escape"))
+        chunks = self._chunks(self.data)
+        chunks[0].file_path = os.path.join(self.temp_dir, "escape", "tmp", "artifact.bin")
+        self.assertIn("outside", self.servicer.UploadFile(iter(chunks), None).error)
+
+    def test_unexpected_offset(self):
+        """Test that out-of-order chunks are rejected."""
+        chunks = self._chunks(self.data)
+        chunks[1].offset += 1
+
+        response = self.servicer.UploadFile(iter(chunks), None)
+
+        self.assertIn("offset", response.error.lower())
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_client_upload(self):
+        """Test the Uploader client against a running server."""
+        source = os.path.join(self.temp_dir, "source.bin")
+        with open(source, "wb") as f:
+            f.write(os.urandom(1024 * 1024 + 5))
+
+        server = FileServer(
+            ports=[50191, 50192, 50193], service=FileServiceServicer(upload_roots=[self.temp_dir]))
+        self.assertTrue(server.start())
+        try:
+            uploader = Uploader(f"localhost:{server.port}", chunk_size=256 * 1024)
+            result = uploader.upload(source, self.target)
+            with self.assertRaises(UploadError):
+                uploader.upload(source, self.target)
+        finally:
+            server.stop()
+
+        self.assertEqual(result.size, os.path.getsize(source))
+        with open(source, "rb") as a, open(self.target, "rb") as b:
+            self.assertEqual(a.read(), b.read())
+
+    def test_client_upload_to_aio_server(self):
+        """Test uploading through the asyncio server's stream bridge."""
+        source = os.path.join(self.temp_dir, "source.bin")
+        with open(source, "wb") as f:
+            f.write(self.data)
+
+        async def run():
+            server = AioFileServer(
+                ports=[50194, 50195, 50196], service=FileServiceServicer(upload_roots=[self.temp_dir]))
+            self.assertTrue(await server.start())
+            try:
+                uploader = Uploader(f"localhost:{server.port}", chunk_size=16 * 1024)
+                return await asyncio.get_running_loop().run_in_executor(
+                    None, uploader.upload, source, self.target)
+            finally:
+                await server.stop()
+
+        result = asyncio.run(run())
+
+        self.assertEqual(result.size, len(self.data))
+        with open(self.target, "rb") as f:
+            self.assertEqual(f.read(), self.data)